@@ -12,12 +12,12 @@ All endpoints include proper authentication, validation, error handling,
 and logging for security and maintainability.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 import uuid
-from sqlalchemy import func, extract, or_
+from sqlalchemy import func, extract, or_, select
 
 from app.database import get_db
 from app.models.user import User, Agent, Customer
@@ -26,6 +26,7 @@ from app.models.ticket import Ticket, Message, TicketStatus, TicketPriority
 from app.models.analytics import Notification, NotificationType
 from app.services.auth import get_current_user
 from app.core.logging import logger
+from app.core.pagination import keyset_page, set_next_cursor
 from app.core.validation import sanitize_string, sanitize_search_query, validate_uuid
 from app.schemas.agent import (
     TicketAssign, TicketStatusUpdate, TicketPriorityUpdate, MessageCreate, CustomerNote, 
@@ -116,9 +117,12 @@ def get_dashboard(current_user: User = Depends(get_current_user), db: Session =
 
 @router.get("/tickets")
 def get_tickets(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter tickets by status (open, in_progress, resolved, etc.)"),
     priority: Optional[str] = Query(None, description="Filter tickets by priority (low, medium, high)"),
     assigned_only: bool = Query(False, description="Show only tickets assigned to current agent"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: Optional[int] = Query(None, description="Page size (capped at PAGINATION_MAX_LIMIT)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -135,11 +139,14 @@ def get_tickets(
         status: Optional status filter (case-insensitive)
         priority: Optional priority filter (case-insensitive)
         assigned_only: If True, shows only tickets assigned to current agent
+        cursor: Keyset cursor of the page to fetch (first page if omitted)
+        limit: Page size
         current_user: Authenticated agent user from JWT token
         db: Database session dependency
         
     Returns:
-        List[dict]: List of tickets with customer and message information
+        List[dict]: One page of tickets with customer and message information, newest
+        first; the X-Next-Cursor header holds the next page's cursor
         
     Raises:
         HTTPException: 500 if database operation fails
@@ -147,12 +154,20 @@ def get_tickets(
     logger.info(f"Tickets requested by agent ID: {current_user.id}, status: {status}, priority: {priority}, assigned_only: {assigned_only}")
     
     try:
+        # Customer and message count come back with each ticket in one statement
+        message_count = select(func.count(Message.id)).where(
+            Message.ticket_id == Ticket.id
+        ).correlate(Ticket).scalar_subquery()
+        query = db.query(Ticket, User.full_name, User.email, message_count).outerjoin(
+            User, User.id == Ticket.customer_id
+        )
+        
         if assigned_only:
             # Show only tickets assigned to this agent
-            query = db.query(Ticket).filter(Ticket.agent_id == current_user.id)
+            query = query.filter(Ticket.agent_id == current_user.id)
         else:
             # Show tickets assigned to this agent + unassigned tickets (available to pick up)
-            query = db.query(Ticket).filter(
+            query = query.filter(
                 or_(Ticket.agent_id == current_user.id, Ticket.agent_id.is_(None))
             )
         
@@ -168,13 +183,10 @@ def get_tickets(
             query = query.filter(Ticket.priority == priority_sanitized)
             logger.debug(f"Applied priority filter: {priority_sanitized}")
         
-        tickets = query.order_by(Ticket.created_at.desc()).all()
+        rows, next_cursor = keyset_page(query, Ticket.created_at, Ticket.id, cursor, limit)
         
         result = []
-        for ticket in tickets:
-            customer = db.query(User).filter(User.id == ticket.customer_id).first()
-            message_count = db.query(Message).filter(Message.ticket_id == ticket.id).count()
-            
+        for ticket, customer_name, customer_email, message_count in rows:
             result.append({
                 "id": ticket.id,
                 "subject": ticket.subject,
@@ -182,15 +194,18 @@ def get_tickets(
                 "priority": ticket.priority,
                 "created_at": ticket.created_at,
                 "updated_at": ticket.updated_at,
-                "customer_name": customer.full_name if customer else "Unknown",
-                "customer_email": customer.email if customer else "",
+                "customer_name": customer_name or "Unknown",
+                "customer_email": customer_email or "",
                 "message_count": message_count,
                 "agent_id": ticket.agent_id
             })
         
+        set_next_cursor(response, next_cursor)
         logger.info(f"Retrieved {len(result)} tickets for agent ID: {current_user.id}")
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving tickets for agent: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve tickets")
@@ -440,39 +455,42 @@ def add_ticket_message(
 # Customer Profile APIs
 @router.get("/customers")
 def get_customers(
+    response: Response,
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: Optional[int] = Query(None, description="Page size (capped at PAGINATION_MAX_LIMIT)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get customers assigned to agent"""
-    # Get customers from tickets assigned to this agent
-    query = db.query(User).join(Ticket, User.id == Ticket.customer_id).filter(
-        Ticket.agent_id == current_user.id
-    ).distinct()
+    """Get one page of customers assigned to agent, newest first (next page cursor in X-Next-Cursor)"""
+    # Get customers from tickets assigned to this agent, with their profile and counts in the same statement
+    assigned_customers = select(Ticket.customer_id).where(Ticket.agent_id == current_user.id)
+    total_orders = select(func.count(Order.id)).where(Order.customer_id == User.id).correlate(User).scalar_subquery()
+    total_tickets = select(func.count(Ticket.id)).where(Ticket.customer_id == User.id).correlate(User).scalar_subquery()
+    query = db.query(User, Customer.member_since, total_orders, total_tickets).outerjoin(
+        Customer, Customer.user_id == User.id
+    ).filter(User.id.in_(assigned_customers))
     
     if search:
         query = query.filter(
             or_(User.full_name.contains(search), User.email.contains(search))
         )
     
-    customers = query.all()
+    rows, next_cursor = keyset_page(query, User.created_at, User.id, cursor, limit)
     
     result = []
-    for customer in customers:
-        customer_profile = db.query(Customer).filter(Customer.user_id == customer.id).first()
-        total_orders = db.query(Order).filter(Order.customer_id == customer.id).count()
-        total_tickets = db.query(Ticket).filter(Ticket.customer_id == customer.id).count()
-        
+    for customer, member_since, order_count, ticket_count in rows:
         result.append({
             "id": customer.id,
             "name": customer.full_name,
             "email": customer.email,
             "avatar": customer.avatar,
-            "member_since": customer_profile.member_since if customer_profile else customer.created_at,
-            "total_orders": total_orders,
-            "total_tickets": total_tickets
+            "member_since": member_since or customer.created_at,
+            "total_orders": order_count,
+            "total_tickets": ticket_count
         })
     
+    set_next_cursor(response, next_cursor)
     return result
 
 @router.get("/customers/{customer_id}")
@@ -20,10 +20,10 @@ All endpoints include proper validation, error handling, and logging.
 
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas.user import UserCreate, Token, UserResponse
-from app.services.auth import authenticate_user, create_user, create_access_token_for_user, get_current_user
+from app.services.auth import aauthenticate_user, acreate_user, create_access_token_for_user, aget_current_user
 from app.models.user import User
 from app.core.logging import logger
 from app.core.validation import sanitize_string, validate_email
@@ -33,7 +33,7 @@ router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 @router.post("/register", response_model=Token)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user account with comprehensive validation.
     
@@ -51,7 +51,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     
     Args:
         user: User registration data (email, password, full_name, role)
-        db: Database session dependency
+        db: Async database session dependency
         
     Returns:
         Token: JWT access token with user information
@@ -76,7 +76,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         user.full_name = sanitized_name
         user.email = user.email.lower().strip()
         
-        db_user = create_user(db, user)
+        db_user = await acreate_user(db, user)
         access_token = create_access_token_for_user(db_user)
         
         logger.info(f"User successfully registered: {db_user.id} ({user.email})")
@@ -104,7 +104,7 @@ async def login(
     username: str = Form(..., description="User email address"),
     password: str = Form(..., description="User password"),
     role: str = Form(..., description="User role (CUSTOMER, AGENT, VENDOR, SUPERVISOR)"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Authenticate user and generate access token with comprehensive validation.
@@ -124,7 +124,7 @@ async def login(
         username: User email address (validated format)
         password: User password (minimum security requirements)
         role: User role for role-based authentication (CUSTOMER, AGENT, VENDOR, SUPERVISOR)
-        db: Database session dependency
+        db: Async database session dependency
         
     Returns:
         Token: JWT access token with user information
@@ -152,7 +152,7 @@ async def login(
         if not password or len(password.strip()) < 1:
             raise HTTPException(status_code=400, detail="Password is required")
         
-        user = authenticate_user(db, username_clean, password, role_clean)
+        user = await aauthenticate_user(db, username_clean, password, role_clean)
         if not user:
             logger.warning(f"Failed login attempt for {username_clean} with role {role_clean}")
             raise HTTPException(
@@ -191,7 +191,7 @@ async def login(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Retrieve current authenticated user information.
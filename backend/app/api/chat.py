@@ -2,12 +2,16 @@
 Chat API endpoints for RAG-based conversational support
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Tuple
 from pydantic import BaseModel
 from datetime import datetime
+import asyncio
 
-from app.database import get_db
+from app.database import get_async_db, get_async_read_db, AsyncSessionLocal
+from app.core.streaming import sse_event, sse_response
 from app.models.chat import ChatConversation, ChatMessage
 from app.models.user import User
 from app.models.refund import ImageAnalysis, RefundRequest, ReturnRequest
@@ -15,7 +19,7 @@ from app.models.order import Order, OrderItem
 from app.services.rag_service import get_rag_service
 from app.services.vision_service import get_vision_service
 from app.services.refund_eligibility_service import get_eligibility_service
-from app.services.auth import get_current_user
+from app.services.auth import aget_current_user
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,27 +27,27 @@ router = APIRouter(prefix="/chat", tags=["chat"])
 
 
 # Helper Functions
-def _load_customer_context(customer_id: int, db: Session) -> Dict:
+async def _load_customer_context(customer_id: int, db: AsyncSession) -> Dict:
     """
     Load customer's order and refund context for personalized responses
     """
     try:
         # Get recent orders (last 5)
-        recent_orders = db.query(Order).filter(
+        recent_orders = (await db.scalars(select(Order).filter(
             Order.customer_id == customer_id
-        ).order_by(Order.created_at.desc()).limit(5).all()
+        ).order_by(Order.created_at.desc()).limit(5))).all()
         
         # Get pending refund requests
-        pending_refunds = db.query(RefundRequest).filter(
+        pending_refunds = (await db.scalars(select(RefundRequest).filter(
             RefundRequest.customer_id == customer_id,
             RefundRequest.status.in_(['REQUESTED', 'UNDER_REVIEW'])
-        ).all()
+        ))).all()
         
         # Get pending return requests
-        pending_returns = db.query(ReturnRequest).filter(
+        pending_returns = (await db.scalars(select(ReturnRequest).filter(
             ReturnRequest.customer_id == customer_id,
             ReturnRequest.status.in_(['REQUESTED', 'APPROVED', 'IN_TRANSIT'])
-        ).all()
+        ))).all()
         
         # Format context
         context = {
@@ -55,7 +59,7 @@ def _load_customer_context(customer_id: int, db: Session) -> Dict:
         
         # Add order details
         for order in recent_orders:
-            order_items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
+            order_items = (await db.scalars(select(OrderItem).filter(OrderItem.order_id == order.id))).all()
             context["recent_orders"].append({
                 "order_id": order.id,
                 "order_number": order.order_number,
@@ -74,7 +78,7 @@ def _load_customer_context(customer_id: int, db: Session) -> Dict:
         
         # Add refund details
         for refund in pending_refunds:
-            order = db.query(Order).filter(Order.id == refund.order_id).first()
+            order = await db.get(Order, refund.order_id)
             context["pending_refunds"].append({
                 "refund_id": refund.id,
                 "order_number": order.order_number if order else "Unknown",
@@ -86,7 +90,7 @@ def _load_customer_context(customer_id: int, db: Session) -> Dict:
         
         # Add return details
         for return_req in pending_returns:
-            order = db.query(Order).filter(Order.id == return_req.order_id).first()
+            order = await db.get(Order, return_req.order_id)
             context["pending_returns"].append({
                 "return_id": return_req.id,
                 "order_number": order.order_number if order else "Unknown",
@@ -162,8 +166,8 @@ class ConversationResponse(BaseModel):
 @router.post("/start", response_model=ConversationResponse)
 async def start_chat(
     request: StartChatRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Start a new chat conversation with automatic context loading
@@ -175,21 +179,15 @@ async def start_chat(
             status="ACTIVE"
         )
         db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-        
-        # Load customer context (orders and refunds)
-        customer_context = _load_customer_context(current_user.id, db)
+        await db.commit()
+        await db.refresh(conversation)
         
         # If initial message provided, process it
         if request.initial_message:
             rag_service = get_rag_service()
             
-            # Analyze intent and sentiment
-            analysis = rag_service.analyze_intent_and_sentiment(
-                request.initial_message,
-                customer_context
-            )
+            # Analyze scope, intent and sentiment while loading orders and refunds
+            analysis, customer_context, docs = await _analyze_message(request.initial_message, current_user.id, db)
             
             # Save customer message with intent and sentiment
             customer_msg = ChatMessage(
@@ -203,13 +201,16 @@ async def start_chat(
                 entities=analysis.get('entities')
             )
             db.add(customer_msg)
-            db.commit()
+            await db.commit()
             
             # Generate AI response with customer context
             if rag_service.is_available():
-                result = rag_service.answer_question(
+                # Awaited LLM calls leave the event loop free for other chats
+                result = await rag_service.aanswer_question(
                     request.initial_message,
-                    customer_context=customer_context
+                    customer_context=customer_context,
+                    analysis=analysis,
+                    context_docs=docs
                 )
                 
                 ai_msg = ChatMessage(
@@ -219,7 +220,7 @@ async def start_chat(
                     rag_sources=result['sources'] if result['sources'] else None
                 )
                 db.add(ai_msg)
-                db.commit()
+                await db.commit()
             else:
                 # Fallback message
                 ai_msg = ChatMessage(
@@ -228,144 +229,262 @@ async def start_chat(
                     sender_type="AI"
                 )
                 db.add(ai_msg)
-                db.commit()
+                await db.commit()
         
         return conversation
         
     except Exception as e:
         logger.error(f"Error starting chat: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to start chat")
 
 
+async def _analyze_message(
+    message: str,
+    customer_id: int,
+    db: AsyncSession,
+    category_filter: Optional[str] = None
+) -> Tuple[Dict, Dict, List[Dict]]:
+    """
+    Analyze a customer message while loading their context and retrieving documents
+    
+    The three are independent, so the LLM analysis no longer waits for the database
+    and the answer's retrieval is ready by the time the analysis returns. The context
+    load is the only user of db meanwhile (an AsyncSession is not shared across tasks).
+    
+    Returns:
+        Tuple of (analysis including scope, customer context, retrieved documents)
+    """
+    rag_service = get_rag_service()
+    return await asyncio.gather(
+        rag_service.aanalyze_message(message),
+        _load_customer_context(customer_id, db),
+        rag_service.aretrieve_for_answer(message, category_filter=category_filter)
+    )
+
+
+async def _record_customer_message(
+    request: ChatMessageRequest,
+    current_user: User,
+    db: AsyncSession
+) -> Tuple[ChatConversation, Dict, List[Dict[str, str]], Dict, List[Dict]]:
+    """
+    Validate the conversation, then analyze and save the customer's message
+    
+    Returns:
+        Tuple of (conversation, analysis, recent history, customer context, retrieved documents)
+    """
+    # Verify conversation exists and belongs to user
+    conversation = await db.scalar(select(ChatConversation).filter(
+        ChatConversation.id == request.conversation_id,
+        ChatConversation.customer_id == current_user.id
+    ))
+    
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    if conversation.status != "ACTIVE":
+        raise HTTPException(status_code=400, detail="Conversation is not active")
+    
+    # Analyze scope, intent and sentiment while loading orders and refunds
+    analysis, customer_context, docs = await _analyze_message(
+        request.message, current_user.id, db, request.category_filter
+    )
+    
+    # Save customer message with intent and sentiment
+    customer_msg = ChatMessage(
+        conversation_id=conversation.id,
+        content=request.message,
+        sender_type="CUSTOMER",
+        intent=analysis.get('intent'),
+        intent_confidence=analysis.get('intent_confidence'),
+        sentiment=analysis.get('sentiment'),
+        sentiment_score=analysis.get('sentiment_score'),
+        entities=analysis.get('entities')
+    )
+    db.add(customer_msg)
+    await db.commit()
+    
+    # Get conversation history
+    history = (await db.scalars(select(ChatMessage).filter(
+        ChatMessage.conversation_id == conversation.id
+    ).order_by(ChatMessage.created_at.desc()).limit(10))).all()
+    
+    history_list = [
+        {"role": msg.sender_type, "content": msg.content}
+        for msg in reversed(history)
+    ]
+    
+    return conversation, analysis, history_list, customer_context, docs
+
+
+async def _save_ai_reply(
+    conversation: ChatConversation,
+    content: str,
+    sources: Optional[List[str]],
+    analysis: Dict,
+    db: AsyncSession
+) -> ChatMessage:
+    """
+    Save the AI reply and update the conversation's activity time and intent
+    """
+    ai_msg = ChatMessage(
+        conversation_id=conversation.id,
+        content=content,
+        sender_type="AI",
+        rag_sources=sources if sources else None
+    )
+    db.add(ai_msg)
+    await db.commit()
+    await db.refresh(ai_msg)
+    
+    # Update conversation timestamp and intent
+    conversation.last_activity_at = datetime.utcnow()
+    
+    # Update conversation intent based on most recent customer message intent
+    if analysis.get('intent') and analysis.get('intent') != 'greeting':
+        conversation.intent = analysis.get('intent')
+    
+    await db.commit()
+    
+    return ai_msg
+
+
 @router.post("/message", response_model=ChatMessageResponse)
 async def send_message(
     request: ChatMessageRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Send a message in an existing conversation with customer context
     """
     try:
-        # Verify conversation exists and belongs to user
-        conversation = db.query(ChatConversation).filter(
-            ChatConversation.id == request.conversation_id,
-            ChatConversation.customer_id == current_user.id
-        ).first()
-        
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        if conversation.status != "ACTIVE":
-            raise HTTPException(status_code=400, detail="Conversation is not active")
-        
-        # Load customer context for intent analysis
-        customer_context = _load_customer_context(current_user.id, db)
-        
-        # Analyze intent and sentiment
-        rag_service = get_rag_service()
-        analysis = rag_service.analyze_intent_and_sentiment(
-            request.message,
-            customer_context
+        conversation, analysis, history_list, customer_context, docs = await _record_customer_message(
+            request, current_user, db
         )
         
-        # Save customer message with intent and sentiment
-        customer_msg = ChatMessage(
-            conversation_id=conversation.id,
-            content=request.message,
-            sender_type="CUSTOMER",
-            intent=analysis.get('intent'),
-            intent_confidence=analysis.get('intent_confidence'),
-            sentiment=analysis.get('sentiment'),
-            sentiment_score=analysis.get('sentiment_score'),
-            entities=analysis.get('entities')
-        )
-        db.add(customer_msg)
-        db.commit()
-        
-        # Get conversation history
-        history = db.query(ChatMessage).filter(
-            ChatMessage.conversation_id == conversation.id
-        ).order_by(ChatMessage.created_at.desc()).limit(10).all()
-        
-        history_list = [
-            {"role": msg.sender_type, "content": msg.content}
-            for msg in reversed(history)
-        ]
-        
-        # Load customer context (orders and refunds)
-        customer_context = _load_customer_context(current_user.id, db)
-        
         # Generate AI response with customer context
         rag_service = get_rag_service()
         
         if rag_service.is_available():
-            result = rag_service.answer_question(
+            # Awaited LLM calls leave the event loop free for other chats
+            result = await rag_service.aanswer_question(
                 request.message,
                 conversation_history=history_list,
                 category_filter=request.category_filter,
-                customer_context=customer_context
+                customer_context=customer_context,
+                analysis=analysis,
+                context_docs=docs
             )
             
-            ai_msg = ChatMessage(
-                conversation_id=conversation.id,
-                content=result['response'],
-                sender_type="AI",
-                rag_sources=result['sources'] if result['sources'] else None
-            )
-        else:
-            ai_msg = ChatMessage(
-                conversation_id=conversation.id,
-                content="I apologize, but I'm currently unable to process your request. Please try again later or contact our support team.",
-                sender_type="AI"
-            )
-        
-        db.add(ai_msg)
-        db.commit()
-        db.refresh(ai_msg)
-        
-        # Update conversation timestamp and intent
-        conversation.last_activity_at = datetime.utcnow()
-        
-        # Update conversation intent based on most recent customer message intent
-        if analysis.get('intent') and analysis.get('intent') != 'greeting':
-            conversation.intent = analysis.get('intent')
-        
-        db.commit()
-        
-        return ai_msg
+            return await _save_ai_reply(conversation, result['response'], result['sources'], analysis, db)
+        
+        return await _save_ai_reply(
+            conversation,
+            "I apologize, but I'm currently unable to process your request. Please try again later or contact our support team.",
+            None,
+            analysis,
+            db
+        )
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error sending message: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to send message")
 
 
+@router.post("/message/stream")
+async def send_message_stream(
+    request: ChatMessageRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
+):
+    """
+    Send a message and stream the AI reply as server-sent events
+    
+    Events: "token" ({"delta": text}) as the reply is generated, then "done" with the
+    saved message (same fields as POST /message) plus time_to_first_token_ms, or "error".
+    The reply is saved only when the stream completes.
+    """
+    try:
+        conversation, analysis, history_list, customer_context, docs = await _record_customer_message(
+            request, current_user, db
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error sending message: {e}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to send message")
+    
+    conversation_id = conversation.id
+    rag_service = get_rag_service()
+    
+    async def persist_reply(content: str, sources: Optional[List[str]]) -> Dict:
+        # The request's session may already be closed once streaming ends, so use a fresh one
+        async with AsyncSessionLocal() as reply_db:
+            reply_conversation = await reply_db.get(ChatConversation, conversation_id)
+            ai_msg = await _save_ai_reply(reply_conversation, content, sources, analysis, reply_db)
+            return ChatMessageResponse.model_validate(ai_msg).model_dump(mode="json")
+    
+    async def events():
+        try:
+            if not rag_service.is_available():
+                message = await persist_reply(
+                    "I apologize, but I'm currently unable to process your request. Please try again later or contact our support team.",
+                    None
+                )
+                yield sse_event("done", {**message, "time_to_first_token_ms": None})
+                return
+            
+            async for event in rag_service.astream_answer(
+                request.message,
+                conversation_history=history_list,
+                category_filter=request.category_filter,
+                customer_context=customer_context,
+                analysis=analysis,
+                context_docs=docs
+            ):
+                if not event.get("done"):
+                    yield sse_event("token", event)
+                    continue
+                
+                message = await persist_reply(event['response'], event['sources'])
+                logger.info(f"Streamed chat reply: first token {event['time_to_first_token_ms']}ms")
+                yield sse_event("done", {**message, "time_to_first_token_ms": event['time_to_first_token_ms']})
+                
+        except Exception as e:
+            logger.error(f"Error streaming message: {e}")
+            yield sse_event("error", {"detail": "Failed to send message"})
+    
+    return sse_response(events())
+
+
 @router.get("/history/{conversation_id}", response_model=List[ChatMessageResponse])
 async def get_chat_history(
     conversation_id: str,
     limit: int = 50,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Get conversation history
     """
     # Verify conversation belongs to user
-    conversation = db.query(ChatConversation).filter(
+    conversation = await db.scalar(select(ChatConversation).filter(
         ChatConversation.id == conversation_id,
         ChatConversation.customer_id == current_user.id
-    ).first()
+    ))
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    messages = db.query(ChatMessage).filter(
+    messages = (await db.scalars(select(ChatMessage).filter(
         ChatMessage.conversation_id == conversation_id
-    ).order_by(ChatMessage.created_at.asc()).limit(limit).all()
+    ).order_by(ChatMessage.created_at.asc()).limit(limit))).all()
     
     return messages
 
@@ -373,15 +492,15 @@ async def get_chat_history(
 @router.get("/conversations", response_model=List[ConversationResponse])
 async def get_conversations(
     limit: int = 20,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Get user's chat conversations
     """
-    conversations = db.query(ChatConversation).filter(
+    conversations = (await db.scalars(select(ChatConversation).filter(
         ChatConversation.customer_id == current_user.id
-    ).order_by(ChatConversation.updated_at.desc()).limit(limit).all()
+    ).order_by(ChatConversation.updated_at.desc()).limit(limit))).all()
     
     return conversations
 
@@ -389,35 +508,36 @@ async def get_conversations(
 @router.post("/escalate")
 async def escalate_to_agent(
     request: EscalateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Escalate conversation to human agent and generate summary
     """
-    conversation = db.query(ChatConversation).filter(
+    conversation = await db.scalar(select(ChatConversation).filter(
         ChatConversation.id == request.conversation_id,
         ChatConversation.customer_id == current_user.id
-    ).first()
+    ))
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     # Generate conversation summary before escalating
-    messages = db.query(ChatMessage).filter(
+    messages = (await db.scalars(select(ChatMessage).filter(
         ChatMessage.conversation_id == conversation.id
-    ).order_by(ChatMessage.created_at.asc()).all()
+    ).order_by(ChatMessage.created_at.asc()))).all()
     
     if messages:
         rag_service = get_rag_service()
-        customer_context = _load_customer_context(current_user.id, db)
+        customer_context = await _load_customer_context(current_user.id, db)
         
         message_list = [
             {"role": msg.sender_type, "content": msg.content}
             for msg in messages
         ]
         
-        summary_result = rag_service.generate_conversation_summary(
+        summary_result = await run_in_threadpool(
+            rag_service.generate_conversation_summary,
             message_list,
             customer_context
         )
@@ -439,7 +559,7 @@ async def escalate_to_agent(
         sender_type="SYSTEM"
     )
     db.add(system_msg)
-    db.commit()
+    await db.commit()
     
     return {"success": True, "message": "Conversation escalated to agent", "summary": conversation.summary}
 
@@ -447,31 +567,31 @@ async def escalate_to_agent(
 @router.post("/feedback")
 async def submit_feedback(
     request: ChatFeedbackRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Submit feedback for an AI response
     """
-    message = db.query(ChatMessage).filter(
+    message = await db.scalar(select(ChatMessage).filter(
         ChatMessage.id == request.message_id
-    ).first()
+    ))
     
     if not message:
         raise HTTPException(status_code=404, detail="Message not found")
     
     # Verify message belongs to user's conversation
-    conversation = db.query(ChatConversation).filter(
+    conversation = await db.scalar(select(ChatConversation).filter(
         ChatConversation.id == message.conversation_id,
         ChatConversation.customer_id == current_user.id
-    ).first()
+    ))
     
     if not conversation:
         raise HTTPException(status_code=403, detail="Access denied")
     
     message.helpful = request.rating >= 4
     message.feedback_reason = request.feedback_text
-    db.commit()
+    await db.commit()
     
     return {"success": True, "message": "Feedback submitted"}
 
@@ -479,32 +599,32 @@ async def submit_feedback(
 @router.post("/conversations/{conversation_id}/generate-summary")
 async def generate_conversation_summary(
     conversation_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Generate AI summary for a conversation
     """
     try:
         # Verify conversation belongs to user
-        conversation = db.query(ChatConversation).filter(
+        conversation = await db.scalar(select(ChatConversation).filter(
             ChatConversation.id == conversation_id,
             ChatConversation.customer_id == current_user.id
-        ).first()
+        ))
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Get all messages
-        messages = db.query(ChatMessage).filter(
+        messages = (await db.scalars(select(ChatMessage).filter(
             ChatMessage.conversation_id == conversation_id
-        ).order_by(ChatMessage.created_at.asc()).all()
+        ).order_by(ChatMessage.created_at.asc()))).all()
         
         if not messages:
             raise HTTPException(status_code=400, detail="No messages to summarize")
         
         # Load customer context
-        customer_context = _load_customer_context(current_user.id, db)
+        customer_context = await _load_customer_context(current_user.id, db)
         
         # Generate summary
         rag_service = get_rag_service()
@@ -514,7 +634,8 @@ async def generate_conversation_summary(
             for msg in messages
         ]
         
-        summary_result = rag_service.generate_conversation_summary(
+        summary_result = await run_in_threadpool(
+            rag_service.generate_conversation_summary,
             message_list,
             customer_context
         )
@@ -528,7 +649,7 @@ async def generate_conversation_summary(
             if summary_result.get('main_issue'):
                 conversation.topic = summary_result.get('main_issue')
             
-            db.commit()
+            await db.commit()
             
             return {
                 "success": True,
@@ -553,16 +674,16 @@ async def generate_conversation_summary(
 @router.get("/conversations/{conversation_id}/summary")
 async def get_conversation_summary(
     conversation_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Get existing summary for a conversation
     """
-    conversation = db.query(ChatConversation).filter(
+    conversation = await db.scalar(select(ChatConversation).filter(
         ChatConversation.id == conversation_id,
         ChatConversation.customer_id == current_user.id
-    ).first()
+    ))
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
@@ -583,37 +704,38 @@ async def get_conversation_summary(
 async def close_conversation(
     conversation_id: str,
     request: CloseConversationRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Close/resolve a conversation and generate summary
     """
     try:
-        conversation = db.query(ChatConversation).filter(
+        conversation = await db.scalar(select(ChatConversation).filter(
             ChatConversation.id == conversation_id,
             ChatConversation.customer_id == current_user.id
-        ).first()
+        ))
         
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Generate summary if not already generated
         if not conversation.summary:
-            messages = db.query(ChatMessage).filter(
+            messages = (await db.scalars(select(ChatMessage).filter(
                 ChatMessage.conversation_id == conversation_id
-            ).order_by(ChatMessage.created_at.asc()).all()
+            ).order_by(ChatMessage.created_at.asc()))).all()
             
             if messages:
                 rag_service = get_rag_service()
-                customer_context = _load_customer_context(current_user.id, db)
+                customer_context = await _load_customer_context(current_user.id, db)
                 
                 message_list = [
                     {"role": msg.sender_type, "content": msg.content}
                     for msg in messages
                 ]
                 
-                summary_result = rag_service.generate_conversation_summary(
+                summary_result = await run_in_threadpool(
+                    rag_service.generate_conversation_summary,
                     message_list,
                     customer_context
                 )
@@ -634,7 +756,7 @@ async def close_conversation(
         if request.feedback:
             conversation.feedback = request.feedback
         
-        db.commit()
+        await db.commit()
         
         return {
             "success": True,
@@ -655,8 +777,8 @@ async def verify_return_image(
     file: UploadFile = File(...),
     product_description: str = "",
     order_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Analyze uploaded image for refund verification
@@ -674,7 +796,8 @@ async def verify_return_image(
                 detail="Image analysis service temporarily unavailable"
             )
         
-        result = vision_service.analyze_product_image(
+        result = await run_in_threadpool(
+            vision_service.analyze_product_image,
             image_bytes,
             product_description
         )
@@ -698,8 +821,8 @@ async def verify_return_image(
             analyzed_at=datetime.utcnow()
         )
         db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
+        await db.commit()
+        await db.refresh(analysis)
         
         return {
             "success": True,
@@ -729,14 +852,21 @@ async def chat_health():
     return {
         "rag_available": rag_service.is_available(),
         "vision_available": vision_service.is_available(),
+        "embedding_cache": rag_service.embedding_service.cache_stats(),
+        "embedding_batcher": rag_service.embedding_service.batcher_stats(),
+        "retrieval": rag_service.retrieval_stats(),
+        "answer_cache": rag_service.answer_cache_stats(),
+        "prompt_budget": rag_service.prompt_budget_stats(),
+        "intent_rules": rag_service.intent_rules_stats(),
+        "streaming": rag_service.llm_service.stream_stats(),
         "status": "healthy" if rag_service.is_available() else "degraded"
     }
 
 
 @router.post("/index-knowledge-base")
 async def index_knowledge_base(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Index knowledge base articles (admin only)
@@ -744,7 +874,7 @@ async def index_knowledge_base(
     # TODO: Add admin role check
     
     rag_service = get_rag_service()
-    result = rag_service.index_knowledge_base()
+    result = await run_in_threadpool(rag_service.index_knowledge_base)
     
     return result
 
@@ -752,8 +882,8 @@ async def index_knowledge_base(
 @router.get("/analytics/intents")
 async def get_intent_analytics(
     days: int = 7,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Get analytics on message intents for the customer
@@ -766,12 +896,12 @@ async def get_intent_analytics(
         start_date = datetime.utcnow() - timedelta(days=days)
         
         # Get customer's messages with intents
-        messages = db.query(ChatMessage).join(ChatConversation).filter(
+        messages = (await db.scalars(select(ChatMessage).join(ChatConversation).filter(
             ChatConversation.customer_id == current_user.id,
             ChatMessage.sender_type == "CUSTOMER",
             ChatMessage.created_at >= start_date,
             ChatMessage.intent.isnot(None)
-        ).all()
+        ))).all()
         
         # Count intents
         intent_counts = {}
@@ -829,8 +959,8 @@ class RefundEligibilityRequest(BaseModel):
 @router.post("/check-refund-eligibility")
 async def check_refund_eligibility(
     request: RefundEligibilityRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Check if customer is eligible for refund based on policies
@@ -843,7 +973,8 @@ async def check_refund_eligibility(
         purchase_date = datetime.fromisoformat(request.purchase_date.replace('Z', '+00:00'))
         
         # Check eligibility
-        result = eligibility_service.check_eligibility(
+        result = await run_in_threadpool(
+            eligibility_service.check_eligibility,
             product_category=request.product_category,
             purchase_date=purchase_date,
             reason=request.reason,
@@ -855,7 +986,8 @@ async def check_refund_eligibility(
         
         # Generate customer-friendly summary
         rag_service = get_rag_service()
-        summary = rag_service.generate_refund_eligibility_summary(
+        summary = await run_in_threadpool(
+            rag_service.generate_refund_eligibility_summary,
             result,
             request.product_category,
             request.reason
@@ -875,14 +1007,14 @@ async def check_refund_eligibility(
 @router.get("/return-window/{category}")
 async def get_return_window(
     category: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Get return window information for a product category
     """
     try:
         eligibility_service = get_eligibility_service()
-        result = eligibility_service.get_return_window(category)
+        result = await run_in_threadpool(eligibility_service.get_return_window, category)
         
         return result
         
@@ -896,14 +1028,15 @@ async def explain_rejection(
     product_category: str,
     days_since_purchase: int,
     reason: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(aget_current_user)
 ):
     """
     Get customer-friendly explanation for why a return might be rejected
     """
     try:
         eligibility_service = get_eligibility_service()
-        explanation = eligibility_service.explain_rejection(
+        explanation = await run_in_threadpool(
+            eligibility_service.explain_rejection,
             product_category=product_category,
             days_since_purchase=days_since_purchase,
             reason=reason
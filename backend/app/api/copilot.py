@@ -4,13 +4,16 @@ Provides AI assistance for agents and supervisors
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional, Dict
 from datetime import datetime, timedelta
 import uuid
 import json
+import logging
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
+from app.core.streaming import sse_event, sse_response
 from app.models.user import User, Agent
 from app.models.ticket import Ticket, Message, TicketStatus
 from app.models.ai_copilot import TicketSummary, SuggestedResponse, RefundExplanation
@@ -18,6 +21,7 @@ from app.models.refund import RefundRequest, FraudCheck
 from app.services.auth import get_current_user
 from app.services.copilot_service import copilot_service
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/copilot", tags=["AI Copilot"])
 
 @router.get("/health")
@@ -32,17 +36,8 @@ def check_copilot_health():
         "status": "healthy" if llm_available else "degraded"
     }
 
-@router.get("/tickets/{ticket_id}/summary")
-def get_ticket_summary(
-    ticket_id: str,
-    regenerate: bool = False,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Get or generate AI summary for a ticket
-    If summary exists and regenerate=False, return cached version
-    """
+def _load_summary_inputs(ticket_id: str, regenerate: bool, db: Session):
+    """Ticket and its stored summary (None when regenerating or not yet summarized), and its messages"""
     
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
     if not ticket:
@@ -54,30 +49,16 @@ def get_ticket_summary(
         ).first()
         
         if existing_summary:
-            return {
-                "id": existing_summary.id,
-                "ticket_id": existing_summary.ticket_id,
-                "summary": existing_summary.summary,
-                "key_points": existing_summary.key_points,
-                "customer_sentiment": existing_summary.customer_sentiment,
-                "urgency_level": existing_summary.urgency_level,
-                "detected_category": existing_summary.detected_category,
-                "model_used": existing_summary.model_used,
-                "confidence_score": existing_summary.confidence_score,
-                "created_at": existing_summary.created_at,
-                "cached": True
-            }
+            return ticket, existing_summary, []
     
     messages = db.query(Message).filter(
         Message.ticket_id == ticket_id
     ).order_by(Message.created_at).all()
     
-    # Allow summarization even without messages - use ticket description
-    if not messages:
-        # Create a mock message from ticket description for AI analysis
-        messages = []
-    
-    summary_data = copilot_service.generate_ticket_summary(ticket, messages, db)
+    return ticket, None, messages
+
+def _save_ticket_summary(ticket_id: str, viewer_id: int, summary_data: Dict, regenerate: bool, db: Session):
+    """Persist a generated summary, replacing the stored one when regenerating"""
     
     if regenerate:
         existing = db.query(TicketSummary).filter(TicketSummary.ticket_id == ticket_id).first()
@@ -95,7 +76,7 @@ def get_ticket_summary(
         model_used=summary_data.get('model_used'),
         confidence_score=summary_data.get('confidence_score'),
         generation_time_ms=summary_data.get('generation_time_ms'),
-        viewed_by_agents=[current_user.id]
+        viewed_by_agents=[viewer_id]
     )
     
     try:
@@ -111,6 +92,45 @@ def get_ticket_summary(
         else:
             raise HTTPException(status_code=500, detail="Failed to create ticket summary")
     
+    return summary
+
+@router.get("/tickets/{ticket_id}/summary")
+async def get_ticket_summary(
+    ticket_id: str,
+    regenerate: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get or generate AI summary for a ticket
+    If summary exists and regenerate=False, return cached version
+    """
+    
+    # The session is synchronous, so its queries run in the threadpool rather than on the event loop
+    ticket, existing_summary, messages = await run_in_threadpool(_load_summary_inputs, ticket_id, regenerate, db)
+    
+    if existing_summary:
+        return {
+            "id": existing_summary.id,
+            "ticket_id": existing_summary.ticket_id,
+            "summary": existing_summary.summary,
+            "key_points": existing_summary.key_points,
+            "customer_sentiment": existing_summary.customer_sentiment,
+            "urgency_level": existing_summary.urgency_level,
+            "detected_category": existing_summary.detected_category,
+            "model_used": existing_summary.model_used,
+            "confidence_score": existing_summary.confidence_score,
+            "created_at": existing_summary.created_at,
+            "cached": True
+        }
+    
+    # Summarization works without messages too, from the ticket description
+    summary_data = await copilot_service.generate_ticket_summary(ticket, messages, db)
+    
+    summary = await run_in_threadpool(
+        _save_ticket_summary, ticket_id, current_user.id, summary_data, regenerate, db
+    )
+    
     return {
         "id": summary.id,
         "ticket_id": summary.ticket_id,
@@ -125,15 +145,8 @@ def get_ticket_summary(
         "cached": False
     }
 
-@router.get("/tickets/{ticket_id}/suggestions")
-def get_response_suggestions(
-    ticket_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Get AI-generated response suggestions for a ticket
-    """
+def _load_suggestion_inputs(ticket_id: str, db: Session):
+    """Ticket, its messages and its customer, or an HTTP error"""
     
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
     if not ticket:
@@ -150,15 +163,16 @@ def get_response_suggestions(
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
-    suggestions_data = copilot_service.generate_response_suggestions(
-        ticket, messages, customer, db
-    )
+    return ticket, messages, customer
+
+def _save_suggestions(ticket_id: str, agent_id: int, suggestions_data, db: Session):
+    """Persist generated suggestions and return them as API dicts"""
     
     result = []
     for suggestion_data in suggestions_data:
         suggestion = SuggestedResponse(
             ticket_id=ticket_id,
-            agent_id=current_user.id,
+            agent_id=agent_id,
             response_text=suggestion_data.get('response_text', ''),
             response_type=suggestion_data.get('response_type', 'SOLUTION'),
             confidence_score=suggestion_data.get('confidence', 0.7),
@@ -184,6 +198,67 @@ def get_response_suggestions(
     
     return result
 
+@router.get("/tickets/{ticket_id}/suggestions")
+async def get_response_suggestions(
+    ticket_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get AI-generated response suggestions for a ticket
+    """
+    
+    ticket, messages, customer = await run_in_threadpool(_load_suggestion_inputs, ticket_id, db)
+    
+    suggestions_data = await copilot_service.generate_response_suggestions(
+        ticket, messages, customer, db
+    )
+    
+    return await run_in_threadpool(_save_suggestions, ticket_id, current_user.id, suggestions_data, db)
+
+@router.get("/tickets/{ticket_id}/suggestions/stream")
+async def stream_response_suggestions(
+    ticket_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream AI-generated response suggestions as server-sent events
+    
+    Events: "token" ({"delta": text}) with the raw model output as it is generated, then
+    "done" with the saved suggestions (same fields as the non-streaming endpoint) plus
+    time_to_first_token_ms, or "error". Suggestions are saved when the stream completes.
+    """
+    
+    ticket, messages, customer = await run_in_threadpool(_load_suggestion_inputs, ticket_id, db)
+    agent_id = current_user.id
+    
+    def persist(suggestions_data):
+        # The request's session may already be closed once streaming ends, so use a fresh one
+        suggestions_db = SessionLocal()
+        try:
+            return _save_suggestions(ticket_id, agent_id, suggestions_data, suggestions_db)
+        finally:
+            suggestions_db.close()
+    
+    async def events():
+        try:
+            async for event in copilot_service.stream_response_suggestions(ticket, messages, customer):
+                if not event.get("done"):
+                    yield sse_event("token", event)
+                    continue
+                
+                suggestions = await run_in_threadpool(persist, event['suggestions'])
+                yield sse_event("done", {
+                    "suggestions": suggestions,
+                    "time_to_first_token_ms": event['time_to_first_token_ms']
+                })
+        except Exception as e:
+            logger.error(f"Error streaming suggestions for ticket {ticket_id}: {e}")
+            yield sse_event("error", {"detail": "Failed to generate suggestions"})
+    
+    return sse_response(events())
+
 @router.post("/suggestions/{suggestion_id}/use")
 def use_suggestion(
     suggestion_id: int,
@@ -212,15 +287,8 @@ def use_suggestion(
     
     return {"message": "Feedback recorded successfully"}
 
-@router.get("/refunds/{refund_id}/explanation")
-def get_refund_explanation(
-    refund_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Get AI-generated explanation for refund decision
-    """
+def _load_refund_explanation_inputs(refund_id: str, db: Session):
+    """Refund request, its stored explanation (if any) and its fraud check"""
     
     refund_request = db.query(RefundRequest).filter(
         RefundRequest.id == refund_id
@@ -234,25 +302,16 @@ def get_refund_explanation(
     ).first()
     
     if existing_explanation:
-        return {
-            "id": existing_explanation.id,
-            "decision": existing_explanation.decision,
-            "agent_explanation": existing_explanation.explanation,
-            "customer_explanation": existing_explanation.customer_explanation,
-            "reasoning_points": existing_explanation.reasoning_points,
-            "policy_sections": existing_explanation.policy_sections,
-            "next_steps": existing_explanation.next_steps,
-            "confidence_score": existing_explanation.confidence_score,
-            "cached": True
-        }
+        return refund_request, existing_explanation, None
     
     fraud_check = db.query(FraudCheck).filter(
         FraudCheck.refund_request_id == refund_id
     ).first()
     
-    explanation_data = copilot_service.generate_refund_explanation(
-        refund_request, fraud_check, db
-    )
+    return refund_request, None, fraud_check
+
+def _save_refund_explanation(refund_id: str, explanation_data: Dict, db: Session):
+    """Persist a generated refund explanation"""
     
     explanation = RefundExplanation(
         refund_request_id=refund_id,
@@ -270,6 +329,41 @@ def get_refund_explanation(
     db.commit()
     db.refresh(explanation)
     
+    return explanation
+
+@router.get("/refunds/{refund_id}/explanation")
+async def get_refund_explanation(
+    refund_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get AI-generated explanation for refund decision
+    """
+    
+    refund_request, existing_explanation, fraud_check = await run_in_threadpool(
+        _load_refund_explanation_inputs, refund_id, db
+    )
+    
+    if existing_explanation:
+        return {
+            "id": existing_explanation.id,
+            "decision": existing_explanation.decision,
+            "agent_explanation": existing_explanation.explanation,
+            "customer_explanation": existing_explanation.customer_explanation,
+            "reasoning_points": existing_explanation.reasoning_points,
+            "policy_sections": existing_explanation.policy_sections,
+            "next_steps": existing_explanation.next_steps,
+            "confidence_score": existing_explanation.confidence_score,
+            "cached": True
+        }
+    
+    explanation_data = await copilot_service.generate_refund_explanation(
+        refund_request, fraud_check, db
+    )
+    
+    explanation = await run_in_threadpool(_save_refund_explanation, refund_id, explanation_data, db)
+    
     return {
         "id": explanation.id,
         "decision": explanation.decision,
@@ -337,30 +431,8 @@ def get_knowledge_categories(
 
 # Supervisor-Specific Copilot Features
 
-@router.get("/supervisor/team-insights")
-def get_team_insights(
-    time_range: str = "7d",
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Generate AI-powered team performance insights for supervisors
-    Analyzes agent performance, ticket trends, and provides recommendations
-    """
-    
-    # Calculate time range
-    if time_range == "24h":
-        start_date = datetime.utcnow() - timedelta(hours=24)
-        period_name = "last 24 hours"
-    elif time_range == "7d":
-        start_date = datetime.utcnow() - timedelta(days=7)
-        period_name = "last 7 days"
-    elif time_range == "30d":
-        start_date = datetime.utcnow() - timedelta(days=30)
-        period_name = "last 30 days"
-    else:
-        start_date = datetime.utcnow() - timedelta(days=7)
-        period_name = "last 7 days"
+def _team_statistics(db: Session):
+    """Agents, per-agent ticket statistics, team totals and the ticket priority distribution"""
     
     # Get all agents
     agents = db.query(User).join(Agent).filter(User.role == "AGENT").all()
@@ -411,6 +483,37 @@ def get_team_insights(
         if priority in priority_distribution:
             priority_distribution[priority] += 1
     
+    return agents, team_stats, total_tickets, total_resolved, priority_distribution
+
+@router.get("/supervisor/team-insights")
+async def get_team_insights(
+    time_range: str = "7d",
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate AI-powered team performance insights for supervisors
+    Analyzes agent performance, ticket trends, and provides recommendations
+    """
+    
+    # Calculate time range
+    if time_range == "24h":
+        start_date = datetime.utcnow() - timedelta(hours=24)
+        period_name = "last 24 hours"
+    elif time_range == "7d":
+        start_date = datetime.utcnow() - timedelta(days=7)
+        period_name = "last 7 days"
+    elif time_range == "30d":
+        start_date = datetime.utcnow() - timedelta(days=30)
+        period_name = "last 30 days"
+    else:
+        start_date = datetime.utcnow() - timedelta(days=7)
+        period_name = "last 7 days"
+    
+    agents, team_stats, total_tickets, total_resolved, priority_distribution = await run_in_threadpool(
+        _team_statistics, db
+    )
+    
     # Generate AI insights
     system_prompt = """You are a customer support operations analyst. 
 Analyze team performance data and provide actionable insights for supervisors."""
@@ -441,7 +544,7 @@ Provide a JSON response with:
 
 Format as valid JSON only."""
 
-    result = copilot_service.llm.generate(
+    result = await copilot_service.llm.agenerate(
         prompt=prompt,
         system_prompt=system_prompt,
         temperature=0.4,
@@ -497,8 +600,26 @@ Format as valid JSON only."""
         "generated_at": datetime.utcnow()
     }
 
+def _agent_performance_inputs(agent_id: int, db: Session):
+    """Agent, their tickets (all time) and those tickets' summaries"""
+    
+    agent_user = db.query(User).filter(User.id == agent_id, User.role == "AGENT").first()
+    if not agent_user:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    
+    agent_tickets = db.query(Ticket).filter(
+        Ticket.agent_id == agent_id
+    ).all()
+    
+    # Customer feedback comes from the ticket summaries
+    summaries = db.query(TicketSummary).join(Ticket).filter(
+        Ticket.agent_id == agent_id
+    ).all()
+    
+    return agent_user, agent_tickets, summaries
+
 @router.get("/supervisor/agent-performance/{agent_id}")
-def get_agent_performance_analysis(
+async def get_agent_performance_analysis(
     agent_id: int,
     time_range: str = "30d",
     current_user: User = Depends(get_current_user),
@@ -508,9 +629,7 @@ def get_agent_performance_analysis(
     Get detailed AI analysis of individual agent performance
     """
     
-    agent_user = db.query(User).filter(User.id == agent_id, User.role == "AGENT").first()
-    if not agent_user:
-        raise HTTPException(status_code=404, detail="Agent not found")
+    agent_user, agent_tickets, summaries = await run_in_threadpool(_agent_performance_inputs, agent_id, db)
     
     # Calculate time range
     if time_range == "7d":
@@ -522,11 +641,6 @@ def get_agent_performance_analysis(
     else:
         start_date = datetime.utcnow() - timedelta(days=30)
     
-    # Get agent's tickets (all time)
-    agent_tickets = db.query(Ticket).filter(
-        Ticket.agent_id == agent_id
-    ).all()
-    
     if not agent_tickets:
         return {
             "agent_name": agent_user.full_name,
@@ -544,11 +658,6 @@ def get_agent_performance_analysis(
     
     avg_resolution_time = sum(resolution_times) / len(resolution_times) if resolution_times else 0
     
-    # Get customer feedback (from ticket summaries)
-    summaries = db.query(TicketSummary).join(Ticket).filter(
-        Ticket.agent_id == agent_id
-    ).all()
-    
     positive_sentiment = len([s for s in summaries if s.customer_sentiment == "POSITIVE"])
     negative_sentiment = len([s for s in summaries if s.customer_sentiment == "NEGATIVE"])
     
@@ -577,7 +686,7 @@ Provide JSON with:
 
 Format as valid JSON."""
 
-    result = copilot_service.llm.generate(
+    result = await copilot_service.llm.agenerate(
         prompt=prompt,
         system_prompt=system_prompt,
         temperature=0.5,
@@ -675,8 +784,16 @@ Format as valid JSON."""
         "model_used": result.get('model', 'fallback')
     }
 
+def _report_inputs(start_date: datetime, db: Session):
+    """Tickets created since start_date, and all agents"""
+    
+    all_tickets = db.query(Ticket).filter(Ticket.created_at >= start_date).all()
+    agents = db.query(User).join(Agent).filter(User.role == "AGENT").all()
+    
+    return all_tickets, agents
+
 @router.post("/supervisor/generate-report")
-def generate_supervisor_report(
+async def generate_supervisor_report(
     report_config: Dict = Body(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -704,12 +821,11 @@ def generate_supervisor_report(
         period = "Weekly"
     
     # Gather comprehensive data
-    all_tickets = db.query(Ticket).filter(Ticket.created_at >= start_date).all()
+    all_tickets, agents = await run_in_threadpool(_report_inputs, start_date, db)
     total_tickets = len(all_tickets)
     resolved_tickets = len([t for t in all_tickets if t.status in [TicketStatus.RESOLVED, TicketStatus.CLOSED]])
     
     # Agent summary
-    agents = db.query(User).join(Agent).filter(User.role == "AGENT").all()
     agent_summary = []
     
     for agent_user in agents:
@@ -744,7 +860,7 @@ Generate a professional report with:
 
 Format as valid JSON."""
 
-    result = copilot_service.llm.generate(
+    result = await copilot_service.llm.agenerate(
         prompt=prompt,
         system_prompt=system_prompt,
         temperature=0.4,
@@ -791,22 +907,16 @@ Format as valid JSON."""
         "model_used": result.get('model', 'fallback')
     }
 
-@router.get("/supervisor/ticket-assignment/{ticket_id}")
-def get_ticket_assignment_recommendation(
-    ticket_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Get AI-powered agent assignment recommendation for unassigned ticket
-    """
+def _get_ticket(ticket_id: str, db: Session) -> Ticket:
+    """Ticket by id, or a 404"""
     
     ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
-    
-    if ticket.agent_id:
-        return {"message": f"Ticket is already assigned to agent {ticket.agent_id}"}
+    return ticket
+
+def _agent_workloads(ticket: Ticket, db: Session):
+    """Ticket's customer name, and each agent's workload and resolution rate"""
     
     # Get customer name
     customer = db.query(User).filter(User.id == ticket.customer_id).first()
@@ -815,9 +925,6 @@ def get_ticket_assignment_recommendation(
     # Get all available agents
     agents = db.query(User).join(Agent).filter(User.role == "AGENT").all()
     
-    if not agents:
-        return {"message": "No agents available"}
-    
     # Calculate agent workloads and performance
     agent_analysis = []
     for agent_user in agents:
@@ -836,6 +943,28 @@ def get_ticket_assignment_recommendation(
             "availability_score": max(0, 10 - len(active_tickets))  # Lower workload = higher score
         })
     
+    return customer_name, agent_analysis
+
+@router.get("/supervisor/ticket-assignment/{ticket_id}")
+async def get_ticket_assignment_recommendation(
+    ticket_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get AI-powered agent assignment recommendation for unassigned ticket
+    """
+    
+    ticket = await run_in_threadpool(_get_ticket, ticket_id, db)
+    
+    if ticket.agent_id:
+        return {"message": f"Ticket is already assigned to agent {ticket.agent_id}"}
+    
+    customer_name, agent_analysis = await run_in_threadpool(_agent_workloads, ticket, db)
+    
+    if not agent_analysis:
+        return {"message": "No agents available"}
+    
     # Generate AI recommendation
     system_prompt = """You are an intelligent ticket assignment system. 
 Recommend the best agent based on workload, performance, and ticket requirements."""
@@ -862,7 +991,7 @@ Provide JSON with:
 
 Format as valid JSON."""
     
-    result = copilot_service.llm.generate(
+    result = await copilot_service.llm.agenerate(
         prompt=prompt,
         system_prompt=system_prompt,
         temperature=0.3,
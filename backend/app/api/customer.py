@@ -12,15 +12,15 @@ All endpoints include proper authentication, validation, error handling,
 and logging for security and maintainability.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, UploadFile, File, Response
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import datetime, timedelta
 import uuid
 import os
 import re
 import shutil
-from sqlalchemy import func, extract
+from sqlalchemy import func, extract, select
 
 from app.database import get_db
 from app.models.user import User, Customer
@@ -34,6 +34,7 @@ from app.schemas.customer import (
     TicketCreate, MessageCreate, ReturnRequest, ProfileUpdate
 )
 from app.core.logging import logger
+from app.core.pagination import keyset_page, set_next_cursor
 from app.core.validation import sanitize_string, validate_email, validate_uuid, sanitize_search_query
 
 router = APIRouter()
@@ -157,8 +158,11 @@ def get_dashboard(current_user: User = Depends(get_current_user), db: Session =
 # Orders APIs
 @router.get("/orders")
 def get_orders(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter orders by status (processing, shipped, delivered, etc.)"),
     search: Optional[str] = Query(None, description="Search orders by order ID"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: Optional[int] = Query(None, description="Page size (capped at PAGINATION_MAX_LIMIT)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -173,11 +177,14 @@ def get_orders(
     Args:
         status: Optional status filter (case-insensitive)
         search: Optional search term for order ID
+        cursor: Keyset cursor of the page to fetch (first page if omitted)
+        limit: Page size
         current_user: Authenticated user from JWT token
         db: Database session dependency
         
     Returns:
-        List[dict]: List of orders with items and details
+        List[dict]: One page of orders with items and details, newest first; the
+        X-Next-Cursor header holds the next page's cursor
         
     Raises:
         HTTPException: 500 if database operation fails
@@ -185,7 +192,8 @@ def get_orders(
     logger.info(f"Orders requested by customer ID: {current_user.id}, status: {status}, search: {search}")
     
     try:
-        query = db.query(Order).filter(Order.customer_id == current_user.id)
+        # Items for the whole page are loaded with one extra IN query
+        query = db.query(Order).options(selectinload(Order.items)).filter(Order.customer_id == current_user.id)
         
         # Validate and apply status filter
         if status and status != "all":
@@ -202,11 +210,10 @@ def get_orders(
         logger.error(f"Error building order query: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve orders")
     
-    orders = query.order_by(Order.created_at.desc()).all()
+    orders, next_cursor = keyset_page(query, Order.created_at, Order.id, cursor, limit)
     
     result = []
     for order in orders:
-        items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
         result.append({
             "id": order.id,
             "status": order.status,
@@ -220,9 +227,10 @@ def get_orders(
                 "quantity": item.quantity,
                 "price": item.price,
                 "subtotal": item.subtotal
-            } for item in items]
+            } for item in order.items]
         })
     
+    set_next_cursor(response, next_cursor)
     return result
 
 @router.get("/orders/{order_id}")
@@ -503,8 +511,11 @@ def request_return(
 # Tickets APIs
 @router.get("/tickets")
 def get_tickets(
+    response: Response,
     status: Optional[str] = Query(None, description="Filter tickets by status (open, in_progress, resolved, etc.)"),
     search: Optional[str] = Query(None, description="Search tickets by subject or ticket ID"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: Optional[int] = Query(None, description="Page size (capped at PAGINATION_MAX_LIMIT)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -520,11 +531,14 @@ def get_tickets(
     Args:
         status: Optional status filter (case-insensitive)
         search: Optional search term for ticket subject or ID
+        cursor: Keyset cursor of the page to fetch (first page if omitted)
+        limit: Page size
         current_user: Authenticated customer user from JWT token
         db: Database session dependency
         
     Returns:
-        List[dict]: List of tickets with metadata and message counts
+        List[dict]: One page of tickets with metadata and message counts, newest
+        first; the X-Next-Cursor header holds the next page's cursor
         
     Raises:
         HTTPException: 500 if database operation fails
@@ -532,7 +546,10 @@ def get_tickets(
     logger.info(f"Tickets requested by customer ID: {current_user.id}, status: {status}, search: {search}")
     
     try:
-        query = db.query(Ticket).filter(Ticket.customer_id == current_user.id)
+        message_count = select(func.count(Message.id)).where(
+            Message.ticket_id == Ticket.id
+        ).correlate(Ticket).scalar_subquery()
+        query = db.query(Ticket, message_count).filter(Ticket.customer_id == current_user.id)
         
         # Validate and apply status filter
         if status and status != "all":
@@ -548,11 +565,10 @@ def get_tickets(
             )
             logger.debug(f"Applied search filter: {search_sanitized}")
         
-        tickets = query.order_by(Ticket.created_at.desc()).all()
+        rows, next_cursor = keyset_page(query, Ticket.created_at, Ticket.id, cursor, limit)
         
         result = []
-        for ticket in tickets:
-            message_count = db.query(Message).filter(Message.ticket_id == ticket.id).count()
+        for ticket, message_count in rows:
             result.append({
                 "id": ticket.id,
                 "subject": ticket.subject,
@@ -564,9 +580,12 @@ def get_tickets(
                 "message_count": message_count
             })
         
+        set_next_cursor(response, next_cursor)
         logger.info(f"Retrieved {len(result)} tickets for customer ID: {current_user.id}")
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving customer tickets: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve tickets")
@@ -11,16 +11,18 @@ All endpoints include proper authentication, validation, error handling,
 and logging for security and maintainability.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, or_, select
+from app.database import get_db, get_read_db
 from app.services.auth import get_current_user
 from app.models.user import User, Agent, Customer, Supervisor
 from app.models.ticket import Ticket, TicketStatus, Message
 from app.models.order import Order, OrderItem
 from app.core.logging import logger
+from app.core.pagination import keyset_page, set_next_cursor
 from app.core.validation import sanitize_string, sanitize_search_query
+from app.services.llm_telemetry import llm_telemetry, TIME_RANGES as LLM_TIME_RANGES
 from typing import Optional
 from datetime import datetime, timedelta
 import uuid
@@ -30,7 +32,7 @@ router = APIRouter()
 @router.get("/dashboard")
 def get_supervisor_dashboard(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Retrieve comprehensive dashboard data for supervisor oversight.
@@ -44,7 +46,7 @@ def get_supervisor_dashboard(
     
     Args:
         current_user: Authenticated supervisor user from JWT token
-        db: Database session dependency
+        db: Read-only database session (replica if configured)
         
     Returns:
         dict: Dashboard data with stats, recent tickets, and team performance
@@ -158,15 +160,25 @@ def get_supervisor_dashboard(
 
 @router.get("/tickets")
 def get_all_tickets(
+    response: Response,
     status: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: Optional[int] = Query(None, description="Page size (capped at PAGINATION_MAX_LIMIT)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all tickets for supervisor oversight"""
+    """Get one page of tickets for supervisor oversight, newest first (next page cursor in X-Next-Cursor)"""
     
-    query = db.query(Ticket)
+    # Ticket.customer_id and agent_id hold the user id, so both names come from joined users
+    customer = aliased(User)
+    agent = aliased(User)
+    query = db.query(Ticket, customer.full_name, customer.email, agent.full_name).outerjoin(
+        customer, customer.id == Ticket.customer_id
+    ).outerjoin(
+        agent, agent.id == Ticket.agent_id
+    )
     
     # Apply filters
     if status and status != 'all':
@@ -177,25 +189,18 @@ def get_all_tickets(
     
     if search:
         # Search in customer name or ticket subject
-        query = query.join(User, User.id == Ticket.customer_id).filter(
+        query = query.filter(
             or_(
-                User.full_name.contains(search),
+                customer.full_name.contains(search),
                 Ticket.subject.contains(search),
                 Ticket.id.contains(search)
             )
         )
     
-    tickets = query.order_by(Ticket.created_at.desc()).all()
+    rows, next_cursor = keyset_page(query, Ticket.created_at, Ticket.id, cursor, limit)
     
     result = []
-    for ticket in tickets:
-        # Get customer using correct foreign key relationship
-        customer = db.query(User).join(Customer).filter(Customer.user_id == ticket.customer_id).first()
-        agent = None
-        if ticket.agent_id:
-            # Get agent using correct foreign key relationship
-            agent = db.query(User).join(Agent).filter(Agent.user_id == ticket.agent_id).first()
-        
+    for ticket, customer_name, customer_email, agent_name in rows:
         result.append({
             "id": ticket.id,
             "subject": ticket.subject,
@@ -203,24 +208,33 @@ def get_all_tickets(
             "priority": ticket.priority.value,
             "created_at": ticket.created_at,
             "updated_at": ticket.updated_at,
-            "customer_name": customer.full_name if customer else "Unknown",
-            "customer_email": customer.email if customer else "",
-            "agent_name": agent.full_name if agent else "Unassigned",
+            "customer_name": customer_name or "Unknown",
+            "customer_email": customer_email or "",
+            "agent_name": agent_name or "Unassigned",
             "agent_id": ticket.agent_id
         })
     
+    set_next_cursor(response, next_cursor)
     return result
 
 @router.get("/agents")
 def get_all_agents(
+    response: Response,
     search: Optional[str] = Query(None),
     status_filter: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: Optional[int] = Query(None, description="Page size (capped at PAGINATION_MAX_LIMIT)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all agents for team management"""
+    """Get one page of agents for team management, newest first (next page cursor in X-Next-Cursor)"""
     
-    query = db.query(User).join(Agent).filter(User.role == "AGENT")
+    # Solved tickets (resolved + closed) are counted in the same statement
+    solved_tickets = select(func.count(Ticket.id)).where(
+        Ticket.agent_id == User.id,
+        Ticket.status.in_([TicketStatus.RESOLVED, TicketStatus.CLOSED])
+    ).correlate(User).scalar_subquery()
+    query = db.query(User, Agent, solved_tickets).join(Agent).filter(User.role == "AGENT")
     
     if search:
         query = query.filter(
@@ -230,40 +244,38 @@ def get_all_agents(
             )
         )
     
-    agents = query.all()
+    # Filter by status in the query so pages stay full
+    if status_filter:
+        query = query.filter(func.lower(func.coalesce(Agent.status, "OFFLINE")) == status_filter.lower())
     
-    result = []
-    for agent_user in agents:
-        agent_profile = db.query(Agent).filter(Agent.user_id == agent_user.id).first()
-        
-        # Get agent's current tickets using correct foreign key
-        assigned_tickets = db.query(Ticket).filter(
-            Ticket.agent_id == agent_user.id,
+    rows, next_cursor = keyset_page(query, User.created_at, User.id, cursor, limit)
+    
+    # Get the page's current tickets in one query using correct foreign key
+    current_tickets = {}
+    agent_ids = [agent_user.id for agent_user, _, _ in rows]
+    if agent_ids:
+        assigned = db.query(Ticket.agent_id, Ticket.id).filter(
+            Ticket.agent_id.in_(agent_ids),
             Ticket.status.in_([TicketStatus.IN_PROGRESS, TicketStatus.OPEN])
         ).all()
-        
-        # Filter by status if requested
-        agent_status = agent_profile.status if agent_profile else "OFFLINE"
-        if status_filter and status_filter.lower() != agent_status.lower():
-            continue
-        
-        # Calculate real solved tickets (resolved + closed)
-        solved_tickets = db.query(Ticket).filter(
-            Ticket.agent_id == agent_user.id,
-            Ticket.status.in_([TicketStatus.RESOLVED, TicketStatus.CLOSED])
-        ).count()
-        
+        for agent_id, ticket_id in assigned:
+            current_tickets.setdefault(agent_id, []).append(ticket_id)
+    
+    result = []
+    for agent_user, agent_profile, solved_count in rows:
+        assigned_tickets = current_tickets.get(agent_user.id, [])
         result.append({
             "id": agent_user.id,
             "name": agent_user.full_name,
             "email": agent_user.email,
             "is_active": agent_user.is_active,
             "assigned_tickets": len(assigned_tickets),
-            "solved_tickets": solved_tickets,
+            "solved_tickets": solved_count,
             "department": agent_profile.department if agent_profile else "Support",
-            "current_tickets": [t.id for t in assigned_tickets]
+            "current_tickets": assigned_tickets
         })
     
+    set_next_cursor(response, next_cursor)
     return result
 
 @router.get("/agents/workload")
@@ -317,14 +329,30 @@ def get_agents_workload(
 
 @router.get("/customers")
 def get_all_customers(
+    response: Response,
     search: Optional[str] = Query(None),
     status_filter: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: Optional[int] = Query(None, description="Page size (capped at PAGINATION_MAX_LIMIT)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all customers for supervisor oversight"""
-    
-    query = db.query(User).filter(User.role == "CUSTOMER")
+    """Get one page of customers for supervisor oversight, newest first (next page cursor in X-Next-Cursor)"""
+    
+    # Get actual customer statistics in the same statement as the customers
+    total_tickets = select(func.count(Ticket.id)).where(
+        Ticket.customer_id == User.id
+    ).correlate(User).scalar_subquery()
+    active_tickets = select(func.count(Ticket.id)).where(
+        Ticket.customer_id == User.id,
+        Ticket.status.in_([TicketStatus.OPEN, TicketStatus.IN_PROGRESS])
+    ).correlate(User).scalar_subquery()
+    total_orders = select(func.count(Order.id)).where(
+        Order.customer_id == User.id
+    ).correlate(User).scalar_subquery()
+    query = db.query(User, Customer.member_since, total_tickets, active_tickets, total_orders).outerjoin(
+        Customer, Customer.user_id == User.id
+    ).filter(User.role == "CUSTOMER")
     
     if search:
         query = query.filter(
@@ -334,45 +362,30 @@ def get_all_customers(
             )
         )
     
-    customers = query.all()
+    # Filter by status in the query so pages stay full
+    if status_filter == "Active Customers":
+        query = query.filter(User.is_active.is_(True))
+    elif status_filter == "Blocked Customers":
+        query = query.filter(or_(User.is_active.is_(False), User.is_active.is_(None)))
+    
+    rows, next_cursor = keyset_page(query, User.created_at, User.id, cursor, limit)
     
     result = []
-    for customer_user in customers:
-        # Get customer profile
-        customer_profile = db.query(Customer).filter(Customer.user_id == customer_user.id).first()
-        
-        # Get actual customer statistics
-        total_tickets = db.query(Ticket).filter(Ticket.customer_id == customer_user.id).count()
-        active_tickets = db.query(Ticket).filter(
-            Ticket.customer_id == customer_user.id,
-            Ticket.status.in_([TicketStatus.OPEN, TicketStatus.IN_PROGRESS])
-        ).count()
-        
-        # Calculate actual orders from Order table
-        total_orders = db.query(Order).filter(Order.customer_id == customer_user.id).count()
-        
-        customer_status = "Active" if customer_user.is_active else "Blocked"
-        
-        # Filter by status if requested
-        if status_filter and status_filter != "All Customers":
-            if status_filter == "Active Customers" and customer_status != "Active":
-                continue
-            elif status_filter == "Blocked Customers" and customer_status != "Blocked":
-                continue
-        
+    for customer_user, member_since, ticket_count, active_count, order_count in rows:
         result.append({
             "id": customer_user.id,
             "name": customer_user.full_name,
             "email": customer_user.email,
-            "status": customer_status,
+            "status": "Active" if customer_user.is_active else "Blocked",
             "is_active": customer_user.is_active,
-            "total_orders": total_orders,
-            "total_tickets": total_tickets,
-            "active_tickets": min(active_tickets, total_tickets),  # Ensure active <= total
-            "member_since": customer_profile.member_since if customer_profile else customer_user.created_at,
+            "total_orders": order_count,
+            "total_tickets": ticket_count,
+            "active_tickets": min(active_count, ticket_count),  # Ensure active <= total
+            "member_since": member_since or customer_user.created_at,
             "last_login": customer_user.last_login
         })
     
+    set_next_cursor(response, next_cursor)
     return result
 
 from pydantic import BaseModel
@@ -576,7 +589,7 @@ def update_customer_status(
 def get_supervisor_analytics(
     time_range: str = Query("24h"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get analytics data for supervisor dashboard"""
     
@@ -623,6 +636,24 @@ def get_supervisor_analytics(
         "agent_performance": agent_performance
     }
 
+@router.get("/analytics/llm-latency")
+def get_llm_latency(
+    time_range: str = Query("24h", description="1h, 24h, 7d or 30d"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    LLM latency budget breakdown from the per-call telemetry store.
+    
+    Returns:
+        dict: Call count, and per feature (summary, priority, intent, ...) and per
+        provider: p50/p95/p99 latency, time to first token for streamed calls,
+        average prompt/completion tokens, cache hit, fallback and error rates
+    """
+    start_date = datetime.utcnow() - LLM_TIME_RANGES.get(time_range, LLM_TIME_RANGES["24h"])
+    report = llm_telemetry.latency_report(db, start_date)
+    return {"time_range": time_range, **report}
+
 # Notification APIs
 @router.get("/notifications")
 def get_notifications(
@@ -17,7 +17,7 @@ from sqlalchemy import func, desc
 import uuid
 import os
 import shutil
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User, Vendor, UserRole
 from app.models.product import Product, ProductComplaint
 from app.models.order import Order, OrderItem, OrderStatus
@@ -82,7 +82,7 @@ class VendorProfileUpdate(BaseModel):
     product_categories: Optional[str] = None
 
 @router.get("/dashboard")
-def get_vendor_dashboard(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_vendor_dashboard(current_user: User = Depends(get_current_user), db: Session = Depends(get_read_db)):
     """
     Retrieve comprehensive dashboard data for the authenticated vendor.
     
@@ -180,7 +180,7 @@ def get_vendor_dashboard(current_user: User = Depends(get_current_user), db: Ses
 def get_vendor_analytics(
     date_range: str = Query("30", description="Number of days for analytics range"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Retrieve detailed analytics data for vendor's product performance.
@@ -11,6 +11,115 @@ class Settings(BaseSettings):
 
     # Database
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    DB_READ_REPLICA_URL: Optional[str] = None  # dashboard/analytics reads; defaults to the primary
+
+    # Database engine profile
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_PRE_PING: bool = True  # test pooled connections before use (drops ones the server closed)
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # replace connections older than this; -1 never
+    DB_SQLITE_JOURNAL_MODE: str = "WAL"  # readers do not block the writer
+    DB_SQLITE_SYNCHRONOUS: str = "NORMAL"  # safe with WAL, fsyncs only at checkpoints
+    DB_SQLITE_BUSY_TIMEOUT_MS: int = 5000  # writers wait for the lock instead of failing
+    DB_SQLITE_CACHE_SIZE: int = -65536  # negative = KiB per connection (64 MiB)
+    DB_SQLITE_MMAP_SIZE: int = 268435456  # bytes of the file read through mmap (256 MiB)
+
+    # List endpoint pagination (keyset on created_at, id)
+    PAGINATION_DEFAULT_LIMIT: int = 100
+    PAGINATION_MAX_LIMIT: int = 500  # larger requested page sizes are capped to this
+
+    # LLM HTTP connection pools (per provider)
+    LLM_HTTP2: bool = True  # used for Groq when the h2 package is installed
+    LLM_GROQ_MAX_CONNECTIONS: int = 20
+    LLM_OLLAMA_MAX_CONNECTIONS: int = 4  # a local Ollama serves few requests in parallel
+    LLM_KEEPALIVE_SECONDS: float = 60.0
+
+    # LLM provider health monitor
+    LLM_HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0
+    LLM_HEALTH_CHECK_TIMEOUT_SECONDS: float = 5.0
+
+    # LLM circuit breakers and latency-aware routing
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 3  # consecutive failures before a provider is skipped
+    LLM_BREAKER_RESET_SECONDS: float = 30.0  # cool-down before a trial request
+    LLM_ROUTING_ADAPTIVE: bool = True  # False keeps the fixed Grok -> Gemini -> Ollama order
+    LLM_ROUTING_WINDOW: int = 100  # recent latencies kept per provider
+    LLM_ROUTING_MIN_SAMPLES: int = 5
+
+    # LLM request coalescing and result cache
+    LLM_COALESCE_ENABLED: bool = True  # identical concurrent prompts share one call
+    LLM_RESULT_CACHE_MAX_TEMPERATURE: float = 0.2  # only near-deterministic prompts are cached
+    LLM_RESULT_CACHE_TTL_SECONDS: float = 300.0  # 0 disables the cache
+    LLM_RESULT_CACHE_MAX_ENTRIES: int = 1024
+
+    # LLM call telemetry (llm_call_logs table)
+    LLM_TELEMETRY_ENABLED: bool = True
+    LLM_TELEMETRY_BUFFER_SIZE: int = 10000  # unflushed records kept in memory
+    LLM_TELEMETRY_FLUSH_INTERVAL_SECONDS: float = 5.0
+    LLM_TELEMETRY_FLUSH_BATCH_SIZE: int = 200  # a full batch is written without waiting for the interval
+
+    # Local in-process LLM (offline tier, tried after the HTTP providers until measured faster)
+    LLM_LOCAL_ENABLED: bool = False
+    LLM_LOCAL_MODEL: str = "google/flan-t5-base"  # any seq2seq or causal LM, hub id or local path
+    LLM_LOCAL_QUANTIZE: bool = True  # int8 dynamic quantisation of Linear layers (CPU)
+    LLM_LOCAL_THREADS: Optional[int] = None  # torch intra-op threads, None keeps torch's default
+    LLM_LOCAL_MAX_BATCH_SIZE: int = 8
+    LLM_LOCAL_MAX_WAIT_MS: float = 10.0  # how long a request waits for others to join its batch
+    LLM_LOCAL_MAX_INPUT_TOKENS: int = 1024
+
+    # RAG vector index
+    RAG_INDEX_MODE: str = "auto"  # auto, flat, ivf_flat, ivf_pq or hnsw
+    RAG_ANN_MIN_VECTORS: int = 10000  # auto mode stays exact (flat) below this size
+    RAG_IVF_PQ_MIN_VECTORS: int = 500000  # auto mode compresses with PQ above this size
+    RAG_IVF_NLIST: Optional[int] = None  # defaults to 4 * sqrt(corpus size)
+    RAG_IVF_NPROBE: int = 8
+    RAG_PQ_M: int = 48  # sub-quantizers, rounded down to a divisor of the dimension
+    RAG_PQ_NBITS: int = 8
+    RAG_HNSW_M: int = 32
+    RAG_HNSW_EF_CONSTRUCTION: int = 200
+    RAG_HNSW_EF_SEARCH: int = 64
+    RAG_TRAIN_SAMPLE_SIZE: int = 100000  # max vectors used to train IVF/PQ
+    RAG_RECALL_TARGET: float = 0.95  # recall@k vs exact search that tuning must reach
+    RAG_INDEX_MMAP: bool = True  # map faiss.index read-only so all workers share its pages
+    RAG_FILTER_EXACT_MAX: int = 2048  # filtered HNSW searches over fewer ids use exact search
+
+    # Hybrid retrieval
+    RAG_RETRIEVAL_MODE: str = "hybrid"  # vector, bm25 or hybrid (reciprocal-rank fusion of both)
+    RAG_HYBRID_CANDIDATES: int = 20  # results taken from each arm before fusion
+    RAG_RRF_K: int = 60
+    RAG_BM25_K1: float = 1.2
+    RAG_BM25_B: float = 0.75
+    RAG_BM25_MIN_SCORE: float = 0.2  # BM25 hits need this fraction of the query's best possible score
+
+    # Semantic answer cache (answer_question)
+    RAG_ANSWER_CACHE_ENABLED: bool = True
+    RAG_ANSWER_CACHE_THRESHOLD: float = 0.95  # cosine similarity needed to reuse an answer
+    RAG_ANSWER_CACHE_TTL_SECONDS: int = 3600
+    RAG_ANSWER_CACHE_MAX_ENTRIES: int = 5000
+
+    # Prompt budget (RAG answer prompts; token counts are ~4 characters per token)
+    RAG_CHUNK_TOKENS: int = 256  # documents are indexed as passages of about this size
+    RAG_CHUNK_OVERLAP_TOKENS: int = 32
+    RAG_CONTEXT_TOKEN_BUDGET: int = 1200  # knowledge base passages per prompt
+    RAG_HISTORY_TOKEN_BUDGET: int = 300  # newest conversation turns per prompt
+    RAG_DEDUP_THRESHOLD: float = 0.8  # passages this covered by already chosen ones are dropped
+
+    # Intent classification
+    INTENT_RULES_ENABLED: bool = True  # decide obvious queries locally, escalate ambiguous ones to the LLM
+
+    # Knowledge base keyword search
+    KB_SEARCH_MODE: str = "ranked"  # ranked (idf x field weight) or compat (whole-query substring match)
+
+    # Embedding cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_DIR: str = "embedding_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 100000  # vectors kept on disk (LRU)
+    EMBEDDING_CACHE_HOT_ENTRIES: int = 2048  # vectors kept in process memory (LRU)
+
+    # Micro-batching of concurrent single-query embeddings
+    EMBEDDING_BATCH_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
 
     @property
     def database_url(self) -> str:
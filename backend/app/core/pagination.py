@@ -0,0 +1,128 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Lists are ordered newest first on (created_at, id), rows without a created_at last.
+A page ends with a cursor that encodes the last row's pair; the next page asks for
+rows strictly after it in that order, which an index on created_at answers directly
+instead of re-reading every earlier row the way OFFSET does, and rows inserted
+meanwhile never shift a page.
+
+The cursor is opaque to clients (URL-safe base64 of JSON) and is returned in the
+X-Next-Cursor response header so list bodies keep their existing shape. Every
+request is paged; clients that need the whole list follow the cursor page by page.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import Row
+
+from app.core.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: Any) -> str:
+    """
+    Encode a row's (created_at, id) position as an opaque cursor token.
+
+    Args:
+        created_at: The row's creation timestamp
+        row_id: The row's primary key (int or string)
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps([created_at.isoformat() if created_at else None, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor token from a previous page
+
+    Returns:
+        Tuple of (created_at, id)
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), row_id
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def page_size(limit: Optional[int]) -> int:
+    """
+    Clamp a requested page size to the configured default and maximum.
+
+    Args:
+        limit: Requested page size (None for the default)
+
+    Returns:
+        Page size between 1 and PAGINATION_MAX_LIMIT
+    """
+    if not limit or limit < 1:
+        return settings.PAGINATION_DEFAULT_LIMIT
+    return min(limit, settings.PAGINATION_MAX_LIMIT)
+
+
+def keyset_page(query, created_column, id_column, cursor: Optional[str] = None, limit: Optional[int] = None) -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page of a query, newest first.
+
+    The query may select extra columns; the page's rows are returned as the query
+    yields them. One row beyond the page is fetched to tell whether another page exists.
+    Rows with a NULL created_at sort after all others (ordered by id alone), so they
+    are reached rather than compared against NULL and dropped.
+
+    Args:
+        query: SQLAlchemy Query to paginate (without ORDER BY or LIMIT)
+        created_column: Timestamp column to order by (e.g. Ticket.created_at)
+        id_column: Primary key column breaking created_at ties (e.g. Ticket.id)
+        cursor: Cursor from the previous page's X-Next-Cursor header
+        limit: Requested page size (clamped by page_size)
+
+    Returns:
+        Tuple of (rows on this page, cursor for the next page or None on the last page)
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    size = page_size(limit)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if created_at is None:
+            # The previous page ended inside the NULL tail
+            query = query.filter(created_column.is_(None), id_column < row_id)
+        else:
+            query = query.filter(or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < row_id),
+                created_column.is_(None)
+            ))
+    query = query.order_by(created_column.desc().nulls_last(), id_column.desc())
+    rows = query.limit(size + 1).all()
+    if len(rows) <= size:
+        return rows, None
+
+    rows = rows[:size]
+    last = rows[-1]
+    entity = last[0] if isinstance(last, Row) else last
+    return rows, encode_cursor(getattr(entity, created_column.key), getattr(entity, id_column.key))
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expose the next page's cursor to the client (absent on the last page)"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
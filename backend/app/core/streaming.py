@@ -0,0 +1,41 @@
+"""
+Server-sent events helpers for the Intellica Customer Support System.
+
+This module formats events for the streaming variants of the chat and copilot
+endpoints, which forward LLM tokens to the browser as they are generated.
+"""
+
+import json
+from typing import Any, AsyncIterator
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(event: str, data: Any) -> str:
+    """
+    Format one server-sent event.
+
+    Args:
+        event: Event name (e.g. "token", "done", "error")
+        data: JSON-serializable payload
+
+    Returns:
+        The event as it is written to the stream
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Wrap formatted events in a response that proxies do not buffer.
+
+    Args:
+        events: Async iterator of strings produced by sse_event
+
+    Returns:
+        StreamingResponse with the text/event-stream media type
+    """
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
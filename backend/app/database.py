@@ -1,16 +1,172 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict, List
+import os
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
 
-engine = create_engine(settings.database_url)
+
+def sqlite_pragmas(read_only: bool = False) -> List[str]:
+    """PRAGMAs run on every new SQLite connection (see the DB_SQLITE_* settings)"""
+    pragmas = [
+        f"journal_mode={settings.DB_SQLITE_JOURNAL_MODE}",
+        f"synchronous={settings.DB_SQLITE_SYNCHRONOUS}",
+        f"busy_timeout={settings.DB_SQLITE_BUSY_TIMEOUT_MS}",
+        f"cache_size={settings.DB_SQLITE_CACHE_SIZE}",
+        f"mmap_size={settings.DB_SQLITE_MMAP_SIZE}",
+    ]
+    if read_only:
+        pragmas.append("query_only=ON")
+    return pragmas
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """create_engine arguments for the configured pool profile"""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory databases live in a single connection; there is no pool to size
+        return options
+    options.update({
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    })
+    return options
+
+
+def _install_sqlite_pragmas(engine, read_only: bool):
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+
+def create_app_engine(url: str, read_only: bool = False):
+    """
+    Engine with the configured pool; SQLite connections also get the PRAGMAs above
+
+    WAL lets readers proceed while one connection writes, and busy_timeout makes a
+    second writer wait for the lock instead of failing with "database is locked".
+    """
+    engine = create_engine(url, **engine_options(url))
+    if engine.dialect.name == "sqlite":
+        _install_sqlite_pragmas(engine, read_only)
+    return engine
+
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    """The same database through its asyncio driver (aiosqlite or asyncpg)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def create_async_app_engine(url: str, read_only: bool = False):
+    """
+    create_app_engine for AsyncSession users
+
+    aiosqlite connections belong to the event loop that opened them, so SQLite is not
+    pooled here (opening the file is cheap); other databases use the configured pool.
+    """
+    async_url = async_database_url(url)
+    if make_url(url).get_backend_name() == "sqlite":
+        engine = create_async_engine(async_url, poolclass=NullPool)
+        _install_sqlite_pragmas(engine.sync_engine, read_only)
+        return engine
+    return create_async_engine(async_url, **engine_options(url))
+
+
+class ReadOnlySession(Session):
+    """Session for reporting queries; flushing raises instead of writing"""
+
+    def flush(self, objects=None):
+        if self.new or self.dirty or self.deleted:
+            raise InvalidRequestError("Read-only session cannot write; use get_db for changes")
+
+
+engine = create_app_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Dashboard and analytics reads go to the replica when one is configured
+read_engine = create_app_engine(settings.DB_READ_REPLICA_URL, read_only=True) if settings.DB_READ_REPLICA_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=ReadOnlySession)
+
+# Async handlers; objects stay loaded after commit because lazy loads cannot run in async code
+async_engine = create_async_app_engine(settings.database_url)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+async_read_engine = (
+    create_async_app_engine(settings.DB_READ_REPLICA_URL, read_only=True) if settings.DB_READ_REPLICA_URL else async_engine
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, autoflush=False, expire_on_commit=False, sync_session_class=ReadOnlySession
+)
+
 Base = declarative_base()
 
+async def dispose_engines():
+    """Close pooled connections (on SQLite the last close checkpoints the WAL into the file)"""
+    engine.dispose()
+    if read_engine is not engine:
+        read_engine.dispose()
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+def schema_revision_status(bind=None) -> Dict[str, Any]:
+    """
+    Alembic revision the database is at versus the newest migration
+
+    Args:
+        bind: Engine to inspect (defaults to the application engine)
+
+    Returns:
+        Dict with current (None before the first upgrade), head and up_to_date
+    """
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+    head = ScriptDirectory.from_config(config).get_current_head()
+    with (bind or engine).connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    return {"current": current, "head": head, "up_to_date": current == head}
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """Read-only session for dashboard and analytics routes (replica if configured)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """AsyncSession for async handlers, so queries do not block the event loop"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Read-only AsyncSession for dashboard and analytics routes (replica if configured)"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -2,8 +2,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api import auth, customer, agent, supervisor, vendor, copilot, chat
+from app.services.llm_service import llm_service
+from app.services.llm_telemetry import llm_telemetry
+from app.database import dispose_engines, schema_revision_status
+from app.core.pagination import NEXT_CURSOR_HEADER
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="Intellica",
     description="Simple AI-powered customer support platform",
@@ -17,6 +24,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Mount static files for uploads
@@ -33,13 +41,41 @@ app.include_router(vendor.router, prefix="/api/v1/vendor", tags=["Vendor"])
 app.include_router(copilot.router, prefix="/api/v1", tags=["AI Copilot"])
 app.include_router(chat.router, prefix="/api/v1", tags=["Chat"])
 
+@app.on_event("startup")
+async def check_schema_revision():
+    """Warn once, at startup, when the database is behind the migrations"""
+    try:
+        status = schema_revision_status()
+    except Exception as e:
+        logger.warning(f"Could not read the database schema revision: {e}")
+        return
+    if not status["up_to_date"]:
+        logger.warning(
+            f"Database schema is at revision {status['current']}, migrations are at {status['head']}: "
+            "run `alembic upgrade head` (until then indexes and the llm_call_logs table may be missing)"
+        )
+
+@app.on_event("startup")
+async def start_llm_health_monitor():
+    """Probe LLM providers in the background so requests read a cached flag"""
+    llm_service.start_health_monitor()
+    llm_telemetry.start()
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    """Stop the health monitor, release pooled LLM connections, write buffered telemetry and close database pools"""
+    llm_service.stop_health_monitor()
+    await llm_service.aclose()
+    llm_telemetry.stop()
+    await dispose_engines()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Intellica AI Support System API"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "llm": llm_service.health_status()}
 
 @app.get("/test-uploads")
 async def test_uploads():
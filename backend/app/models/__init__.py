@@ -6,7 +6,7 @@ from .product import Product, ProductComplaint, ComplaintStatus
 from .analytics import AgentStats, SupervisorMetrics, ProductMetrics, Notification, Alert, AlertType, NotificationType
 from .refund import RefundRequest, ReturnRequest, FraudCheck, ImageAnalysis, RejectionLog, RefundStatus, ReturnStatus, FraudRiskLevel
 from .chat import ChatConversation, ChatMessage, KnowledgeBase, FAQItem, ConversationStatus, MessageSender
-from .ai_copilot import TicketSummary, SuggestedResponse, ResponseTemplate, RefundExplanation
+from .ai_copilot import TicketSummary, SuggestedResponse, ResponseTemplate, RefundExplanation, LLMCallLog
 from .analytics_extended import AgentWorkload, SLATracking, TeamPerformance, AgentRating, ProductReturnAnalytics, TicketActivity, ShippingAddress
 from .communication import EmailLog, WhatsAppLog, CommunicationTemplate, NotificationPreference, CommunicationStatus
 from .insights import InsightLog, AutoLearnedPattern, PredictiveInsight, TrendAnalysis
@@ -145,3 +145,26 @@ class RefundExplanation(Base):
 
     # Relationships
     refund_request = relationship("RefundRequest")
+
+class LLMCallLog(Base):
+    __tablename__ = "llm_call_logs"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+    # What was called
+    feature = Column(String(50), nullable=False)  # summary, priority, intent, chat_answer, ...
+    provider = Column(String(20), nullable=False)  # groq, gemini, ollama, local, fallback
+    model = Column(String(100), nullable=True)
+    tier = Column(Integer, nullable=True)  # 0 = first provider tried, 1 = first fallback, ...
+
+    # Cost and latency
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    latency_ms = Column(Integer, nullable=False)
+    time_to_first_token_ms = Column(Integer, nullable=True)  # streamed calls only
+
+    # Outcome
+    cache = Column(String(20), nullable=False)  # hit, miss, coalesced, bypass
+    streamed = Column(Boolean, default=False)
+    success = Column(Boolean, nullable=False)
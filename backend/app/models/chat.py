@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Boolean, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -24,7 +24,7 @@ class ChatConversation(Base):
     __tablename__ = "chat_conversations"
 
     id = Column(String, primary_key=True, default=generate_uuid)
-    customer_id = Column(Integer, ForeignKey("customers.user_id"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.user_id"), nullable=False, index=True)
     session_id = Column(String(200), nullable=True)  # Browser session tracking
     
     # Conversation Details
@@ -57,6 +57,10 @@ class ChatConversation(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Conversation history is read newest or oldest first
+        Index("ix_chat_messages_conversation_id_created_at", "conversation_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     conversation_id = Column(String, ForeignKey("chat_conversations.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, JSON, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, JSON, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -14,6 +14,10 @@ class OrderStatus(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # A customer's orders, newest first (order list pages, chat context)
+        Index("ix_orders_customer_id_created_at", "customer_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True, default=str(func.gen_random_uuid()))
     order_number = Column(String(50), unique=True, nullable=False)
@@ -41,8 +45,8 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(String, primary_key=True, default=str(func.gen_random_uuid()))
-    order_id = Column(String, ForeignKey("orders.id"), nullable=False)
-    product_id = Column(String)
+    order_id = Column(String, ForeignKey("orders.id"), nullable=False, index=True)
+    product_id = Column(String, index=True)
     product_name = Column(String(150))
     quantity = Column(Integer)
     price = Column(Float)
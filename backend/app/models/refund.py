@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Float, Boolean, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -30,6 +30,10 @@ class FraudRiskLevel(str, enum.Enum):
 
 class RefundRequest(Base):
     __tablename__ = "refund_requests"
+    __table_args__ = (
+        # A customer's pending refunds (chat context, eligibility checks)
+        Index("ix_refund_requests_customer_id_status", "customer_id", "status"),
+    )
 
     id = Column(String, primary_key=True, default=str(func.gen_random_uuid()))
     order_id = Column(String, ForeignKey("orders.id"), nullable=False)
@@ -63,6 +67,10 @@ class RefundRequest(Base):
 
 class ReturnRequest(Base):
     __tablename__ = "return_requests"
+    __table_args__ = (
+        # A customer's open returns (chat context)
+        Index("ix_return_requests_customer_id_status", "customer_id", "status"),
+    )
 
     id = Column(String, primary_key=True, default=str(func.gen_random_uuid()))
     order_id = Column(String, ForeignKey("orders.id"), nullable=False)
@@ -8,7 +8,7 @@ through resolution, with full conversation history and AI assistance.
 Required for: Features 1, 4, 5, 6, 8 (Ticket Management, AI Copilot, Dashboards)
 """
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, Float, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -45,6 +45,10 @@ class Ticket(Base):
     conversation history stored in the Message model.
     """
     __tablename__ = "tickets"
+    __table_args__ = (
+        # Keyset pages of the ticket listings, newest first
+        Index("ix_tickets_created_at_id", "created_at", "id"),
+    )
 
     # Primary identification - Using UUID for distributed system compatibility
     id = Column(String, primary_key=True, default=str(func.gen_random_uuid()))
@@ -72,7 +76,7 @@ class Ticket(Base):
     priority = Column(Enum(TicketPriority), nullable=False, index=True)  # Urgency level
     
     # Context linking - Required for order-related issues (Feature 2)
-    related_order_id = Column(String, nullable=True)  # Links to Order if ticket is about an order
+    related_order_id = Column(String, nullable=True, index=True)  # Links to Order if ticket is about an order
     
     # AI assistance fields - Required for AI Copilot (Feature 4)
     ai_suggested_solution = Column(Text, nullable=True)  # AI-generated solution recommendation
@@ -109,6 +113,10 @@ class Message(Base):
     for context and quality assurance.
     """
     __tablename__ = "messages"
+    __table_args__ = (
+        # A ticket's thread is read in order (ticket details, copilot summaries)
+        Index("ix_messages_ticket_id_created_at", "ticket_id", "created_at"),
+    )
 
     # Primary identification
     id = Column(String, primary_key=True, default=str(func.gen_random_uuid()))
@@ -1 +1,4 @@
-from .auth import authenticate_user, create_user, get_current_user, create_access_token_for_user
+from .auth import (
+    authenticate_user, create_user, get_current_user, create_access_token_for_user,
+    aauthenticate_user, acreate_user, aget_current_user
+)
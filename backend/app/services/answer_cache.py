@@ -0,0 +1,136 @@
+"""
+Semantic Answer Cache
+Reuses answers for near-duplicate questions, matched by cosine similarity of query embeddings
+"""
+from typing import Any, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import copy
+import logging
+import threading
+import time
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """Size-bounded LRU of answers with a TTL, indexed by a small exact inner-product FAISS index"""
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 5000):
+        """
+        Create an empty cache
+
+        Args:
+            threshold: Minimum cosine similarity for a query to reuse a stored answer
+            ttl_seconds: Lifetime of an entry
+            max_entries: Capacity before least recently used entries are evicted
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._index: Optional[faiss.Index] = None  # created on first store, once the dimension is known
+        # id -> (scope, answer, expires_at), least recently used first
+        self._entries: "OrderedDict[int, Tuple[Hashable, Dict, float]]" = OrderedDict()
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalise(vector: np.ndarray) -> np.ndarray:
+        vector = np.array(vector, dtype='float32').reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _remove(self, entry_ids):
+        if entry_ids:
+            self._index.remove_ids(np.array(entry_ids, dtype='int64'))
+            for entry_id in entry_ids:
+                self._entries.pop(entry_id, None)
+
+    def lookup(self, vector: np.ndarray, scope: Hashable = None) -> Optional[Tuple[Dict, float]]:
+        """
+        Find a stored answer for a similar query asked under the same scope
+
+        Args:
+            vector: Query embedding
+            scope: Anything else the answer depends on (filters, top_k); must match exactly
+
+        Returns:
+            Tuple of (copy of the stored answer, similarity), or None on a miss
+        """
+        with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            now = time.time()
+            similarities, ids = self._index.search(self._normalise(vector), min(8, self._index.ntotal))
+            expired = []
+            for similarity, entry_id in zip(similarities[0].tolist(), ids[0].tolist()):
+                if entry_id == -1 or similarity < self.threshold:
+                    break
+                entry_scope, answer, expires_at = self._entries[entry_id]
+                if expires_at <= now:
+                    expired.append(entry_id)
+                    continue
+                if entry_scope != scope:
+                    continue
+                self._entries.move_to_end(entry_id)
+                self._remove(expired)
+                self.hits += 1
+                return copy.deepcopy(answer), similarity
+
+            self._remove(expired)
+            self.misses += 1
+            return None
+
+    def store(self, vector: np.ndarray, answer: Dict, scope: Hashable = None):
+        """Remember an answer, evicting the least recently used entries beyond capacity"""
+        if self.max_entries <= 0:
+            return
+        vector = self._normalise(vector)
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+
+            overflow = len(self._entries) + 1 - self.max_entries
+            if overflow > 0:
+                oldest = list(self._entries)[:overflow]
+                self._remove(oldest)
+                self.evictions += len(oldest)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype='int64'))
+            self._entries[entry_id] = (scope, copy.deepcopy(answer), time.time() + self.ttl_seconds)
+
+    def clear(self):
+        """Drop every entry (e.g. after the knowledge base was re-indexed)"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            if self._index is not None:
+                self._index.reset()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds
+        }
@@ -1,9 +1,12 @@
+import asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate
 from app.core.security import get_password_hash, verify_password, create_access_token
 from app.core.config import settings
-from app.database import get_db
+from app.database import get_db, get_async_db
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import timedelta
@@ -23,48 +26,78 @@ def authenticate_user(db: Session, email: str, password: str, role: str = None):
         return False
     return user
 
-def create_user(db: Session, user: UserCreate):
-    from app.models.user import Customer, Agent, Supervisor, Vendor, UserRole
-    
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = get_password_hash(user.password)
+async def aauthenticate_user(db: AsyncSession, email: str, password: str, role: str = None):
+    """authenticate_user for async handlers; bcrypt runs in a worker thread"""
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
+    if not user:
+        return False
+    if not await asyncio.to_thread(verify_password, password, user.password):
+        return False
+    if not user.is_active:
+        return False
+    if role and user.role.value != role.upper():
+        return False
+    return user
+
+def _new_user(user: UserCreate, hashed_password: str) -> User:
     # Generate default avatar URL
     avatar_url = f"https://api.dicebear.com/7.x/avataaars/svg?seed={user.full_name.replace(' ', '')}"
-    db_user = User(
+    return User(
         email=user.email,
         password=hashed_password,
         full_name=user.full_name,
         role=user.role,
         avatar=avatar_url
     )
+
+def _role_profile(user: UserCreate, user_id: int):
+    from app.models.user import Customer, Agent, Supervisor, Vendor, UserRole
+    
+    profiles = {
+        UserRole.CUSTOMER: Customer,
+        UserRole.AGENT: Agent,
+        UserRole.SUPERVISOR: Supervisor,
+        UserRole.VENDOR: Vendor
+    }
+    profile_class = profiles.get(user.role)
+    return profile_class(user_id=user_id) if profile_class else None
+
+def create_user(db: Session, user: UserCreate):
+    db_user = db.query(User).filter(User.email == user.email).first()
+    if db_user:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    db_user = _new_user(user, get_password_hash(user.password))
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     
     # Create role-specific profile
-    if user.role == UserRole.CUSTOMER:
-        profile = Customer(user_id=db_user.id)
-        db.add(profile)
-    elif user.role == UserRole.AGENT:
-        profile = Agent(user_id=db_user.id)
-        db.add(profile)
-    elif user.role == UserRole.SUPERVISOR:
-        profile = Supervisor(user_id=db_user.id)
-        db.add(profile)
-    elif user.role == UserRole.VENDOR:
-        profile = Vendor(user_id=db_user.id)
+    profile = _role_profile(user, db_user.id)
+    if profile is not None:
         db.add(profile)
     
     db.commit()
     return db_user
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
+async def acreate_user(db: AsyncSession, user: UserCreate):
+    """create_user for async handlers; bcrypt runs in a worker thread"""
+    existing = (await db.execute(select(User).filter(User.email == user.email))).scalars().first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    db_user = _new_user(user, await asyncio.to_thread(get_password_hash, user.password))
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    
+    # Create role-specific profile
+    profile = _role_profile(user, db_user.id)
+    if profile is not None:
+        db.add(profile)
+    
+    await db.commit()
+    return db_user
+
+def _token_email(credentials: HTTPAuthorizationCredentials) -> str:
     try:
         payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=["HS256"])
         email: str = payload.get("sub")
@@ -72,14 +105,31 @@ def get_current_user(
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    
-    user = db.query(User).filter(User.email == email).first()
+    return email
+
+def _active_user(user: User) -> User:
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Account has been deactivated")
     return user
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get current authenticated user from JWT token"""
+    email = _token_email(credentials)
+    return _active_user(db.query(User).filter(User.email == email).first())
+
+async def aget_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """get_current_user for async handlers; shares the handler's get_async_db session"""
+    email = _token_email(credentials)
+    return _active_user((await db.execute(select(User).filter(User.email == email))).scalars().first())
+
 def create_access_token_for_user(user: User):
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -3,7 +3,7 @@ AI Copilot Service
 Main orchestration service for AI Copilot features
 """
 
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
 import json
@@ -24,7 +24,7 @@ class CopilotService:
         self.kb = knowledge_loader
         self.kb.load_all_documents()
     
-    def generate_ticket_summary(self, ticket: Ticket, messages: List[Message], db: Session) -> Dict:
+    async def generate_ticket_summary(self, ticket: Ticket, messages: List[Message], db: Session) -> Dict:
         """
         Generate AI summary for a ticket
         Returns summary with key points, sentiment, and urgency
@@ -54,11 +54,12 @@ Create a JSON response with:
 
 Respond with valid JSON only."""
 
-        result = self.llm.generate(
+        result = await self.llm.agenerate(
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.3,
-            max_tokens=800
+            max_tokens=800,
+            feature="ticket_summary"
         )
         
         if not result['success']:
@@ -80,7 +81,7 @@ Respond with valid JSON only."""
         
         return summary_data
     
-    def generate_response_suggestions(
+    async def generate_response_suggestions(
         self, 
         ticket: Ticket, 
         messages: List[Message],
@@ -92,6 +93,35 @@ Respond with valid JSON only."""
         Returns list of suggested responses with reasoning
         """
         
+        request, relevant_docs = self._suggestions_request(ticket, messages, customer)
+        result = await self.llm.agenerate(**request)
+        return self._parse_suggestions(result, relevant_docs, ticket, customer)
+    
+    async def stream_response_suggestions(
+        self, 
+        ticket: Ticket, 
+        messages: List[Message],
+        customer: User
+    ) -> AsyncIterator[Dict]:
+        """
+        generate_response_suggestions, forwarding the raw LLM output as it streams
+        Yields {"delta": text} chunks, then {"done": True, "suggestions": [...], "time_to_first_token_ms": ...}
+        """
+        
+        request, relevant_docs = self._suggestions_request(ticket, messages, customer)
+        async for event in self.llm.astream(**request):
+            if not event.get("done"):
+                yield event
+                continue
+            yield {
+                "done": True,
+                "suggestions": self._parse_suggestions(event, relevant_docs, ticket, customer),
+                "time_to_first_token_ms": event["time_to_first_token_ms"]
+            }
+    
+    def _suggestions_request(self, ticket: Ticket, messages: List[Message], customer: User) -> Tuple[Dict, List[Dict]]:
+        """LLM arguments for response suggestions, and the knowledge base articles they draw on"""
+        
         conversation = self._format_conversation(messages)
         
         relevant_docs = self.kb.search_documents(ticket.subject)[:3]
@@ -124,13 +154,15 @@ For each response, provide:
 
 Format as JSON array."""
 
-        result = self.llm.generate(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            temperature=0.7,
-            max_tokens=1200
-        )
-        
+        return {
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+            "temperature": 0.7,
+            "max_tokens": 1200,
+            "feature": "response_suggestions"
+        }, relevant_docs
+    
+    def _parse_suggestions(self, result: Dict, relevant_docs: List[Dict], ticket: Ticket, customer: User) -> List[Dict]:
         if not result['success']:
             return self._fallback_suggestions(ticket, customer)
         
@@ -149,7 +181,7 @@ Format as JSON array."""
         
         return suggestions
     
-    def generate_refund_explanation(
+    async def generate_refund_explanation(
         self,
         refund_request: RefundRequest,
         fraud_check: Optional[FraudCheck],
@@ -199,11 +231,12 @@ Provide:
 
 Format as valid JSON."""
 
-        result = self.llm.generate(
+        result = await self.llm.agenerate(
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.3,
-            max_tokens=1000
+            max_tokens=1000,
+            feature="refund_explanation"
         )
         
         if not result['success']:
@@ -0,0 +1,196 @@
+"""
+Document Store
+Memory-mapped, read-mostly store of RAG document text and metadata keyed by FAISS id
+
+Layout of docstore.bin:
+    header    magic + row count + byte offsets of the two blobs
+    offsets   int64 matrix, row = FAISS id: [text_offset, text_length, meta_offset, meta_length]
+    meta      concatenated UTF-8 JSON metadata (without the document text)
+    text      concatenated UTF-8 document text
+
+All workers map the same file, so pages are shared through the OS page cache. A lookup
+by id is one row read plus two slices; nothing is decoded until a hit is materialised.
+A new generation is written beside the old one and swapped in with a single rename.
+The previous generation stays mapped until nothing references it any more, so readers
+holding it are never cut off mid-lookup.
+"""
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import mmap
+import os
+import struct
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = "docstore.bin"
+MAGIC = b"KBDOCS01"
+HEADER = struct.Struct("<8sqqq")  # magic, rows, meta blob start, text blob start
+
+# Row layout of the offsets matrix
+TEXT_OFFSET, TEXT_LENGTH, META_OFFSET, META_LENGTH = range(4)
+
+
+class DocumentStore:
+    """O(1) id -> (text, metadata) lookups over a memory-mapped file"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path = self.directory / STORE_FILE
+        self._map: Optional[mmap.mmap] = None
+        self._offsets: np.ndarray = np.empty((0, 4), dtype="int64")
+        self._meta_base = 0
+        self._text_base = 0
+        self._count = 0
+
+    @classmethod
+    def exists_in(cls, directory: Path) -> bool:
+        return (Path(directory) / STORE_FILE).exists()
+
+    def open(self) -> bool:
+        """Map the store file; returns False when it does not exist"""
+        if not self.path.exists():
+            return False
+        self.close()
+        with open(self.path, "rb") as f:
+            # The mapping keeps its own handle on the file
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, rows, self._meta_base, self._text_base = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{self.path} is not a document store")
+        self._offsets = np.frombuffer(self._map, dtype="int64", count=rows * 4, offset=HEADER.size).reshape(-1, 4)
+        self._count = int((self._offsets[:, TEXT_OFFSET] >= 0).sum())
+        return True
+
+    def close(self):
+        """
+        Release the mapping
+
+        Only for a store nobody reads any more (shutdown, tests); a store that was
+        swapped out is released by garbage collection once its last reader is done.
+        """
+        # Drop the numpy view first; an mmap with exported buffers cannot be closed
+        self._offsets = np.empty((0, 4), dtype="int64")
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, doc_id: int) -> bool:
+        return self._row(doc_id) is not None
+
+    def _row(self, doc_id: int) -> Optional[np.ndarray]:
+        doc_id = int(doc_id)
+        if doc_id < 0 or doc_id >= len(self._offsets):
+            return None
+        row = self._offsets[doc_id]
+        return row if row[TEXT_OFFSET] >= 0 else None
+
+    def _slice(self, base: int, offset: int, length: int) -> str:
+        start = base + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def get_text(self, doc_id: int) -> Optional[str]:
+        """Document text for a FAISS id"""
+        row = self._row(doc_id)
+        if row is None:
+            return None
+        return self._slice(self._text_base, int(row[TEXT_OFFSET]), int(row[TEXT_LENGTH]))
+
+    def get_metadata(self, doc_id: int) -> Optional[Dict]:
+        """Document metadata for a FAISS id"""
+        row = self._row(doc_id)
+        if row is None:
+            return None
+        return json.loads(self._slice(self._meta_base, int(row[META_OFFSET]), int(row[META_LENGTH])))
+
+    def ids(self) -> Iterator[int]:
+        """All stored FAISS ids"""
+        return iter(np.nonzero(self._offsets[:, TEXT_OFFSET] >= 0)[0].tolist())
+
+    def records(self) -> Iterator[Tuple[int, str, Dict]]:
+        """Iterate (id, text, metadata) for every stored document"""
+        for doc_id in self.ids():
+            yield doc_id, self.get_text(doc_id), self.get_metadata(doc_id)
+
+    @classmethod
+    def write(cls, directory: Path, records: Iterable[Tuple[int, str, Dict]]) -> "DocumentStore":
+        """
+        Write a new store generation and atomically swap it in
+
+        Readers that still map the previous file keep a consistent view until they reopen.
+
+        Args:
+            directory: Target directory
+            records: (FAISS id, text, metadata) tuples; metadata must be JSON-serialisable
+
+        Returns:
+            An opened DocumentStore over the new file
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        rows: Dict[int, Tuple[int, int, int, int]] = {}
+        text_parts, meta_parts = [], []
+        text_pos = meta_pos = 0
+        for doc_id, text, metadata in records:
+            text_bytes = (text or "").encode("utf-8")
+            meta_bytes = json.dumps(metadata, default=str).encode("utf-8")
+            text_parts.append(text_bytes)
+            meta_parts.append(meta_bytes)
+            rows[int(doc_id)] = (text_pos, len(text_bytes), meta_pos, len(meta_bytes))
+            text_pos += len(text_bytes)
+            meta_pos += len(meta_bytes)
+
+        offsets = np.full((max(rows) + 1 if rows else 0, 4), -1, dtype="int64")
+        for doc_id, row in rows.items():
+            offsets[doc_id] = row
+
+        meta_base = HEADER.size + offsets.nbytes
+        text_base = meta_base + meta_pos
+        tmp_path = directory / f"{STORE_FILE}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, len(offsets), meta_base, text_base))
+            out.write(offsets.tobytes())
+            for part in meta_parts:
+                out.write(part)
+            for part in text_parts:
+                out.write(part)
+        os.replace(tmp_path, directory / STORE_FILE)
+
+        store = cls(directory)
+        store.open()
+        logger.info(f"Wrote document store with {len(rows)} documents ({text_pos} text bytes)")
+        return store
+
+    def rewrite(self, upserts: Dict[int, Tuple[str, Dict]], deletes: Iterable[int] = ()) -> "DocumentStore":
+        """
+        Write a new generation with some documents replaced, added or removed
+
+        Unchanged documents are streamed from the current mapping, which stays open
+        for readers still using this store.
+
+        Args:
+            upserts: FAISS id -> (text, metadata) for added or changed documents
+            deletes: FAISS ids to drop
+
+        Returns:
+            An opened DocumentStore over the new file
+        """
+        dropped = set(int(doc_id) for doc_id in deletes) | set(upserts)
+
+        def merged():
+            for doc_id, text, metadata in self.records():
+                if doc_id not in dropped:
+                    yield doc_id, text, metadata
+            for doc_id, (text, metadata) in upserts.items():
+                yield doc_id, text, metadata
+
+        return self.write(self.directory, merged())
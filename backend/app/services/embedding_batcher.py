@@ -0,0 +1,117 @@
+"""
+Embedding Micro-Batcher
+Coalesces concurrent single-text embedding requests into one model forward pass
+"""
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import Future
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """
+    Worker thread that drains a request queue in micro-batches
+
+    The first request of a batch waits at most `max_wait_ms` for company; the
+    batch is dispatched early once `max_batch_size` requests are queued.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], Optional[np.ndarray]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Start the batching worker
+
+        Args:
+            encode_fn: Batch encoder (texts -> array with one row per text, or None on failure)
+            max_batch_size: Largest batch handed to encode_fn
+            max_wait_ms: How long the first request waits for others to join its batch
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue a text; the returned future resolves to its embedding (or None)"""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def stop(self):
+        """Finish queued work and stop the worker"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def _collect(self, first) -> (List, bool):
+        """Gather up to max_batch_size requests, waiting at most max_wait after the first"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+
+            # Drop requests whose callers gave up
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            try:
+                vectors = self.encode_fn([text for text, _ in batch])
+            except Exception as e:
+                logger.error(f"Batched embedding failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for i, (_, future) in enumerate(batch):
+                future.set_result(vectors[i] if vectors is not None else None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize()
+        }
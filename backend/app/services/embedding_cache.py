@@ -0,0 +1,214 @@
+"""
+Embedding Cache
+Disk-backed, LRU-evicting cache of text embeddings keyed by (model_name, sha256(text))
+
+Layout per model (in EMBEDDING_CACHE_DIR):
+    <model>.vectors.f32   memory-mapped float32 matrix, one row per slot
+    <model>.keys.bin      memory-mapped sha256 digest per slot (guards against stale slots)
+    <model>.index.pkl     digest -> slot map in LRU order
+"""
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from pathlib import Path
+import atexit
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 32
+
+
+def text_digest(text: str) -> bytes:
+    """sha256 of the text, used as the cache key within one model's store"""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: hot in-process LRU over a memory-mapped disk LRU"""
+
+    def __init__(
+        self,
+        model_name: str,
+        dimension: int,
+        cache_dir: str = "embedding_cache",
+        max_entries: int = 100000,
+        hot_entries: int = 2048,
+        flush_every: int = 256
+    ):
+        """
+        Open (or create) the on-disk store for a model
+
+        Args:
+            model_name: Embedding model name; each model gets its own store
+            dimension: Embedding dimension
+            cache_dir: Directory holding the store files
+            max_entries: Disk capacity in vectors before LRU eviction
+            hot_entries: In-process tier capacity
+            flush_every: Persist the slot index after this many inserts
+        """
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.hot_entries = hot_entries
+        self.flush_every = flush_every
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.vectors_file = self.cache_dir / f"{slug}.vectors.f32"
+        self.keys_file = self.cache_dir / f"{slug}.keys.bin"
+        self.index_file = self.cache_dir / f"{slug}.index.pkl"
+
+        self._lock = threading.Lock()
+        self._hot: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._slots: "OrderedDict[bytes, int]" = OrderedDict()
+        self._free_slots: List[int] = []
+        self._pending_writes = 0
+
+        self.hot_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._open_store()
+        atexit.register(self.flush)
+
+    def _open_store(self):
+        """Map the vector/key files, creating or resetting them when the shape changed"""
+        state = None
+        if self.index_file.exists() and self.vectors_file.exists() and self.keys_file.exists():
+            try:
+                with open(self.index_file, "rb") as f:
+                    state = pickle.load(f)
+                if state.get("dimension") != self.dimension or state.get("max_entries") != self.max_entries:
+                    logger.info("Embedding cache shape changed, starting a new store")
+                    state = None
+            except Exception as e:
+                logger.warning(f"Embedding cache index unreadable, starting a new store: {e}")
+                state = None
+
+        mode = "r+" if state else "w+"
+        self._vectors = np.memmap(self.vectors_file, dtype="float32", mode=mode, shape=(self.max_entries, self.dimension))
+        self._keys = np.memmap(self.keys_file, dtype="uint8", mode=mode, shape=(self.max_entries, DIGEST_SIZE))
+
+        if state:
+            self._slots = state["slots"]
+        used = set(self._slots.values())
+        self._free_slots = [slot for slot in range(self.max_entries - 1, -1, -1) if slot not in used]
+        logger.info(f"Embedding cache for {self.model_name}: {len(self._slots)}/{self.max_entries} entries on disk")
+
+    def _read_disk(self, digest: bytes) -> Optional[np.ndarray]:
+        slot = self._slots.get(digest)
+        if slot is None:
+            return None
+        # Another worker may have reused the slot; the stored digest tells us
+        if self._keys[slot].tobytes() != digest:
+            del self._slots[digest]
+            return None
+        self._slots.move_to_end(digest)
+        return np.array(self._vectors[slot])
+
+    def _remember_hot(self, digest: bytes, vector: np.ndarray):
+        if self.hot_entries <= 0:
+            return
+        self._hot[digest] = vector
+        self._hot.move_to_end(digest)
+        while len(self._hot) > self.hot_entries:
+            self._hot.popitem(last=False)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up embeddings for texts
+
+        Returns:
+            List aligned with texts; None where the text is not cached
+        """
+        results = []
+        with self._lock:
+            for text in texts:
+                digest = text_digest(text)
+                vector = self._hot.get(digest)
+                if vector is not None:
+                    self._hot.move_to_end(digest)
+                    self.hot_hits += 1
+                else:
+                    vector = self._read_disk(digest)
+                    if vector is not None:
+                        self.disk_hits += 1
+                        self._remember_hot(digest, vector)
+                    else:
+                        self.misses += 1
+                results.append(vector)
+        return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Store freshly computed embeddings, evicting least recently used entries when full"""
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                digest = text_digest(text)
+                vector = np.asarray(vector, dtype="float32")
+                slot = self._slots.get(digest)
+                if slot is None:
+                    if self._free_slots:
+                        slot = self._free_slots.pop()
+                    else:
+                        _, slot = self._slots.popitem(last=False)
+                        self.evictions += 1
+                self._vectors[slot] = vector
+                self._keys[slot] = np.frombuffer(digest, dtype="uint8")
+                self._slots[digest] = slot
+                self._slots.move_to_end(digest)
+                self._remember_hot(digest, vector)
+                self._pending_writes += 1
+
+            if self._pending_writes >= self.flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        self._vectors.flush()
+        self._keys.flush()
+        state = {"dimension": self.dimension, "max_entries": self.max_entries, "slots": self._slots}
+        tmp_file = self.index_file.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(state, f)
+        os.replace(tmp_file, self.index_file)
+        self._pending_writes = 0
+
+    def flush(self):
+        """Persist the slot index and flush mapped pages"""
+        with self._lock:
+            if self._pending_writes:
+                self._flush_locked()
+
+    def clear(self):
+        """Drop all entries (both tiers)"""
+        with self._lock:
+            self._hot.clear()
+            self._slots.clear()
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+            self._keys[:] = 0
+            self._pending_writes += 1
+            self._flush_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy"""
+        lookups = self.hot_hits + self.disk_hits + self.misses
+        return {
+            "model": self.model_name,
+            "hot_hits": self.hot_hits,
+            "disk_hits": self.disk_hits,
+            "hits": self.hot_hits + self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hot_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "hot_entries": len(self._hot),
+            "disk_entries": len(self._slots),
+            "max_entries": self.max_entries
+        }
@@ -2,11 +2,16 @@
 Embedding Service for RAG
 Handles text embedding generation for semantic search
 """
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+import asyncio
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import logging
 
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_batcher import EmbeddingBatcher
+
 logger = logging.getLogger(__name__)
 
 
@@ -24,7 +29,11 @@ class EmbeddingService:
         """
         self.model_name = model_name
         self.model: Optional[SentenceTransformer] = None
+        self.cache: Optional[EmbeddingCache] = None
+        self.batcher: Optional[EmbeddingBatcher] = None
         self._initialize_model()
+        self._initialize_cache()
+        self._initialize_batcher()
     
     def _initialize_model(self):
         """Load the embedding model"""
@@ -43,10 +52,38 @@ class EmbeddingService:
                 logger.error(f"Fallback model also failed: {e2}")
                 self.model = None
     
+    def _initialize_cache(self):
+        """Open the persistent embedding cache for the loaded model"""
+        if not self.model or not settings.EMBEDDING_CACHE_ENABLED:
+            return
+        try:
+            self.cache = EmbeddingCache(
+                model_name=self.model_name,
+                dimension=self.get_embedding_dimension(),
+                cache_dir=settings.EMBEDDING_CACHE_DIR,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                hot_entries=settings.EMBEDDING_CACHE_HOT_ENTRIES
+            )
+        except Exception as e:
+            logger.error(f"Failed to open embedding cache, continuing without it: {e}")
+            self.cache = None
+    
+    def _initialize_batcher(self):
+        """Start the micro-batching worker used by encode_single"""
+        if not self.model or not settings.EMBEDDING_BATCH_ENABLED:
+            return
+        self.batcher = EmbeddingBatcher(
+            self.encode,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS
+        )
+    
     def encode(self, texts: List[str], batch_size: int = 32) -> Optional[np.ndarray]:
         """
         Generate embeddings for a list of texts
         
+        Cached embeddings are reused; only texts never seen by this model are encoded.
+        
         Args:
             texts: List of text strings to embed
             batch_size: Batch size for encoding
@@ -59,30 +96,82 @@ class EmbeddingService:
             return None
         
         try:
-            embeddings = self.model.encode(
-                texts,
-                batch_size=batch_size,
-                show_progress_bar=False,
-                convert_to_numpy=True
-            )
-            return embeddings
+            if self.cache is None:
+                return self._encode_uncached(texts, batch_size)
+            
+            cached = self.cache.get_many(texts)
+            missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+            if missing:
+                fresh = self._encode_uncached(missing, batch_size)
+                self.cache.put_many(missing, fresh)
+                computed = dict(zip(missing, fresh))
+                cached = [vector if vector is not None else computed[text] for text, vector in zip(texts, cached)]
+            
+            return np.vstack(cached).astype('float32') if cached else np.empty((0, self.get_embedding_dimension()), dtype='float32')
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
             return None
     
+    def _encode_uncached(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Run the model over texts"""
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True
+        )
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Embedding cache hit/miss counters"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
+    
+    def batcher_stats(self) -> Dict[str, Any]:
+        """Micro-batching counters"""
+        if self.batcher is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.batcher.stats()}
+    
     def encode_single(self, text: str) -> Optional[np.ndarray]:
         """
         Generate embedding for a single text
         
+        Concurrent callers are coalesced by the micro-batcher into one forward pass.
+        
         Args:
             text: Text string to embed
             
         Returns:
             Numpy array embedding or None if model unavailable
         """
+        if self.batcher is not None:
+            try:
+                return self.batcher.submit(text).result()
+            except Exception as e:
+                logger.error(f"Error generating embeddings: {e}")
+                return None
         result = self.encode([text])
         return result[0] if result is not None else None
     
+    async def aencode_single(self, text: str) -> Optional[np.ndarray]:
+        """
+        Async variant of encode_single that never blocks the event loop
+        
+        Args:
+            text: Text string to embed
+            
+        Returns:
+            Numpy array embedding or None if model unavailable
+        """
+        if self.batcher is not None:
+            try:
+                return await asyncio.wrap_future(self.batcher.submit(text))
+            except Exception as e:
+                logger.error(f"Error generating embeddings: {e}")
+                return None
+        return await asyncio.to_thread(self.encode_single, text)
+    
     def get_embedding_dimension(self) -> int:
         """Get the dimension of embeddings produced by this model"""
         if not self.model:
@@ -0,0 +1,251 @@
+"""
+Rule-based Intent Classifier
+Answers obvious scope and intent/sentiment questions locally so only ambiguous
+messages need an LLM round trip
+
+Each category is one compiled word-boundary alternation (an expanded version of the
+keyword lists in RAGService._fallback_intent_sentiment). A message is decided locally
+only when exactly one category matches and no cue contradicts it; anything else
+returns None and the caller escalates to the LLM. So are messages whose only support
+cue is a verb with everyday meanings ("return to the menu") and sentiment joined by
+a contrast ("thanks, but ...").
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _alternation(patterns: Iterable[str]) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(patterns) + r")\b", re.IGNORECASE)
+
+
+# Terms that only come up in e-commerce support
+SUPPORT_TERMS = _alternation([
+    r"orders?", r"ordered", r"refund\w*", r"return(?:s|ed|ing)?", r"ship\w*", r"deliver\w*",
+    r"track\w*", r"package", r"parcel", r"courier", r"warranty", r"exchange\w*", r"payments?",
+    r"paid", r"charged?", r"invoice", r"receipt", r"account", r"password", r"log ?in",
+    r"cancel\w*", r"damaged", r"defective", r"broken", r"items?", r"products?", r"purchase\w*",
+    r"bought", r"coupon", r"discount", r"promo(?: code)?", r"checkout", r"cart", r"in stock",
+    r"out of stock", r"replacement", r"money back", r"reimburs\w*", r"polic(?:y|ies)",
+    r"terms and conditions", r"intellica"
+])
+
+# Requests that are clearly not customer support
+OFF_TOPIC_TERMS = _alternation([
+    r"jokes?", r"poem", r"story", r"weather", r"recipe", r"capital of", r"president",
+    r"movies?", r"songs?", r"lyrics", r"homework", r"translate", r"math", r"calculate",
+    r"who won", r"meaning of life", r"bitcoin", r"horoscope", r"sports?", r"football",
+    r"write (?:\w+ ){0,4}(?:essays?|code|programs?|scripts?|functions?)"
+])
+# Support cues that are ordinary verbs outside shopping; alone they do not settle anything
+AMBIGUOUS_CUE = re.compile(r"return(?:s|ed|ing)?|track\w*", re.IGNORECASE)
+
+ARITHMETIC = re.compile(r"(?<![\w-])\d+\s*[-+*/x×÷^]\s*\d+(?![\w-])")
+
+GREETING = re.compile(
+    r"^\s*(?:hi|hello|hey|hiya|good (?:morning|afternoon|evening)|thanks?(?: you)?|thank you(?: so much)?|ok(?:ay)?|bye)"
+    r"(?:\s+(?:there|team|again|so much|a lot))?\s*[!.,?]*\s*$",
+    re.IGNORECASE
+)
+
+INTENT_PATTERNS = {
+    "refund_inquiry": _alternation([r"refund\w*", r"money back", r"reimburs\w*", r"charge ?back", r"credited"]),
+    "return_inquiry": _alternation([r"return(?:s|ed|ing)?", r"send (?:it |this |them )?back", r"give (?:it )?back", r"exchange\w*", r"replacement"]),
+    "order_status": _alternation([
+        r"track\w*", r"where is my (?:order|package|parcel|item)", r"deliver\w*", r"ship(?:ped|ping|ment)",
+        r"arriv\w+", r"order status", r"dispatch\w*", r"in transit", r"out for delivery"
+    ]),
+    "product_inquiry": _alternation([
+        r"in stock", r"out of stock", r"sizes?", r"colou?rs?", r"specs?", r"specifications?",
+        r"compatible", r"dimensions", r"material", r"does (?:it|this|the \w+) (?:come|work|have|fit)"
+    ]),
+    "policy_question": _alternation([r"polic(?:y|ies)", r"guidelines?", r"terms and conditions", r"return window"]),
+    "complaint": _alternation([
+        r"angry", r"frustrat\w*", r"disappoint\w*", r"terrible", r"awful", r"worst", r"unacceptable",
+        r"ridiculous", r"horrible", r"complain\w*", r"fed up", r"scam"
+    ]),
+}
+
+# More specific intents win over the generic words that usually accompany them
+# ("what is your refund policy" is a policy question, "track my return" is about a return)
+PRECEDENCE = [
+    ("policy_question", {"refund_inquiry", "return_inquiry", "order_status"}),
+    ("return_inquiry", {"order_status"}),
+    ("refund_inquiry", {"order_status"}),
+]
+
+POSITIVE_WORDS = _alternation([
+    r"thanks?", r"thank you", r"great", r"excellent", r"happy", r"appreciate\w*", r"perfect",
+    r"awesome", r"love", r"amazing", r"wonderful", r"helpful"
+])
+NEGATIVE_WORDS = _alternation([
+    r"bad", r"terrible", r"awful", r"angry", r"frustrat\w*", r"disappoint\w*", r"upset", r"horrible",
+    r"worst", r"unacceptable", r"ridiculous", r"annoy\w*", r"fed up", r"scam", r"useless"
+])
+NEGATION = _alternation([r"not", r"no", r"never", r"\w+n't", r"hardly"])
+# "Thanks, but my refund is still missing": the clause after the contrast carries the sentiment
+CONTRAST = _alternation([r"but", r"however", r"still", r"although", r"though"])
+
+ORDER_NUMBER = re.compile(r"(?<!\w)(ORD[-_]?\d[\w-]*|#\d{3,})\b", re.IGNORECASE)
+AMOUNT = re.compile(r"[$₹€£]\s?\d[\d,]*(?:\.\d{1,2})?")
+
+
+class RuleIntentClassifier:
+    """Local, CPU-only first pass for scope and intent/sentiment classification"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {task: {"resolved": 0, "escalated": 0} for task in ("scope", "analysis")}
+
+    def _count(self, task: str, resolved: bool):
+        with self._lock:
+            self._counts[task]["resolved" if resolved else "escalated"] += 1
+
+    def classify_scope(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Decide whether a question is e-commerce support
+
+        Args:
+            query: User question
+
+        Returns:
+            Dict shaped like RAGService.classify_intent's result, or None when the LLM should decide
+        """
+        support = sorted({match.lower() for match in SUPPORT_TERMS.findall(query)})
+        off_topic = OFF_TOPIC_TERMS.search(query) or ARITHMETIC.search(query)
+
+        result = None
+        if support and not off_topic and self._corroborated(support, query):
+            result = {"in_scope": True, "confidence": 0.9, "reason": f"support terms: {', '.join(support[:3])}"}
+        elif off_topic and not support:
+            result = {"in_scope": False, "confidence": 0.9, "reason": f"off-topic: {off_topic.group(0)}"}
+        elif GREETING.match(query):
+            result = {"in_scope": True, "confidence": 0.9, "reason": "greeting"}
+
+        self._count("scope", result is not None)
+        if result is not None:
+            result["method"] = "rules"
+        return result
+
+    @staticmethod
+    def _corroborated(cues: Iterable[str], message: str) -> bool:
+        """Whether the cues hold more than a lone ambiguous verb (or the message names an order)"""
+        return any(not AMBIGUOUS_CUE.fullmatch(cue) for cue in cues) or bool(ORDER_NUMBER.search(message))
+
+    def _intent(self, message: str) -> Optional[str]:
+        if GREETING.match(message):
+            return "greeting"
+        matched = {intent for intent, pattern in INTENT_PATTERNS.items() if pattern.search(message)}
+        for winner, losers in PRECEDENCE:
+            if winner in matched:
+                matched -= losers
+        if len(matched) != 1:
+            return None
+        intent = matched.pop()
+        cues = INTENT_PATTERNS[intent].findall(message) + SUPPORT_TERMS.findall(message)
+        return intent if self._corroborated(cues, message) else None
+
+    def _sentiment(self, message: str) -> Optional[Dict[str, Any]]:
+        positive = len(POSITIVE_WORDS.findall(message))
+        negative = len(NEGATIVE_WORDS.findall(message))
+        if (positive and negative) or CONTRAST.search(message):
+            return None
+        if (positive or negative) and NEGATION.search(message):
+            # "not happy", "wasn't bad": polarity depends on scope the rules do not model
+            return None
+        if positive:
+            return {"sentiment": "positive", "sentiment_score": min(0.7 + positive * 0.1, 1.0)}
+        if negative:
+            return {"sentiment": "negative", "sentiment_score": max(0.3 - negative * 0.1, 0.0)}
+        return {"sentiment": "neutral", "sentiment_score": 0.5}
+
+    @staticmethod
+    def extract_entities(message: str) -> Dict[str, Any]:
+        order = ORDER_NUMBER.search(message)
+        amount = AMOUNT.search(message)
+        return {
+            "order_number": order.group(1).lstrip("#") if order else None,
+            "product_name": None,
+            "amount": amount.group(0) if amount else None
+        }
+
+    def analyze(self, message: str) -> Optional[Dict[str, Any]]:
+        """
+        Intent, sentiment and entities for an unambiguous message
+
+        Returns:
+            Dict shaped like RAGService.analyze_intent_and_sentiment's result, or None
+            when the LLM should decide
+        """
+        intent = self._intent(message)
+        sentiment = self._sentiment(message) if intent else None
+        if intent == "complaint" and sentiment and sentiment["sentiment"] == "positive":
+            sentiment = None
+
+        if sentiment is None:
+            self._count("analysis", False)
+            return None
+
+        self._count("analysis", True)
+        return {
+            "success": True,
+            "intent": intent,
+            "intent_confidence": 0.85,
+            **sentiment,
+            "entities": self.extract_entities(message),
+            "model_used": "rules"
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Share of classifications answered locally, i.e. LLM calls avoided"""
+        stats = {}
+        for task, counts in self._counts.items():
+            total = counts["resolved"] + counts["escalated"]
+            stats[task] = {
+                **counts,
+                "llm_calls_avoided": round(counts["resolved"] / total, 4) if total else 0.0
+            }
+        return stats
+
+
+def agreement(classifier: RuleIntentClassifier, examples: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Coverage and agreement of the rules on a labelled set
+
+    Args:
+        classifier: Classifier to evaluate (its counters are updated as a side effect)
+        examples: Dicts with 'text', 'in_scope' and, for in-scope messages, 'intent'
+            (and optionally 'sentiment')
+
+    Returns:
+        Per task: examples, resolved (share answered without the LLM) and agreement
+        (share of resolved examples matching the label)
+    """
+    report = {}
+    for task in ("scope", "analysis"):
+        total = resolved = agreed = 0
+        for example in examples:
+            if task == "analysis" and "intent" not in example:
+                continue
+            total += 1
+            if task == "scope":
+                result = classifier.classify_scope(example["text"])
+                correct = result is not None and result["in_scope"] == example["in_scope"]
+            else:
+                result = classifier.analyze(example["text"])
+                correct = (
+                    result is not None and result["intent"] == example["intent"]
+                    and result["sentiment"] == example.get("sentiment", result["sentiment"])
+                )
+            if result is not None:
+                resolved += 1
+                agreed += correct
+        report[task] = {
+            "examples": total,
+            "resolved": round(resolved / total, 4) if total else 0.0,
+            "agreement": round(agreed / resolved, 4) if resolved else None
+        }
+    return report
@@ -4,10 +4,20 @@ Loads and indexes knowledge base documents for RAG
 """
 
 import os
+import math
+from bisect import bisect_left
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 import re
 
+from app.core.config import settings
+from app.services.lexical_index import tokenize
+
+# Field bits in the postings and their weights (same weights the substring scorer used)
+TITLE, CONTENT, TAGS, KEYWORDS = 1, 2, 4, 8
+FIELD_WEIGHTS = {TITLE: 3, TAGS: 2, KEYWORDS: 2, CONTENT: 1}
+
+
 class KnowledgeLoader:
     def __init__(self, kb_path: str = "knowledge_base"):
         # Try multiple possible paths
@@ -27,6 +37,10 @@ class KnowledgeLoader:
             self.kb_path = Path(kb_path)  # Use default even if doesn't exist
             
         self.documents = []
+        # token -> {document position: bitmask of fields containing it}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # Sorted tokens for prefix lookups
+        self._vocabulary: List[str] = []
         
     def load_all_documents(self) -> List[Dict]:
         """Load all markdown and CSV documents from knowledge base"""
@@ -51,6 +65,7 @@ class KnowledgeLoader:
                         documents.extend(csv_docs)
         
         self.documents = documents
+        self._build_postings()
         return documents
     
     def _load_document(self, file_path: Path, doc_type: str) -> Optional[Dict]:
@@ -184,12 +199,106 @@ class KnowledgeLoader:
         """Get documents filtered by category"""
         return [doc for doc in self.documents if doc['category'] == category]
     
-    def search_documents(self, query: str) -> List[Dict]:
-        """Simple keyword search in documents"""
+    def _build_postings(self):
+        """Index every token of title, content, tags and keywords by document and field"""
+        postings: Dict[str, Dict[int, int]] = {}
+        for position, doc in enumerate(self.documents):
+            fields = (
+                (TITLE, doc['title']),
+                (CONTENT, doc['content']),
+                (TAGS, ' '.join(doc['tags'])),
+                (KEYWORDS, ' '.join(doc['keywords']))
+            )
+            for field, text in fields:
+                for token in set(tokenize(text)):
+                    docs = postings.setdefault(token, {})
+                    docs[position] = docs.get(position, 0) | field
+        
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+    
+    def _expand(self, term: str) -> List[str]:
+        """Indexed tokens equal to or starting with term"""
+        start = bisect_left(self._vocabulary, term)
+        end = start
+        while end < len(self._vocabulary) and self._vocabulary[end].startswith(term):
+            end += 1
+        return self._vocabulary[start:end]
+    
+    def _term_fields(self, term: str) -> Dict[int, int]:
+        """Document position -> field mask for every token matching term as a prefix"""
+        fields: Dict[int, int] = {}
+        for token in self._expand(term):
+            for position, mask in self._postings[token].items():
+                fields[position] = fields.get(position, 0) | mask
+        return fields
+    
+    def search_documents(self, query: str, mode: Optional[str] = None) -> List[Dict]:
+        """
+        Keyword search over the postings index
+        
+        Each query term also matches indexed words it is a prefix of ("ship" -> "shipping"),
+        so cost follows the number of matching postings rather than corpus size.
+        
+        Args:
+            query: Search text
+            mode: "ranked" (default via KB_SEARCH_MODE) scores every term by
+                  idf x field weight; "compat" keeps the original scoring, where the
+                  whole query must appear in a field (title 3, tag 2, keyword 2, content 1)
+        
+        Returns:
+            Matching documents with 'relevance_score', best first
+        """
+        mode = mode or settings.KB_SEARCH_MODE
+        terms = list(dict.fromkeys(tokenize(query)))
+        
+        if mode == "compat":
+            results = self._phrase_search(query, terms)
+        else:
+            results = self._ranked_search(terms)
+        
+        results.sort(key=lambda x: x['relevance_score'], reverse=True)
+        return results
+    
+    def _ranked_search(self, terms: List[str]) -> List[Dict]:
+        """Sum over query terms of idf x the weights of the fields the term occurs in"""
+        scores: Dict[int, float] = {}
+        total = len(self.documents)
+        for term in terms:
+            fields = self._term_fields(term)
+            if not fields:
+                continue
+            idf = math.log(1 + total / len(fields))
+            for position, mask in fields.items():
+                weight = sum(w for field, w in FIELD_WEIGHTS.items() if mask & field)
+                scores[position] = scores.get(position, 0.0) + idf * weight
+        
+        return [
+            {**self.documents[position], 'relevance_score': round(score, 4)}
+            for position, score in sorted(scores.items())
+        ]
+    
+    def _phrase_search(self, query: str, terms: List[str]) -> List[Dict]:
+        """
+        Original substring scoring, run only on documents holding every query term
+        
+        A phrase that starts or ends mid-word still matches through prefix expansion;
+        one that starts inside a word (e.g. "fund" for "refund") no longer does.
+        """
+        candidates: Optional[Set[int]] = None
+        for term in terms:
+            matched = set(self._term_fields(term))
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+        
+        # Queries made only of stopwords have no postings; fall back to a scan
+        positions = sorted(candidates) if candidates is not None else range(len(self.documents))
+        
         query_lower = query.lower()
         results = []
-        
-        for doc in self.documents:
+        for position in positions:
+            doc = self.documents[position]
             score = 0
             if query_lower in doc['title'].lower():
                 score += 3
@@ -203,7 +312,6 @@ class KnowledgeLoader:
             if score > 0:
                 results.append({**doc, 'relevance_score': score})
         
-        results.sort(key=lambda x: x['relevance_score'], reverse=True)
         return results
 
 knowledge_loader = KnowledgeLoader()
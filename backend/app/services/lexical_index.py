@@ -0,0 +1,175 @@
+"""
+Lexical Index
+Tokenizer, BM25 inverted index and reciprocal-rank fusion for hybrid retrieval
+
+Postings are built once per corpus generation; a query only touches the postings of
+its own terms, so exact identifiers (order numbers, SKUs, policy names) are found
+without scanning every document.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import logging
+import math
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Words joined by - _ . / # stay together as one identifier token (ORD-2024-001, SKU_12.B)
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./#][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_./#]")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does for from had has have how i if in
+into is it its me my no not of on or our so than that the their them then there these
+they this to was we were what when where which who why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens with stopwords removed
+
+    Compound identifiers are emitted whole and as their parts, so "ORD-2024-001"
+    matches both the exact order number and a search for "2024".
+    """
+    tokens = []
+    for match in _TOKEN_RE.findall((text or "").lower()):
+        parts = _SPLIT_RE.split(match)
+        if len(parts) > 1:
+            tokens.append(match)
+        tokens.extend(part for part in parts if part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of (document, precomputed term weight) postings"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_ids = np.empty(0, dtype="int64")
+        self.avg_doc_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def build(self, documents: Iterable[Tuple[int, str]]) -> "BM25Index":
+        """
+        Index a corpus, replacing any previous contents
+
+        Args:
+            documents: (document id, text) pairs
+
+        Returns:
+            self
+        """
+        doc_ids, lengths = [], []
+        term_counts: Dict[str, Dict[int, int]] = {}
+        for position, (doc_id, text) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(int(doc_id))
+            lengths.append(len(tokens))
+            for token in tokens:
+                counts = term_counts.setdefault(token, {})
+                counts[position] = counts.get(position, 0) + 1
+
+        self._doc_ids = np.array(doc_ids, dtype="int64")
+        doc_lengths = np.array(lengths, dtype="float32")
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        norm = self.k1 * (1 - self.b + self.b * doc_lengths / max(self.avg_doc_length, 1e-9))
+
+        # Term weights do not depend on the query, so scoring is just a sum over postings
+        total = len(doc_ids)
+        self._postings = {}
+        for token, counts in term_counts.items():
+            positions = np.fromiter(counts.keys(), dtype="int64", count=len(counts))
+            tf = np.fromiter(counts.values(), dtype="float32", count=len(counts))
+            idf = math.log(1 + (total - len(counts) + 0.5) / (len(counts) + 0.5))
+            weights = idf * tf * (self.k1 + 1) / (tf + norm[positions])
+            self._postings[token] = (positions, weights.astype("float32"))
+
+        logger.info(f"BM25 index built: {total} documents, {len(self._postings)} terms")
+        return self
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        allowed_ids: Optional[Set[int]] = None,
+        min_score: float = 0.0
+    ) -> List[Tuple[int, float]]:
+        """
+        Rank documents for a query
+
+        Args:
+            query: Free-text query
+            top_k: Number of results
+            allowed_ids: Optional set of document ids to restrict results to
+            min_score: Drop documents scoring below this fraction of max_score(query)
+
+        Returns:
+            List of (document id, score), best first; only documents sharing a term with the query
+        """
+        postings = [self._postings[token] for token in set(tokenize(query)) if token in self._postings]
+        if not postings:
+            return []
+
+        positions = np.concatenate([p for p, _ in postings])
+        weights = np.concatenate([w for _, w in postings])
+        matched, inverse = np.unique(positions, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        doc_ids = self._doc_ids[matched]
+
+        if min_score > 0:
+            keep = scores >= min_score * self.max_score(query)
+            doc_ids, scores = doc_ids[keep], scores[keep]
+
+        if allowed_ids is not None:
+            keep = np.fromiter((doc_id in allowed_ids for doc_id in doc_ids.tolist()), dtype=bool, count=len(doc_ids))
+            doc_ids, scores = doc_ids[keep], scores[keep]
+
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(doc_ids[i]), float(scores[i])) for i in best]
+
+    def max_score(self, query: str) -> float:
+        """
+        Score of a document matching every query term with saturated frequency
+
+        Terms missing from the corpus count with the idf of a term in no document, so a
+        query made mostly of unknown words (an unrelated question) scores low everywhere.
+        """
+        total = len(self._doc_ids)
+        ceiling = 0.0
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            matching = len(postings[0]) if postings is not None else 0
+            ceiling += math.log(1 + (total - matching + 0.5) / (matching + 0.5)) * (self.k1 + 1)
+        return ceiling
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Merge ranked id lists: score(d) = sum over lists of 1 / (k + rank)
+
+    Args:
+        rankings: Ranked document id lists, best first
+        k: Damping constant; larger values flatten the contribution of top ranks
+
+    Returns:
+        List of (document id, fused score), best first
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
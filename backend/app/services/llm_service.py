@@ -1,22 +1,44 @@
 """
 LLM Service for AI Copilot
 Handles all LLM inference for ticket summarization, response generation, and explanations
-Uses Hugging Face Transformers with Flan-T5 (fast, lightweight, CPU-friendly)
+Providers: Groq, Gemini and Ollama over HTTP, plus an optional in-process Hugging Face
+model (Flan-T5 by default, CPU-friendly) for offline use
 """
 
-import requests
+import httpx
+import asyncio
+import threading
 import json
-from typing import List, Dict, Optional
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Tuple, Any
 import time
 import logging
+from datetime import datetime
 import os
 from dotenv import load_dotenv
 
+from app.core.config import settings
+from app.services.llm_telemetry import estimate_tokens, llm_telemetry
+from app.services.local_llm import LocalLLM, load_local_model
+from app.services.provider_router import ProviderRouter
+from app.services.request_coalescer import ResultCache, SingleFlight
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
 class LLMService:
     def __init__(self, base_url: str = "http://localhost:11434"):
         # Ollama configuration (fallback)
@@ -46,10 +68,111 @@ class LLMService:
         else:
             logger.warning("Gemini API key not found. Will use Ollama as fallback.")
         
-        # Hugging Face models (disabled for now)
-        self.hf_model = None
-        self.hf_tokenizer = None    
-        # self._initialize_hf_model()
+        # In-process Hugging Face model with a batching worker (LLM_LOCAL_ENABLED)
+        self.local_llm: Optional[LocalLLM] = None
+        if settings.LLM_LOCAL_ENABLED:
+            self._initialize_local_model()
+        
+        # Pooled keep-alive HTTP clients per provider, created on first use
+        self._http2 = settings.LLM_HTTP2 and _http2_available()
+        self._clients: Dict[str, httpx.Client] = {}
+        self._clients_lock = threading.Lock()
+        # event loop -> provider -> client; an async client is bound to the loop it was created on
+        self._async_clients: Dict[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]] = {}
+        
+        # Circuit breakers and latency-aware provider order
+        self.router = ProviderRouter(
+            failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout_seconds=settings.LLM_BREAKER_RESET_SECONDS,
+            window=settings.LLM_ROUTING_WINDOW,
+            min_samples=settings.LLM_ROUTING_MIN_SAMPLES,
+            adaptive=settings.LLM_ROUTING_ADAPTIVE
+        )
+        
+        # Sharing of identical in-flight requests and short-lived results of low-temperature prompts
+        self.single_flight = SingleFlight()
+        self.result_cache = ResultCache(
+            ttl_seconds=settings.LLM_RESULT_CACHE_TTL_SECONDS,
+            max_entries=settings.LLM_RESULT_CACHE_MAX_ENTRIES
+        )
+        
+        # Provider health, refreshed by the background monitor (see start_health_monitor)
+        self._health: Dict[str, Dict] = {}
+        self._available = False
+        self._health_checked_at: Optional[float] = None
+        self._health_stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        self._health_thread_lock = threading.Lock()
+        
+        # Per-call records (feature, provider, tokens, latency, cache and fallback outcome)
+        self.telemetry = llm_telemetry
+        
+        # Recent streamed generations: time to first token and total time (ms)
+        self._stream_latencies = {key: deque(maxlen=1000) for key in ("first_token", "total")}
+    
+    def _client_options(self, provider: str) -> Dict:
+        """Connection limits per provider; HTTP/2 only for the TLS endpoint"""
+        max_connections = settings.LLM_GROQ_MAX_CONNECTIONS if provider == "groq" else settings.LLM_OLLAMA_MAX_CONNECTIONS
+        return {
+            "http2": self._http2 and provider == "groq",
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS
+            ),
+            "timeout": self.timeout
+        }
+    
+    def _http_client(self, provider: str) -> httpx.Client:
+        """Shared blocking client for a provider (thread-safe)"""
+        client = self._clients.get(provider)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(provider)
+                if client is None:
+                    client = httpx.Client(**self._client_options(provider))
+                    self._clients[provider] = client
+        return client
+    
+    def _async_http_client(self, provider: str) -> httpx.AsyncClient:
+        """Shared async client for a provider on the running event loop"""
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.get(loop)
+        if clients is None:
+            # Clients of other loops cannot be used from this one; release them
+            for other in list(self._async_clients):
+                self._retire_async_clients(other)
+            clients = self._async_clients[loop] = {}
+        client = clients.get(provider)
+        if client is None:
+            client = clients[provider] = httpx.AsyncClient(**self._client_options(provider))
+        return client
+    
+    def _retire_async_clients(self, loop: asyncio.AbstractEventLoop):
+        """Close the clients of another event loop on that loop, if it is still alive"""
+        clients = self._async_clients.pop(loop, {})
+        if not clients:
+            return
+        if loop.is_closed():
+            # A closed loop cannot run the close any more, so its sockets are left to the GC
+            logger.warning(f"Dropping {len(clients)} async HTTP client(s) of a closed event loop")
+            return
+        for client in clients.values():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    
+    async def aclose(self):
+        """Close pooled connections and stop the local model worker (call on application shutdown)"""
+        loop = asyncio.get_running_loop()
+        for client in self._async_clients.pop(loop, {}).values():
+            await client.aclose()
+        for other in list(self._async_clients):
+            self._retire_async_clients(other)
+        with self._clients_lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+        if self.local_llm is not None:
+            await asyncio.to_thread(self.local_llm.stop)
 
     def _initialize_gemini(self):
         """Initialize Google Gemini API"""
@@ -78,195 +201,623 @@ class LLMService:
             logger.error(f"Failed to initialize Gemini API: {e}")
             self.gemini_client = None
     
-    def _initialize_hf_model(self):
-        """Initialize Hugging Face model (Flan-T5-base)"""
+    def _initialize_local_model(self):
+        """Load the local model (LLM_LOCAL_MODEL) once and start its batching worker"""
         try:
-            from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-            import torch
-            
-            logger.info("Loading Flan-T5-base model from Hugging Face...")
-            self.hf_tokenizer = AutoTokenizer.from_pretrained("google/flan-t5-base")
-            self.hf_model = AutoModelForSeq2SeqLM.from_pretrained("google/flan-t5-base")
-            
-            # Use CPU
-            self.device = "cpu"
-            self.hf_model = self.hf_model.to(self.device)
-            logger.info("Flan-T5-base model loaded successfully on CPU")
+            logger.info(f"Loading local model {settings.LLM_LOCAL_MODEL} (int8: {settings.LLM_LOCAL_QUANTIZE})...")
+            model, tokenizer = load_local_model(
+                settings.LLM_LOCAL_MODEL,
+                quantize=settings.LLM_LOCAL_QUANTIZE,
+                threads=settings.LLM_LOCAL_THREADS
+            )
+            self.local_llm = LocalLLM(
+                model,
+                tokenizer,
+                model_name=settings.LLM_LOCAL_MODEL,
+                max_batch_size=settings.LLM_LOCAL_MAX_BATCH_SIZE,
+                max_wait_ms=settings.LLM_LOCAL_MAX_WAIT_MS,
+                max_input_tokens=settings.LLM_LOCAL_MAX_INPUT_TOKENS
+            )
+            logger.info("Local model loaded successfully on CPU")
             
         except Exception as e:
-            logger.error(f"Failed to load Hugging Face model: {e}")
-            self.hf_model = None
-            self.hf_tokenizer = None
+            logger.error(f"Failed to load local model: {e}")
+            self.local_llm = None
         
     def check_health(self) -> bool:
-        """Check if LLM service is available"""
-        # Check Grok API first (primary)
-        if self.grok_api_key:
+        """
+        Check if LLM service is available
+        
+        Reads the state kept by the background health monitor, so hot paths never
+        wait on a probe. Until the monitor's first probe lands the state is unknown
+        and providers are assumed up; generate still falls back if they are not.
+        """
+        if self._health_checked_at is None:
+            if not self._health_stop.is_set():
+                self.start_health_monitor()
             return True
-            
-        # Check Gemini API second
+        return self._available
+    
+    def _providers(self) -> List[str]:
+        """Configured providers, in the order generate tries them"""
+        providers = []
+        if self.grok_api_key:
+            providers.append("groq")
         if self.gemini_client is not None:
-            return True
+            providers.append("gemini")
+        providers.append("ollama")
+        if self.local_llm is not None:
+            providers.append("local")
+        return providers
+    
+    def _probe(self, provider: str):
+        """Cheap metadata request against a provider; raises when it is unreachable"""
+        timeout = settings.LLM_HEALTH_CHECK_TIMEOUT_SECONDS
+        if provider == "groq":
+            response = self._http_client("groq").get(
+                f"{self.grok_base_url}/models",
+                headers={"Authorization": f"Bearer {self.grok_api_key}"},
+                timeout=timeout
+            )
+            response.raise_for_status()
+        elif provider == "gemini":
+            import google.generativeai as genai
+            genai.get_model(f"models/{self.gemini_model}", request_options={"timeout": timeout})
+        elif provider == "local":
+            if not self.local_llm.is_alive():
+                raise RuntimeError("local model worker is not running")
+        else:
+            response = self._http_client("ollama").get(f"{self.base_url}/api/tags", timeout=timeout)
+            response.raise_for_status()
+    
+    def refresh_health(self) -> Dict[str, Dict]:
+        """Probe every configured provider and update the cached state"""
+        health = {}
+        for provider in self._providers():
+            start_time = time.perf_counter()
+            try:
+                self._probe(provider)
+                health[provider] = {"up": True, "error": None}
+            except Exception as e:
+                health[provider] = {"up": False, "error": str(e)[:200]}
+            health[provider]["latency_ms"] = round((time.perf_counter() - start_time) * 1000, 1)
+            health[provider]["checked_at"] = datetime.utcnow().isoformat()
         
-        # Check Hugging Face model
-        if self.hf_model is not None:
-            return True
+        available = any(state["up"] for state in health.values())
+        if available != self._available:
+            logger.info(f"LLM availability changed to {'up' if available else 'down'}: {health}")
+        self._health = health
+        self._available = available
+        self._health_checked_at = time.time()
+        return health
+    
+    def _health_loop(self):
+        while True:
+            try:
+                self.refresh_health()
+            except Exception as e:
+                logger.error(f"LLM health check failed: {e}")
+            if self._health_stop.wait(settings.LLM_HEALTH_CHECK_INTERVAL_SECONDS):
+                return
+    
+    def start_health_monitor(self):
+        """Probe providers every LLM_HEALTH_CHECK_INTERVAL_SECONDS in a daemon thread"""
+        with self._health_thread_lock:
+            if self._health_thread is not None and self._health_thread.is_alive():
+                return
+            self._health_stop.clear()
+            self._health_thread = threading.Thread(target=self._health_loop, name="llm-health-monitor", daemon=True)
+            self._health_thread.start()
+    
+    def stop_health_monitor(self):
+        self._health_stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=settings.LLM_HEALTH_CHECK_TIMEOUT_SECONDS * 3)
+            self._health_thread = None
+    
+    def health_status(self) -> Dict[str, Any]:
+        """Cached availability and per-provider up/down state with probe latency"""
+        return {
+            "available": self._available,
+            "checked_at": datetime.utcfromtimestamp(self._health_checked_at).isoformat() if self._health_checked_at else None,
+            "interval_seconds": settings.LLM_HEALTH_CHECK_INTERVAL_SECONDS,
+            "providers": self._health,
+            "routing": self.router.stats(self._providers()),
+            "coalescing": self.single_flight.stats(),
+            "result_cache": self.result_cache.stats(),
+            "local_model": self.local_llm.stats() if self.local_llm is not None else None,
+            "telemetry": self.telemetry.stats()
+        }
+
+    @staticmethod
+    def _messages(prompt: str, system_prompt: Optional[str]) -> List[Dict[str, str]]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def _groq_request(
+        self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, stream: bool = False
+    ) -> Dict:
+        """Arguments of a Groq (OpenAI-compatible) chat completion request"""
+        return {
+            "url": f"{self.grok_base_url}/chat/completions",
+            "json": {
+                "messages": self._messages(prompt, system_prompt),
+                "model": self.grok_model,
+                "stream": stream,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            },
+            "headers": {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.grok_api_key}"
+            },
+            "timeout": 10  # Fast timeout for Grok
+        }
+    
+    def _groq_result(self, response: httpx.Response, start_time: float) -> Optional[Dict]:
+        """Result dict for a Groq response, or None to fall through to the next provider"""
+        if response.status_code != 200:
+            logger.warning(f"Grok API error: {response.status_code} - {response.text}")
+            return None
         
-        # Fallback to Ollama check
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+        result = response.json()
+        generation_time = int((time.time() - start_time) * 1000)
+        text = result['choices'][0]['message']['content']
+        
+        logger.info(f"Generated response in {generation_time}ms using Grok {self.grok_model}")
+        usage = result.get('usage') or {}
+        
+        return {
+            "text": text,
+            "model": self.grok_model,
+            "generation_time_ms": generation_time,
+            "success": True,
+            "prompt_tokens": usage.get('prompt_tokens'),
+            "completion_tokens": usage.get('completion_tokens')
+        }
+    
+    @staticmethod
+    def _gemini_prompt(prompt: str, system_prompt: Optional[str]) -> str:
+        # Combine system prompt and user prompt
+        if system_prompt:
+            return f"{system_prompt}\n\n{prompt}"
+        return prompt
+    
+    def _gemini_result(self, response, start_time: float) -> Dict:
+        generation_time = int((time.time() - start_time) * 1000)
+        
+        # Check if response was blocked by safety filters
+        if not response.parts:
+            logger.warning(f"Gemini response blocked by safety filters (finish_reason: {response.candidates[0].finish_reason})")
+            # Return a safe fallback response instead of crashing
+            return {
+                "text": "I apologize, but I'm having trouble generating a response. Please rephrase your question or contact our support team.",
+                "model": self.gemini_model,
+                "generation_time_ms": generation_time,
+                "success": False
+            }
+        
+        logger.info(f"Generated response in {generation_time}ms using Gemini {self.gemini_model}")
+        usage = getattr(response, "usage_metadata", None)
+        
+        return {
+            "text": response.text.strip(),
+            "model": self.gemini_model,
+            "generation_time_ms": generation_time,
+            "success": True,
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None)
+        }
+    
+    def _ollama_request(
+        self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, stream: bool = False
+    ) -> Dict:
+        """Arguments of an Ollama chat request"""
+        return {
+            "url": f"{self.base_url}/api/chat",
+            "json": {
+                "model": self.model,
+                "messages": self._messages(prompt, system_prompt),
+                "stream": stream,
+                "options": {
+                    "temperature": temperature,
+                    "num_predict": max_tokens
+                }
+            },
+            "timeout": self.timeout
+        }
+    
+    def _ollama_result(self, response: httpx.Response, start_time: float) -> Optional[Dict]:
+        if response.status_code != 200:
+            logger.warning(f"Ollama error: {response.status_code} - {response.text}")
+            return None
+        
+        result = response.json()
+        generation_time = int((time.time() - start_time) * 1000)
+        
+        logger.info(f"Generated response in {generation_time}ms using Ollama {self.model}")
+        
+        return {
+            "text": result.get("message", {}).get("content", ""),
+            "model": self.model,
+            "generation_time_ms": generation_time,
+            "success": True,
+            "prompt_tokens": result.get("prompt_eval_count"),
+            "completion_tokens": result.get("eval_count")
+        }
 
+    def _generate_with(
+        self, provider: str, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, start_time: float
+    ) -> Optional[Dict]:
+        """One provider's result dict, or None when it answered with an error"""
+        if provider == "groq":
+            response = self._http_client("groq").post(
+                **self._groq_request(prompt, system_prompt, temperature, max_tokens)
+            )
+            return self._groq_result(response, start_time)
+        if provider == "gemini":
+            response = self.gemini_client.generate_content(
+                self._gemini_prompt(prompt, system_prompt),
+                generation_config={
+                    "temperature": temperature,
+                    "max_output_tokens": max_tokens,
+                }
+            )
+            return self._gemini_result(response, start_time)
+        if provider == "local":
+            return self.local_llm.generate(prompt, system_prompt, temperature, max_tokens)
+        response = self._http_client("ollama").post(
+            **self._ollama_request(prompt, system_prompt, temperature, max_tokens)
+        )
+        return self._ollama_result(response, start_time)
+    
+    async def _agenerate_with(
+        self, provider: str, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int, start_time: float
+    ) -> Optional[Dict]:
+        """_generate_with on the async clients"""
+        if provider == "groq":
+            response = await self._async_http_client("groq").post(
+                **self._groq_request(prompt, system_prompt, temperature, max_tokens)
+            )
+            return self._groq_result(response, start_time)
+        if provider == "gemini":
+            response = await self.gemini_client.generate_content_async(
+                self._gemini_prompt(prompt, system_prompt),
+                generation_config={
+                    "temperature": temperature,
+                    "max_output_tokens": max_tokens,
+                }
+            )
+            return self._gemini_result(response, start_time)
+        if provider == "local":
+            return await self.local_llm.agenerate(prompt, system_prompt, temperature, max_tokens)
+        response = await self._async_http_client("ollama").post(
+            **self._ollama_request(prompt, system_prompt, temperature, max_tokens)
+        )
+        return self._ollama_result(response, start_time)
+    
+    def _routed_providers(self, streamed: bool = False) -> Iterator[str]:
+        """Providers to try for one call: fastest healthy first, open circuits skipped"""
+        for provider in self.router.order(self._providers(), streamed):
+            if self.router.allow(provider):
+                yield provider
+    
+    def _record_outcome(self, provider: str, result: Optional[Dict], call_start: float):
+        if result is None:
+            self.router.record_failure(provider)
+        else:
+            self.router.record_success(provider, (time.perf_counter() - call_start) * 1000)
+    
+    def _record_call(
+        self,
+        feature: Optional[str],
+        result: Dict,
+        call_start: float,
+        cache: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        time_to_first_token_ms: Optional[float] = None
+    ):
+        """Telemetry record for one generate/agenerate/astream call"""
+        if not settings.LLM_TELEMETRY_ENABLED:
+            return
+        # Hits, shared calls and the canned fallback cost no provider tokens
+        spent = cache in ("miss", "bypass") and result.get("provider", "fallback") != "fallback"
+        self.telemetry.record(
+            feature=feature,
+            provider=result.get("provider", "fallback"),
+            model=result.get("model"),
+            latency_ms=(time.perf_counter() - call_start) * 1000,
+            cache=cache,
+            success=result.get("success", False),
+            tier=result.get("tier"),
+            prompt_tokens=(result.get("prompt_tokens") or estimate_tokens((system_prompt or "") + prompt)) if spent else 0,
+            completion_tokens=(result.get("completion_tokens") or estimate_tokens(result.get("text"))) if spent else 0,
+            time_to_first_token_ms=time_to_first_token_ms,
+            streamed=time_to_first_token_ms is not None
+        )
+
+    def _request_key(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> Tuple:
+        """Identity of a completion request: configured (provider, model) chain and generation arguments"""
+        models = {"groq": self.grok_model, "gemini": self.gemini_model, "ollama": self.model, "local": settings.LLM_LOCAL_MODEL}
+        chain = tuple((provider, models[provider]) for provider in self._providers())
+        return (chain, system_prompt, prompt, temperature, max_tokens)
+    
+    def _is_cacheable(self, temperature: float) -> bool:
+        """Near-deterministic (classification) prompts may be answered from the result cache"""
+        return temperature <= settings.LLM_RESULT_CACHE_MAX_TEMPERATURE
+    
     def generate(
         self, 
         prompt: str, 
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 200
+        max_tokens: int = 200,
+        feature: Optional[str] = None
     ) -> Dict:
         """
-        Generate text using Grok (primary), Gemini (secondary), or Ollama (fallback)
-        Returns dict with 'text', 'model', 'generation_time_ms', 'success'
+        Generate text using Grok, Gemini, Ollama or the local model
+        Returns dict with 'text', 'model', 'generation_time_ms', 'success', plus 'provider'
+        and 'tier' (position of that provider in the routing order)
+        
+        Providers are tried fastest-first by recent latency (Grok, Gemini, Ollama, local until
+        measured); a provider whose circuit is open is skipped without waiting on it.
+        Identical concurrent requests share one call, and low-temperature results are
+        cached briefly. Blocks the calling thread; async code should await agenerate instead.
+        Every call is recorded in the telemetry store under `feature`.
         """
+        call_start = time.perf_counter()
+        key = self._request_key(prompt, system_prompt, temperature, max_tokens)
+        cacheable = self._is_cacheable(temperature)
+        if cacheable:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                self._record_call(feature, cached, call_start, "hit", prompt, system_prompt)
+                return cached
+        
+        led = []
+        
+        def call():
+            led.append(True)
+            result = self._generate_routed(prompt, system_prompt, temperature, max_tokens)
+            if cacheable and result.get("success"):
+                self.result_cache.put(key, result)
+            return result
+        
+        result = self.single_flight.do(key, call) if settings.LLM_COALESCE_ENABLED else call()
+        cache = ("miss" if cacheable else "bypass") if led else "coalesced"
+        self._record_call(feature, result, call_start, cache, prompt, system_prompt)
+        return result
+    
+    def _generate_routed(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> Dict:
+        """generate without coalescing or caching"""
         start_time = time.time()
         
-        # Tier 1: Try Grok API (Fastest & Most Accurate)
-        if self.grok_api_key:
+        tier = 0
+        for provider in self._routed_providers():
+            call_start = time.perf_counter()
             try:
-                messages = []
-                if system_prompt:
-                    messages.append({"role": "system", "content": system_prompt})
-                messages.append({"role": "user", "content": prompt})
-                
-                payload = {
-                    "messages": messages,
-                    "model": self.grok_model,
-                    "stream": False,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens
-                }
-                
-                headers = {
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.grok_api_key}"
-                }
-                
-                response = requests.post(
-                    f"{self.grok_base_url}/chat/completions",
-                    json=payload,
-                    headers=headers,
-                    timeout=10  # Fast timeout for Grok
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    generation_time = int((time.time() - start_time) * 1000)
-                    text = result['choices'][0]['message']['content']
-                    
-                    logger.info(f"Generated response in {generation_time}ms using Grok {self.grok_model}")
-                    
-                    return {
-                        "text": text,
-                        "model": self.grok_model,
-                        "generation_time_ms": generation_time,
-                        "success": True
-                    }
-                else:
-                    logger.warning(f"Grok API error: {response.status_code} - {response.text}")
-                    # Fall through to Gemini
-                    
+                result = self._generate_with(provider, prompt, system_prompt, temperature, max_tokens, start_time)
             except Exception as e:
-                logger.error(f"Grok API generation failed: {e}")
-                # Fall through to Gemini
-
-        # Tier 2: Try Gemini API (Reliable Fallback)
-        if self.gemini_client:
+                logger.error(f"{provider} generation failed: {e}")
+                result = None
+            self._record_outcome(provider, result, call_start)
+            if result is not None:
+                return {**result, "provider": provider, "tier": tier}
+            tier += 1  # Fall through to the next provider
+        
+        return {**self._fallback_response(), "provider": "fallback", "tier": tier}
+    
+    async def agenerate(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 200,
+        feature: Optional[str] = None
+    ) -> Dict:
+        """
+        Async generate: same routing, coalescing, caching, telemetry and result dict,
+        without blocking the event loop
+        
+        HTTP providers share pooled keep-alive connections (HTTP/2 for Groq when h2 is
+        installed), capped per provider by LLM_*_MAX_CONNECTIONS.
+        """
+        call_start = time.perf_counter()
+        key = self._request_key(prompt, system_prompt, temperature, max_tokens)
+        cacheable = self._is_cacheable(temperature)
+        if cacheable:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                self._record_call(feature, cached, call_start, "hit", prompt, system_prompt)
+                return cached
+        
+        led = []
+        
+        async def call():
+            led.append(True)
+            result = await self._agenerate_routed(prompt, system_prompt, temperature, max_tokens)
+            if cacheable and result.get("success"):
+                self.result_cache.put(key, result)
+            return result
+        
+        result = await (self.single_flight.ado(key, call) if settings.LLM_COALESCE_ENABLED else call())
+        cache = ("miss" if cacheable else "bypass") if led else "coalesced"
+        self._record_call(feature, result, call_start, cache, prompt, system_prompt)
+        return result
+    
+    async def _agenerate_routed(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> Dict:
+        """agenerate without coalescing or caching"""
+        start_time = time.time()
+        
+        tier = 0
+        for provider in self._routed_providers():
+            call_start = time.perf_counter()
             try:
-                # Combine system prompt and user prompt
-                if system_prompt:
-                    full_prompt = f"{system_prompt}\n\n{prompt}"
-                else:
-                    full_prompt = prompt
-                
-                # Generate with Gemini
-                response = self.gemini_client.generate_content(
-                    full_prompt,
-                    generation_config={
-                        "temperature": temperature,
-                        "max_output_tokens": max_tokens,
-                    }
-                )
-                
-                generation_time = int((time.time() - start_time) * 1000)
-                
-                # Check if response was blocked by safety filters
-                if not response.parts:
-                    logger.warning(f"Gemini response blocked by safety filters (finish_reason: {response.candidates[0].finish_reason})")
-                    # Return a safe fallback response instead of crashing
-                    return {
-                        "text": "I apologize, but I'm having trouble generating a response. Please rephrase your question or contact our support team.",
-                        "model": self.gemini_model,
-                        "generation_time_ms": generation_time,
-                        "success": False
-                    }
-                
-                logger.info(f"Generated response in {generation_time}ms using Gemini {self.gemini_model}")
-                
-                return {
-                    "text": response.text.strip(),
-                    "model": self.gemini_model,
-                    "generation_time_ms": generation_time,
-                    "success": True
-                }
-                
+                result = await self._agenerate_with(provider, prompt, system_prompt, temperature, max_tokens, start_time)
             except Exception as e:
-                logger.error(f"Gemini API generation failed: {e}")
-                logger.info("Falling back to Ollama...")
-                # Fall through to Ollama fallback
+                logger.error(f"{provider} generation failed: {e}")
+                result = None
+            self._record_outcome(provider, result, call_start)
+            if result is not None:
+                return {**result, "provider": provider, "tier": tier}
+            tier += 1
         
-        # Tier 3: Fallback to Ollama (Local)
-        try:
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "stream": False,
-                "options": {
-                    "temperature": temperature,
-                    "num_predict": max_tokens
-                }
-            }
+        return {**self._fallback_response(), "provider": "fallback", "tier": tier}
+    
+    @staticmethod
+    def _groq_delta(line: str) -> Optional[str]:
+        """Text of one server-sent event line of an OpenAI-compatible stream"""
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+        choices = json.loads(data).get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content")
+    
+    @staticmethod
+    def _ollama_delta(line: str) -> Optional[str]:
+        """Text of one line of Ollama's newline-delimited JSON stream"""
+        if not line.strip():
+            return None
+        return json.loads(line).get("message", {}).get("content")
+    
+    async def _astream_http(self, provider: str, request: Dict, parse_line) -> AsyncIterator[str]:
+        """Text chunks of a streamed HTTP completion"""
+        request = dict(request)
+        url = request.pop("url")
+        async with self._async_http_client(provider).stream("POST", url, **request) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise RuntimeError(f"{provider} stream error: {response.status_code} - {response.text}")
+            async for line in response.aiter_lines():
+                delta = parse_line(line)
+                if delta:
+                    yield delta
+    
+    async def _astream_gemini(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        response = await self.gemini_client.generate_content_async(
+            self._gemini_prompt(prompt, system_prompt),
+            generation_config={
+                "temperature": temperature,
+                "max_output_tokens": max_tokens,
+            },
+            stream=True
+        )
+        async for chunk in response:
+            # Chunks blocked by safety filters have no parts
+            if chunk.parts:
+                yield chunk.text
+    
+    async def _astream_local(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        # Batched generation completes all at once, so the text arrives as one chunk
+        result = await self.local_llm.agenerate(prompt, system_prompt, temperature, max_tokens)
+        if result["text"]:
+            yield result["text"]
+    
+    def _stream_tiers(
+        self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int
+    ) -> Iterator[Tuple[str, str, AsyncIterator[str]]]:
+        """(provider, model, chunk stream), fastest first by time to first token"""
+        for provider in self._routed_providers(streamed=True):
+            if provider == "groq":
+                request = self._groq_request(prompt, system_prompt, temperature, max_tokens, stream=True)
+                yield "groq", self.grok_model, self._astream_http("groq", request, self._groq_delta)
+            elif provider == "gemini":
+                yield "gemini", self.gemini_model, self._astream_gemini(prompt, system_prompt, temperature, max_tokens)
+            elif provider == "local":
+                yield "local", settings.LLM_LOCAL_MODEL, self._astream_local(prompt, system_prompt, temperature, max_tokens)
+            else:
+                request = self._ollama_request(prompt, system_prompt, temperature, max_tokens, stream=True)
+                yield "ollama", self.model, self._astream_http("ollama", request, self._ollama_delta)
+    
+    async def astream(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 200,
+        feature: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream a generation as the provider produces it
+        
+        Yields {"delta": text} for each chunk, then one final dict with generate's keys plus
+        'done' and 'time_to_first_token_ms'. A provider that fails before its first token
+        falls through to the next one; a failure after that ends the stream with the
+        partial text and success False.
+        """
+        start_time = time.time()
+        call_start = time.perf_counter()
+        
+        tier = 0
+        for provider, model, chunks in self._stream_tiers(prompt, system_prompt, temperature, max_tokens):
+            parts = []
+            first_token_ms = None
+            success = True
+            try:
+                async with aclosing(chunks) as stream:
+                    async for delta in stream:
+                        if first_token_ms is None:
+                            first_token_ms = int((time.time() - start_time) * 1000)
+                        parts.append(delta)
+                        yield {"delta": delta}
+            except Exception as e:
+                logger.error(f"{provider} streaming failed: {e}")
+                success = False
             
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=self.timeout
-            )
+            if not parts:
+                # Nothing was sent yet, so the next provider can still answer
+                self.router.record_failure(provider)
+                tier += 1
+                continue
             
-            if response.status_code == 200:
-                result = response.json()
-                generation_time = int((time.time() - start_time) * 1000)
-                
-                logger.info(f"Generated response in {generation_time}ms using Ollama {self.model}")
-                
-                return {
-                    "text": result.get("message", {}).get("content", ""),
-                    "model": self.model,
-                    "generation_time_ms": generation_time,
-                    "success": True
-                }
+            generation_time = int((time.time() - start_time) * 1000)
+            if success:
+                # Ranked by time to first token, which is what a streaming caller waits for; kept
+                # apart from completion latencies so it does not flatter the provider for generate
+                self.router.record_success(provider, first_token_ms, streamed=True)
             else:
-                return self._fallback_response()
-                
-        except Exception as e:
-            logger.error(f"Ollama generation failed: {e}")
-            return self._fallback_response()
+                self.router.record_failure(provider)
+            self._stream_latencies["first_token"].append(first_token_ms)
+            self._stream_latencies["total"].append(generation_time)
+            logger.info(f"Streamed response using {provider} {model}: first token {first_token_ms}ms, total {generation_time}ms")
+            
+            result = {
+                "done": True,
+                "text": "".join(parts),
+                "model": model,
+                "provider": provider,
+                "tier": tier,
+                "generation_time_ms": generation_time,
+                "time_to_first_token_ms": first_token_ms,
+                "success": success
+            }
+            self._record_call(feature, result, call_start, "bypass", prompt, system_prompt, first_token_ms)
+            yield result
+            return
+        
+        fallback = {**self._fallback_response(), "provider": "fallback", "tier": tier}
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        self._record_call(feature, fallback, call_start, "bypass", prompt, system_prompt, elapsed_ms)
+        yield {"delta": fallback["text"]}
+        yield {**fallback, "done": True, "time_to_first_token_ms": elapsed_ms}
+    
+    def stream_stats(self) -> Dict[str, Any]:
+        """p50/p95 time to first token and total time of recent streamed generations"""
+        stats = {}
+        for key, samples in self._stream_latencies.items():
+            values = sorted(samples)
+            stats[key] = {
+                "streams": len(values),
+                "p50_ms": values[int(0.50 * (len(values) - 1))] if values else None,
+                "p95_ms": values[int(0.95 * (len(values) - 1))] if values else None
+            }
+        return stats
     
     def _fallback_response(self):
         """Return a helpful fallback response"""
@@ -278,23 +829,6 @@ class LLMService:
             "error": "LLM unavailable"
         }
     
-    def check_health(self) -> bool:
-        """Check if LLM service is available"""
-        # Check Gemini API first
-        if self.gemini_client is not None:
-            return True
-        
-        # Check Hugging Face model
-        if self.hf_model is not None:
-            return True
-        
-        # Fallback to Ollama check
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
-    
     def _rule_based_priority_fallback(self, message: str, category: str) -> str:
         """
         Rule-based priority classification fallback
@@ -339,7 +873,7 @@ class LLMService:
         subject: str = "",
         category: str = "General",
         customer_data: Optional[Dict] = None
-    ) -> Dict[str, any]:
+    ) -> Dict[str, Any]:
         """
         Classify ticket priority using Gemini API with comprehensive edge case handling
         
@@ -444,7 +978,8 @@ Respond with ONLY a JSON object:
                     prompt=prompt,
                     system_prompt="You are a helpful e-commerce support priority classifier.",
                     temperature=0.2,  # Low for consistent classification
-                    max_tokens=150
+                    max_tokens=150,
+                    feature="priority"
                 )
                 
                 if result['success']:
@@ -526,9 +1061,9 @@ Respond with ONLY a JSON object:
             "method": "rule_based"
         }
 
-    def generate_response(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+    def generate_response(self, prompt: str, system_prompt: Optional[str] = None, feature: Optional[str] = None) -> str:
         """Simple wrapper for generate method that returns just the text"""
-        result = self.generate(prompt, system_prompt)
+        result = self.generate(prompt, system_prompt, feature=feature)
         return result.get('text', '')
 
 llm_service = LLMService()
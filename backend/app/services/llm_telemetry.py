@@ -0,0 +1,272 @@
+"""
+LLM Telemetry
+Per-call records of every LLM request (feature, provider, tokens, latency, cache and
+fallback outcome), buffered in memory and written to SQLite in batches
+
+Recording is a deque append, so the request path never waits on the database; a
+background thread flushes the ring buffer every few seconds or once a batch is full.
+If the database falls behind, the oldest unflushed records are dropped and counted.
+The llm_call_logs table comes from the migrations (alembic upgrade head); without it
+the writer is not started and records stay in the buffer only.
+"""
+from typing import Any, Dict, List, Optional
+from collections import deque
+from datetime import datetime, timedelta
+import logging
+import threading
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.ai_copilot import LLMCallLog
+
+logger = logging.getLogger(__name__)
+
+TIME_RANGES = {"1h": timedelta(hours=1), "24h": timedelta(hours=24), "7d": timedelta(days=7), "30d": timedelta(days=30)}
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count (~4 characters per token) for providers that do not report usage"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return None
+    return values[int(q * (len(values) - 1))]
+
+
+class LLMTelemetry:
+    """Ring buffer of call records with a batching SQLite writer"""
+
+    def __init__(
+        self,
+        buffer_size: int = 10000,
+        flush_interval_seconds: float = 5.0,
+        flush_batch_size: int = 200,
+        session_factory=SessionLocal
+    ):
+        """
+        Args:
+            buffer_size: Unflushed records kept in memory; older ones are dropped beyond this
+            flush_interval_seconds: Longest a record waits before it is written
+            flush_batch_size: Buffered records that trigger an early flush
+            session_factory: Creates the sessions used for writing
+        """
+        self.buffer_size = buffer_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_batch_size = flush_batch_size
+        self.session_factory = session_factory
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.writable = True
+
+    def record(
+        self,
+        feature: Optional[str],
+        provider: str,
+        model: Optional[str],
+        latency_ms: float,
+        cache: str,
+        success: bool,
+        tier: Optional[int] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        time_to_first_token_ms: Optional[float] = None,
+        streamed: bool = False
+    ):
+        """
+        Buffer one call record
+
+        Args:
+            feature: Calling feature (summary, priority, intent, ...); None is stored as "other"
+            provider: Provider that answered, or "fallback" for the canned response
+            model: Model name reported by the provider
+            latency_ms: Wall time of the call as seen by the caller
+            cache: "hit", "miss", "coalesced" (shared another caller's call) or "bypass" (not cacheable)
+            success: Whether a provider produced the text
+            tier: Position of the answering provider in the routing order (0 = first choice)
+        """
+        row = {
+            "created_at": datetime.utcnow(),
+            "feature": feature or "other",
+            "provider": provider,
+            "model": model,
+            "tier": tier,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": int(latency_ms),
+            "time_to_first_token_ms": int(time_to_first_token_ms) if time_to_first_token_ms is not None else None,
+            "cache": cache,
+            "streamed": streamed,
+            "success": bool(success)
+        }
+        with self._lock:
+            if len(self._buffer) == self.buffer_size:
+                self.dropped += 1
+            self._buffer.append(row)
+            self.recorded += 1
+            full = len(self._buffer) >= self.flush_batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Write buffered records now
+
+        Returns:
+            Number of records written; on a database error they go back into the buffer
+        """
+        if not self.writable:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._buffer)
+                self._buffer.clear()
+            if not rows:
+                return 0
+
+            db = None
+            try:
+                db = self.session_factory()
+                db.bulk_insert_mappings(LLMCallLog, rows)
+                db.commit()
+            except Exception as e:
+                if db is not None:
+                    db.rollback()
+                self.failed_flushes += 1
+                logger.error(f"Failed to write {len(rows)} LLM telemetry records: {e}")
+                with self._lock:
+                    # Records buffered meanwhile are newer and win if there is no room for both
+                    room = self.buffer_size - len(self._buffer)
+                    kept = rows[len(rows) - room:] if room < len(rows) else rows
+                    self.dropped += len(rows) - len(kept)
+                    self._buffer.extendleft(reversed(kept))
+                return 0
+            finally:
+                if db is not None:
+                    db.close()
+
+            self.flushed += len(rows)
+            return len(rows)
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"LLM telemetry flush failed: {e}")
+        self.flush()
+
+    def _table_exists(self) -> bool:
+        db = self.session_factory()
+        try:
+            return inspect(db.get_bind()).has_table(LLMCallLog.__tablename__)
+        finally:
+            db.close()
+
+    def start(self):
+        """Flush in a daemon thread until stop(), if the llm_call_logs table exists"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.writable = self._table_exists()
+        if not self.writable:
+            logger.warning(
+                f"{LLMCallLog.__tablename__} table not found (run `alembic upgrade head`); "
+                "LLM telemetry is kept in memory only"
+            )
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._flush_loop, name="llm-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer after a final flush"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "buffered": len(self._buffer),
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+            "writable": self.writable
+        }
+
+    def latency_report(self, db: Session, since: datetime) -> Dict[str, Any]:
+        """
+        Latency percentiles and outcome rates per feature and per provider
+
+        Buffered records are flushed first, so the report includes the latest calls.
+
+        Args:
+            db: Database session
+            since: Only calls made at or after this time are included
+
+        Returns:
+            Dict with 'calls', 'by_feature' and 'by_provider'
+        """
+        self.flush()
+        rows = db.query(
+            LLMCallLog.feature, LLMCallLog.provider, LLMCallLog.latency_ms, LLMCallLog.time_to_first_token_ms,
+            LLMCallLog.prompt_tokens, LLMCallLog.completion_tokens, LLMCallLog.cache, LLMCallLog.tier,
+            LLMCallLog.success
+        ).filter(LLMCallLog.created_at >= since).all()
+
+        return {
+            "calls": len(rows),
+            "by_feature": self._summarize(rows, lambda row: row.feature),
+            "by_provider": self._summarize(rows, lambda row: row.provider)
+        }
+
+    @staticmethod
+    def _summarize(rows, key) -> Dict[str, Dict]:
+        groups: Dict[str, List] = {}
+        for row in rows:
+            groups.setdefault(key(row), []).append(row)
+
+        summary = {}
+        for name, group in sorted(groups.items()):
+            latencies = sorted(row.latency_ms for row in group)
+            first_tokens = sorted(row.time_to_first_token_ms for row in group if row.time_to_first_token_ms is not None)
+            calls = len(group)
+            summary[name] = {
+                "calls": calls,
+                "p50_ms": percentile(latencies, 0.50),
+                "p95_ms": percentile(latencies, 0.95),
+                "p99_ms": percentile(latencies, 0.99),
+                "time_to_first_token_p50_ms": percentile(first_tokens, 0.50),
+                "total_latency_ms": sum(latencies),
+                "avg_prompt_tokens": round(sum(row.prompt_tokens or 0 for row in group) / calls, 1),
+                "avg_completion_tokens": round(sum(row.completion_tokens or 0 for row in group) / calls, 1),
+                "cache_hit_rate": round(sum(row.cache in ("hit", "coalesced") for row in group) / calls, 4),
+                "fallback_rate": round(sum((row.tier or 0) > 0 or row.provider == "fallback" for row in group) / calls, 4),
+                "error_rate": round(sum(not row.success for row in group) / calls, 4)
+            }
+        return summary
+
+
+# Global instance
+llm_telemetry = LLMTelemetry(
+    buffer_size=settings.LLM_TELEMETRY_BUFFER_SIZE,
+    flush_interval_seconds=settings.LLM_TELEMETRY_FLUSH_INTERVAL_SECONDS,
+    flush_batch_size=settings.LLM_TELEMETRY_FLUSH_BATCH_SIZE
+)
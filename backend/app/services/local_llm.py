@@ -0,0 +1,262 @@
+"""
+Local LLM
+In-process Hugging Face model served by a worker thread that batches concurrent requests
+
+The model is loaded once; requests queue up and the worker runs one generate() per
+micro-batch (grouped by temperature), so concurrent callers share a forward pass
+instead of serialising on it. On CPU, Linear layers can be int8 dynamically quantised.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import Future
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Temperatures at or below this are decoded greedily
+GREEDY_TEMPERATURE = 1e-3
+
+
+class _Request:
+    def __init__(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int):
+        self.prompt = prompt
+        self.system_prompt = system_prompt
+        self.temperature = temperature
+        self.max_tokens = max(1, max_tokens)
+        self.future: Future = Future()
+
+
+def load_local_model(model_name: str, quantize: bool = True, threads: Optional[int] = None):
+    """
+    Load a seq2seq or causal model and its tokenizer for CPU inference
+
+    Args:
+        model_name: Hugging Face model id or local path
+        quantize: Apply int8 dynamic quantisation to Linear layers
+        threads: torch intra-op threads (None keeps torch's default)
+
+    Returns:
+        Tuple of (model, tokenizer)
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    config = AutoConfig.from_pretrained(model_name)
+    model_class = AutoModelForSeq2SeqLM if config.is_encoder_decoder else AutoModelForCausalLM
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = model_class.from_pretrained(model_name)
+    if quantize:
+        model = quantize_model(model)
+    return model, tokenizer
+
+
+def quantize_model(model):
+    """int8 dynamic quantisation of a model's Linear layers (weights int8, activations quantised per batch)"""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class LocalLLM:
+    """
+    Batched generation with a loaded model
+
+    Requests wait at most `max_wait_ms` for others to join their batch; a batch is
+    dispatched early once `max_batch_size` requests are queued.
+    """
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        model_name: str = "local",
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_input_tokens: int = 1024
+    ):
+        """
+        Start the generation worker
+
+        Args:
+            model: Hugging Face seq2seq or causal LM (see load_local_model)
+            tokenizer: The model's tokenizer
+            model_name: Name reported in results
+            max_batch_size: Largest batch passed to one generate() call
+            max_wait_ms: How long the first request waits for others to join its batch
+            max_input_tokens: Prompts are truncated (from the left for causal models) to this length
+        """
+        self.model = model.eval()
+        self.tokenizer = tokenizer
+        self.model_name = model_name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_input_tokens = max_input_tokens
+        self.is_encoder_decoder = bool(getattr(model.config, "is_encoder_decoder", False))
+
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        if not self.is_encoder_decoder:
+            # Decoder-only models continue from the end of the prompt, so pad on the left
+            self.tokenizer.padding_side = "left"
+            self.tokenizer.truncation_side = "left"
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+        self._thread = threading.Thread(target=self._run, name="local-llm", daemon=True)
+        self._thread.start()
+
+    def is_alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def submit(
+        self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 200
+    ) -> Future:
+        """Queue a generation; the returned future resolves to its text"""
+        request = _Request(prompt, system_prompt, temperature, max_tokens)
+        self._queue.put(request)
+        return request.future
+
+    def generate(
+        self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 200
+    ) -> Dict:
+        """Blocking generation; returns LLMService.generate's result dict"""
+        start_time = time.time()
+        text = self.submit(prompt, system_prompt, temperature, max_tokens).result()
+        return self._result(text, start_time)
+
+    async def agenerate(
+        self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 200
+    ) -> Dict:
+        """generate without blocking the event loop"""
+        start_time = time.time()
+        text = await asyncio.wrap_future(self.submit(prompt, system_prompt, temperature, max_tokens))
+        return self._result(text, start_time)
+
+    def _result(self, text: str, start_time: float) -> Dict:
+        return {
+            "text": text.strip(),
+            "model": self.model_name,
+            "generation_time_ms": int((time.time() - start_time) * 1000),
+            "success": True
+        }
+
+    def stop(self):
+        """Finish queued work and stop the worker"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout=30)
+
+    def _collect(self, first) -> Tuple[List[_Request], bool]:
+        """Gather up to max_batch_size requests, waiting at most max_wait after the first"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+
+            # Drop requests whose callers gave up
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            # One generate() call takes a single temperature
+            groups: Dict[float, List[_Request]] = {}
+            for request in batch:
+                key = 0.0 if request.temperature <= GREEDY_TEMPERATURE else round(request.temperature, 2)
+                groups.setdefault(key, []).append(request)
+
+            for temperature, group in groups.items():
+                try:
+                    texts = self._generate_batch(group, temperature)
+                except Exception as e:
+                    logger.error(f"Local generation failed: {e}")
+                    for request in group:
+                        request.future.set_exception(e)
+                    continue
+                for request, text in zip(group, texts):
+                    request.future.set_result(text)
+
+    def _format(self, request: _Request) -> str:
+        if not self.is_encoder_decoder and getattr(self.tokenizer, "chat_template", None):
+            messages = []
+            if request.system_prompt:
+                messages.append({"role": "system", "content": request.system_prompt})
+            messages.append({"role": "user", "content": request.prompt})
+            return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        if request.system_prompt:
+            return f"{request.system_prompt}\n\n{request.prompt}"
+        return request.prompt
+
+    def _generate_batch(self, group: List[_Request], temperature: float) -> List[str]:
+        """Texts for requests sharing a temperature; each is cut to its own max_tokens"""
+        import torch
+
+        inputs = self.tokenizer(
+            [self._format(request) for request in group],
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.max_input_tokens
+        )
+        inputs.pop("token_type_ids", None)
+
+        sampling = {"do_sample": True, "temperature": temperature, "top_p": 0.95} if temperature else {"do_sample": False}
+        with torch.inference_mode():
+            output = self.model.generate(
+                **inputs,
+                max_new_tokens=max(request.max_tokens for request in group),
+                pad_token_id=self.tokenizer.pad_token_id,
+                **sampling
+            )
+
+        if self.is_encoder_decoder:
+            # Drop the decoder start token
+            output = output[:, 1:]
+        else:
+            # Causal models return prompt + continuation
+            output = output[:, inputs["input_ids"].shape[1]:]
+        return [
+            self.tokenizer.decode(tokens[:request.max_tokens], skip_special_tokens=True)
+            for request, tokens in zip(group, output)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters"""
+        return {
+            "model": self.model_name,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": self._queue.qsize()
+        }
@@ -0,0 +1,197 @@
+"""
+Prompt Builder
+Token-budgeted knowledge base context for RAG answer prompts
+
+Documents are split into passages at index time (chunk_document), so retrieval returns
+passages instead of whole policy files. At answer time build_context keeps the best-ranked
+passages that fit the context budget, skipping passages that are mostly covered by ones
+already chosen (chunk overlap, repeated FAQ rows), and reports how the budget was spent.
+
+Token counts are estimates (~4 characters per token), the same as LLM telemetry's.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+import re
+
+from app.services.llm_telemetry import estimate_tokens
+
+CHARS_PER_TOKEN = 4
+
+# A passage is only truncated into the remaining budget if at least this much of it fits
+MIN_TRUNCATED_TOKENS = 40
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\w+")
+
+
+def _split_words(text: str, max_chars: int) -> List[str]:
+    parts, current = [], ""
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            parts.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _pieces(text: str, max_chars: int) -> List[str]:
+    """Paragraphs, with paragraphs longer than max_chars split into sentences, then words"""
+    pieces = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            if len(sentence) <= max_chars:
+                pieces.append(sentence)
+            else:
+                pieces.extend(_split_words(sentence, max_chars))
+    return pieces
+
+
+def _tail(text: str, max_chars: int) -> str:
+    """Trailing whole words of text, at most max_chars long"""
+    words = []
+    size = 0
+    for word in reversed(text.split()):
+        if size + len(word) + 1 > max_chars:
+            break
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(reversed(words))
+
+
+def chunk_document(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """
+    Split a document into passages of at most ~max_tokens
+
+    Passages follow paragraph boundaries where possible; each one after the first starts
+    with the last ~overlap_tokens of its predecessor so a fact spanning a boundary is
+    retrievable from either side.
+
+    Args:
+        text: Document text
+        max_tokens: Target passage size
+        overlap_tokens: Words carried over from the previous passage
+
+    Returns:
+        List of passages (a short document is a single passage)
+    """
+    text = text.strip()
+    max_chars = max(1, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    overlap_chars = min(overlap_tokens * CHARS_PER_TOKEN, max_chars // 2)
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in _pieces(text, max_chars):
+        if current and size + 2 + len(piece) > max_chars:
+            chunks.append("\n\n".join(current))
+            overlap = _tail(chunks[-1], overlap_chars) if overlap_chars else ""
+            current = [overlap] if overlap and len(overlap) + 2 + len(piece) <= max_chars else []
+            size = len(current[0]) if current else 0
+        current.append(piece)
+        size += len(piece) + (2 if len(current) > 1 else 0)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    cut = text[:max_tokens * CHARS_PER_TOKEN]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip() + " ..."
+
+
+def build_context(
+    docs: List[Dict[str, Any]],
+    budget_tokens: int,
+    dedup_threshold: float = 0.8
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Pick passages for the prompt within a token budget
+
+    Args:
+        docs: Retrieved passages, best first (retrieve_relevant_docs order)
+        budget_tokens: Tokens available for passage text
+        dedup_threshold: Share of a passage's word trigrams already in chosen passages
+            at which it is dropped as a duplicate
+
+    Returns:
+        Tuple of (chosen passages, each a copy whose 'content' may be truncated,
+        and a usage dict)
+    """
+    selected = []
+    seen: Set[Tuple[str, ...]] = set()
+    used = duplicates = over_budget = truncated = 0
+
+    for doc in docs:
+        content = doc["content"].strip()
+        shingles = _shingles(content)
+        if shingles and len(shingles & seen) / len(shingles) >= dedup_threshold:
+            duplicates += 1
+            continue
+
+        tokens = estimate_tokens(content)
+        remaining = budget_tokens - used
+        if tokens > remaining:
+            if remaining < MIN_TRUNCATED_TOKENS:
+                over_budget += 1
+                continue
+            content = _truncate(content, remaining)
+            tokens = estimate_tokens(content)
+            truncated += 1
+
+        selected.append({**doc, "content": content})
+        seen |= shingles
+        used += tokens
+
+    return selected, {
+        "budget_tokens": budget_tokens,
+        "context_tokens": used,
+        "passages_retrieved": len(docs),
+        "passages_used": len(selected),
+        "duplicates_dropped": duplicates,
+        "over_budget_dropped": over_budget,
+        "truncated": truncated
+    }
+
+
+def trim_history(
+    messages: Optional[List[Dict[str, str]]],
+    budget_tokens: int,
+    max_messages: int = 5
+) -> Tuple[List[str], int]:
+    """
+    Newest conversation turns that fit the history budget, oldest first
+
+    Returns:
+        Tuple of ("Role: content" lines, their estimated tokens)
+    """
+    lines: List[str] = []
+    used = 0
+    for msg in reversed((messages or [])[-max_messages:]):
+        line = f"{msg.get('role', 'user').capitalize()}: {msg.get('content', '')}"
+        tokens = estimate_tokens(line)
+        if used + tokens > budget_tokens:
+            break
+        lines.append(line)
+        used += tokens
+    lines.reverse()
+    return lines, used
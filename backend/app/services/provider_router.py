@@ -0,0 +1,186 @@
+"""
+Provider Router
+Per-provider circuit breakers and latency-aware ordering for LLM calls
+
+A provider that keeps failing is skipped outright (open breaker) instead of costing
+every request its timeout; after a cool-down one trial request decides whether it is
+back (half-open). Healthy providers are tried fastest first by rolling p50 latency.
+Streamed calls are ranked separately, by time to first token, since that is a
+different (and much smaller) number than a full completion's latency.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from collections import deque
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed → open after consecutive failures → half-open after a cool-down → closed on success"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout_seconds: float = 30.0):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout_seconds: Time an open breaker waits before allowing a trial request
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the provider now; claims the trial slot when half-open"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_timeout_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self.trial_started_at = now
+                return True
+            # Half-open: one trial at a time; a trial that never reported back is abandoned after the cool-down
+            if now - self.trial_started_at >= self.reset_timeout_seconds:
+                self.trial_started_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.trial_started_at = None
+
+
+class ProviderRouter:
+    """Breaker and latency window per provider"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout_seconds: float = 30.0,
+        window: int = 100,
+        min_samples: int = 5,
+        adaptive: bool = True
+    ):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open a provider's breaker
+            reset_timeout_seconds: Cool-down before an open provider gets a trial request
+            window: Number of recent successful call latencies kept per provider (and per kind of call)
+            min_samples: Latencies needed before a provider is ranked by speed
+            adaptive: Order providers by latency; when False keep the configured order
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.window = window
+        self.min_samples = min_samples
+        self.adaptive = adaptive
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, deque] = {}  # full completion latency
+        self._stream_latencies: Dict[str, deque] = {}  # time to first token of streamed calls
+        self._lock = threading.Lock()
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(self.failure_threshold, self.reset_timeout_seconds)
+                self._latencies[provider] = deque(maxlen=self.window)
+                self._stream_latencies[provider] = deque(maxlen=self.window)
+            return self._breakers[provider]
+
+    def _samples(self, streamed: bool) -> Dict[str, deque]:
+        return self._stream_latencies if streamed else self._latencies
+
+    def _percentile(self, provider: str, q: float, streamed: bool = False) -> Optional[float]:
+        values = sorted(self._samples(streamed).get(provider, ()))
+        if not values:
+            return None
+        return values[int(q * (len(values) - 1))]
+
+    def order(self, providers: Sequence[str], streamed: bool = False) -> List[str]:
+        """
+        Configured providers in the order to try them
+
+        Streamed calls are ranked by time to first token, other calls by completion latency.
+
+        Providers with enough samples are reordered among their own slots, fastest p50
+        (then p95) first; the rest keep their configured slot, so a provider without
+        data (e.g. the primary after an outage) still gets traffic before its fallbacks.
+        Breakers are not consulted here, see allow().
+        """
+        ordered = list(providers)
+        if not self.adaptive:
+            return ordered
+
+        samples = self._samples(streamed)
+        slots = [i for i, provider in enumerate(ordered) if len(samples.get(provider, ())) >= self.min_samples]
+        ranked = sorted(
+            (ordered[i] for i in slots),
+            key=lambda provider: (self._percentile(provider, 0.50, streamed), self._percentile(provider, 0.95, streamed))
+        )
+        for slot, provider in zip(slots, ranked):
+            ordered[slot] = provider
+        return ordered
+
+    def allow(self, provider: str) -> bool:
+        """Whether the provider's breaker lets a call through now"""
+        allowed = self._breaker(provider).allow_request()
+        if not allowed:
+            logger.debug(f"Skipping {provider}: circuit open")
+        return allowed
+
+    def record_success(self, provider: str, latency_ms: float, streamed: bool = False):
+        """latency_ms is the completion latency, or the time to first token when streamed"""
+        breaker = self._breaker(provider)
+        if breaker.state != CLOSED:
+            logger.info(f"Circuit for {provider} closed after a successful call")
+        breaker.record_success()
+        self._samples(streamed)[provider].append(latency_ms)
+
+    def record_failure(self, provider: str):
+        breaker = self._breaker(provider)
+        was_open = breaker.state == OPEN
+        breaker.record_failure()
+        if breaker.state == OPEN and not was_open:
+            logger.warning(f"Circuit for {provider} opened after {breaker.consecutive_failures} consecutive failure(s)")
+
+    def stats(self, providers: Sequence[str]) -> Dict[str, Any]:
+        """Breaker state and latency percentiles per provider, and the current routing order"""
+        result = {"adaptive": self.adaptive, "order": self.order(providers), "providers": {}}
+        for provider in providers:
+            breaker = self._breaker(provider)
+            result["providers"][provider] = {
+                "state": breaker.state,
+                "consecutive_failures": breaker.consecutive_failures,
+                "times_opened": breaker.times_opened,
+                "samples": len(self._latencies[provider]),
+                "p50_ms": self._percentile(provider, 0.50),
+                "p95_ms": self._percentile(provider, 0.95),
+                "stream_samples": len(self._stream_latencies[provider]),
+                "stream_first_token_p50_ms": self._percentile(provider, 0.50, streamed=True),
+                "stream_first_token_p95_ms": self._percentile(provider, 0.95, streamed=True)
+            }
+        return result
@@ -2,26 +2,67 @@
 RAG (Retrieval-Augmented Generation) Service
 Handles knowledge base retrieval and response generation using FAISS
 """
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple, Any
 import faiss
 import numpy as np
 import pickle
+import hashlib
+import json
+import time
+import asyncio
 import logging
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 from app.services.embedding_service import get_embedding_service
 from app.services.llm_service import llm_service
 from app.services.knowledge_loader import knowledge_loader
+from app.services.vector_index import (
+    build_index, apply_configured_search_params, index_mode_of,
+    select_index_mode, supports_removal, get_search_params,
+    read_index, write_index, filtered_search
+)
+from app.services.document_store import DocumentStore
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.intent_classifier import RuleIntentClassifier
+from app.services.prompt_builder import build_context, chunk_document, trim_history
+from app.services.llm_telemetry import estimate_tokens
+from app.core.config import settings
 from app.database import SessionLocal
 from app.models.chat import KnowledgeBase
 
+try:
+    import fcntl
+except ImportError:  # Windows: re-indexing is then only serialised within one process
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# Held while re-indexing, so workers sharing an index directory take turns
+INDEX_LOCK_FILE = "index.lock"
+
 
 class RAGService:
     """Service for RAG-based question answering using FAISS"""
     
+    OUT_OF_SCOPE_RESPONSE = "I apologize, but I can only assist with Intellica e-commerce support questions (orders, returns, refunds, shipping, products). For other inquiries, please contact our general support team."
+    # If no relevant documents found, offer human agent
+    NO_DOCUMENTS_RESPONSE = "I don't have information about that in my knowledge base. Would you like me to connect you with a human agent who can better assist you?"
+    LLM_UNAVAILABLE_RESPONSE = "I apologize, but I'm currently unable to process your request. Please try again later or contact support."
+    UNKNOWN_ANALYSIS = {
+        "success": False,
+        "intent": "unknown",
+        "intent_confidence": 0.0,
+        "sentiment": "neutral",
+        "sentiment_score": 0.5,
+        "entities": {}
+    }
+    
     def __init__(self, index_path: str = "faiss_index"):
         """
         Initialize RAG service with FAISS
@@ -34,8 +75,32 @@ class RAGService:
         self.embedding_service = get_embedding_service()
         self.llm_service = llm_service
         self.index: Optional[faiss.Index] = None
-        self.documents: List[Dict] = []
-        self.metadatas: List[Dict] = []
+        # Memory-mapped indexes are shared across workers but must not be mutated
+        self.index_mmapped = False
+        # Manifest generation the loaded index belongs to; another worker's re-index changes it
+        self._loaded_generation: Optional[str] = None
+        self._sync_lock = threading.Lock()
+        # Document text and metadata keyed by FAISS id, memory-mapped and shared across workers
+        self.doc_store = DocumentStore(self.index_path)
+        # BM25 postings over the same ids, rebuilt whenever the document store changes
+        self.lexical_index = BM25Index(k1=settings.RAG_BM25_K1, b=settings.RAG_BM25_B)
+        # ("category" | "subcategory", value) -> ids, for pre-filtered search
+        self._filter_ids: Dict[Tuple[str, str], np.ndarray] = {}
+        # Recent per-arm retrieval latencies (ms)
+        self._latencies = {arm: deque(maxlen=1000) for arm in ("vector", "bm25", "fusion")}
+        # Recent answer prompts' budget usage (see prompt_builder.build_context)
+        self._prompt_usage = deque(maxlen=1000)
+        # Answers to non-personalised questions, reused for near-duplicates until the KB changes
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        self._answer_cache_version: Optional[int] = None  # index version the cached answers belong to
+        if settings.RAG_ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=settings.RAG_ANSWER_CACHE_THRESHOLD,
+                ttl_seconds=settings.RAG_ANSWER_CACHE_TTL_SECONDS,
+                max_entries=settings.RAG_ANSWER_CACHE_MAX_ENTRIES
+            )
+        # Local first pass for scope and intent/sentiment classification
+        self.intent_classifier = RuleIntentClassifier()
         self._initialize_vector_db()
     
     def _initialize_vector_db(self):
@@ -45,20 +110,26 @@ class RAGService:
             
             # Try to load existing index
             index_file = self.index_path / "faiss.index"
-            metadata_file = self.index_path / "metadata.pkl"
-            documents_file = self.index_path / "documents.pkl"
+            # Read before the files it describes: a re-index landing in between then
+            # only causes an extra reload before this worker's next sync
+            generation = self._stored_generation()
             
-            if index_file.exists() and metadata_file.exists() and documents_file.exists():
+            if index_file.exists() and (self.doc_store.open() or self._migrate_pickle_store()):
                 logger.info("Loading existing FAISS index")
-                self.index = faiss.read_index(str(index_file))
+                self._loaded_generation = generation
+                self.index, self.index_mmapped = read_index(index_file)
+                apply_configured_search_params(self.index)
+                self._build_retrieval_indexes()
                 
-                with open(metadata_file, 'rb') as f:
-                    self.metadatas = pickle.load(f)
-                
-                with open(documents_file, 'rb') as f:
-                    self.documents = pickle.load(f)
-                
-                logger.info(f"FAISS index loaded with {self.index.ntotal} vectors")
+                logger.info(
+                    f"FAISS {index_mode_of(self.index)} index loaded with {self.index.ntotal} vectors"
+                    f"{' (memory-mapped)' if self.index_mmapped else ''}"
+                )
+                if not (self.index_path / "manifest.pkl").exists():
+                    logger.warning(
+                        "FAISS index has no manifest: it predates passage chunking and is served "
+                        "unchunked until the knowledge base is re-indexed"
+                    )
             else:
                 logger.info("No existing FAISS index found, will create on first indexing")
                 self.index = None
@@ -67,13 +138,49 @@ class RAGService:
             logger.error(f"Failed to initialize FAISS: {e}")
             self.index = None
     
-    def index_knowledge_base(self, use_file_kb: bool = True) -> Dict[str, any]:
+    def _migrate_pickle_store(self) -> bool:
         """
-        Index all knowledge base articles into FAISS vector store
+        Convert metadata.pkl/documents.pkl from older indexes into the document store
+        
+        Returns:
+            True if a legacy store was found and converted
+        """
+        metadata_file = self.index_path / "metadata.pkl"
+        documents_file = self.index_path / "documents.pkl"
+        if not (metadata_file.exists() and documents_file.exists()):
+            return False
+        
+        logger.info("Converting pickled FAISS metadata to the memory-mapped document store")
+        with open(metadata_file, 'rb') as f:
+            metadatas = pickle.load(f)
+        with open(documents_file, 'rb') as f:
+            documents = pickle.load(f)
+        
+        # Those indexes stored plain lists (id == position) with the text duplicated in metadata
+        if isinstance(metadatas, list):
+            metadatas = dict(enumerate(metadatas))
+        if isinstance(documents, list):
+            documents = dict(enumerate(documents))
+        
+        self.doc_store = DocumentStore.write(self.index_path, (
+            (doc_id, documents.get(doc_id, metadata.get('content', '')),
+             {k: v for k, v in metadata.items() if k != 'content'})
+            for doc_id, metadata in metadatas.items()
+        ))
+        return True
+    
+    def index_knowledge_base(self, use_file_kb: bool = True, full_rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Index knowledge base articles into FAISS vector store
+        
+        Indexing is incremental: every document carries a content hash, and only
+        added or changed documents are re-embedded. Deleted documents are removed
+        from the ID-mapped index by id.
         
         Args:
             use_file_kb: If True, use file-based knowledge loader (default)
                         If False, use database KnowledgeBase table
+            full_rebuild: Re-embed every document and rebuild the index from scratch
         
         Returns:
             Dictionary with indexing results
@@ -83,75 +190,41 @@ class RAGService:
         
         try:
             if use_file_kb:
-                # Use file-based knowledge loader
-                documents = knowledge_loader.documents
-                if not documents:
-                    # Try to load if not already loaded
-                    documents = knowledge_loader.load_all_documents()
+                # Always reload so edited files are picked up
+                documents = knowledge_loader.load_all_documents()
                 
                 if not documents:
                     return {"success": True, "indexed": 0, "message": "No documents to index"}
                 
-                # Prepare texts and metadata
-                texts = []
-                metadatas = []
-                
-                for i, doc in enumerate(documents):
-                    # Use full content for embedding
-                    text = f"{doc['title']}\n\n{doc['content']}"
-                    texts.append(text)
+                entries = {}
+                for doc in documents:
+                    key = f"{doc['subcategory']}/{doc['file_name']}"
+                    if doc['file_name'].endswith('.csv'):
+                        # Each FAQ row is its own document
+                        key = f"{key}#{doc['title']}"
+                    key = self._unique_key(key, entries)
                     
-                    metadatas.append({
-                        "doc_id": str(i),
+                    self._add_chunks(entries, key, doc['title'], doc['content'], {
+                        "doc_key": key,
                         "title": doc['title'],
                         "category": doc['category'],
                         "subcategory": doc['subcategory'],
                         "file_name": doc['file_name'],
                         "tags": ','.join(doc['tags']) if doc['tags'] else "",
-                        "keywords": ','.join(doc['keywords']) if doc['keywords'] else "",
-                        "content": text
+                        "keywords": ','.join(doc['keywords']) if doc['keywords'] else ""
                     })
                 
-                # Generate embeddings in batches
-                logger.info(f"Generating embeddings for {len(texts)} documents...")
-                embeddings = self.embedding_service.encode(texts)
-                if embeddings is None:
-                    return {"success": False, "error": "Failed to generate embeddings"}
-                
-                # Create FAISS index
-                dimension = embeddings.shape[1]
-                logger.info(f"Creating FAISS index with dimension {dimension}")
-                
-                # Use IndexFlatL2 for exact search (can be changed to IndexIVFFlat for larger datasets)
-                self.index = faiss.IndexFlatL2(dimension)
-                
-                # Add vectors to index
-                self.index.add(embeddings.astype('float32'))
-                
-                # Store documents and metadata
-                self.documents = texts
-                self.metadatas = metadatas
-                
-                # Save index to disk
-                index_file = self.index_path / "faiss.index"
-                metadata_file = self.index_path / "metadata.pkl"
-                documents_file = self.index_path / "documents.pkl"
-                
-                faiss.write_index(self.index, str(index_file))
-                
-                with open(metadata_file, 'wb') as f:
-                    pickle.dump(self.metadatas, f)
-                
-                with open(documents_file, 'wb') as f:
-                    pickle.dump(self.documents, f)
+                report = self._sync_index(entries, source="file", full_rebuild=full_rebuild)
+                if not report["success"]:
+                    return report
                 
                 logger.info(f"Indexed {len(documents)} knowledge base documents into FAISS")
                 return {
-                    "success": True,
+                    **report,
                     "indexed": len(documents),
+                    "chunks": len(entries),
                     "message": f"Successfully indexed {len(documents)} documents into FAISS",
-                    "categories": list(set(doc['category'] for doc in documents)),
-                    "dimension": dimension
+                    "categories": list(set(doc['category'] for doc in documents))
                 }
             
             else:
@@ -165,51 +238,28 @@ class RAGService:
                     if not articles:
                         return {"success": True, "indexed": 0, "message": "No articles to index"}
                     
-                    texts = []
-                    metadatas = []
-                    
+                    entries = {}
                     for article in articles:
-                        text = f"{article.title}\n\n{article.content}"
-                        texts.append(text)
+                        key = f"article:{article.id}"
                         
-                        metadatas.append({
+                        self._add_chunks(entries, key, article.title, article.content, {
+                            "doc_key": key,
                             "article_id": str(article.id),
                             "title": article.title,
                             "category": article.category or "general",
                             "tags": article.tags or "",
-                            "created_at": article.created_at.isoformat() if article.created_at else "",
-                            "content": text
+                            "created_at": article.created_at.isoformat() if article.created_at else ""
                         })
                     
-                    embeddings = self.embedding_service.encode(texts)
-                    if embeddings is None:
-                        return {"success": False, "error": "Failed to generate embeddings"}
-                    
-                    # Create FAISS index
-                    dimension = embeddings.shape[1]
-                    self.index = faiss.IndexFlatL2(dimension)
-                    self.index.add(embeddings.astype('float32'))
-                    
-                    self.documents = texts
-                    self.metadatas = metadatas
-                    
-                    # Save to disk
-                    index_file = self.index_path / "faiss.index"
-                    metadata_file = self.index_path / "metadata.pkl"
-                    documents_file = self.index_path / "documents.pkl"
-                    
-                    faiss.write_index(self.index, str(index_file))
-                    
-                    with open(metadata_file, 'wb') as f:
-                        pickle.dump(self.metadatas, f)
-                    
-                    with open(documents_file, 'wb') as f:
-                        pickle.dump(self.documents, f)
+                    report = self._sync_index(entries, source="db", full_rebuild=full_rebuild)
+                    if not report["success"]:
+                        return report
                 
                     logger.info(f"Indexed {len(articles)} knowledge base articles into FAISS")
                     return {
-                        "success": True,
+                        **report,
                         "indexed": len(articles),
+                        "chunks": len(entries),
                         "message": f"Successfully indexed {len(articles)} articles into FAISS"
                     }
                 finally:
@@ -219,82 +269,416 @@ class RAGService:
             logger.error(f"Error indexing knowledge base: {e}")
             return {"success": False, "error": str(e)}          
     
+    @staticmethod
+    def _add_chunks(entries: Dict[str, Dict], key: str, title: str, content: str, metadata: Dict[str, str]):
+        """
+        Index a document as passages of about RAG_CHUNK_TOKENS
+        
+        Every passage repeats the title so it embeds and ranks on its own. A document
+        that fits in one passage keeps its key; longer ones get "key@n" per passage.
+        """
+        chunks = chunk_document(content or "", settings.RAG_CHUNK_TOKENS, settings.RAG_CHUNK_OVERLAP_TOKENS) or [""]
+        for n, chunk in enumerate(chunks):
+            entries[key if len(chunks) == 1 else f"{key}@{n}"] = {
+                "text": f"{title}\n\n{chunk}",
+                "metadata": {**metadata, "chunk": n, "chunks": len(chunks)}
+            }
+    
+    @staticmethod
+    def _unique_key(key: str, existing: Dict) -> str:
+        """Disambiguate documents that would otherwise share a key (e.g. repeated FAQ questions)"""
+        def taken(candidate: str) -> bool:
+            return candidate in existing or f"{candidate}@0" in existing
+        
+        if not taken(key):
+            return key
+        suffix = 2
+        while taken(f"{key}~{suffix}"):
+            suffix += 1
+        return f"{key}~{suffix}"
+    
+    @staticmethod
+    def _content_hash(entry: Dict) -> str:
+        """Hash of everything that ends up in the index for a document"""
+        payload = json.dumps([entry["text"], entry["metadata"]], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _sync_index(self, entries: Dict[str, Dict], source: str, full_rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Bring the FAISS index in line with the given documents
+        
+        Args:
+            entries: Mapping of stable document key -> {"text", "metadata"}
+            source: "file" or "db"; switching source forces a full rebuild
+            full_rebuild: Ignore the manifest and re-embed everything
+            
+        Returns:
+            Dictionary with counts of added/updated/removed/unchanged documents
+        
+        Runs under the index lock, starting from whatever another worker last wrote.
+        """
+        with self._index_lock():
+            return self._sync_index_locked(entries, source, full_rebuild)
+    
+    def _sync_index_locked(self, entries: Dict[str, Dict], source: str, full_rebuild: bool) -> Dict[str, Any]:
+        start_time = time.time()
+        hashes = {key: self._content_hash(entry) for key, entry in entries.items()}
+        
+        # Changes are merged into the index and document store on disk, which another
+        # worker may have rewritten since this one loaded them
+        generation = self._stored_generation()
+        if generation != self._loaded_generation and (self.index_path / "faiss.index").exists():
+            self._reload_index(generation)
+        
+        manifest = self._load_manifest()
+        needs_rebuild = (
+            full_rebuild
+            or self.index is None
+            or not isinstance(faiss.downcast_index(self.index), faiss.IndexIDMap)
+            or manifest.get("source") != source
+        )
+        
+        if not needs_rebuild:
+            known = manifest["entries"]
+            added = [key for key in entries if key not in known]
+            updated = [key for key in entries if key in known and known[key]["hash"] != hashes[key]]
+            removed = [key for key in known if key not in entries]
+            
+            # HNSW cannot drop vectors, and crossing an auto-selection threshold changes the index type
+            if (updated or removed) and not supports_removal(self.index):
+                needs_rebuild = True
+            elif select_index_mode(len(entries)) != index_mode_of(self.index) and settings.RAG_INDEX_MODE == "auto":
+                needs_rebuild = True
+        
+        if needs_rebuild:
+            keys = list(entries.keys())
+            ids = np.arange(len(keys), dtype='int64')
+            logger.info(f"Full re-index: generating embeddings for {len(keys)} documents...")
+            embeddings = self.embedding_service.encode([entries[key]["text"] for key in keys])
+            if embeddings is None:
+                return {"success": False, "error": "Failed to generate embeddings"}
+            
+            logger.info(f"Creating FAISS index with dimension {embeddings.shape[1]}")
+            self.index, index_report = build_index(embeddings, ids=ids)
+            self.index_mmapped = False
+            manifest = {"source": source, "next_id": len(keys), "entries": {}}
+            for key, doc_id in zip(keys, ids.tolist()):
+                manifest["entries"][key] = {"id": doc_id, "hash": hashes[key]}
+            
+            # The previous store is not closed: concurrent retrievals may still be reading it
+            self.doc_store = DocumentStore.write(self.index_path, (
+                (doc_id, entries[key]["text"], {**entries[key]["metadata"], "doc_id": str(doc_id)})
+                for key, doc_id in zip(keys, ids.tolist())
+            ))
+            
+            counts = {"added": len(keys), "updated": 0, "removed": 0, "unchanged": 0}
+        else:
+            known = manifest["entries"]
+            
+            # Searches keep running on the live index, which FAISS does not allow to be
+            # mutated meanwhile: update a private copy and swap it in once it is complete.
+            # A mapped index cannot be copied in memory, so it is read back unmapped.
+            # Either way it is the generation the manifest describes (see the reload above).
+            if self.index_mmapped:
+                index, _ = read_index(self.index_path / "faiss.index", mmap=False)
+                apply_configured_search_params(index)
+            else:
+                index = faiss.clone_index(self.index)
+            
+            # Drop vectors for changed and deleted documents
+            stale_ids = [known[key]["id"] for key in updated + removed]
+            if stale_ids:
+                index.remove_ids(np.array(stale_ids, dtype='int64'))
+            deleted_ids = [known.pop(key)["id"] for key in removed]
+            
+            # Re-embed only what changed; updated documents keep their id
+            to_embed = updated + added
+            upserts = {}
+            if to_embed:
+                logger.info(f"Incremental re-index: generating embeddings for {len(to_embed)} of {len(entries)} documents...")
+                embeddings = self.embedding_service.encode([entries[key]["text"] for key in to_embed])
+                if embeddings is None:
+                    return {"success": False, "error": "Failed to generate embeddings"}
+                
+                ids = []
+                for key in to_embed:
+                    if key in known:
+                        ids.append(known[key]["id"])
+                    else:
+                        ids.append(manifest["next_id"])
+                        manifest["next_id"] += 1
+                index.add_with_ids(
+                    np.ascontiguousarray(embeddings, dtype='float32'),
+                    np.array(ids, dtype='int64')
+                )
+                for key, doc_id in zip(to_embed, ids):
+                    upserts[doc_id] = (entries[key]["text"], {**entries[key]["metadata"], "doc_id": str(doc_id)})
+                    known[key] = {"id": doc_id, "hash": hashes[key]}
+            
+            if upserts or deleted_ids:
+                self.doc_store = self.doc_store.rewrite(upserts, deleted_ids)
+            self.index, self.index_mmapped = index, False
+            
+            index_report = {"mode": index_mode_of(self.index), "params": get_search_params(self.index)}
+            counts = {
+                "added": len(added),
+                "updated": len(updated),
+                "removed": len(removed),
+                "unchanged": len(entries) - len(added) - len(updated)
+            }
+        
+        changed = needs_rebuild or counts["added"] or counts["updated"] or counts["removed"]
+        if changed:
+            # Rewriting the manifest also bumps the index version other workers check
+            self._save_index(manifest)
+            self._build_retrieval_indexes()
+        if self.answer_cache is not None and changed:
+            # Cached answers were generated from the previous knowledge base
+            self.answer_cache.clear()
+        
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        logger.info(
+            f"FAISS index synced in {elapsed_ms}ms: {counts['added']} added, {counts['updated']} updated, "
+            f"{counts['removed']} removed, {counts['unchanged']} unchanged"
+        )
+        return {
+            "success": True,
+            **counts,
+            "full_rebuild": needs_rebuild,
+            "dimension": self.index.d,
+            "index": index_report,
+            "indexing_time_ms": elapsed_ms
+        }
+    
+    @contextmanager
+    def _index_lock(self):
+        """Exclusive re-indexing rights over index_path, across threads and worker processes"""
+        with self._sync_lock, open(self.index_path / INDEX_LOCK_FILE, "a") as lock_file:
+            if fcntl is not None:
+                # Released when the file is closed
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+    
+    def _stored_generation(self) -> Optional[str]:
+        """Generation of the index on disk (None when there is no manifest, or it predates generations)"""
+        manifest_file = self.index_path / "manifest.pkl"
+        if not manifest_file.exists():
+            return None
+        with open(manifest_file, 'rb') as f:
+            return pickle.load(f).get("generation")
+    
+    def _reload_index(self, generation: Optional[str]):
+        """Load the index and document store another worker wrote since this one loaded them"""
+        logger.info("FAISS index was re-indexed by another worker, reloading it first")
+        doc_store = DocumentStore(self.index_path)
+        doc_store.open()
+        index, mmapped = read_index(self.index_path / "faiss.index")
+        apply_configured_search_params(index)
+        
+        self.index, self.index_mmapped, self.doc_store = index, mmapped, doc_store
+        self._loaded_generation = generation
+        self._build_retrieval_indexes()
+    
+    def _load_manifest(self) -> Dict:
+        """Content-hash manifest of the current index (only needed while indexing)"""
+        manifest_file = self.index_path / "manifest.pkl"
+        if self.index is not None and manifest_file.exists():
+            with open(manifest_file, 'rb') as f:
+                return pickle.load(f)
+        return {"source": None, "next_id": 0, "entries": {}}
+    
+    def _save_index(self, manifest: Dict):
+        """Persist index and the content-hash manifest (the document store writes itself)"""
+        write_index(self.index, str(self.index_path / "faiss.index"))
+        
+        manifest["generation"] = uuid.uuid4().hex
+        with open(self.index_path / "manifest.pkl", 'wb') as f:
+            pickle.dump(manifest, f)
+        self._loaded_generation = manifest["generation"]
+    
+    def _build_retrieval_indexes(self):
+        """Rebuild the BM25 postings and the category/subcategory id sets from the document store"""
+        filter_ids: Dict[Tuple[str, str], List[int]] = {}
+        lexical_docs = []
+        for doc_id, text, metadata in self.doc_store.records():
+            lexical_docs.append((doc_id, f"{text}\n{metadata.get('tags', '')} {metadata.get('keywords', '')}"))
+            for field in ("category", "subcategory"):
+                if metadata.get(field):
+                    filter_ids.setdefault((field, metadata[field]), []).append(doc_id)
+        
+        # Built aside and swapped in, so searches running meanwhile keep a consistent index
+        self.lexical_index = BM25Index(k1=settings.RAG_BM25_K1, b=settings.RAG_BM25_B).build(lexical_docs)
+        self._filter_ids = {key: np.array(ids, dtype='int64') for key, ids in filter_ids.items()}
+    
+    def _allowed_ids(self, category_filter: Optional[str], subcategory_filter: Optional[str]) -> Optional[np.ndarray]:
+        """Ids matching every given filter, or None when unfiltered"""
+        allowed = None
+        for field, value in (("category", category_filter), ("subcategory", subcategory_filter)):
+            if value:
+                ids = self._filter_ids.get((field, value), np.empty(0, dtype='int64'))
+                allowed = ids if allowed is None else np.intersect1d(allowed, ids)
+        return allowed
+    
+    def _record_latency(self, arm: str, started: float) -> float:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._latencies[arm].append(elapsed_ms)
+        return elapsed_ms
+    
+    def retrieval_stats(self) -> Dict[str, Any]:
+        """p50/p95 latency of each retrieval arm over recent queries"""
+        stats = {"mode": settings.RAG_RETRIEVAL_MODE, "bm25_terms": self.lexical_index.vocabulary_size}
+        for arm, samples in self._latencies.items():
+            values = np.array(samples) if samples else None
+            stats[arm] = {
+                "queries": len(samples),
+                "p50_ms": round(float(np.percentile(values, 50)), 3) if values is not None else None,
+                "p95_ms": round(float(np.percentile(values, 95)), 3) if values is not None else None
+            }
+        return stats
+    
+    def _vector_search(
+        self,
+        query: str,
+        search_k: int,
+        threshold: float,
+        allowed_ids: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float, float]]:
+        """
+        FAISS arm: (id, distance, similarity) for hits above the similarity threshold
+        """
+        if not self.embedding_service.is_available():
+            return []
+        
+        query_embedding = self.embedding_service.encode_single(query)
+        if query_embedding is None:
+            return []
+        
+        query_vector = query_embedding.astype('float32').reshape(1, -1)
+        if allowed_ids is not None:
+            distances, indices = filtered_search(self.index, query_vector, search_k, allowed_ids)
+        else:
+            distances, indices = self.index.search(query_vector, min(search_k, self.index.ntotal))
+        
+        hits = []
+        for distance, idx in zip(distances[0].tolist(), indices[0].tolist()):
+            if idx == -1:  # FAISS returns -1 for empty results
+                continue
+            similarity = 1.0 / (1.0 + distance)
+            # Apply similarity threshold - skip irrelevant documents
+            if similarity < threshold:
+                logger.debug(f"Skipping document with low similarity: {similarity:.3f}")
+                continue
+            hits.append((idx, distance, similarity))
+        return hits
+    
     def retrieve_relevant_docs(
         self,
         query: str,
         top_k: int = 5,
-        category_filter: Optional[str] = None
-    ) -> List[Dict[str, any]]:
+        category_filter: Optional[str] = None,
+        subcategory_filter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Retrieve relevant documents for a query using FAISS
+        Retrieve relevant documents for a query
+        
+        In hybrid mode (RAG_RETRIEVAL_MODE) FAISS and BM25 results are merged with
+        reciprocal-rank fusion, so exact terms such as order numbers or SKUs are found
+        even when their embeddings are not close to the query. Filters are applied
+        inside each search, so a rare category still yields up to top_k documents.
+        Each arm has its own relevance floor (similarity threshold, RAG_BM25_MIN_SCORE),
+        so an unrelated query retrieves nothing rather than its best weak matches.
         
         Args:
             query: User query
             top_k: Number of documents to retrieve
             category_filter: Optional category to filter by
+            subcategory_filter: Optional subcategory (agent, supervisor, customer) to filter by
             
         Returns:
             List of relevant documents with metadata
         """
-        if not self.index or not self.embedding_service.is_available():
-            logger.error("FAISS index or embedding service not available")
+        if not self.index:
+            logger.error("FAISS index not available")
             return []
         
+        mode = settings.RAG_RETRIEVAL_MODE
+        SIMILARITY_THRESHOLD = 0.35  # Minimum similarity score (0-1 scale)
+        
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_service.encode_single(query)
-            if query_embedding is None:
+            allowed_ids = self._allowed_ids(category_filter, subcategory_filter)
+            if allowed_ids is not None and len(allowed_ids) == 0:
+                logger.info(f"No documents in category={category_filter} subcategory={subcategory_filter}")
                 return []
+            allowed_set = set(allowed_ids.tolist()) if allowed_ids is not None else None
             
-            # Search FAISS index
-            query_vector = query_embedding.astype('float32').reshape(1, -1)
+            search_k = max(top_k, settings.RAG_HYBRID_CANDIDATES) if mode == "hybrid" else top_k
             
-            # Get more results if filtering by category
-            search_k = top_k * 3 if category_filter else top_k
-            distances, indices = self.index.search(query_vector, min(search_k, self.index.ntotal))
+            vector_hits, lexical_hits = [], []
+            if mode in ("vector", "hybrid"):
+                started = time.perf_counter()
+                vector_hits = self._vector_search(query, search_k, SIMILARITY_THRESHOLD, allowed_ids)
+                vector_ms = self._record_latency("vector", started)
+            if mode in ("bm25", "hybrid"):
+                started = time.perf_counter()
+                lexical_hits = self.lexical_index.search(
+                    query, search_k, allowed_ids=allowed_set, min_score=settings.RAG_BM25_MIN_SCORE
+                )
+                bm25_ms = self._record_latency("bm25", started)
             
-            # Format results with similarity threshold
-            documents = []
-            SIMILARITY_THRESHOLD = 0.35  # Minimum similarity score (0-1 scale)
+            vector_by_id = {idx: (distance, similarity) for idx, distance, similarity in vector_hits}
+            bm25_by_id = dict(lexical_hits)
             
-            for i, idx in enumerate(indices[0]):
-                if idx == -1:  # FAISS returns -1 for empty results
-                    continue
-                
-                metadata = self.metadatas[idx]
-                
-                # Calculate similarity score
-                similarity = 1.0 / (1.0 + float(distances[0][i]))
-                
-                # Apply similarity threshold - skip irrelevant documents
-                if similarity < SIMILARITY_THRESHOLD:
-                    logger.debug(f"Skipping document with low similarity: {similarity:.3f}")
-                    continue
-                
-                # Apply category filter if specified
-                if category_filter and metadata.get('category') != category_filter:
+            started = time.perf_counter()
+            if mode == "hybrid":
+                ranked = reciprocal_rank_fusion(
+                    [[idx for idx, _, _ in vector_hits], [idx for idx, _ in lexical_hits]],
+                    k=settings.RAG_RRF_K
+                )
+            elif mode == "bm25":
+                ranked = lexical_hits
+            else:
+                ranked = [(idx, similarity) for idx, _, similarity in vector_hits]
+            
+            # One store for the whole request, even if re-indexing swaps in a new one meanwhile
+            doc_store = self.doc_store
+            documents = []
+            for idx, score in ranked:
+                metadata = doc_store.get_metadata(idx)
+                if metadata is None:
                     continue
                 
+                distance, similarity = vector_by_id.get(idx, (None, None))
                 documents.append({
-                    "content": metadata.get('content', self.documents[idx]),
+                    "content": doc_store.get_text(idx),
                     "metadata": metadata,
-                    "distance": float(distances[0][i]),
-                    "similarity": similarity
+                    "distance": distance,
+                    "similarity": similarity,
+                    "bm25_score": bm25_by_id.get(idx),
+                    "score": score
                 })
                 
                 # Stop if we have enough results
                 if len(documents) >= top_k:
                     break
+            fusion_ms = self._record_latency("fusion", started)
             
-            logger.info(f"Retrieved {len(documents)} relevant documents (threshold: {SIMILARITY_THRESHOLD})")
+            timings = []
+            if mode in ("vector", "hybrid"):
+                timings.append(f"vector {vector_ms:.1f}ms")
+            if mode in ("bm25", "hybrid"):
+                timings.append(f"bm25 {bm25_ms:.1f}ms")
+            logger.info(
+                f"Retrieved {len(documents)} relevant documents ({mode}: {', '.join(timings)}, "
+                f"fusion {fusion_ms:.1f}ms, threshold: {SIMILARITY_THRESHOLD}, bm25 floor: {settings.RAG_BM25_MIN_SCORE})"
+            )
             
             return documents
             
         except Exception as e:
-            logger.error(f"Error retrieving documents from FAISS: {e}")
+            logger.error(f"Error retrieving documents: {e}")
             return []
     
-    def classify_intent(self, query: str) -> Dict[str, any]:
+    def classify_intent(self, query: str) -> Dict[str, Any]:
         """
         Classify if user query is in-scope for e-commerce support
         
@@ -304,10 +688,38 @@ class RAGService:
         Returns:
             Dict with 'in_scope' (bool), 'confidence' (float), 'reason' (str)
         """
+        # Obvious cases are decided locally; only ambiguous ones cost an LLM call
+        ruled = self._rule_scope(query)
+        if ruled is not None:
+            return ruled
+        
         if not self.llm_service.check_health():
             # If LLM unavailable, assume in-scope to allow fallback handling
             return {"in_scope": True, "confidence": 0.5, "reason": "LLM unavailable"}
         
+        result = self.llm_service.generate(**self._intent_request(query))
+        return self._parse_intent(result)
+    
+    async def aclassify_intent(self, query: str) -> Dict[str, Any]:
+        """classify_intent without blocking the event loop"""
+        ruled = self._rule_scope(query)
+        if ruled is not None:
+            return ruled
+        
+        if not self.llm_service.check_health():
+            return {"in_scope": True, "confidence": 0.5, "reason": "LLM unavailable"}
+        
+        result = await self.llm_service.agenerate(**self._intent_request(query))
+        return self._parse_intent(result)
+    
+    def _rule_scope(self, query: str) -> Optional[Dict[str, Any]]:
+        if not settings.INTENT_RULES_ENABLED:
+            return None
+        return self.intent_classifier.classify_scope(query)
+    
+    @staticmethod
+    def _intent_request(query: str) -> Dict[str, Any]:
+        """LLM arguments for in-scope classification"""
         system_prompt = """You are a Intellica helpful assistant that categorizes e-commercecustomer questions. If the user ask any other question other than e-commerce customer support, respond with "I apologize, but I can only assist with Intellica e-commerce support questions (orders, returns, refunds, shipping, products). For other inquiries, please contact our general support team."""
         
         prompt = f"""Is this question about e-commerce customer support (orders, returns, shipping, refunds, products, accounts)?
@@ -323,13 +735,16 @@ Examples:
 - "What is 2+2?" → {{"in_scope": false, "confidence": 0.95, "reason": "math question"}}
 - "Tell me a joke" → {{"in_scope": false, "confidence": 0.95, "reason": "entertainment"}}"""
         
-        result = self.llm_service.generate(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            temperature=0.1,  # Very low for consistent classification
-            max_tokens=100
-        )
-        
+        return {
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+            "temperature": 0.1,  # Very low for consistent classification
+            "max_tokens": 100,
+            "feature": "scope"
+        }
+    
+    @staticmethod
+    def _parse_intent(result: Dict) -> Dict[str, Any]:
         if not result['success']:
             return {"in_scope": True, "confidence": 0.5, "reason": "Classification failed"}
         
@@ -345,7 +760,7 @@ Examples:
     def generate_response(
         self,
         query: str,
-        context_docs: List[Dict[str, any]],
+        context_docs: List[Dict[str, Any]],
         conversation_history: Optional[List[Dict[str, str]]] = None,
         customer_context: Optional[Dict] = None
     ) -> Tuple[str, List[str]]:
@@ -361,29 +776,78 @@ Examples:
         Returns:
             Tuple of (response text, list of source article IDs)
         """
+        response, source_ids, _, _ = self._generate_response(query, context_docs, conversation_history, customer_context)
+        return response, source_ids
+    
+    def _generate_response(
+        self,
+        query: str,
+        context_docs: List[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        customer_context: Optional[Dict] = None
+    ) -> Tuple[str, List[str], bool, Optional[Dict[str, Any]]]:
+        """generate_response, also reporting whether the LLM produced the text and the prompt budget usage"""
         if not self.llm_service.check_health():
-            return "I apologize, but I'm currently unable to process your request. Please try again later or contact support.", []
+            return self.LLM_UNAVAILABLE_RESPONSE, [], False, None
+        
+        request, source_ids, usage = self._response_request(query, context_docs, conversation_history, customer_context)
+        result = self.llm_service.generate(**request)
+        response = result.get('text', 'Unable to generate response')
         
-        # Build context from retrieved documents
+        return response, source_ids, bool(result.get('success')), usage
+    
+    async def _agenerate_response(
+        self,
+        query: str,
+        context_docs: List[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        customer_context: Optional[Dict] = None
+    ) -> Tuple[str, List[str], bool, Optional[Dict[str, Any]]]:
+        """_generate_response without blocking the event loop"""
+        if not self.llm_service.check_health():
+            return self.LLM_UNAVAILABLE_RESPONSE, [], False, None
+        
+        request, source_ids, usage = self._response_request(query, context_docs, conversation_history, customer_context)
+        result = await self.llm_service.agenerate(**request)
+        response = result.get('text', 'Unable to generate response')
+        
+        return response, source_ids, bool(result.get('success')), usage
+    
+    def _response_request(
+        self,
+        query: str,
+        context_docs: List[Dict[str, Any]],
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        customer_context: Optional[Dict] = None
+    ) -> Tuple[Dict[str, Any], List[str], Dict[str, Any]]:
+        """
+        LLM arguments for an answer grounded in the retrieved documents
+        
+        Passages and conversation turns are cut to RAG_CONTEXT_TOKEN_BUDGET and
+        RAG_HISTORY_TOKEN_BUDGET (see prompt_builder).
+        
+        Returns:
+            Tuple of (request, source ids of the passages used, prompt budget usage)
+        """
+        # Build context from the retrieved passages that fit the budget
+        passages, usage = build_context(
+            context_docs, settings.RAG_CONTEXT_TOKEN_BUDGET, settings.RAG_DEDUP_THRESHOLD
+        )
         context_parts = []
         source_ids = []
         
-        for i, doc in enumerate(context_docs, 1):
+        for i, doc in enumerate(passages, 1):
             context_parts.append(f"[Source {i}] {doc['content']}")
-            if 'metadata' in doc and 'article_id' in doc['metadata']:
-                source_ids.append(doc['metadata']['article_id'])
+            article_id = doc.get('metadata', {}).get('article_id')
+            # Several passages can come from one article
+            if article_id is not None and article_id not in source_ids:
+                source_ids.append(article_id)
         
         context_text = "\n\n".join(context_parts) if context_parts else "No relevant information found."
         
-        # Build conversation context
-        history_text = ""
-        if conversation_history:
-            history_parts = []
-            for msg in conversation_history[-5:]:  # Last 5 messages
-                role = msg.get('role', 'user')
-                content = msg.get('content', '')
-                history_parts.append(f"{role.capitalize()}: {content}")
-            history_text = "\n".join(history_parts)
+        # Build conversation context from the newest turns that fit
+        history_parts, history_tokens = trim_history(conversation_history, settings.RAG_HISTORY_TOKEN_BUDGET)
+        history_text = "\n".join(history_parts)
         
         # Build customer context section
         customer_context_text = ""
@@ -462,16 +926,26 @@ Instructions:
 
 Response:"""
         
-        # Generate response with optimized parameters
-        result = self.llm_service.generate(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            temperature=0.3,  # Lower = more focused and consistent
-            max_tokens=300    # Shorter = faster responses
+        usage.update({
+            "history_tokens": history_tokens,
+            "customer_context_tokens": estimate_tokens(customer_context_text),
+            "prompt_tokens": estimate_tokens(system_prompt) + estimate_tokens(prompt)
+        })
+        self._prompt_usage.append(usage)
+        logger.info(
+            f"Answer prompt ~{usage['prompt_tokens']} tokens: {usage['passages_used']}/{usage['passages_retrieved']} passages "
+            f"({usage['context_tokens']}/{usage['budget_tokens']} context tokens, {usage['duplicates_dropped']} duplicate, "
+            f"{usage['over_budget_dropped']} over budget, {usage['truncated']} truncated), {history_tokens} history tokens"
         )
-        response = result.get('text', 'Unable to generate response')
         
-        return response, source_ids
+        # Generate response with optimized parameters
+        return {
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+            "temperature": 0.3,  # Lower = more focused and consistent
+            "max_tokens": 300,   # Shorter = faster responses
+            "feature": "chat_answer"
+        }, source_ids, usage
     
     def answer_question(
         self,
@@ -479,8 +953,10 @@ Response:"""
         conversation_history: Optional[List[Dict[str, str]]] = None,
         category_filter: Optional[str] = None,
         top_k: int = 5,
-        customer_context: Optional[Dict] = None
-    ) -> Dict[str, any]:
+        customer_context: Optional[Dict] = None,
+        analysis: Optional[Dict] = None,
+        context_docs: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
         """
         Complete RAG pipeline with validation and intent classification
         
@@ -490,16 +966,158 @@ Response:"""
             category_filter: Optional category filter
             top_k: Number of documents to retrieve
             customer_context: Customer's order and refund data
+            analysis: Result of analyze_message for this query; its scope replaces
+                the classify_intent call
+            context_docs: Documents already retrieved for this query (see aretrieve_for_answer)
             
         Returns:
             Dictionary with response and metadata
         """
+        query, early_result = self._prepare_query(query)
+        if early_result is not None:
+            return early_result
+        
+        # Near-duplicates of earlier non-personalised questions reuse the stored answer
+        cache_vector = None
+        cache_scope = self._answer_cache_scope(category_filter, top_k)
+        if self.answer_cache is not None and self._is_cacheable(query, conversation_history, customer_context):
+            if self.embedding_service.is_available():
+                cache_vector = self.embedding_service.encode_single(query)
+            cached = self._cached_answer(query, cache_vector, cache_scope)
+            if cached is not None:
+                return cached
+        
+        result, reusable = self._answer(
+            query, conversation_history, category_filter, top_k, customer_context, analysis, context_docs
+        )
+        if cache_vector is not None and reusable:
+            self.answer_cache.store(cache_vector, result, cache_scope)
+        return result
+    
+    async def aanswer_question(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        category_filter: Optional[str] = None,
+        top_k: int = 5,
+        customer_context: Optional[Dict] = None,
+        analysis: Optional[Dict] = None,
+        context_docs: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        answer_question for async callers
+        
+        LLM calls are awaited on the pooled async client and retrieval runs in a worker
+        thread, so the event loop keeps serving other requests meanwhile.
+        """
+        query, early_result = self._prepare_query(query)
+        if early_result is not None:
+            return early_result
+        
+        cache_vector = None
+        cache_scope = self._answer_cache_scope(category_filter, top_k)
+        if self.answer_cache is not None and self._is_cacheable(query, conversation_history, customer_context):
+            if self.embedding_service.is_available():
+                cache_vector = await self.embedding_service.aencode_single(query)
+            cached = self._cached_answer(query, cache_vector, cache_scope)
+            if cached is not None:
+                return cached
+        
+        result, reusable = await self._aanswer(
+            query, conversation_history, category_filter, top_k, customer_context, analysis, context_docs
+        )
+        if cache_vector is not None and reusable:
+            self.answer_cache.store(cache_vector, result, cache_scope)
+        return result
+    
+    async def astream_answer(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        category_filter: Optional[str] = None,
+        top_k: int = 5,
+        customer_context: Optional[Dict] = None,
+        analysis: Optional[Dict] = None,
+        context_docs: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        aanswer_question, streaming the generated answer
+        
+        Yields {"delta": text} chunks as the LLM produces them, then {"done": True, ...}
+        with the keys of answer_question's result plus 'time_to_first_token_ms'.
+        Canned and cached answers arrive as a single chunk.
+        """
+        start_time = time.time()
+        query, early_result = self._prepare_query(query)
+        if early_result is not None:
+            async for event in self._single_chunk(early_result, start_time):
+                yield event
+            return
+        
+        cache_vector = None
+        cache_scope = self._answer_cache_scope(category_filter, top_k)
+        if self.answer_cache is not None and self._is_cacheable(query, conversation_history, customer_context):
+            if self.embedding_service.is_available():
+                cache_vector = await self.embedding_service.aencode_single(query)
+            cached = self._cached_answer(query, cache_vector, cache_scope)
+            if cached is not None:
+                async for event in self._single_chunk(cached, start_time):
+                    yield event
+                return
+        
+        intent_result = self._precomputed_scope(analysis) or await self.aclassify_intent(query)
+        canned = None
+        if self._is_out_of_scope(query, intent_result):
+            canned = self._result(self.OUT_OF_SCOPE_RESPONSE, intent_result)
+        else:
+            docs = context_docs
+            if docs is None:
+                docs = await asyncio.to_thread(self.retrieve_relevant_docs, query, top_k, category_filter)
+            if not docs:
+                logger.info(f"No relevant documents found for query: {query[:50]}...")
+                canned = self._result(self.NO_DOCUMENTS_RESPONSE, intent_result)
+        
+        if canned is not None:
+            if cache_vector is not None:
+                self.answer_cache.store(cache_vector, canned, cache_scope)
+            async for event in self._single_chunk(canned, start_time):
+                yield event
+            return
+        
+        if not self.llm_service.check_health():
+            async for event in self._single_chunk(self._result(self.LLM_UNAVAILABLE_RESPONSE, intent_result), start_time):
+                yield event
+            return
+        
+        request, source_ids, usage = self._response_request(query, docs, conversation_history, customer_context)
+        async for event in self.llm_service.astream(**request):
+            if not event.get("done"):
+                yield event
+                continue
+            result = self._result(event["text"], intent_result, source_ids, len(docs), usage)
+            if cache_vector is not None and event["success"]:
+                self.answer_cache.store(cache_vector, result, cache_scope)
+            yield {**result, "done": True, "time_to_first_token_ms": event["time_to_first_token_ms"]}
+    
+    @staticmethod
+    async def _single_chunk(result: Dict[str, Any], start_time: float) -> AsyncIterator[Dict[str, Any]]:
+        """Stream events for an answer that is already complete"""
+        yield {"delta": result["response"]}
+        yield {**result, "done": True, "time_to_first_token_ms": int((time.time() - start_time) * 1000)}
+    
+    def _prepare_query(self, query: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Validate and normalise a query
+        
+        Returns:
+            Tuple of (query, immediate response for empty/too short queries or None)
+        """
         # Validate query
         query = query.strip()
         
         # Handle empty query
         if not query:
-            return {
+            return query, {
                 "response": "I didn't receive a question. How can I help you today?",
                 "sources": [],
                 "retrieved_docs": 0,
@@ -509,7 +1127,7 @@ Response:"""
         
         # Handle very short query
         if len(query) < 3:
-            return {
+            return query, {
                 "response": "Could you please provide more details about what you need help with?",
                 "sources": [],
                 "retrieved_docs": 0,
@@ -523,55 +1141,178 @@ Response:"""
             logger.warning(f"Query too long ({len(query)} chars), truncating to {MAX_QUERY_LENGTH}")
             query = query[:MAX_QUERY_LENGTH] + "..."
         
-        # PHASE 2: Intent classification - check if question is in-scope
-        intent_result = self.classify_intent(query)
+        return query, None
+    
+    def _index_version(self) -> int:
+        """Changes whenever any worker re-indexes with changes (each such sync rewrites manifest.pkl)"""
+        try:
+            return (self.index_path / "manifest.pkl").stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+    
+    def _answer_cache_scope(self, category_filter: Optional[str], top_k: int) -> Tuple:
+        """
+        Everything besides the question that a cached answer depends on
         
-        if not intent_result.get('in_scope', True) and intent_result.get('confidence', 0) > 0.7:
-            # High confidence that question is out-of-scope - refuse immediately
-            logger.info(f"Refusing out-of-scope question: {query[:50]}... (confidence: {intent_result.get('confidence')})")
-            return {
-                "response": "I apologize, but I can only assist with Intellica e-commerce support questions (orders, returns, refunds, shipping, products). For other inquiries, please contact our general support team.",
-                "sources": [],
-                "retrieved_docs": 0,
-                "timestamp": datetime.utcnow().isoformat(),
-                "intent_classification": intent_result
-            }
+        The index version is part of it, so a re-index by any worker invalidates the
+        answers cached in every worker, not only in the one that ran it.
+        """
+        version = self._index_version()
+        if self.answer_cache is not None and version != self._answer_cache_version:
+            # Entries of the previous version can never match again
+            self._answer_cache_version = version
+            self.answer_cache.clear()
+        return (version, category_filter, top_k)
+    
+    def _cached_answer(self, query: str, cache_vector: Optional[np.ndarray], cache_scope) -> Optional[Dict[str, Any]]:
+        """Stored answer to a near-duplicate question, if any"""
+        if cache_vector is None:
+            return None
+        cached = self.answer_cache.lookup(cache_vector, cache_scope)
+        if cached is None:
+            return None
+        answer, similarity = cached
+        logger.info(f"Answer cache hit (similarity {similarity:.3f}) for: {query[:50]}...")
+        # No prompt was built for this answer
+        answer = {key: value for key, value in answer.items() if key != "prompt_budget"}
+        return {
+            **answer,
+            "timestamp": datetime.utcnow().isoformat(),
+            "cached": True,
+            "cache_similarity": round(similarity, 4)
+        }
+    
+    @staticmethod
+    def _is_cacheable(
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        customer_context: Optional[Dict]
+    ) -> bool:
+        """An answer depends on the query alone when there is no order data and no earlier turn"""
+        if customer_context and customer_context.get('has_orders'):
+            return False
+        # The chat API passes history including the message being answered
+        return all(msg.get('content', '').strip() == query for msg in conversation_history or [])
+    
+    def _answer(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        category_filter: Optional[str],
+        top_k: int,
+        customer_context: Optional[Dict],
+        analysis: Optional[Dict] = None,
+        context_docs: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Classification, retrieval and generation for a validated query
         
-        # Retrieve relevant documents
-        docs = self.retrieve_relevant_docs(query, top_k, category_filter)
+        Returns:
+            Tuple of (answer, whether the answer may be cached)
+        """
+        # PHASE 2: Intent classification - check if question is in-scope
+        intent_result = self._precomputed_scope(analysis) or self.classify_intent(query)
+        if self._is_out_of_scope(query, intent_result):
+            return self._result(self.OUT_OF_SCOPE_RESPONSE, intent_result), True
         
-        # If no relevant documents found, offer human agent
+        # Retrieve relevant documents
+        docs = context_docs if context_docs is not None else self.retrieve_relevant_docs(query, top_k, category_filter)
         if not docs:
             logger.info(f"No relevant documents found for query: {query[:50]}...")
-            return {
-                "response": "I don't have information about that in my knowledge base. Would you like me to connect you with a human agent who can better assist you?",
-                "sources": [],
-                "retrieved_docs": 0,
-                "timestamp": datetime.utcnow().isoformat(),
-                "intent_classification": intent_result
-            }
+            return self._result(self.NO_DOCUMENTS_RESPONSE, intent_result), True
         
         # Generate response with customer context
-        response, source_ids = self.generate_response(
+        response, source_ids, generated, usage = self._generate_response(
             query, 
             docs, 
             conversation_history,
             customer_context
         )
+        return self._result(response, intent_result, source_ids, len(docs), usage), generated
+    
+    async def _aanswer(
+        self,
+        query: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        category_filter: Optional[str],
+        top_k: int,
+        customer_context: Optional[Dict],
+        analysis: Optional[Dict] = None,
+        context_docs: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """_answer with awaited LLM calls and retrieval off the event loop"""
+        intent_result = self._precomputed_scope(analysis) or await self.aclassify_intent(query)
+        if self._is_out_of_scope(query, intent_result):
+            return self._result(self.OUT_OF_SCOPE_RESPONSE, intent_result), True
         
-        return {
+        docs = context_docs
+        if docs is None:
+            docs = await asyncio.to_thread(self.retrieve_relevant_docs, query, top_k, category_filter)
+        if not docs:
+            logger.info(f"No relevant documents found for query: {query[:50]}...")
+            return self._result(self.NO_DOCUMENTS_RESPONSE, intent_result), True
+        
+        response, source_ids, generated, usage = await self._agenerate_response(
+            query,
+            docs,
+            conversation_history,
+            customer_context
+        )
+        return self._result(response, intent_result, source_ids, len(docs), usage), generated
+    
+    async def aretrieve_for_answer(
+        self,
+        query: str,
+        top_k: int = 5,
+        category_filter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieval for a later answer_question(context_docs=...) call, off the event loop
+        
+        Lets callers retrieve while the message is still being analyzed; the result is
+        simply unused if the question turns out to be out of scope or cached.
+        """
+        query, early_result = self._prepare_query(query)
+        if early_result is not None:
+            return []
+        return await asyncio.to_thread(self.retrieve_relevant_docs, query, top_k, category_filter)
+    
+    @staticmethod
+    def _precomputed_scope(analysis: Optional[Dict]) -> Optional[Dict[str, Any]]:
+        return analysis.get('scope') if analysis else None
+    
+    @staticmethod
+    def _is_out_of_scope(query: str, intent_result: Dict) -> bool:
+        if not intent_result.get('in_scope', True) and intent_result.get('confidence', 0) > 0.7:
+            # High confidence that question is out-of-scope - refuse immediately
+            logger.info(f"Refusing out-of-scope question: {query[:50]}... (confidence: {intent_result.get('confidence')})")
+            return True
+        return False
+    
+    @staticmethod
+    def _result(
+        response: str,
+        intent_result: Dict,
+        sources: Optional[List[str]] = None,
+        retrieved_docs: int = 0,
+        prompt_budget: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        result = {
             "response": response,
-            "sources": source_ids,
-            "retrieved_docs": len(docs),
+            "sources": sources or [],
+            "retrieved_docs": retrieved_docs,
             "timestamp": datetime.utcnow().isoformat(),
             "intent_classification": intent_result
         }
+        if prompt_budget is not None:
+            result["prompt_budget"] = prompt_budget
+        return result
     
     def generate_conversation_summary(
         self,
         messages: List[Dict[str, str]],
         customer_context: Optional[Dict] = None
-    ) -> Dict[str, any]:
+    ) -> Dict[str, Any]:
         """
         Generate AI summary of a conversation
         
@@ -628,7 +1369,8 @@ Format as valid JSON only."""
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.3,
-            max_tokens=600
+            max_tokens=600,
+            feature="conversation_summary"
         )
         
         if not result['success']:
@@ -663,7 +1405,7 @@ Format as valid JSON only."""
         eligibility_result: Dict,
         product_category: str,
         reason: str
-    ) -> Dict[str, any]:
+    ) -> Dict[str, Any]:
         """
         Generate customer-friendly summary of refund eligibility check
         
@@ -711,7 +1453,8 @@ Format as valid JSON only."""
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.5,
-            max_tokens=400
+            max_tokens=400,
+            feature="refund_summary"
         )
         
         if not result['success']:
@@ -772,7 +1515,7 @@ Format as valid JSON only."""
         self,
         message: str,
         customer_context: Optional[Dict] = None
-    ) -> Dict[str, any]:
+    ) -> Dict[str, Any]:
         """
         Analyze intent and sentiment of a customer message
         
@@ -783,16 +1526,150 @@ Format as valid JSON only."""
         Returns:
             Dictionary with intent, sentiment, and confidence scores
         """
+        ruled = self._rule_analysis(message)
+        if ruled is not None:
+            return ruled
+        
         if not self.llm_service.check_health():
-            return {
-                "success": False,
-                "intent": "unknown",
-                "intent_confidence": 0.0,
-                "sentiment": "neutral",
-                "sentiment_score": 0.5,
-                "entities": {}
-            }
+            return dict(self.UNKNOWN_ANALYSIS, entities={})
+        
+        result = self.llm_service.generate(**self._analysis_request(message, customer_context))
+        return self._parse_analysis(result, message)
+    
+    async def aanalyze_intent_and_sentiment(
+        self,
+        message: str,
+        customer_context: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """analyze_intent_and_sentiment without blocking the event loop"""
+        ruled = self._rule_analysis(message)
+        if ruled is not None:
+            return ruled
+        
+        if not self.llm_service.check_health():
+            return dict(self.UNKNOWN_ANALYSIS, entities={})
+        
+        result = await self.llm_service.agenerate(**self._analysis_request(message, customer_context))
+        return self._parse_analysis(result, message)
+    
+    def analyze_message(self, message: str) -> Dict[str, Any]:
+        """
+        Scope, intent, sentiment and entities of a customer message in one LLM call
+        
+        Replaces calling analyze_intent_and_sentiment and classify_intent separately;
+        pass the result to answer_question(analysis=...) to skip its classification.
         
+        Args:
+            message: Customer message text
+            
+        Returns:
+            analyze_intent_and_sentiment's result plus 'scope' (classify_intent's result)
+        """
+        scope, analysis = self._rule_scope(message), self._rule_analysis(message)
+        if scope is None or analysis is None:
+            if self.llm_service.check_health():
+                result = self.llm_service.generate(**self._message_analysis_request(message))
+            else:
+                result = None
+            scope, analysis = self._parse_message_analysis(result, message, scope, analysis)
+        return {**analysis, "scope": scope}
+    
+    async def aanalyze_message(self, message: str) -> Dict[str, Any]:
+        """analyze_message without blocking the event loop"""
+        scope, analysis = self._rule_scope(message), self._rule_analysis(message)
+        if scope is None or analysis is None:
+            if self.llm_service.check_health():
+                result = await self.llm_service.agenerate(**self._message_analysis_request(message))
+            else:
+                result = None
+            scope, analysis = self._parse_message_analysis(result, message, scope, analysis)
+        return {**analysis, "scope": scope}
+    
+    @staticmethod
+    def _message_analysis_request(message: str) -> Dict[str, Any]:
+        """LLM arguments for the combined scope/intent/sentiment analysis"""
+        system_prompt = """You are an AI assistant that analyzes Intellica e-commerce customer support messages.
+Decide whether the message is a customer support question and detect its intent and sentiment accurately."""
+        
+        prompt = f"""Analyze this customer message.
+
+Customer Message: "{message}"
+
+Respond with only a JSON object with these keys:
+1. in_scope: true if the message is about e-commerce customer support (orders, returns, shipping, refunds, products, accounts) or is a greeting, false otherwise (e.g. math, jokes, general knowledge)
+2. scope_confidence: Confidence score 0.0-1.0 for in_scope
+3. scope_reason: Brief explanation
+4. intent: One of refund_inquiry, return_inquiry, order_status, product_inquiry, policy_question, complaint, general_question, greeting, other
+5. intent_confidence: Confidence score 0.0-1.0
+6. sentiment: One of positive, neutral, negative
+7. sentiment_score: Score 0.0-1.0 (0=very negative, 0.5=neutral, 1.0=very positive)
+8. entities: Object with order_number, product_name and amount (null when not mentioned)
+
+Example:
+"Where is my order ORD-2024-001? It's late again." → {{"in_scope": true, "scope_confidence": 0.95, "scope_reason": "order tracking", "intent": "order_status", "intent_confidence": 0.9, "sentiment": "negative", "sentiment_score": 0.3, "entities": {{"order_number": "ORD-2024-001", "product_name": null, "amount": null}}}}"""
+        
+        return {
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+            "temperature": 0.1,  # Very low for consistent classification
+            "max_tokens": 300,
+            "feature": "message_analysis"
+        }
+    
+    def _parse_message_analysis(
+        self,
+        result: Optional[Dict],
+        message: str,
+        scope: Optional[Dict[str, Any]],
+        analysis: Optional[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Fill in the parts the rules left undecided from the combined LLM result
+        
+        Returns:
+            Tuple of (scope, analysis); failures degrade as classify_intent and
+            analyze_intent_and_sentiment do
+        """
+        if result is None:
+            return (
+                scope or {"in_scope": True, "confidence": 0.5, "reason": "LLM unavailable"},
+                analysis or dict(self.UNKNOWN_ANALYSIS, entities={})
+            )
+        
+        parsed = None
+        if result['success']:
+            try:
+                parsed = json.loads(result['text'])
+            except (ValueError, TypeError):
+                pass
+            if not isinstance(parsed, dict):
+                logger.warning(f"Failed to parse message analysis: {result['text']}")
+                parsed = None
+        
+        if parsed is None:
+            failed_scope = {"in_scope": True, "confidence": 0.5, "reason": "Classification failed"}
+            return scope or failed_scope, analysis or self._fallback_intent_sentiment(message)
+        
+        if scope is None:
+            scope = {
+                "in_scope": parsed.pop('in_scope', True),
+                "confidence": parsed.pop('scope_confidence', 0.5),
+                "reason": parsed.pop('scope_reason', '')
+            }
+        if analysis is None:
+            for key in ('in_scope', 'scope_confidence', 'scope_reason'):
+                parsed.pop(key, None)
+            analysis = {**parsed, "success": True, "model_used": result.get('model', 'unknown')}
+        return scope, analysis
+    
+    def _rule_analysis(self, message: str) -> Optional[Dict[str, Any]]:
+        if not settings.INTENT_RULES_ENABLED:
+            return None
+        return self.intent_classifier.analyze(message)
+    
+    @staticmethod
+    def _analysis_request(message: str, customer_context: Optional[Dict] = None) -> Dict[str, Any]:
+        """LLM arguments for intent/sentiment analysis"""
         # Build context summary
         context_info = ""
         if customer_context and customer_context.get('has_orders'):
@@ -837,13 +1714,15 @@ Provide a JSON response with:
 
 Format as valid JSON only."""
         
-        result = self.llm_service.generate(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            temperature=0.2,  # Low temperature for consistent classification
-            max_tokens=300
-        )
-        
+        return {
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+            "temperature": 0.2,  # Low temperature for consistent classification
+            "max_tokens": 300,
+            "feature": "intent"
+        }
+    
+    def _parse_analysis(self, result: Dict, message: str) -> Dict[str, Any]:
         if not result['success']:
             # Fallback: simple keyword-based detection
             return self._fallback_intent_sentiment(message)
@@ -858,7 +1737,7 @@ Format as valid JSON only."""
             # Use fallback
             return self._fallback_intent_sentiment(message)
     
-    def _fallback_intent_sentiment(self, message: str) -> Dict[str, any]:
+    def _fallback_intent_sentiment(self, message: str) -> Dict[str, Any]:
         """
         Fallback intent and sentiment detection using keywords
         """
@@ -914,6 +1793,39 @@ Format as valid JSON only."""
             "model_used": "fallback"
         }
     
+    def intent_rules_stats(self) -> Dict[str, Any]:
+        """Share of scope and intent/sentiment classifications answered without the LLM"""
+        return {"enabled": settings.INTENT_RULES_ENABLED, **self.intent_classifier.stats()}
+    
+    def prompt_budget_stats(self) -> Dict[str, Any]:
+        """Mean token use of recent answer prompts and how often the context budget was binding"""
+        samples = list(self._prompt_usage)
+        if not samples:
+            return {"prompts": 0, "context_budget_tokens": settings.RAG_CONTEXT_TOKEN_BUDGET}
+        
+        def mean(field: str) -> float:
+            return round(sum(sample[field] for sample in samples) / len(samples), 1)
+        
+        return {
+            "prompts": len(samples),
+            "context_budget_tokens": settings.RAG_CONTEXT_TOKEN_BUDGET,
+            "history_budget_tokens": settings.RAG_HISTORY_TOKEN_BUDGET,
+            "mean_prompt_tokens": mean("prompt_tokens"),
+            "mean_context_tokens": mean("context_tokens"),
+            "mean_history_tokens": mean("history_tokens"),
+            "mean_passages_used": mean("passages_used"),
+            "mean_duplicates_dropped": mean("duplicates_dropped"),
+            "budget_limited_rate": round(
+                sum(bool(sample["over_budget_dropped"] or sample["truncated"]) for sample in samples) / len(samples), 4
+            )
+        }
+    
+    def answer_cache_stats(self) -> Dict[str, Any]:
+        """Semantic answer cache hit/miss counters"""
+        if self.answer_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.answer_cache.stats()}
+    
     def is_available(self) -> bool:
         """Check if RAG service is fully available"""
         return (
@@ -64,21 +64,16 @@ I need to check if I'm eligible for a refund:
 Am I eligible for a refund?
 """
         
-        # Retrieve relevant policy documents
-        docs = self.rag_service.retrieve_relevant_docs(
+        # Retrieve customer-facing policy documents (filtered inside the search)
+        policy_docs = self.rag_service.retrieve_relevant_docs(
             query=query,
-            top_k=5,
-            category_filter=None  # Search all customer docs
+            top_k=3,
+            subcategory_filter="customer"
         )
         
-        # Filter for customer-facing policy docs
-        policy_docs = [
-            doc for doc in docs 
-            if 'customer' in doc.get('metadata', {}).get('subcategory', '').lower()
-        ]
-        
         if not policy_docs:
-            policy_docs = docs  # Use all docs if no customer docs found
+            # Use all docs if no customer docs found
+            policy_docs = self.rag_service.retrieve_relevant_docs(query=query, top_k=3)
         
         # Build context from policies
         context_parts = []
@@ -132,7 +127,8 @@ POLICY_REFERENCES:
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.3,  # Lower temperature for more consistent decisions
-            max_tokens=800
+            max_tokens=800,
+            feature="refund_eligibility"
         )
         
         response_text = result.get('text', '')
@@ -302,7 +298,8 @@ Keep it brief (2-3 sentences) and customer-focused."""
             prompt=prompt,
             system_prompt=system_prompt,
             temperature=0.7,
-            max_tokens=200
+            max_tokens=200,
+            feature="rejection_explanation"
         )
         
         return result.get('text', 'Unfortunately, this return may not meet our policy requirements. Please contact support for assistance.')
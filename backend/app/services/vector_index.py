@@ -0,0 +1,458 @@
+"""
+Vector Index Factory
+Builds and tunes FAISS indexes for the RAG service (flat, IVF-Flat, IVF-PQ, HNSW)
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import os
+import time
+import logging
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_MODES = ["flat", "ivf_flat", "ivf_pq", "hnsw"]
+
+# Read-only mapping of flat codes and IVF inverted lists (adding IO_FLAG_MMAP breaks IVF loads)
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+# FAISS warns below ~39 training points per IVF centroid; PQ needs 2^nbits points per codebook
+MIN_POINTS_PER_CENTROID = 39
+
+
+def select_index_mode(num_vectors: int, mode: Optional[str] = None) -> str:
+    """
+    Pick an index mode for a corpus of the given size
+
+    Args:
+        num_vectors: Number of vectors that will be indexed
+        mode: Explicit mode, or None/"auto" to use RAG_INDEX_MODE and corpus size
+
+    Returns:
+        One of INDEX_MODES
+    """
+    mode = (mode or settings.RAG_INDEX_MODE or "auto").lower()
+    if mode != "auto":
+        if mode not in INDEX_MODES:
+            logger.warning(f"Unknown index mode '{mode}', using flat")
+            return "flat"
+        return mode
+
+    # Exact search is cheap for small corpora and needs no training
+    if num_vectors < settings.RAG_ANN_MIN_VECTORS:
+        return "flat"
+    # Very large corpora get compressed codes to keep memory bounded
+    if num_vectors >= settings.RAG_IVF_PQ_MIN_VECTORS:
+        return "ivf_pq"
+    return "ivf_flat"
+
+
+def _default_nlist(num_vectors: int) -> int:
+    """Number of IVF cells, capped so every cell gets enough training points"""
+    nlist = settings.RAG_IVF_NLIST or int(4 * math.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """Largest divisor of the dimension that does not exceed RAG_PQ_M"""
+    for m in range(min(settings.RAG_PQ_M, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def _factory_string(mode: str, dimension: int, num_vectors: int) -> str:
+    """Translate an index mode into a FAISS index_factory description"""
+    if mode == "ivf_flat":
+        return f"IVF{_default_nlist(num_vectors)},Flat"
+    if mode == "ivf_pq":
+        return f"IVF{_default_nlist(num_vectors)},PQ{_pq_subquantizers(dimension)}x{settings.RAG_PQ_NBITS}"
+    if mode == "hnsw":
+        return f"HNSW{settings.RAG_HNSW_M},Flat"
+    return "Flat"
+
+
+def _min_training_points(mode: str) -> int:
+    """Smallest corpus a mode can be trained on"""
+    if mode == "ivf_flat":
+        return MIN_POINTS_PER_CENTROID
+    if mode == "ivf_pq":
+        return max(MIN_POINTS_PER_CENTROID, 2 ** settings.RAG_PQ_NBITS)
+    return 0
+
+
+def create_index(dimension: int, num_vectors: int, mode: Optional[str] = None) -> Tuple[faiss.Index, str]:
+    """
+    Create an empty (untrained) index sized for the given corpus
+
+    Returns:
+        Tuple of (index, resolved mode)
+    """
+    mode = select_index_mode(num_vectors, mode)
+    if num_vectors < _min_training_points(mode):
+        logger.warning(f"Only {num_vectors} vectors, too few to train {mode}; using flat index")
+        mode = "flat"
+
+    index = faiss.index_factory(dimension, _factory_string(mode, dimension, num_vectors))
+    if mode == "hnsw":
+        index.hnsw.efConstruction = settings.RAG_HNSW_EF_CONSTRUCTION
+    return index, mode
+
+
+def train_index(index: faiss.Index, embeddings: np.ndarray) -> None:
+    """Train an IVF/PQ index on (a sample of) the embeddings; no-op for flat and HNSW"""
+    if index.is_trained:
+        return
+    sample = embeddings
+    if len(embeddings) > settings.RAG_TRAIN_SAMPLE_SIZE:
+        rng = np.random.default_rng(0)
+        rows = rng.choice(len(embeddings), settings.RAG_TRAIN_SAMPLE_SIZE, replace=False)
+        sample = embeddings[rows]
+    logger.info(f"Training FAISS index on {len(sample)} vectors")
+    index.train(np.ascontiguousarray(sample, dtype='float32'))
+
+
+def read_index(path: str, mmap: Optional[bool] = None) -> Tuple[faiss.Index, bool]:
+    """
+    Load an index, memory-mapped when RAG_INDEX_MMAP is on
+
+    A mapped index shares its pages with every other process mapping the same file,
+    but it is read-only: adding or removing vectors aborts the process, so callers
+    must load a private copy (mmap=False) before mutating it.
+
+    Returns:
+        Tuple of (index, whether it is memory-mapped)
+    """
+    use_mmap = settings.RAG_INDEX_MMAP if mmap is None else mmap
+    if use_mmap:
+        try:
+            return faiss.read_index(str(path), MMAP_FLAGS), True
+        except Exception as e:
+            logger.warning(f"Memory-mapped load of {path} failed, reading into memory: {e}")
+    return faiss.read_index(str(path)), False
+
+
+def write_index(index: faiss.Index, path: str) -> None:
+    """
+    Write an index beside the old file and rename it into place
+
+    Other workers may have the old file mapped; rewriting it in place would change
+    (or truncate) pages under them.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, str(path))
+
+
+def index_mode_of(index: faiss.Index) -> str:
+    """Report the mode of an existing (possibly ID-mapped) index"""
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """HNSW graphs cannot drop vectors; every other mode supports remove_ids"""
+    return index_mode_of(index) != "hnsw"
+
+
+def get_search_params(index: faiss.Index) -> Dict[str, int]:
+    """Current query-time knobs of an index (nprobe or efSearch)"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return {"nprobe": ivf.nprobe}
+    base = faiss.downcast_index(index)
+    if isinstance(base, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        base = faiss.downcast_index(base.index)
+    if isinstance(base, faiss.IndexHNSW):
+        return {"efSearch": base.hnsw.efSearch}
+    return {}
+
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Apply query-time knobs; parameters that do not apply to the index type are ignored"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe is not None:
+        ivf.nprobe = max(1, min(int(nprobe), ivf.nlist))
+        return
+    base = faiss.downcast_index(index)
+    if isinstance(base, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        base = faiss.downcast_index(base.index)
+    if isinstance(base, faiss.IndexHNSW) and ef_search is not None:
+        base.hnsw.efSearch = max(1, int(ef_search))
+
+
+def filtered_search(
+    index: faiss.Index,
+    queries: np.ndarray,
+    top_k: int,
+    ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    k-NN search restricted to a set of ids (e.g. one category)
+
+    Non-matching vectors are skipped inside FAISS through an IDSelector, so the result
+    holds min(top_k, len(ids)) hits instead of whatever survives post-filtering. ANN
+    knobs are widened by the inverse of the selected fraction so that a rare category
+    is still reached: IVF probes more lists, HNSW explores more candidates, and a
+    small HNSW selection is searched exactly over its stored vectors.
+
+    Args:
+        index: Index to search (ids are the external ids of an IndexIDMap)
+        queries: Query vectors
+        top_k: Number of neighbours
+        ids: Allowed ids
+
+    Returns:
+        (distances, ids) as returned by index.search
+    """
+    ids = np.asarray(ids, dtype='int64')
+    top_k = max(1, min(top_k, len(ids)))
+    fraction = len(ids) / max(index.ntotal, 1)
+    selector = faiss.IDSelectorBatch(ids)
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = min(ivf.nlist, max(ivf.nprobe, math.ceil(ivf.nprobe / fraction)))
+        return index.search(queries, top_k, params=faiss.SearchParametersIVF(sel=selector, nprobe=nprobe))
+
+    id_map = None
+    base = faiss.downcast_index(index)
+    if isinstance(base, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        id_map = faiss.vector_to_array(base.id_map)
+        base = faiss.downcast_index(base.index)
+
+    if isinstance(base, faiss.IndexHNSW):
+        if len(ids) <= settings.RAG_FILTER_EXACT_MAX:
+            positions = np.nonzero(np.isin(id_map, ids))[0] if id_map is not None else ids
+            vectors = base.storage.reconstruct_batch(positions)
+            distances, neighbours = faiss.knn(np.ascontiguousarray(queries, dtype='float32'), vectors, top_k)
+            external = id_map[positions] if id_map is not None else positions
+            return distances, np.where(neighbours >= 0, external[np.maximum(neighbours, 0)], -1)
+        ef_search = min(index.ntotal, max(base.hnsw.efSearch, math.ceil(top_k / fraction)))
+        return index.search(queries, top_k, params=faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search))
+
+    return index.search(queries, top_k, params=faiss.SearchParameters(sel=selector))
+
+
+def apply_configured_search_params(index: faiss.Index) -> None:
+    """
+    Raise nprobe/efSearch to at least the configured values
+
+    Values tuned at build time are persisted with the index, so they are only
+    ever raised here, never lowered.
+    """
+    current = get_search_params(index)
+    set_search_params(
+        index,
+        nprobe=max(current.get("nprobe", 0), settings.RAG_IVF_NPROBE),
+        ef_search=max(current.get("efSearch", 0), settings.RAG_HNSW_EF_SEARCH)
+    )
+
+
+def measure_recall(
+    index: faiss.Index,
+    queries: np.ndarray,
+    ground_truth: np.ndarray,
+    top_k: int
+) -> Tuple[float, float]:
+    """
+    Recall@k of an index against exact neighbours
+
+    Returns:
+        Tuple of (recall, mean latency per query in ms)
+    """
+    start = time.perf_counter()
+    _, found = index.search(queries, top_k)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+    hits = 0
+    for row_found, row_truth in zip(found, ground_truth):
+        hits += len(set(row_found.tolist()) & set(row_truth.tolist()))
+    total = ground_truth.size or 1
+    return hits / total, elapsed_ms
+
+
+def exact_neighbours(embeddings: np.ndarray, queries: np.ndarray, top_k: int) -> np.ndarray:
+    """Brute-force neighbour positions used as the recall baseline"""
+    flat = faiss.IndexFlatL2(embeddings.shape[1])
+    flat.add(embeddings)
+    _, truth = flat.search(queries, top_k)
+    return truth
+
+
+def tune_search_params(
+    index: faiss.Index,
+    embeddings: np.ndarray,
+    top_k: int = 5,
+    recall_target: Optional[float] = None,
+    num_queries: int = 200,
+    ids: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Raise nprobe/efSearch until recall@k reaches the target
+
+    The corpus vectors themselves are used as sample queries. The index must hold
+    `embeddings` under `ids` (or row ids 0..n-1 when `ids` is None).
+
+    Returns:
+        Dictionary with the chosen parameters and the measured recall/latency
+    """
+    apply_configured_search_params(index)
+    mode = index_mode_of(index)
+    if mode == "flat":
+        return {"mode": mode, "recall": 1.0, "params": {}}
+
+    recall_target = settings.RAG_RECALL_TARGET if recall_target is None else recall_target
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    top_k = min(top_k, len(embeddings))
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(embeddings), min(num_queries, len(embeddings)), replace=False)
+    queries = embeddings[rows]
+    truth = exact_neighbours(embeddings, queries, top_k)
+    if ids is not None:
+        truth = np.asarray(ids, dtype='int64')[truth]
+
+    if mode in ("ivf_flat", "ivf_pq"):
+        knob, limit = "nprobe", faiss.extract_index_ivf(index).nlist
+    else:
+        # efSearch beyond a few thousand stops buying recall and only costs latency
+        knob, limit = "efSearch", 4096
+
+    def apply(value: int) -> None:
+        set_search_params(index, **({"nprobe": value} if knob == "nprobe" else {"ef_search": value}))
+
+    recall, latency_ms = measure_recall(index, queries, truth, top_k)
+    while recall < recall_target and get_search_params(index)[knob] < limit:
+        previous = (get_search_params(index)[knob], recall, latency_ms)
+        apply(min(previous[0] * 2, limit))
+        recall, latency_ms = measure_recall(index, queries, truth, top_k)
+        # PQ quantisation error caps recall; once extra probes stop helping, keep the cheaper setting
+        if recall - previous[1] < 0.005:
+            apply(previous[0])
+            _, recall, latency_ms = previous
+            break
+
+    params = get_search_params(index)
+    if recall < recall_target:
+        logger.warning(f"{mode} index reached recall {recall:.3f} < target {recall_target} with {params}")
+    else:
+        logger.info(f"{mode} index tuned to {params}: recall@{top_k}={recall:.3f}, {latency_ms:.3f}ms/query")
+
+    return {
+        "mode": mode,
+        "recall": round(recall, 4),
+        "latency_ms": round(latency_ms, 4),
+        "params": params
+    }
+
+
+def build_index(
+    embeddings: np.ndarray,
+    mode: Optional[str] = None,
+    tune: bool = True,
+    ids: Optional[np.ndarray] = None
+) -> Tuple[faiss.Index, Dict[str, Any]]:
+    """
+    Create, train, populate and tune an index for the given embeddings
+
+    Args:
+        embeddings: Corpus vectors
+        mode: Index mode, or None for automatic selection
+        tune: Calibrate nprobe/efSearch against RAG_RECALL_TARGET
+        ids: Stable int64 ids; when given the index is wrapped in an IndexIDMap
+             so vectors can later be removed or replaced by id
+
+    Returns:
+        Tuple of (index, build report)
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    num_vectors, dimension = embeddings.shape
+
+    start = time.perf_counter()
+    index, resolved_mode = create_index(dimension, num_vectors, mode)
+    train_index(index, embeddings)
+    if ids is not None:
+        index = faiss.IndexIDMap(index)
+        index.add_with_ids(embeddings, np.asarray(ids, dtype='int64'))
+    else:
+        index.add(embeddings)
+    build_ms = int((time.perf_counter() - start) * 1000)
+
+    report = {"mode": resolved_mode, "build_time_ms": build_ms, "params": {}}
+    if tune:
+        report.update(tune_search_params(index, embeddings, ids=ids))
+    else:
+        apply_configured_search_params(index)
+        report["params"] = get_search_params(index)
+
+    logger.info(f"Built {resolved_mode} FAISS index over {num_vectors} vectors in {build_ms}ms")
+    return index, report
+
+
+def compare_index_modes(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    top_k: int = 5,
+    modes: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Recall-vs-latency comparison of each index mode against the flat baseline
+
+    Args:
+        embeddings: Corpus vectors
+        queries: Query vectors to evaluate with
+        top_k: Neighbours per query
+        modes: Modes to compare (default: all)
+
+    Returns:
+        One report row per mode, flat first
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    truth = exact_neighbours(embeddings, queries, top_k)
+
+    rows = []
+    baseline_ms = None
+    for mode in modes or INDEX_MODES:
+        index, build = build_index(embeddings, mode=mode, tune=mode != "flat")
+        if build["mode"] != mode:
+            logger.warning(f"Skipping {mode}: corpus too small, built {build['mode']} instead")
+            continue
+
+        # Per-query latency, as seen by retrieve_relevant_docs (one query at a time)
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query.reshape(1, -1), top_k)
+            timings.append((time.perf_counter() - start) * 1000)
+        recall, _ = measure_recall(index, queries, truth, top_k)
+
+        timings.sort()
+        p50 = timings[len(timings) // 2]
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        if mode == "flat":
+            baseline_ms = p50
+
+        rows.append({
+            "mode": mode,
+            "params": build["params"],
+            "build_time_ms": build["build_time_ms"],
+            "recall_at_k": round(recall, 4),
+            "p50_ms": round(p50, 4),
+            "p95_ms": round(p95, 4),
+            "speedup_vs_flat": round(baseline_ms / p50, 2) if baseline_ms and p50 else None
+        })
+    return rows
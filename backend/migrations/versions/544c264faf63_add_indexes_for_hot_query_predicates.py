@@ -0,0 +1,49 @@
+"""add indexes for hot query predicates
+
+Revision ID: 544c264faf63
+Revises: 
+Create Date: 2026-10-17 05:02:50.036932
+
+First revision. Tables were created with Base.metadata.create_all before
+migrations existed, so this revision only adds the indexes; databases created
+from the current models already have them, hence if_not_exists.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '544c264faf63'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ("ix_messages_ticket_id_created_at", "messages", ["ticket_id", "created_at"]),
+    ("ix_chat_messages_conversation_id_created_at", "chat_messages", ["conversation_id", "created_at"]),
+    ("ix_orders_customer_id_created_at", "orders", ["customer_id", "created_at"]),
+    ("ix_order_items_order_id", "order_items", ["order_id"]),
+    ("ix_order_items_product_id", "order_items", ["product_id"]),
+    ("ix_notifications_user_id_timestamp", "notifications", ["user_id", "timestamp"]),
+    ("ix_refund_requests_customer_id_status", "refund_requests", ["customer_id", "status"]),
+    ("ix_return_requests_customer_id_status", "return_requests", ["customer_id", "status"]),
+    ("ix_tickets_related_order_id", "tickets", ["related_order_id"]),
+    # Found by scripts/audit_query_plans.py
+    ("ix_tickets_created_at_id", "tickets", ["created_at", "id"]),
+    ("ix_chat_conversations_customer_id", "chat_conversations", ["customer_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,50 @@
+"""add llm call logs
+
+Revision ID: 778fee689a69
+Revises: 544c264faf63
+Create Date: 2026-10-17 05:25:40.673501
+
+Table of per-call LLM telemetry (app.models.ai_copilot.LLMCallLog). Earlier builds
+created it at runtime from the telemetry writer, and create_all databases have it
+too, hence if_not_exists.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '778fee689a69'
+down_revision: Union[str, Sequence[str], None] = '544c264faf63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'llm_call_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('feature', sa.String(length=50), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=True),
+        sa.Column('tier', sa.Integer(), nullable=True),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+        sa.Column('completion_tokens', sa.Integer(), nullable=True),
+        sa.Column('latency_ms', sa.Integer(), nullable=False),
+        sa.Column('time_to_first_token_ms', sa.Integer(), nullable=True),
+        sa.Column('cache', sa.String(length=20), nullable=False),
+        sa.Column('streamed', sa.Boolean(), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index('ix_llm_call_logs_created_at', 'llm_call_logs', ['created_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_llm_call_logs_created_at', table_name='llm_call_logs', if_exists=True)
+    op.drop_table('llm_call_logs', if_exists=True)
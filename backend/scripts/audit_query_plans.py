@@ -0,0 +1,205 @@
+"""
+Query plan audit for the app's hot queries
+
+Runs EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (PostgreSQL) over a catalogue of the queries
+the API routes issue, built with the same ORM expressions, and flags every full table
+scan. Queries are planned, never executed, so the audit is safe on a production copy.
+
+Apply the index migration first (alembic upgrade head); a scan that remains means a
+predicate without an index.
+
+Usage:
+    python scripts/audit_query_plans.py                     # the configured database
+    python scripts/audit_query_plans.py --database-url sqlite:///./app/instance/intellica.db
+    python scripts/audit_query_plans.py --json --strict     # exit 1 on any full scan
+"""
+import sys
+import os
+import argparse
+import json
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.core.config import settings
+from app.models import (
+    ChatConversation, ChatMessage, Message, Notification, Order, OrderItem, RefundRequest,
+    ReturnRequest, Ticket, TicketStatus, TrackingInfo, User, Customer, Agent
+)
+
+CUSTOMER_ID = 1
+AGENT_ID = 2
+PAGE = 101  # keyset_page fetches one row beyond the page
+
+
+def _message_count():
+    return select(func.count(Message.id)).where(Message.ticket_id == Ticket.id).correlate(Ticket).scalar_subquery()
+
+
+def _after(query, created_column, id_column):
+    """The keyset predicate of a page after the first"""
+    created_at = datetime.utcnow() - timedelta(days=1)
+    return query.filter(or_(
+        created_column < created_at, (created_column == created_at) & (id_column < "x"), created_column.is_(None)
+    ))
+
+
+def _agent_tickets(db):
+    query = db.query(Ticket, User.full_name, User.email, _message_count()).outerjoin(
+        User, User.id == Ticket.customer_id
+    ).filter(or_(Ticket.agent_id == AGENT_ID, Ticket.agent_id.is_(None)))
+    return _after(query, Ticket.created_at, Ticket.id).order_by(Ticket.created_at.desc().nulls_last(), Ticket.id.desc()).limit(PAGE)
+
+
+def _supervisor_tickets(db):
+    customer, agent = aliased(User), aliased(User)
+    query = db.query(Ticket, customer.full_name, customer.email, agent.full_name).outerjoin(
+        customer, customer.id == Ticket.customer_id
+    ).outerjoin(agent, agent.id == Ticket.agent_id)
+    return query.order_by(Ticket.created_at.desc().nulls_last(), Ticket.id.desc()).limit(PAGE)
+
+
+def _agent_customers(db):
+    total_orders = select(func.count(Order.id)).where(Order.customer_id == User.id).correlate(User).scalar_subquery()
+    total_tickets = select(func.count(Ticket.id)).where(Ticket.customer_id == User.id).correlate(User).scalar_subquery()
+    return db.query(User, Customer.member_since, total_orders, total_tickets).outerjoin(
+        Customer, Customer.user_id == User.id
+    ).filter(
+        User.id.in_(select(Ticket.customer_id).where(Ticket.agent_id == AGENT_ID))
+    ).order_by(User.created_at.desc().nulls_last(), User.id.desc()).limit(PAGE)
+
+
+def _supervisor_agents(db):
+    solved = select(func.count(Ticket.id)).where(
+        Ticket.agent_id == User.id, Ticket.status.in_([TicketStatus.RESOLVED, TicketStatus.CLOSED])
+    ).correlate(User).scalar_subquery()
+    return db.query(User, Agent, solved).join(Agent).filter(User.role == "AGENT").order_by(
+        User.created_at.desc().nulls_last(), User.id.desc()
+    ).limit(PAGE)
+
+
+def _vendor_order_ids(db):
+    return db.query(OrderItem.order_id).filter(OrderItem.product_id.in_(["p1", "p2"])).distinct()
+
+
+# (name, route that issues it, query builder)
+CATALOGUE = [
+    ("agent ticket page", "GET /agent/tickets", _agent_tickets),
+    ("supervisor ticket page", "GET /supervisor/tickets", _supervisor_tickets),
+    ("customer ticket page", "GET /customer/tickets", lambda db: db.query(Ticket, _message_count()).filter(
+        Ticket.customer_id == CUSTOMER_ID).order_by(Ticket.created_at.desc().nulls_last(), Ticket.id.desc()).limit(PAGE)),
+    ("customer order page", "GET /customer/orders", lambda db: db.query(Order).filter(
+        Order.customer_id == CUSTOMER_ID).order_by(Order.created_at.desc().nulls_last(), Order.id.desc()).limit(PAGE)),
+    ("order items of a page", "GET /customer/orders (selectinload)", lambda db: db.query(OrderItem).filter(
+        OrderItem.order_id.in_(["o1", "o2", "o3"]))),
+    ("agent customer page", "GET /agent/customers", _agent_customers),
+    ("supervisor agent page", "GET /supervisor/agents", _supervisor_agents),
+    ("ticket thread", "GET /agent/tickets/{id}, GET /tickets/{id}/summary", lambda db: db.query(Message).filter(
+        Message.ticket_id == "t1").order_by(Message.created_at.asc())),
+    ("chat history", "GET /chat/history/{id}", lambda db: db.query(ChatMessage).filter(
+        ChatMessage.conversation_id == "c1").order_by(ChatMessage.created_at.asc()).limit(50)),
+    ("recent chat turns", "POST /chat/message", lambda db: db.query(ChatMessage).filter(
+        ChatMessage.conversation_id == "c1").order_by(ChatMessage.created_at.desc()).limit(10)),
+    ("customer intent analytics", "GET /chat/analytics/intents", lambda db: db.query(ChatMessage).join(ChatConversation).filter(
+        ChatConversation.customer_id == CUSTOMER_ID, ChatMessage.sender_type == "CUSTOMER",
+        ChatMessage.created_at >= datetime.utcnow() - timedelta(days=7), ChatMessage.intent.isnot(None))),
+    ("chat context orders", "chat customer context", lambda db: db.query(Order).filter(
+        Order.customer_id == CUSTOMER_ID).order_by(Order.created_at.desc()).limit(5)),
+    ("chat context refunds", "chat customer context", lambda db: db.query(RefundRequest).filter(
+        RefundRequest.customer_id == CUSTOMER_ID, RefundRequest.status.in_(["REQUESTED", "UNDER_REVIEW"]))),
+    ("chat context returns", "chat customer context", lambda db: db.query(ReturnRequest).filter(
+        ReturnRequest.customer_id == CUSTOMER_ID, ReturnRequest.status.in_(["REQUESTED", "APPROVED", "IN_TRANSIT"]))),
+    ("items of an order", "chat customer context, GET /customer/orders/{id}", lambda db: db.query(OrderItem).filter(
+        OrderItem.order_id == "o1")),
+    ("notifications", "GET /{customer,agent,supervisor,vendor}/notifications", lambda db: db.query(Notification).filter(
+        Notification.user_id == CUSTOMER_ID).order_by(Notification.timestamp.desc()).limit(20)),
+    ("order tracking", "GET /customer/orders/track/{id}", lambda db: db.query(TrackingInfo).filter(
+        TrackingInfo.tracking_number == "TRK1")),
+    ("vendor product orders", "vendor dashboard and analytics", _vendor_order_ids),
+    ("vendor complaint tickets", "vendor dashboard and analytics", lambda db: db.query(Ticket).filter(
+        Ticket.related_order_id.in_(["o1", "o2", "o3"]))),
+]
+
+
+class _Planned(Exception):
+    """Raised after planning so the query itself never runs"""
+
+
+def explain(engine, build) -> list:
+    """Plan lines for one catalogue query"""
+    dialect = engine.dialect.name
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    plan = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+        # SQLite rows are (id, parent, notused, detail); PostgreSQL rows are single text lines
+        plan.extend(row[-1] for row in rows)
+        raise _Planned()
+
+    with Session(engine) as db:
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            build(db).all()
+        except _Planned:
+            pass
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+    return plan
+
+
+def full_scans(plan: list, dialect: str) -> list:
+    """Plan lines that read a whole table rather than searching an index"""
+    if dialect == "sqlite":
+        # "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX i" walks an index in order
+        return [line for line in plan if line.startswith("SCAN ") and " USING " not in line]
+    return [line.strip() for line in plan if "Seq Scan" in line]
+
+
+def audit(database_url: str) -> list:
+    """Plan every catalogue query against database_url"""
+    engine = create_engine(database_url)
+    report = []
+    for name, route, build in CATALOGUE:
+        plan = explain(engine, build)
+        report.append({
+            "query": name,
+            "route": route,
+            "plan": plan,
+            "full_scans": full_scans(plan, engine.dialect.name)
+        })
+    engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--strict", action="store_true", help="Exit with status 1 if any query scans a whole table")
+    args = parser.parse_args()
+
+    report = audit(args.database_url)
+    flagged = [row for row in report if row["full_scans"]]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("=" * 88)
+        print(f"Query plan audit: {len(report)} queries, {len(flagged)} with full table scans")
+        print("=" * 88)
+        for row in report:
+            status = "FULL SCAN" if row["full_scans"] else "ok"
+            print(f"{status:<10}{row['query']:<28}{row['route']}")
+            for line in row["full_scans"]:
+                print(f"{'':<10}  {line}")
+
+    if args.strict and flagged:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Recall-vs-latency report for the FAISS index modes used by RAGService
+
+Compares flat, IVF-Flat, IVF-PQ and HNSW against the exact (flat) baseline.
+
+Usage:
+    python scripts/benchmark_ann_index.py                 # vectors from faiss_index/faiss.index
+    python scripts/benchmark_ann_index.py --synthetic 50000
+"""
+import sys
+import os
+import argparse
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+
+from app.services.vector_index import compare_index_modes, INDEX_MODES
+
+
+def load_index_vectors(index_file: str) -> np.ndarray:
+    """Reconstruct the stored vectors of an existing index"""
+    index = faiss.read_index(index_file)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthetic_vectors(count: int, dimension: int, clusters: int = 256) -> np.ndarray:
+    """Clustered unit vectors, closer to real sentence embeddings than uniform noise"""
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(clusters, dimension)).astype('float32')
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.35 * rng.normal(size=(count, dimension)).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype('float32')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-file", default="faiss_index/faiss.index")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic vectors instead of the stored index")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--modes", default=",".join(INDEX_MODES))
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_vectors(args.synthetic + args.queries, args.dimension)
+        corpus, queries = vectors[:args.synthetic], vectors[args.synthetic:]
+    else:
+        corpus = load_index_vectors(args.index_file)
+        # Perturbed corpus vectors stand in for real queries
+        rng = np.random.default_rng(7)
+        rows = rng.choice(len(corpus), min(args.queries, len(corpus)), replace=False)
+        queries = corpus[rows] + 0.05 * rng.normal(size=(len(rows), corpus.shape[1])).astype('float32')
+
+    report = compare_index_modes(corpus, queries, top_k=args.top_k, modes=args.modes.split(","))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 88)
+    print(f"FAISS index modes: {len(corpus)} vectors, {len(queries)} queries, recall@{args.top_k}")
+    print("=" * 88)
+    print(f"{'mode':<10}{'params':<20}{'build ms':>10}{'recall':>10}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>10}")
+    for row in report:
+        params = ",".join(f"{k}={v}" for k, v in row["params"].items()) or "-"
+        speedup = f"{row['speedup_vs_flat']}x" if row["speedup_vs_flat"] else "-"
+        print(f"{row['mode']:<10}{params:<20}{row['build_time_ms']:>10}{row['recall_at_k']:>10.3f}"
+              f"{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{speedup:>10}")
+
+
+if __name__ == "__main__":
+    main()
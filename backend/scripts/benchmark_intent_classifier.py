@@ -0,0 +1,71 @@
+"""
+Coverage and agreement of the rule-based intent classifier on a labelled set
+
+Reports, for scope (in/out of scope) and intent classification, the share of
+messages the rules decide locally (LLM calls avoided) and how often those local
+decisions agree with the label. With --with-llm the escalated messages are sent
+to the LLM as well, giving the accuracy of the full rules-then-LLM pipeline.
+
+Usage:
+    python scripts/benchmark_intent_classifier.py
+    python scripts/benchmark_intent_classifier.py --dataset my_labels.json --with-llm
+"""
+import sys
+import os
+import argparse
+import json
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.intent_classifier import RuleIntentClassifier, agreement
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_benchmark.json")
+
+
+def pipeline_accuracy(examples):
+    """Accuracy of RAGService's rules-then-LLM classification, and LLM calls made"""
+    from app.services.rag_service import get_rag_service
+
+    rag = get_rag_service()
+    rag.intent_classifier = RuleIntentClassifier()  # fresh counters
+
+    scope_correct = intent_correct = intent_total = 0
+    for example in examples:
+        scope = rag.classify_intent(example["text"])
+        scope_correct += scope.get("in_scope", True) == example["in_scope"]
+        if "intent" in example:
+            intent_total += 1
+            intent_correct += rag.analyze_intent_and_sentiment(example["text"]).get("intent") == example["intent"]
+
+    stats = rag.intent_classifier.stats()
+    return {
+        "scope_accuracy": round(scope_correct / len(examples), 4),
+        "intent_accuracy": round(intent_correct / intent_total, 4) if intent_total else None,
+        "llm_calls": stats["scope"]["escalated"] + stats["analysis"]["escalated"],
+        "llm_calls_without_rules": len(examples) + intent_total
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET, help="JSON list of {text, in_scope, intent?}")
+    parser.add_argument("--with-llm", action="store_true", help="also classify escalated messages with the LLM")
+    args = parser.parse_args()
+
+    with open(args.dataset, encoding="utf-8") as f:
+        examples = json.load(f)
+
+    classifier = RuleIntentClassifier()
+    start = time.perf_counter()
+    report = agreement(classifier, examples)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    report["rules_ms_per_message"] = round(elapsed_ms / (2 * len(examples)), 4)
+
+    if args.with_llm:
+        report["pipeline"] = pipeline_accuracy(examples)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
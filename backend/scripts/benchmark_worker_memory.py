@@ -0,0 +1,137 @@
+"""
+Per-worker memory report for loading the FAISS index privately vs memory-mapped
+
+Starts N worker processes (as uvicorn/gunicorn workers would be), each loading the same
+faiss.index and serving searches, then samples every worker's memory while all of them
+are alive. With a private load each worker holds its own copy (anonymous memory); with
+RAG_INDEX_MMAP the vectors live in the page cache once and PSS shrinks with N.
+
+Usage:
+    python scripts/benchmark_worker_memory.py                       # faiss_index/faiss.index
+    python scripts/benchmark_worker_memory.py --synthetic 200000 --mode ivf_flat --workers 4
+"""
+import sys
+import os
+import argparse
+import json
+import tempfile
+import multiprocessing as mp
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.services.vector_index import build_index, read_index, write_index, INDEX_MODES
+
+
+def read_memory() -> dict:
+    """RSS, PSS and private/anonymous memory of this process in MB (Linux)"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    mb = lambda kb: round(kb / 1024, 1)
+    return {
+        "rss_mb": mb(fields.get("Rss", 0)),
+        "pss_mb": mb(fields.get("Pss", 0)),
+        "private_mb": mb(fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)),
+        "anonymous_mb": mb(fields.get("Anonymous", 0))
+    }
+
+
+def worker(index_file, use_mmap, queries, top_k, loaded, measured, results):
+    """Load the index, search it, then report memory once every worker has done the same"""
+    before = read_memory()
+    index, mapped = read_index(index_file, mmap=use_mmap)
+    index.search(queries, top_k)
+    loaded.wait()
+    after = read_memory()
+    results.put({"pid": os.getpid(), "mmapped": mapped, "before": before, "after": after})
+    # Stay alive until every sample is taken so shared pages are counted across workers
+    measured.wait()
+
+
+def run_workers(index_file: str, use_mmap: bool, workers: int, queries: np.ndarray, top_k: int) -> list:
+    """Run one round of workers and collect their memory samples"""
+    ctx = mp.get_context("spawn")
+    loaded, measured = ctx.Barrier(workers), ctx.Barrier(workers)
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=worker, args=(index_file, use_mmap, queries, top_k, loaded, measured, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return sorted(samples, key=lambda sample: sample["pid"])
+
+
+def summarise(samples: list) -> dict:
+    return {
+        key: round(sum(sample["after"][key] for sample in samples), 1)
+        for key in ("rss_mb", "pss_mb", "private_mb", "anonymous_mb")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-file", default="faiss_index/faiss.index")
+    parser.add_argument("--synthetic", type=int, default=0, help="Build an index over N random vectors instead")
+    parser.add_argument("--mode", default="flat", choices=INDEX_MODES, help="Index mode for --synthetic")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    queries = rng.normal(size=(args.queries, args.dimension)).astype('float32')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_file = args.index_file
+        if args.synthetic:
+            vectors = rng.normal(size=(args.synthetic, args.dimension)).astype('float32')
+            index, _ = build_index(vectors, mode=args.mode, tune=False)
+            index_file = os.path.join(tmp_dir, "faiss.index")
+            write_index(index, index_file)
+            del vectors, index
+        else:
+            index, _ = read_index(index_file, mmap=False)
+            queries = queries[:, :index.d]
+            del index
+
+        report = {
+            "index_file": index_file,
+            "index_mb": round(os.path.getsize(index_file) / 2 ** 20, 1),
+            "workers": args.workers,
+            "private": run_workers(index_file, False, args.workers, queries, args.top_k),
+            "mmap": run_workers(index_file, True, args.workers, queries, args.top_k)
+        }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 88)
+    print(f"Worker memory: {report['index_mb']} MB index, {args.workers} workers (after load + search)")
+    print("=" * 88)
+    print(f"{'load':<10}{'pid':>8}{'mapped':>8}{'RSS MB':>10}{'PSS MB':>10}{'private MB':>12}{'anon MB':>10}{'anon +MB':>10}")
+    for label in ("private", "mmap"):
+        for sample in report[label]:
+            after, before = sample["after"], sample["before"]
+            print(f"{label:<10}{sample['pid']:>8}{str(sample['mmapped']):>8}{after['rss_mb']:>10}{after['pss_mb']:>10}"
+                  f"{after['private_mb']:>12}{after['anonymous_mb']:>10}"
+                  f"{round(after['anonymous_mb'] - before['anonymous_mb'], 1):>10}")
+    print("-" * 88)
+    for label in ("private", "mmap"):
+        total = summarise(report[label])
+        print(f"{label:<10}{'total':>16}{total['rss_mb']:>10}{total['pss_mb']:>10}"
+              f"{total['private_mb']:>12}{total['anonymous_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ AI Copilot Feature Test with Real Database Data
 Tests all GenAI features using actual tickets, refunds, and user data
 """
 
+import asyncio
 import sys
 from pathlib import Path
 from datetime import datetime
@@ -65,7 +66,7 @@ try:
                 
                 print("\n--- Generating AI Summary ---")
                 try:
-                    summary = copilot_service.generate_ticket_summary(ticket, messages, db)
+                    summary = asyncio.run(copilot_service.generate_ticket_summary(ticket, messages, db))
                     
                     print("\nAI-Generated Summary:")
                     print(f"  Summary: {summary.get('summary', 'N/A')}")
@@ -107,9 +108,9 @@ try:
             
             print("\n--- Generating Response Suggestions ---")
             try:
-                suggestions = copilot_service.generate_response_suggestions(
+                suggestions = asyncio.run(copilot_service.generate_response_suggestions(
                     ticket, messages, customer, db
-                )
+                ))
                 
                 print(f"\nGenerated {len(suggestions)} suggestions:\n")
                 
@@ -178,9 +179,9 @@ try:
             
             print("\n--- Generating Refund Explanation ---")
             try:
-                explanation = copilot_service.generate_refund_explanation(
+                explanation = asyncio.run(copilot_service.generate_refund_explanation(
                     refund, fraud_check, db
-                )
+                ))
                 
                 print("\nAI-Generated Explanation:")
                 print(f"  Decision: {explanation.get('decision', 'N/A')}")
@@ -3,6 +3,7 @@ AI Copilot Feature Validation Script
 Comprehensive error checking and validation for all AI Copilot components
 """
 
+import asyncio
 import sys
 from pathlib import Path
 import traceback
@@ -274,7 +275,7 @@ try:
     ticket = MockTicket()
     messages = [MockMessage(1, "Test message")]
     
-    result = copilot_service.generate_ticket_summary(ticket, messages, None)
+    result = asyncio.run(copilot_service.generate_ticket_summary(ticket, messages, None))
     
     if isinstance(result, dict):
         passed.append("Ticket summary generation")
@@ -324,9 +325,9 @@ try:
     messages = [MockMessage(1, "Test message")]
     customer = MockCustomer()
     
-    result = copilot_service.generate_response_suggestions(
+    result = asyncio.run(copilot_service.generate_response_suggestions(
         ticket, messages, customer, None
-    )
+    ))
     
     if isinstance(result, list):
         passed.append("Response suggestions generation")
@@ -368,7 +369,7 @@ try:
     
     refund = MockRefund()
     
-    result = copilot_service.generate_refund_explanation(refund, None, None)
+    result = asyncio.run(copilot_service.generate_refund_explanation(refund, None, None))
     
     if isinstance(result, dict):
         passed.append("Refund explanation generation")
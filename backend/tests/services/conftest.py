@@ -0,0 +1,93 @@
+"""
+Shared fixtures for the RAG service tests
+
+Modules pick the embedder, knowledge base, LLM and settings by overriding the
+embedder, documents, llm and rag_settings fixtures, or per test with
+@pytest.mark.parametrize.
+"""
+import hashlib
+import numpy as np
+import pytest
+
+from app.services import rag_service as rag_module
+from app.services.rag_service import RAGService
+
+
+class HashEmbeddingService:
+    """Deterministic embeddings seeded by a hash of the text, unrelated to meaning; counts encoded texts"""
+
+    def __init__(self, dimension=16):
+        self.dimension = dimension
+        self.encoded = 0
+
+    def is_available(self):
+        return True
+
+    def encode(self, texts, batch_size=32):
+        self.encoded += len(texts)
+        rows = [
+            np.random.default_rng(int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)).normal(size=self.dimension)
+            for text in texts
+        ]
+        return np.array(rows, dtype='float32').reshape(len(texts), self.dimension)
+
+    def encode_single(self, text):
+        return self.encode([text])[0]
+
+    async def aencode_single(self, text):
+        return self.encode_single(text)
+
+
+@pytest.fixture
+def make_doc():
+    """Build a knowledge base document the way knowledge_loader returns it"""
+    def make(name, content, category="Policy", subcategory="customer", **fields):
+        return {
+            "title": name.title(),
+            "content": content,
+            "category": category,
+            "subcategory": subcategory,
+            "file_name": f"{name}.md",
+            "file_path": f"knowledge_base/{subcategory}_docs/{name}.md",
+            "tags": [name],
+            "keywords": [],
+            **fields
+        }
+    return make
+
+
+@pytest.fixture
+def embedder():
+    """Embedding service the RAG service is built with"""
+    return HashEmbeddingService()
+
+
+@pytest.fixture
+def documents():
+    """Knowledge base returned by knowledge_loader; tests may change it before re-indexing"""
+    return []
+
+
+@pytest.fixture
+def llm():
+    """LLM stand-in attached to the RAG service, or None to keep the real client"""
+    return None
+
+
+@pytest.fixture
+def rag_settings():
+    """Settings overridden for the RAG service under test"""
+    return {}
+
+
+@pytest.fixture
+def rag(tmp_path, monkeypatch, embedder, documents, llm, rag_settings):
+    """RAGService over a temporary index directory, not yet indexed"""
+    monkeypatch.setattr(rag_module, "get_embedding_service", lambda: embedder)
+    monkeypatch.setattr(rag_module.knowledge_loader, "load_all_documents", lambda: documents)
+    for name, value in rag_settings.items():
+        monkeypatch.setattr(rag_module.settings, name, value)
+    service = RAGService(index_path=str(tmp_path / "faiss_index"))
+    if llm is not None:
+        service.llm_service = llm
+    return service
@@ -0,0 +1,190 @@
+"""
+Test cases for the semantic answer cache in front of RAGService.answer_question
+"""
+import asyncio
+import hashlib
+import re
+import numpy as np
+import pytest
+
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.rag_service import RAGService
+
+
+class BagOfWordsEmbeddingService:
+    """Hashed bag-of-words vectors, so rephrasings with the same words are near-identical"""
+
+    def is_available(self):
+        return True
+
+    def encode(self, texts, batch_size=32):
+        rows = np.zeros((len(texts), 64), dtype='float32')
+        for i, text in enumerate(texts):
+            for word in re.findall(r"[a-z0-9]+", text.lower()):
+                rows[i, int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+        return rows
+
+    def encode_single(self, text):
+        return self.encode([text])[0]
+
+    async def aencode_single(self, text):
+        return self.encode_single(text)
+
+
+class CountingLLMService:
+    """LLM stand-in that counts generate calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def check_health(self):
+        return True
+
+    def generate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500, feature=None):
+        self.calls += 1
+        if "Respond with only a JSON object" in prompt:
+            return {"success": True, "text": '{"in_scope": true, "confidence": 0.9, "reason": "refund"}'}
+        return {"success": True, "text": "Refunds are accepted within 30 days."}
+
+    async def agenerate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500, feature=None):
+        return self.generate(prompt, system_prompt, temperature, max_tokens)
+
+    async def astream(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500, feature=None):
+        result = self.generate(prompt, system_prompt, temperature, max_tokens)
+        for word in result["text"].split(" "):
+            yield {"delta": word + " "}
+        yield {**result, "done": True, "model": "counting", "generation_time_ms": 0, "time_to_first_token_ms": 0}
+
+
+def vector(*values):
+    return np.array(values, dtype='float32')
+
+
+class TestSemanticAnswerCache:
+    """Test suite for SemanticAnswerCache"""
+
+    def test_similar_query_hits_and_dissimilar_misses(self):
+        """Test that a hit requires cosine similarity above the threshold"""
+        cache = SemanticAnswerCache(threshold=0.95)
+        cache.store(vector(1, 0, 0), {"response": "a"})
+        answer, similarity = cache.lookup(vector(1, 0.05, 0))
+        assert answer["response"] == "a" and similarity > 0.95
+        assert cache.lookup(vector(0, 1, 0)) is None
+
+    def test_scope_must_match(self):
+        """Test that answers are only reused under the same filters"""
+        cache = SemanticAnswerCache()
+        cache.store(vector(1, 0), {"response": "a"}, scope=("Policy", 5))
+        assert cache.lookup(vector(1, 0), scope=(None, 5)) is None
+        assert cache.lookup(vector(1, 0), scope=("Policy", 5)) is not None
+
+    def test_expired_entries_are_dropped(self):
+        """Test that entries past their TTL are not returned"""
+        cache = SemanticAnswerCache(ttl_seconds=-1)
+        cache.store(vector(1, 0), {"response": "a"})
+        assert cache.lookup(vector(1, 0)) is None
+        assert cache.stats()["entries"] == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test size-bounded LRU eviction"""
+        cache = SemanticAnswerCache(max_entries=2)
+        cache.store(vector(1, 0, 0), {"response": "a"})
+        cache.store(vector(0, 1, 0), {"response": "b"})
+        cache.lookup(vector(1, 0, 0))
+        cache.store(vector(0, 0, 1), {"response": "c"})
+        assert cache.lookup(vector(0, 1, 0)) is None
+        assert cache.lookup(vector(1, 0, 0))[0]["response"] == "a"
+        assert cache.stats()["evictions"] == 1
+
+
+class TestAnswerQuestionCache:
+    """Test suite for answer caching in RAGService.answer_question"""
+
+    @pytest.fixture
+    def embedder(self):
+        return BagOfWordsEmbeddingService()
+
+    @pytest.fixture
+    def documents(self, make_doc):
+        return [make_doc("refund_policy", "What is your refund policy? Refunds are accepted within 30 days.",
+                         title="Refund Policy", tags=["refund"], keywords=["refund"])]
+
+    @pytest.fixture
+    def llm(self):
+        return CountingLLMService()
+
+    @pytest.fixture
+    def rag_settings(self):
+        # Every question costs a scope classification and an answer call
+        return {"RAG_RETRIEVAL_MODE": "bm25", "INTENT_RULES_ENABLED": False}
+
+    @pytest.fixture
+    def rag(self, rag):
+        rag.index_knowledge_base()
+        return rag
+
+    def test_repeated_question_skips_llm_calls(self, rag):
+        """Test that a rephrased question is answered from the cache"""
+        first = rag.answer_question("What is your refund policy?")
+        assert rag.llm_service.calls == 2
+        second = rag.answer_question("what is your refund policy")
+        assert rag.llm_service.calls == 2
+        assert second["cached"] is True
+        assert second["response"] == first["response"]
+
+    def test_async_answer_shares_cache(self, rag):
+        """Test that aanswer_question reuses answers stored by answer_question"""
+        first = rag.answer_question("What is your refund policy?")
+        second = asyncio.run(rag.aanswer_question("what is your refund policy"))
+        assert rag.llm_service.calls == 2
+        assert second["cached"] is True
+        assert second["response"] == first["response"]
+
+    def test_streamed_answer_is_cached(self, rag):
+        """Test that a streamed answer is stored and a repeat streams from the cache"""
+        async def stream(query):
+            return [event async for event in rag.astream_answer(query)]
+
+        first = asyncio.run(stream("What is your refund policy?"))
+        assert len(first) > 2 and first[-1]["done"]
+        assert first[-1]["response"] == "Refunds are accepted within 30 days."
+
+        second = asyncio.run(stream("what is your refund policy"))
+        assert rag.llm_service.calls == 2
+        assert second[0]["delta"] == first[-1]["response"]
+        assert second[-1]["cached"] is True
+
+    def test_personalised_and_follow_up_questions_bypass_cache(self, rag):
+        """Test that order context or earlier turns disable caching"""
+        rag.answer_question("What is your refund policy?", customer_context={"has_orders": True})
+        rag.answer_question("What is your refund policy?", conversation_history=[
+            {"role": "CUSTOMER", "content": "I bought a TV"},
+            {"role": "CUSTOMER", "content": "What is your refund policy?"}
+        ])
+        assert rag.answer_cache.stats()["entries"] == 0
+        assert rag.llm_service.calls == 4
+
+    def test_reindex_with_changes_invalidates(self, rag, documents):
+        """Test that changing the knowledge base clears cached answers"""
+        rag.answer_question("What is your refund policy?")
+        documents[0] = {**documents[0], "content": "Refunds are accepted within 60 days."}
+        rag.index_knowledge_base()
+        assert rag.answer_cache.stats()["entries"] == 0
+
+    def test_reindex_by_another_worker_invalidates(self, rag, documents):
+        """Test that a worker drops its cached answers once another worker re-indexes the same files"""
+        rag.answer_question("What is your refund policy?")
+        other_worker = RAGService(index_path=str(rag.index_path))
+        other_worker.llm_service = rag.llm_service
+        documents[0] = {**documents[0], "content": "Refunds are accepted within 60 days."}
+        other_worker.index_knowledge_base()
+
+        answer = rag.answer_question("what is your refund policy")
+        assert answer.get("cached") is not True
+        assert rag.llm_service.calls == 4
+
+    def test_unchanged_reindex_keeps_cache(self, rag):
+        """Test that re-indexing an unchanged knowledge base leaves cached answers valid"""
+        rag.answer_question("What is your refund policy?")
+        rag.index_knowledge_base()
+        assert rag.answer_question("what is your refund policy")["cached"] is True
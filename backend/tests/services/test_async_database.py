@@ -0,0 +1,87 @@
+"""
+Test cases for the async engine, get_async_db and the async auth helpers
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.security import create_access_token
+from app.database import async_database_url, create_app_engine, create_async_app_engine
+from app.models import Base
+from app.models.user import Customer, User, UserRole
+from app.schemas.user import UserCreate
+from app.services.auth import aauthenticate_user, acreate_user, aget_current_user
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_app_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return url
+
+
+def run_with_session(db_url, work):
+    """Run work(db) on an AsyncSession in a fresh event loop"""
+    async def run():
+        engine = create_async_app_engine(db_url)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with Session() as db:
+                return await work(db)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+class TestAsyncDatabase:
+    """Test suite for create_async_app_engine and the async auth helpers"""
+
+    def test_async_driver_urls(self):
+        """Test that sync URLs map onto their asyncio drivers"""
+        assert async_database_url("sqlite:///./app/instance/intellica.db") == "sqlite+aiosqlite:///./app/instance/intellica.db"
+        assert async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+        with pytest.raises(ValueError):
+            async_database_url("mysql://u:p@db/app")
+
+    def test_async_connections_get_pragmas(self, db_url):
+        """Test that aiosqlite connections run with the same PRAGMAs as the sync engine"""
+        async def work(db):
+            return (await db.execute(text("PRAGMA journal_mode"))).scalar()
+
+        assert run_with_session(db_url, work) == "wal"
+
+    def test_create_authenticate_and_resolve_user(self, db_url):
+        """Test that a registered user can log in and is resolved from their token"""
+        new_user = UserCreate(email="ada@example.com", password="secret", full_name="Ada Lovelace", role=UserRole.CUSTOMER)
+
+        async def work(db):
+            created = await acreate_user(db, new_user)
+            profile = await db.scalar(select(Customer).filter(Customer.user_id == created.id))
+            authenticated = await aauthenticate_user(db, "ada@example.com", "secret", role="customer")
+            wrong_password = await aauthenticate_user(db, "ada@example.com", "nope")
+            credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(subject="ada@example.com"))
+            current = await aget_current_user(credentials, db)
+            return created, profile, authenticated, wrong_password, current
+
+        created, profile, authenticated, wrong_password, current = run_with_session(db_url, work)
+        assert profile is not None
+        assert authenticated.id == created.id == current.id
+        assert wrong_password is False
+
+    def test_duplicate_email_is_rejected(self, db_url):
+        """Test that acreate_user refuses an email that is already registered"""
+        new_user = UserCreate(email="ada@example.com", password="secret", full_name="Ada Lovelace", role=UserRole.AGENT)
+
+        async def work(db):
+            await acreate_user(db, new_user)
+            with pytest.raises(HTTPException) as error:
+                await acreate_user(db, new_user)
+            return error.value.status_code, len((await db.scalars(select(User))).all())
+
+        assert run_with_session(db_url, work) == (400, 1)
@@ -0,0 +1,103 @@
+"""
+Test cases for the async copilot endpoints keeping database work off the event loop
+"""
+from datetime import datetime
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app.main import app
+from app.models import Base
+from app.models.ai_copilot import TicketSummary
+from app.models.ticket import Message, Ticket, TicketPriority, TicketStatus
+from app.models.user import Agent, Customer, User, UserRole
+from app.services.auth import get_current_user
+from app.services.copilot_service import copilot_service
+
+AGENT_ID = 1
+CUSTOMER_ID = 2
+START = datetime(2025, 1, 1)
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def threads(monkeypatch):
+    """Seeded in-memory database; records the thread of every SQL statement and of the event loop"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    db.add(User(id=AGENT_ID, email="agent@example.com", password="x", full_name="Agent Smith", role=UserRole.AGENT, created_at=START))
+    db.add(Agent(user_id=AGENT_ID, department="Support", status="AVAILABLE"))
+    db.add(User(id=CUSTOMER_ID, email="buyer@example.com", password="x", full_name="Frequent Buyer", role=UserRole.CUSTOMER, created_at=START))
+    db.add(Customer(user_id=CUSTOMER_ID))
+    db.add(Ticket(id="T1", customer_id=CUSTOMER_ID, agent_id=AGENT_ID, subject="Late parcel", description="Where is it?",
+                  status=TicketStatus.RESOLVED, priority=TicketPriority.HIGH, created_at=START, updated_at=START))
+    db.add(Ticket(id="T2", customer_id=CUSTOMER_ID, subject="Refund", description="Please refund",
+                  status=TicketStatus.OPEN, priority=TicketPriority.LOW, created_at=START))
+    db.add(Message(id="T1-M0", ticket_id="T1", sender_id=CUSTOMER_ID, content="Still waiting"))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    recorded = {"statements": set(), "loop": set(), "Session": Session}
+    listener = lambda conn, cursor, statement, params, context, executemany: recorded["statements"].add(threading.get_ident())
+    event.listen(engine, "before_cursor_execute", listener)
+
+    async def agenerate(prompt, system_prompt=None, temperature=0.7, max_tokens=500, feature=None):
+        recorded["loop"].add(threading.get_ident())
+        return {"success": False, "text": "", "model": "test", "generation_time_ms": 0}
+
+    monkeypatch.setattr(copilot_service.llm, "agenerate", agenerate)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: User(id=AGENT_ID, email="agent@example.com", full_name="Agent Smith")
+    yield recorded
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+class TestCopilotEndpoints:
+    """Test suite for the async copilot handlers"""
+
+    @pytest.mark.parametrize("method, url, body", [
+        ("get", "/api/v1/copilot/tickets/T1/summary", None),
+        ("get", "/api/v1/copilot/supervisor/team-insights", None),
+        ("get", f"/api/v1/copilot/supervisor/agent-performance/{AGENT_ID}", None),
+        ("post", "/api/v1/copilot/supervisor/generate-report", {"type": "monthly"}),
+        ("get", "/api/v1/copilot/supervisor/ticket-assignment/T2", None),
+    ])
+    def test_queries_run_off_the_event_loop(self, threads, method, url, body):
+        """Test that the handlers answer and none of their SQL runs on the event loop thread"""
+        response = client.request(method, url, json=body)
+
+        assert response.status_code == 200
+        assert threads["loop"] and threads["statements"]
+        assert not threads["loop"] & threads["statements"]
+
+    def test_summary_is_saved_then_served_cached(self, threads):
+        """Test that a generated summary is stored and returned from the database next time"""
+        first = client.get("/api/v1/copilot/tickets/T1/summary").json()
+        second = client.get("/api/v1/copilot/tickets/T1/summary").json()
+
+        assert first["cached"] is False and second["cached"] is True
+        assert second["id"] == first["id"]
+        db = threads["Session"]()
+        assert db.query(TicketSummary).filter(TicketSummary.ticket_id == "T1").one().viewed_by_agents == [AGENT_ID]
+        db.close()
+
+    def test_unknown_ticket_is_404(self, threads):
+        """Test that errors raised in the threadpool still reach the client"""
+        assert client.get("/api/v1/copilot/tickets/nope/summary").status_code == 404
+        assert client.get("/api/v1/copilot/supervisor/ticket-assignment/nope").status_code == 404
@@ -0,0 +1,97 @@
+"""
+Test cases for the database engine profile (pooling, SQLite PRAGMAs, read-only sessions)
+"""
+import threading
+from datetime import datetime
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import InvalidRequestError, OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import ReadOnlySession, create_app_engine, engine_options, schema_revision_status
+from app.models.ai_copilot import LLMCallLog
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+class TestDatabaseEngine:
+    """Test suite for create_app_engine and ReadOnlySession"""
+
+    def test_sqlite_connections_get_pragmas(self, db_url):
+        """Test that every pooled SQLite connection runs in WAL with the configured PRAGMAs"""
+        engine = create_app_engine(db_url)
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert engine.pool.size() == 10
+        engine.dispose()
+
+    def test_in_memory_database_skips_pool_sizing(self):
+        """Test that pool arguments are only passed for pooled databases"""
+        assert "pool_size" not in engine_options("sqlite://")
+        assert engine_options("postgresql://u:p@db/app")["pool_recycle"] == 1800
+
+    def test_concurrent_writers_wait_instead_of_failing(self, db_url):
+        """Test that writers queue on busy_timeout rather than raising "database is locked" """
+        engine = create_app_engine(db_url)
+        LLMCallLog.__table__.create(bind=engine)
+        Session = sessionmaker(bind=engine)
+        errors = []
+
+        def write(worker):
+            try:
+                for i in range(20):
+                    db = Session()
+                    db.add(LLMCallLog(created_at=datetime.utcnow(), feature=f"w{worker}", provider="groq", latency_ms=i, cache="miss", streamed=False, success=True))
+                    db.commit()
+                    db.close()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        db = Session()
+        assert errors == []
+        assert db.query(LLMCallLog).count() == 80
+        db.close()
+        engine.dispose()
+
+    def test_read_only_sessions_refuse_writes(self, db_url):
+        """Test that the read session factory can query but not write"""
+        engine = create_app_engine(db_url)
+        LLMCallLog.__table__.create(bind=engine)
+        read_engine = create_app_engine(db_url, read_only=True)
+        db = sessionmaker(bind=read_engine, class_=ReadOnlySession)()
+
+        assert db.query(LLMCallLog).count() == 0
+        db.add(LLMCallLog(created_at=datetime.utcnow(), feature="x", provider="groq", latency_ms=1, cache="miss", streamed=False, success=True))
+        with pytest.raises(InvalidRequestError):
+            db.commit()
+        db.rollback()
+        # The replica connection itself is query_only as well
+        with pytest.raises(OperationalError):
+            db.execute(text("DELETE FROM llm_call_logs"))
+        db.close()
+        read_engine.dispose()
+        engine.dispose()
+
+    def test_schema_revision_status(self, db_url):
+        """Test that a database never upgraded is reported behind the newest migration"""
+        engine = create_app_engine(db_url)
+        status = schema_revision_status(engine)
+        assert status["current"] is None and status["head"]
+        assert status["up_to_date"] is False
+
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            connection.execute(text("INSERT INTO alembic_version VALUES (:head)"), {"head": status["head"]})
+        assert schema_revision_status(engine)["up_to_date"] is True
+        engine.dispose()
@@ -0,0 +1,47 @@
+"""
+Test cases for the memory-mapped document store
+"""
+from app.services.document_store import DocumentStore
+
+
+class TestDocumentStore:
+    """Test suite for DocumentStore lookups and rewrites"""
+
+    def test_lookup_by_id(self, tmp_path):
+        """Test O(1) lookups of text and metadata by FAISS id, including sparse ids"""
+        store = DocumentStore.write(tmp_path, [
+            (0, "Refund policy: 30 days", {"title": "Refunds", "category": "Policy"}),
+            (5, "Réexpédition sous 24h", {"title": "Shipping", "category": "FAQ"})
+        ])
+        assert len(store) == 2
+        assert store.get_text(5) == "Réexpédition sous 24h"
+        assert store.get_metadata(0) == {"title": "Refunds", "category": "Policy"}
+        assert store.get_text(3) is None
+        assert 99 not in store
+
+    def test_rewrite_applies_upserts_and_deletes(self, tmp_path):
+        """Test that a rewrite keeps unchanged rows and applies changes"""
+        store = DocumentStore.write(tmp_path, [
+            (0, "a", {"title": "A"}), (1, "b", {"title": "B"}), (2, "c", {"title": "C"})
+        ])
+        store = store.rewrite({1: ("b2", {"title": "B2"}), 3: ("d", {"title": "D"})}, deletes=[2])
+        assert sorted(store.ids()) == [0, 1, 3]
+        assert store.get_text(1) == "b2"
+        assert store.get_metadata(3) == {"title": "D"}
+        assert store.get_text(0) == "a"
+
+    def test_reopen_from_disk(self, tmp_path):
+        """Test that a fresh instance maps the written store"""
+        DocumentStore.write(tmp_path, [(0, "hello", {"title": "Hi"})])
+        store = DocumentStore(tmp_path)
+        assert store.open() is True
+        assert store.get_text(0) == "hello"
+        assert DocumentStore(tmp_path / "missing").open() is False
+
+    def test_rewrite_leaves_the_old_generation_readable(self, tmp_path):
+        """Test that readers holding the previous store keep reading it after a rewrite"""
+        old = DocumentStore.write(tmp_path, [(0, "a", {"title": "A"}), (1, "b", {"title": "B"})])
+        new = old.rewrite({0: ("a2", {"title": "A2"})}, deletes=[1])
+
+        assert old.get_text(0) == "a" and old.get_metadata(1) == {"title": "B"}
+        assert new.get_text(0) == "a2" and 1 not in new
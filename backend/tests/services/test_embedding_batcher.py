@@ -0,0 +1,64 @@
+"""
+Test cases for the embedding micro-batcher
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import numpy as np
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class TestEmbeddingBatcher:
+    """Test suite for EmbeddingBatcher"""
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Test that concurrent submissions are encoded in one call and fanned back in order"""
+        calls = []
+        release = threading.Event()
+
+        def encode(texts):
+            calls.append(list(texts))
+            release.wait(1)
+            return np.array([[len(text)] for text in texts], dtype='float32')
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=16, max_wait_ms=200)
+        release.set()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            texts = ["a" * n for n in range(1, 9)]
+            results = list(pool.map(lambda text: batcher.submit(text).result(), texts))
+        batcher.stop()
+
+        assert [int(vector[0]) for vector in results] == list(range(1, 9))
+        assert len(calls) < len(texts)
+        assert batcher.stats()["items"] == 8
+
+    def test_batch_size_cap(self):
+        """Test that batches never exceed max_batch_size"""
+        sizes = []
+
+        def encode(texts):
+            sizes.append(len(texts))
+            return np.zeros((len(texts), 2), dtype='float32')
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=3, max_wait_ms=50)
+        futures = [batcher.submit(str(i)) for i in range(7)]
+        for future in futures:
+            future.result(timeout=2)
+        batcher.stop()
+        assert max(sizes) <= 3
+        assert sum(sizes) == 7
+
+    def test_encoder_failure_propagates(self):
+        """Test that waiters see the encoder's exception"""
+        def encode(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=4, max_wait_ms=1)
+        future = batcher.submit("hello")
+        try:
+            future.result(timeout=2)
+            assert False, "expected failure"
+        except RuntimeError as e:
+            assert "model unavailable" in str(e)
+        batcher.stop()
@@ -0,0 +1,55 @@
+"""
+Test cases for the persistent embedding cache
+"""
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+def vec(value: float, dimension: int = 4) -> np.ndarray:
+    return np.full(dimension, value, dtype='float32')
+
+
+class TestEmbeddingCache:
+    """Test suite for EmbeddingCache tiers, eviction and persistence"""
+
+    def test_hit_and_miss_counters(self, tmp_path):
+        """Test that lookups are counted per tier"""
+        cache = EmbeddingCache("test-model", 4, cache_dir=str(tmp_path), max_entries=10, hot_entries=1)
+        assert cache.get_many(["where is my order"]) == [None]
+        cache.put_many(["where is my order", "refund policy"], np.stack([vec(1), vec(2)]))
+
+        # Hot tier holds only the most recent insert; the other comes from disk
+        first, second = cache.get_many(["refund policy", "where is my order"])
+        np.testing.assert_array_equal(first, vec(2))
+        np.testing.assert_array_equal(second, vec(1))
+        stats = cache.stats()
+        assert (stats["hot_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+
+    def test_lru_eviction(self, tmp_path):
+        """Test that the least recently used entry is evicted when full"""
+        cache = EmbeddingCache("test-model", 4, cache_dir=str(tmp_path), max_entries=2, hot_entries=0)
+        cache.put_many(["a", "b"], np.stack([vec(1), vec(2)]))
+        cache.get_many(["a"])
+        cache.put_many(["c"], np.stack([vec(3)]))
+        a, b, c = cache.get_many(["a", "b", "c"])
+        assert b is None
+        np.testing.assert_array_equal(a, vec(1))
+        np.testing.assert_array_equal(c, vec(3))
+        assert cache.stats()["evictions"] == 1
+
+    def test_entries_persist_across_instances(self, tmp_path):
+        """Test that flushed entries are served by a new cache instance"""
+        cache = EmbeddingCache("test-model", 4, cache_dir=str(tmp_path), max_entries=10)
+        cache.put_many(["refund policy"], np.stack([vec(5)]))
+        cache.flush()
+
+        reopened = EmbeddingCache("test-model", 4, cache_dir=str(tmp_path), max_entries=10)
+        (vector,) = reopened.get_many(["refund policy"])
+        np.testing.assert_array_equal(vector, vec(5))
+        assert reopened.stats()["disk_hits"] == 1
+
+    def test_models_do_not_share_entries(self, tmp_path):
+        """Test that the cache is keyed by model name"""
+        EmbeddingCache("model-a", 4, cache_dir=str(tmp_path)).put_many(["hi"], np.stack([vec(1)]))
+        assert EmbeddingCache("model-b", 4, cache_dir=str(tmp_path)).get_many(["hi"]) == [None]
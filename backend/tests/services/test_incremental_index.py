@@ -0,0 +1,117 @@
+"""
+Test cases for incremental, content-hashed knowledge base indexing
+"""
+import pytest
+
+from app.services import rag_service as rag_module
+from app.services.rag_service import RAGService
+
+
+class TestIncrementalIndex:
+    """Test suite for RAGService.index_knowledge_base incremental mode"""
+
+    def test_only_changed_documents_are_reembedded(self, rag, documents, make_doc):
+        """Test that re-indexing embeds only added/changed documents and drops deleted ones"""
+        documents[:] = [make_doc("refunds", "30 days"), make_doc("returns", "pack it"), make_doc("fraud", "flag it")]
+        first = rag.index_knowledge_base()
+        assert first["full_rebuild"] is True
+        assert rag.embedding_service.encoded == 3
+
+        # Edit one, delete one, add one
+        documents[:] = [
+            make_doc("refunds", "60 days"), make_doc("returns", "pack it"), make_doc("sla", "24 hours")
+        ]
+        second = rag.index_knowledge_base()
+        assert second["full_rebuild"] is False
+        assert (second["added"], second["updated"], second["removed"], second["unchanged"]) == (1, 1, 1, 1)
+        assert rag.embedding_service.encoded == 5
+        assert rag.index.ntotal == 3
+        titles = {meta["title"] for _, _, meta in rag.doc_store.records()}
+        assert titles == {"Refunds", "Returns", "Sla"}
+
+    def test_unchanged_corpus_embeds_nothing(self, rag, documents, make_doc):
+        """Test that re-indexing an unchanged corpus is a no-op"""
+        documents[:] = [make_doc("refunds", "30 days")]
+        rag.index_knowledge_base()
+        result = rag.index_knowledge_base()
+        assert result["unchanged"] == 1
+        assert rag.embedding_service.encoded == 1
+
+    def test_manifest_survives_reload(self, rag, documents, make_doc):
+        """Test that a reloaded service continues incrementally from the saved manifest"""
+        documents[:] = [make_doc("refunds", "30 days"), make_doc("returns", "pack it")]
+        rag.index_knowledge_base()
+
+        reloaded = RAGService(index_path=str(rag.index_path))
+        result = reloaded.index_knowledge_base()
+        assert result["full_rebuild"] is False
+        assert rag.embedding_service.encoded == 2
+
+        hits = reloaded.retrieve_relevant_docs("Refunds\n\n30 days", top_k=1)
+        assert hits[0]["metadata"]["title"] == "Refunds"
+
+    @pytest.mark.parametrize("rag_settings", [{"RAG_INDEX_MMAP": True}])
+    def test_incremental_update_of_memory_mapped_index(self, rag, documents, make_doc):
+        """Test that a reloaded, memory-mapped index is copied into memory before it is mutated"""
+        documents[:] = [make_doc("refunds", "30 days"), make_doc("returns", "pack it")]
+        rag.index_knowledge_base()
+
+        reloaded = RAGService(index_path=str(rag.index_path))
+        assert reloaded.index_mmapped is True
+
+        documents[:] = [make_doc("refunds", "60 days"), make_doc("sla", "24 hours")]
+        result = reloaded.index_knowledge_base()
+        assert result["full_rebuild"] is False
+        assert reloaded.index_mmapped is False
+        assert reloaded.index.ntotal == 2
+
+    def test_incremental_update_swaps_in_a_copy(self, rag, documents, make_doc):
+        """Test that the index serving searches is replaced, never mutated in place"""
+        documents[:] = [make_doc("refunds", "30 days"), make_doc("returns", "pack it")]
+        rag.index_knowledge_base()
+        live = rag.index
+
+        documents[:] = [make_doc("refunds", "60 days"), make_doc("sla", "24 hours")]
+        result = rag.index_knowledge_base()
+        assert result["full_rebuild"] is False
+        assert rag.index is not live
+        id_map = lambda index: sorted(rag_module.faiss.vector_to_array(rag_module.faiss.downcast_index(index).id_map).tolist())
+        assert id_map(live) == [0, 1]
+        assert id_map(rag.index) == [0, 2]
+        assert sorted(rag.doc_store.ids()) == [0, 2]
+
+    def test_workers_sharing_an_index_merge_each_others_changes(self, rag, documents, make_doc):
+        """Test that a worker re-indexing after another one starts from what that one wrote"""
+        documents[:] = [make_doc("refunds", "30 days"), make_doc("returns", "pack it")]
+        rag.index_knowledge_base()
+        other = RAGService(index_path=str(rag.index_path))
+
+        documents[:] = [make_doc("refunds", "30 days"), make_doc("returns", "pack it"), make_doc("sla", "24 hours")]
+        rag.index_knowledge_base()
+        documents[:] = [
+            make_doc("refunds", "30 days"), make_doc("returns", "pack it"), make_doc("sla", "24 hours"), make_doc("fraud", "flag it")
+        ]
+        result = other.index_knowledge_base()
+        assert (result["added"], result["unchanged"]) == (1, 3)
+
+        fresh = RAGService(index_path=str(rag.index_path))
+        assert fresh.index.ntotal == len(fresh.doc_store) == 4
+        titles = {meta["title"] for _, _, meta in fresh.doc_store.records()}
+        assert titles == {"Refunds", "Returns", "Sla", "Fraud"}
+
+    @pytest.mark.parametrize("rag_settings", [{"RAG_INDEX_MMAP": False}])
+    def test_stale_in_memory_index_is_not_updated(self, rag, documents, make_doc):
+        """Test that an unmapped index older than the manifest is reloaded before ids are removed or assigned"""
+        documents[:] = [make_doc("refunds", "30 days"), make_doc("returns", "pack it")]
+        rag.index_knowledge_base()
+        other = RAGService(index_path=str(rag.index_path))
+        assert other.index_mmapped is False
+
+        documents[:] = [make_doc("refunds", "60 days"), make_doc("sla", "24 hours")]
+        rag.index_knowledge_base()
+        documents[:] = [make_doc("refunds", "60 days"), make_doc("fraud", "flag it")]
+        result = other.index_knowledge_base()
+        assert (result["added"], result["updated"], result["removed"], result["unchanged"]) == (1, 0, 1, 1)
+
+        id_map = sorted(rag_module.faiss.vector_to_array(rag_module.faiss.downcast_index(other.index).id_map).tolist())
+        assert id_map == sorted(other.doc_store.ids()) == [0, 3]
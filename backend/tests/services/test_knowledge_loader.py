@@ -0,0 +1,53 @@
+"""
+Test cases for the knowledge base postings index and keyword search
+"""
+import pytest
+
+from app.services.knowledge_loader import KnowledgeLoader
+
+
+@pytest.fixture
+def loader(tmp_path):
+    agent_docs = tmp_path / "agent_docs"
+    agent_docs.mkdir()
+    (agent_docs / "refund_policy.md").write_text(
+        "# Refund Policy\n\nRefunds are approved within 30 days of delivery.", encoding="utf-8"
+    )
+    (agent_docs / "shipping_sop.md").write_text(
+        "# Shipping Procedure\n\nShipments leave the warehouse in 24 hours. Refund shipping fees on damage.",
+        encoding="utf-8"
+    )
+    (agent_docs / "fraud_escalation.md").write_text(
+        "# Fraud Escalation\n\nEscalate repeated claims to a supervisor.", encoding="utf-8"
+    )
+    kb = KnowledgeLoader(kb_path=str(tmp_path))
+    kb.load_all_documents()
+    return kb
+
+
+class TestKnowledgeLoaderSearch:
+    """Test suite for KnowledgeLoader.search_documents"""
+
+    def test_ranked_search_prefers_title_matches(self, loader):
+        """Test that a title hit outranks a content-only hit"""
+        results = loader.search_documents("refund", mode="ranked")
+        assert [doc["title"] for doc in results] == ["Refund Policy", "Shipping Procedure"]
+
+    def test_prefix_terms_match_longer_words(self, loader):
+        """Test that a query term matches the words it is a prefix of"""
+        titles = [doc["title"] for doc in loader.search_documents("escal", mode="ranked")]
+        assert titles == ["Fraud Escalation"]
+
+    def test_compat_mode_keeps_substring_scores(self, loader):
+        """Test the original title 3 / tag 2 / keyword 2 / content 1 scoring"""
+        results = loader.search_documents("refund policy", mode="compat")
+        assert [(doc["title"], doc["relevance_score"]) for doc in results] == [("Refund Policy", 4)]
+
+        # All terms are present but not as a phrase, so nothing matches
+        assert loader.search_documents("policy refund", mode="compat") == []
+
+    def test_index_follows_reload(self, loader, tmp_path):
+        """Test that reloading documents rebuilds the postings"""
+        (tmp_path / "agent_docs" / "sla_policy.md").write_text("# SLA\n\nRespond within 4 hours.", encoding="utf-8")
+        loader.load_all_documents()
+        assert [doc["title"] for doc in loader.search_documents("respond")] == ["SLA"]
@@ -0,0 +1,113 @@
+"""
+Test cases for BM25 lexical search and hybrid retrieval
+"""
+import pytest
+
+from app.services import rag_service as rag_module
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from app.services.rag_service import RAGService
+
+
+class InScopeLLMService:
+    """LLM stand-in that classifies every question as in scope and echoes a fixed answer"""
+
+    def check_health(self):
+        return True
+
+    def generate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500, feature=None):
+        if "Respond with only a JSON object" in prompt:
+            return {"success": True, "text": '{"in_scope": true, "confidence": 0.9, "reason": "support"}'}
+        return {"success": True, "text": "Answered from the knowledge base."}
+
+
+class TestLexicalIndex:
+    """Test suite for the tokenizer, BM25 index and rank fusion"""
+
+    def test_tokenize_keeps_identifiers_and_drops_stopwords(self):
+        """Test that compound identifiers are kept whole and split into parts"""
+        tokens = tokenize("Where is order ORD-2024-001?")
+        assert "ord-2024-001" in tokens
+        assert "2024" in tokens
+        assert "where" not in tokens and "is" not in tokens
+
+    def test_bm25_ranks_exact_term_first(self):
+        """Test that the document containing a rare exact term ranks first"""
+        index = BM25Index().build([
+            (10, "Refund policy for electronics"),
+            (11, "Warranty for SKU-88231 headphones"),
+            (12, "Shipping policy and refund timelines")
+        ])
+        results = index.search("sku-88231 warranty", top_k=2)
+        assert results[0][0] == 11
+        assert index.search("nonexistent", top_k=2) == []
+
+    def test_bm25_respects_allowed_ids(self):
+        """Test that results can be restricted to a subset of ids"""
+        index = BM25Index().build([(1, "refund policy"), (2, "refund timelines")])
+        assert [doc_id for doc_id, _ in index.search("refund", allowed_ids={2})] == [2]
+
+    def test_bm25_min_score_drops_weak_partial_matches(self):
+        """Test that a document sharing one common word with a mostly unknown query is dropped"""
+        index = BM25Index().build([
+            (1, "Warranty covers manufacturing defects"),
+            (2, "Refund policy for electronics"),
+            (3, "Shipping takes five days")
+        ])
+        assert [doc_id for doc_id, _ in index.search("warranty defects", min_score=0.2)] == [1]
+        assert index.search("does the warranty cover my pizza oven burning the crust", top_k=3) != []
+        assert index.search("does the warranty cover my pizza oven burning the crust", top_k=3, min_score=0.2) == []
+
+    def test_reciprocal_rank_fusion(self):
+        """Test that documents ranked by both lists outrank single-list hits"""
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+        assert [doc_id for doc_id, _ in fused][:2] == [1, 3]
+
+
+class TestHybridRetrieval:
+    """Test suite for RAGService hybrid retrieval"""
+
+    @pytest.fixture
+    def documents(self, make_doc):
+        # Embeddings are unrelated to meaning, so only the lexical arm can find exact terms
+        return [
+            make_doc("returns", "Items can be returned within 30 days"),
+            make_doc("warranty", "Product SKU-88231 carries a two year warranty"),
+            make_doc("shipping", "Standard shipping takes 5 business days", category="Shipping")
+        ]
+
+    @pytest.fixture
+    def rag(self, rag):
+        rag.index_knowledge_base()
+        return rag
+
+    @pytest.mark.parametrize("rag_settings", [{"RAG_RETRIEVAL_MODE": "hybrid"}])
+    def test_exact_term_found_in_hybrid_mode(self, rag):
+        """Test that an exact SKU query retrieves its document and records both arm latencies"""
+        docs = rag.retrieve_relevant_docs("SKU-88231", top_k=1)
+        assert docs[0]["metadata"]["title"] == "Warranty"
+        assert docs[0]["bm25_score"] > 0
+
+        stats = rag.retrieval_stats()
+        assert stats["vector"]["queries"] == 1
+        assert stats["bm25"]["queries"] == 1
+
+    @pytest.mark.parametrize("rag_settings", [{"RAG_RETRIEVAL_MODE": "bm25"}])
+    def test_bm25_mode_applies_category_filter(self, rag):
+        """Test that lexical-only retrieval honours the category filter"""
+        docs = rag.retrieve_relevant_docs("shipping days returned", top_k=3, category_filter="Shipping")
+        assert [doc["metadata"]["title"] for doc in docs] == ["Shipping"]
+
+    @pytest.mark.parametrize("rag_settings", [{"RAG_RETRIEVAL_MODE": "hybrid"}])
+    def test_subcategory_filter_is_applied_inside_search(self, rag):
+        """Test that subcategory filtering returns matching documents only, or none"""
+        docs = rag.retrieve_relevant_docs("warranty returned", top_k=5, subcategory_filter="customer")
+        assert {doc["metadata"]["subcategory"] for doc in docs} == {"customer"}
+        assert rag.retrieve_relevant_docs("warranty", top_k=5, subcategory_filter="agent") == []
+
+    @pytest.mark.parametrize("llm", [InScopeLLMService()])
+    def test_unrelated_query_gets_no_documents_reply(self, rag):
+        """Test that in the default hybrid mode a query sharing only a stray word with the KB is not answered from it"""
+        assert rag_module.settings.RAG_RETRIEVAL_MODE == "hybrid"
+        query = "Does the warranty cover my pizza oven burning the crust?"
+        assert rag.retrieve_relevant_docs(query) == []
+        assert rag.answer_question(query)["response"] == RAGService.NO_DOCUMENTS_RESPONSE
@@ -0,0 +1,277 @@
+"""
+Test cases for the paginated list endpoints (statement count and keyset pagination)
+"""
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.database import get_db
+from app.main import app
+from app.models import Base
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.ticket import Message, Ticket, TicketPriority, TicketStatus
+from app.models.user import Agent, Customer, User, UserRole
+from app.services.auth import get_current_user
+
+AGENT_ID = 1
+CUSTOMER_ID = 2
+START = datetime(2025, 1, 1)
+
+
+class Seeder:
+    """Adds rows to the test database; pairs of rows share a created_at so the id tie-break is exercised"""
+
+    def __init__(self, Session):
+        self.Session = Session
+
+    def login(self, user_id):
+        app.dependency_overrides[get_current_user] = lambda: User(id=user_id, email=f"u{user_id}@example.com", full_name="Current User")
+
+    def add_tickets(self, count):
+        """count more tickets, each from a new customer, alternately assigned to AGENT_ID"""
+        db = self.Session()
+        existing = db.query(Ticket).count()
+        for i in range(existing, existing + count):
+            customer_id = 100 + i
+            ticket_id = f"T{i:04d}"
+            db.add(User(id=customer_id, email=f"c{i}@example.com", password="x", full_name=f"Customer {i}",
+                        role=UserRole.CUSTOMER, is_active=i % 4 != 0, created_at=START + timedelta(minutes=i // 2)))
+            db.add(Customer(user_id=customer_id))
+            db.add(Ticket(
+                id=ticket_id, customer_id=customer_id, agent_id=AGENT_ID if i % 2 else None,
+                subject=f"Issue {i}", status=TicketStatus.OPEN, priority=TicketPriority.MEDIUM,
+                created_at=START + timedelta(minutes=i // 2)
+            ))
+            for m in range(i % 3):
+                db.add(Message(id=f"{ticket_id}-M{m}", ticket_id=ticket_id, sender_id=customer_id, content="hi"))
+        db.commit()
+        db.close()
+
+    def add_orders(self, count):
+        """count more orders for CUSTOMER_ID, two items each"""
+        db = self.Session()
+        existing = db.query(Order).count()
+        for i in range(existing, existing + count):
+            order_id = f"O{i:04d}"
+            db.add(Order(id=order_id, order_number=f"ORD{i:04d}", customer_id=CUSTOMER_ID, status=OrderStatus.DELIVERED,
+                         total=10.0 * (i + 1), created_at=START + timedelta(minutes=i // 2)))
+            for n in range(2):
+                db.add(OrderItem(id=f"{order_id}-I{n}", order_id=order_id, product_name=f"Product {n}", quantity=1, price=5.0, subtotal=5.0))
+        db.commit()
+        db.close()
+
+    def add_agents(self, count):
+        """count more agents, alternately AVAILABLE and OFFLINE, each with one open ticket"""
+        db = self.Session()
+        existing = db.query(Agent).count()
+        for i in range(existing, existing + count):
+            agent_id = 1000 + i
+            db.add(User(id=agent_id, email=f"a{i}@example.com", password="x", full_name=f"Agent {i}",
+                        role=UserRole.AGENT, created_at=START + timedelta(minutes=i // 2)))
+            db.add(Agent(user_id=agent_id, department="Support", status="AVAILABLE" if i % 2 else "OFFLINE"))
+            db.add(Ticket(id=f"AT{i:04d}", customer_id=CUSTOMER_ID, agent_id=agent_id, subject="Assigned",
+                          status=TicketStatus.IN_PROGRESS, priority=TicketPriority.LOW, created_at=START))
+        db.commit()
+        db.close()
+
+
+@pytest.fixture
+def seed():
+    """Fresh in-memory database wired into the app"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    db.add(User(id=AGENT_ID, email="agent@example.com", password="x", full_name="Agent Smith", role=UserRole.AGENT, created_at=START))
+    db.add(User(id=CUSTOMER_ID, email="buyer@example.com", password="x", full_name="Frequent Buyer", role=UserRole.CUSTOMER, created_at=START))
+    db.add(Customer(user_id=CUSTOMER_ID))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    seeder = Seeder(Session)
+    seeder.engine = engine
+    seeder.login(AGENT_ID)
+    yield seeder
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def count_statements(engine, func):
+    statements = []
+    listener = lambda conn, cursor, statement, params, context, executemany: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return result, len(statements)
+
+
+client = TestClient(app)
+
+# (url, user, seeding method, statements per page)
+LISTINGS = [
+    ("/api/v1/agent/tickets", AGENT_ID, "add_tickets", 1),
+    ("/api/v1/supervisor/tickets", AGENT_ID, "add_tickets", 1),
+    ("/api/v1/customer/tickets", CUSTOMER_ID, "add_agents", 1),
+    ("/api/v1/customer/orders", CUSTOMER_ID, "add_orders", 2),  # orders, then their items
+    ("/api/v1/agent/customers", AGENT_ID, "add_tickets", 1),
+    ("/api/v1/supervisor/customers", AGENT_ID, "add_tickets", 1),
+    ("/api/v1/supervisor/agents", AGENT_ID, "add_agents", 2),  # agents, then their current tickets
+]
+
+
+def walk(url, page_size, **params):
+    """Follow X-Next-Cursor from the first page to the last; returns (rows, pages)"""
+    rows, cursor, pages = [], None, 0
+    while True:
+        response = client.get(url, params={"limit": page_size, **params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        rows.extend(response.json())
+        pages += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return rows, pages
+
+
+class TestListPagination:
+    """Test suite for the keyset-paginated list endpoints"""
+
+    @pytest.mark.parametrize("url,user_id,add,statements", LISTINGS)
+    def test_statement_count_does_not_grow_with_rows(self, seed, url, user_id, add, statements):
+        """Test that a page costs the same number of statements for 4 or 40 rows"""
+        seed.login(user_id)
+        getattr(seed, add)(4)
+        small, small_count = count_statements(seed.engine, lambda: client.get(url))
+        getattr(seed, add)(36)
+        large, large_count = count_statements(seed.engine, lambda: client.get(url))
+
+        assert small.status_code == large.status_code == 200
+        assert len(large.json()) > len(small.json())
+        assert small_count == large_count == statements
+
+    @pytest.mark.parametrize("url,user_id,add,statements", LISTINGS)
+    def test_cursor_walks_every_row_once(self, seed, url, user_id, add, statements):
+        """Test that following X-Next-Cursor visits all rows without repeats"""
+        seed.login(user_id)
+        getattr(seed, add)(9)
+        everything = client.get(url).json()
+        rows, pages = walk(url, 4)
+
+        assert [row["id"] for row in rows] == [row["id"] for row in everything]
+        assert len({row["id"] for row in rows}) == len(rows)
+        assert pages == -(-len(everything) // 4)
+
+    def test_page_size_is_capped(self, seed, monkeypatch):
+        """Test that limits above PAGINATION_MAX_LIMIT return a capped page"""
+        monkeypatch.setattr(settings, "PAGINATION_MAX_LIMIT", 5)
+        seed.add_tickets(8)
+        response = client.get("/api/v1/supervisor/tickets", params={"limit": 1000})
+
+        assert len(response.json()) == 5
+        assert NEXT_CURSOR_HEADER in response.headers
+
+    @pytest.mark.parametrize("url,user_id,add,statements", LISTINGS)
+    def test_request_without_limit_gets_default_page(self, seed, monkeypatch, url, user_id, add, statements):
+        """Test that clients sending neither cursor nor limit get one default-sized page, not the whole table"""
+        monkeypatch.setattr(settings, "PAGINATION_DEFAULT_LIMIT", 3)
+        seed.login(user_id)
+        getattr(seed, add)(9)
+        first = client.get(url)
+        rows, _ = walk(url, 3)
+
+        assert [row["id"] for row in first.json()] == [row["id"] for row in rows[:3]]
+        assert NEXT_CURSOR_HEADER in first.headers and len(rows) > 3
+
+    def test_rows_without_created_at_come_last(self, seed):
+        """Test that a page ending on a NULL created_at still leads to the remaining rows"""
+        seed.add_tickets(7)
+        with seed.engine.begin() as connection:
+            connection.execute(Ticket.__table__.update().where(Ticket.id.in_(["T0000", "T0002", "T0003"])).values(created_at=None))
+        rows, _ = walk("/api/v1/supervisor/tickets", 2)
+
+        assert [row["id"] for row in rows] == ["T0006", "T0005", "T0004", "T0001", "T0003", "T0002", "T0000"]
+
+    def test_invalid_cursor_is_rejected(self, seed):
+        """Test that a malformed cursor is a client error"""
+        seed.add_tickets(1)
+        for url, user_id, _, _ in LISTINGS:
+            seed.login(user_id)
+            assert client.get(url, params={"cursor": "not-a-cursor"}).status_code == 400, url
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode to the encoded position"""
+        assert decode_cursor(encode_cursor(START, "T0001")) == (START, "T0001")
+        assert decode_cursor(encode_cursor(START, 42)) == (START, 42)
+
+
+class TestListContents:
+    """Test suite for the joined columns that replaced per-row lookups"""
+
+    def test_agent_tickets_carry_customer_and_message_count(self, seed):
+        """Test that the joined columns match what the per-ticket lookups returned"""
+        seed.add_tickets(6)
+        tickets = {t["id"]: t for t in client.get("/api/v1/agent/tickets").json()}
+
+        assert tickets["T0005"]["customer_name"] == "Customer 5"
+        assert tickets["T0005"]["customer_email"] == "c5@example.com"
+        assert tickets["T0005"]["message_count"] == 2
+        assert tickets["T0003"]["message_count"] == 0
+
+    def test_supervisor_tickets_carry_agent_name(self, seed):
+        """Test that assigned tickets name their agent and unassigned ones say so"""
+        seed.add_tickets(4)
+        tickets = {t["id"]: t for t in client.get("/api/v1/supervisor/tickets").json()}
+
+        assert tickets["T0001"]["agent_name"] == "Agent Smith"
+        assert tickets["T0002"]["agent_name"] == "Unassigned"
+        assert tickets["T0002"]["customer_name"] == "Customer 2"
+
+    def test_orders_carry_their_items(self, seed):
+        """Test that each order lists its own items"""
+        seed.login(CUSTOMER_ID)
+        seed.add_orders(3)
+        orders = client.get("/api/v1/customer/orders").json()
+
+        assert [order["id"] for order in orders] == ["O0002", "O0001", "O0000"]
+        assert [item["id"] for item in orders[0]["items"]] == ["O0002-I0", "O0002-I1"]
+
+    def test_agent_customers_are_only_assigned_ones(self, seed):
+        """Test that an agent sees the customers of tickets assigned to them, with counts"""
+        seed.add_tickets(6)
+        customers = client.get("/api/v1/agent/customers").json()
+
+        assert sorted(c["id"] for c in customers) == [101, 103, 105]
+        assert all(c["total_tickets"] == 1 and c["total_orders"] == 0 for c in customers)
+
+    def test_supervisor_customer_status_filter(self, seed):
+        """Test that the status filter runs in the query, so every page is full"""
+        seed.add_tickets(8)
+        blocked, _ = walk("/api/v1/supervisor/customers", 1, status_filter="Blocked Customers")
+        active = client.get("/api/v1/supervisor/customers", params={"status_filter": "Active Customers"}).json()
+
+        assert sorted(c["id"] for c in blocked) == [100, 104]
+        assert all(c["status"] == "Active" for c in active) and len(active) == 7  # six ticket customers + CUSTOMER_ID
+
+    def test_supervisor_agents_status_filter_and_current_tickets(self, seed):
+        """Test that agents filter by status in the query and list their open tickets"""
+        seed.add_agents(4)
+        available = client.get("/api/v1/supervisor/agents", params={"status_filter": "available"}).json()
+
+        assert sorted(a["id"] for a in available) == [1001, 1003]
+        assert available[0]["current_tickets"] == [f"AT{available[0]['id'] - 1000:04d}"]
+        assert available[0]["assigned_tickets"] == 1 and available[0]["solved_tickets"] == 0
@@ -0,0 +1,214 @@
+"""
+Test cases for the pooled async LLM client
+"""
+import asyncio
+import json
+import threading
+import time
+import httpx
+import pytest
+
+from app.services import llm_service as llm_module
+from app.services.llm_service import LLMService
+
+
+def groq_reply(text):
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    service = LLMService()
+    service.grok_api_key = "test-key"
+    service.gemini_client = None
+    service.requests = []
+
+    def handler(request):
+        service.requests.append(request)
+        if request.url.host == "api.groq.com":
+            return service.groq_handler(request)
+        if request.method == "GET":
+            return httpx.Response(200, json={"models": []})
+        if json.loads(request.content).get("stream"):
+            lines = [{"message": {"content": "from "}, "done": False}, {"message": {"content": "ollama"}, "done": True}]
+            return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines).encode())
+        return httpx.Response(200, json={"message": {"content": "from ollama"}})
+
+    service.groq_handler = lambda request: (
+        httpx.Response(200, json={"data": []}) if request.method == "GET" else groq_reply("from groq")
+    )
+    options = service._client_options
+    monkeypatch.setattr(service, "_client_options", lambda provider: {
+        **options(provider), "transport": httpx.MockTransport(handler)
+    })
+    return service
+
+
+class TestAsyncGenerate:
+    """Test suite for LLMService.agenerate"""
+
+    def test_returns_text_and_reuses_pooled_client(self, llm):
+        """Test that consecutive calls on one loop share a client"""
+        async def run():
+            first = await llm.agenerate("hello", system_prompt="be brief")
+            client = llm._async_http_client("groq")
+            second = await llm.agenerate("again")
+            assert llm._async_http_client("groq") is client
+            await llm.aclose()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first["success"] and first["text"] == "from groq"
+        assert second["text"] == "from groq"
+        assert llm.requests[0].headers["Authorization"] == "Bearer test-key"
+        assert not llm._async_clients
+
+    def test_client_of_another_loop_is_closed_on_it(self, llm):
+        """Test that a new loop's first call closes the clients left on a live older loop"""
+        other = asyncio.new_event_loop()
+        thread = threading.Thread(target=other.run_forever, daemon=True)
+        thread.start()
+
+        async def get_client():
+            return llm._async_http_client("groq")
+
+        try:
+            old = asyncio.run_coroutine_threadsafe(get_client(), other).result(5)
+            new = asyncio.run(get_client())
+            deadline = time.time() + 5
+            while not old.is_closed and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            other.call_soon_threadsafe(other.stop)
+            thread.join(5)
+            other.close()
+
+        assert new is not old
+        assert old.is_closed
+        assert other not in llm._async_clients
+
+    def test_concurrent_calls_overlap(self, llm):
+        """Test that awaiting calls run concurrently instead of one after another"""
+        async def slow_transport(request):
+            await asyncio.sleep(0.2)
+            return groq_reply("slow")
+
+        llm._client_options = lambda provider: {"transport": httpx.MockTransport(slow_transport)}
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            results = await asyncio.gather(*(llm.agenerate(f"q{i}") for i in range(5)))
+            return results, loop.time() - start
+
+        results, elapsed = asyncio.run(run())
+        assert [r["text"] for r in results] == ["slow"] * 5
+        assert elapsed < 0.6
+
+    def test_groq_error_falls_back_to_ollama(self, llm):
+        """Test the provider fallback order is unchanged"""
+        llm.groq_handler = lambda request: httpx.Response(503, text="unavailable")
+        result = asyncio.run(llm.agenerate("hello"))
+        assert result["text"] == "from ollama"
+        assert [r.url.host for r in llm.requests] == ["api.groq.com", "localhost"]
+
+    def test_sync_generate_uses_pooled_client(self, llm):
+        """Test that the blocking path shares one client across calls"""
+        assert llm.generate("hello")["text"] == "from groq"
+        client = llm._http_client("groq")
+        llm.generate("again")
+        assert llm._http_client("groq") is client
+
+
+def groq_stream(*chunks):
+    events = [{"choices": [{"delta": {"content": chunk}}]} for chunk in chunks]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    return httpx.Response(200, content=body.encode())
+
+
+async def collect(stream):
+    return [event async for event in stream]
+
+
+class TestStreaming:
+    """Test suite for LLMService.astream"""
+
+    def test_groq_stream_yields_deltas_then_result(self, llm):
+        """Test that OpenAI-compatible SSE chunks are forwarded in order"""
+        llm.groq_handler = lambda request: groq_stream("Refunds ", "take ", "5 days.")
+        events = asyncio.run(collect(llm.astream("refund time?")))
+
+        assert [event["delta"] for event in events[:-1]] == ["Refunds ", "take ", "5 days."]
+        final = events[-1]
+        assert final["done"] and final["success"]
+        assert final["text"] == "Refunds take 5 days."
+        assert final["time_to_first_token_ms"] <= final["generation_time_ms"]
+        assert json.loads(llm.requests[0].content)["stream"] is True
+        assert llm.stream_stats()["first_token"]["streams"] == 1
+
+    def test_failure_before_first_token_falls_back_to_ollama(self, llm):
+        """Test that a provider that fails up front is skipped like in generate"""
+        llm.groq_handler = lambda request: httpx.Response(429, text="rate limited")
+        events = asyncio.run(collect(llm.astream("hello")))
+
+        assert [event["delta"] for event in events[:-1]] == ["from ", "ollama"]
+        assert events[-1]["text"] == "from ollama" and events[-1]["model"] == llm.model
+
+
+class TestHealthMonitor:
+    """Test suite for cached provider health"""
+
+    def test_first_check_does_not_probe_on_the_calling_thread(self, llm, monkeypatch):
+        """Test that a check before any probe assumes up and leaves probing to the monitor"""
+        llm.grok_api_key = None
+        llm._client_options = lambda provider: {"transport": httpx.MockTransport(lambda request: httpx.Response(503))}
+        probed = []
+        refresh = llm.refresh_health
+        monkeypatch.setattr(llm, "refresh_health", lambda: probed.append(threading.get_ident()) or refresh())
+
+        assert llm.check_health() is True
+        deadline = time.monotonic() + 5
+        while llm._health_checked_at is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        llm.stop_health_monitor()
+
+        assert probed and threading.get_ident() not in probed
+        assert llm.check_health() is False
+
+    def test_check_health_reads_cache(self, llm):
+        """Test that checks after a probe do not probe again"""
+        llm.refresh_health()
+        assert llm.check_health() is True
+        assert llm.check_health() is True
+        assert [(r.method, r.url.path) for r in llm.requests] == [("GET", "/openai/v1/models"), ("GET", "/api/tags")]
+
+    def test_per_provider_state_and_latency(self, llm):
+        """Test that one provider being down is reported without failing availability"""
+        llm.groq_handler = lambda request: httpx.Response(401, text="bad key")
+        llm.refresh_health()
+        status = llm.health_status()
+
+        assert status["available"] is True
+        assert status["providers"]["groq"]["up"] is False
+        assert "401" in status["providers"]["groq"]["error"]
+        assert status["providers"]["ollama"]["up"] is True
+        assert status["providers"]["ollama"]["latency_ms"] >= 0
+
+    def test_all_providers_down(self, llm):
+        """Test that availability is false when no provider answers"""
+        llm.grok_api_key = None
+        llm._client_options = lambda provider: {"transport": httpx.MockTransport(lambda request: httpx.Response(503))}
+        llm.refresh_health()
+        assert llm.check_health() is False
+
+    def test_monitor_refreshes_in_background(self, llm, monkeypatch):
+        """Test that the monitor thread keeps probing until stopped"""
+        monkeypatch.setattr(llm_module.settings, "LLM_HEALTH_CHECK_INTERVAL_SECONDS", 0.05)
+        llm.start_health_monitor()
+        time.sleep(0.3)
+        llm.stop_health_monitor()
+        probes = len(llm.requests)
+
+        assert probes >= 4
+        time.sleep(0.1)
+        assert len(llm.requests) == probes
@@ -0,0 +1,165 @@
+"""
+Test cases for per-call LLM telemetry
+"""
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.ai_copilot import LLMCallLog
+from app.services.llm_service import LLMService
+from app.services.llm_telemetry import LLMTelemetry
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    LLMCallLog.__table__.create(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def telemetry(session_factory):
+    return LLMTelemetry(buffer_size=1000, flush_batch_size=500, session_factory=session_factory)
+
+
+def record(telemetry, feature="intent", provider="groq", latency_ms=100, **fields):
+    telemetry.record(feature=feature, provider=provider, model="m", latency_ms=latency_ms,
+                     cache=fields.pop("cache", "miss"), success=fields.pop("success", True), **fields)
+
+
+class TestLLMTelemetry:
+    """Test suite for LLMTelemetry"""
+
+    def test_flush_writes_buffered_records(self, telemetry, session_factory):
+        """Test that records reach the table in one batch and leave the buffer"""
+        for latency in (10, 20, 30):
+            record(telemetry, latency_ms=latency, prompt_tokens=5)
+        assert telemetry.flush() == 3
+        assert telemetry.stats()["buffered"] == 0
+
+        db = session_factory()
+        assert sorted(row.latency_ms for row in db.query(LLMCallLog).all()) == [10, 20, 30]
+        db.close()
+
+    def test_ring_buffer_drops_oldest(self, session_factory):
+        """Test that an unflushed buffer keeps only the newest records"""
+        telemetry = LLMTelemetry(buffer_size=3, session_factory=session_factory)
+        for latency in range(5):
+            record(telemetry, latency_ms=latency)
+        assert telemetry.stats()["dropped"] == 2
+        telemetry.flush()
+
+        db = session_factory()
+        assert sorted(row.latency_ms for row in db.query(LLMCallLog).all()) == [2, 3, 4]
+        db.close()
+
+    def test_failed_flush_keeps_records(self, telemetry):
+        """Test that records survive a database error for the next flush"""
+        record(telemetry)
+        telemetry.session_factory = lambda: (_ for _ in ()).throw(RuntimeError("database is locked"))
+        assert telemetry.flush() == 0
+        assert telemetry.stats()["buffered"] == 1
+        assert telemetry.stats()["failed_flushes"] == 1
+
+    def test_background_writer_flushes_on_stop(self, telemetry):
+        """Test that stop() writes what is still buffered"""
+        telemetry.flush_interval_seconds = 60
+        telemetry.start()
+        record(telemetry)
+        telemetry.stop()
+        assert telemetry.stats()["flushed"] == 1
+
+    def test_missing_table_disables_writer(self):
+        """Test that without llm_call_logs the writer is not started and flushes do not fail"""
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        telemetry = LLMTelemetry(session_factory=sessionmaker(bind=engine))
+        telemetry.start()
+        record(telemetry)
+
+        assert telemetry.stats()["writable"] is False
+        assert telemetry.flush() == 0
+        assert telemetry.stats()["buffered"] == 1
+        assert telemetry.stats()["failed_flushes"] == 0
+        telemetry.stop()
+
+    def test_latency_report_by_feature_and_provider(self, telemetry, session_factory):
+        """Test percentiles and rates grouped by feature and by provider"""
+        for latency in range(1, 101):
+            record(telemetry, feature="chat_answer", latency_ms=latency)
+        record(telemetry, feature="intent", provider="ollama", latency_ms=900, tier=1)
+        record(telemetry, feature="intent", latency_ms=0, cache="hit")
+
+        db = session_factory()
+        report = telemetry.latency_report(db, datetime.utcnow() - timedelta(hours=1))
+        future = telemetry.latency_report(db, datetime.utcnow() + timedelta(hours=1))
+        db.close()
+
+        answer = report["by_feature"]["chat_answer"]
+        assert report["calls"] == 102 and future["calls"] == 0
+        assert (answer["p50_ms"], answer["p95_ms"], answer["p99_ms"]) == (50, 95, 99)
+        assert report["by_feature"]["intent"]["cache_hit_rate"] == 0.5
+        assert report["by_feature"]["intent"]["fallback_rate"] == 0.5
+        assert report["by_provider"]["ollama"]["p50_ms"] == 900
+
+
+@pytest.fixture
+def llm(telemetry):
+    service = LLMService()
+    service.grok_api_key = "test-key"
+    service.gemini_client = None
+    service.telemetry = telemetry
+    service.groq_status = 200
+
+    def handler(request):
+        if request.url.host == "api.groq.com":
+            if service.groq_status != 200:
+                return httpx.Response(service.groq_status)
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": "from groq"}}],
+                "usage": {"prompt_tokens": 42, "completion_tokens": 7}
+            })
+        return httpx.Response(200, json={"message": {"content": "from ollama"}, "prompt_eval_count": 40, "eval_count": 3})
+
+    service._client_options = lambda provider: {"transport": httpx.MockTransport(handler)}
+    return service
+
+
+class TestLLMServiceTelemetry:
+    """Test suite for telemetry recorded by LLMService"""
+
+    def records(self, telemetry):
+        return list(telemetry._buffer)
+
+    def test_records_feature_provider_and_usage(self, llm):
+        """Test that a call records its feature and the provider's token counts"""
+        llm.generate("hello", feature="ticket_summary")
+        row = self.records(llm.telemetry)[-1]
+        assert (row["feature"], row["provider"], row["tier"], row["cache"]) == ("ticket_summary", "groq", 0, "bypass")
+        assert (row["prompt_tokens"], row["completion_tokens"]) == (42, 7)
+
+    def test_cache_hit_and_fallback_tier(self, llm):
+        """Test that cached repeats and provider fallbacks are distinguishable"""
+        llm.generate("classify", temperature=0.1, feature="intent")
+        llm.generate("classify", temperature=0.1, feature="intent")
+        llm.groq_status = 503
+        asyncio.run(llm.agenerate("other", feature="intent"))
+
+        miss, hit, fallback = self.records(llm.telemetry)
+        assert (miss["cache"], hit["cache"]) == ("miss", "hit")
+        assert hit["prompt_tokens"] == 0
+        assert (fallback["provider"], fallback["tier"], fallback["completion_tokens"]) == ("ollama", 1, 3)
+
+    def test_streams_record_time_to_first_token(self, llm):
+        """Test that streamed calls are recorded with their first-token latency"""
+        async def run():
+            return [event async for event in llm.astream("hello", feature="chat_answer")]
+
+        final = asyncio.run(run())[-1]
+        row = self.records(llm.telemetry)[-1]
+        assert row["streamed"] and row["feature"] == "chat_answer"
+        assert row["time_to_first_token_ms"] == final["time_to_first_token_ms"]
+        assert row["completion_tokens"] > 0
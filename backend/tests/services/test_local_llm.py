@@ -0,0 +1,157 @@
+"""
+Test cases for the batched in-process LLM backend
+
+Uses tiny randomly initialised T5 and GPT-2 models with an in-memory word-level
+tokenizer, so nothing is downloaded; the generated text is meaningless but its
+length and determinism are not.
+"""
+import asyncio
+import threading
+import warnings
+import httpx
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+from app.services.llm_service import LLMService
+from app.services.local_llm import LocalLLM, quantize_model
+
+WORDS = ["what", "is", "your", "refund", "policy", "hello", "where", "my", "order"] + [f"w{i}" for i in range(50)]
+
+
+def make_tokenizer():
+    vocab = {word: i for i, word in enumerate(["<pad>", "</s>", "<unk>"] + WORDS)}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    return transformers.PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, pad_token="<pad>", eos_token="</s>", unk_token="<unk>"
+    )
+
+
+def make_t5():
+    torch.manual_seed(0)
+    config = transformers.T5Config(
+        vocab_size=len(WORDS) + 3, d_model=32, d_ff=64, num_layers=2, num_heads=2, d_kv=16,
+        decoder_start_token_id=0, pad_token_id=0, eos_token_id=1
+    )
+    return transformers.T5ForConditionalGeneration(config)
+
+
+def make_gpt2():
+    torch.manual_seed(0)
+    config = transformers.GPT2Config(
+        vocab_size=len(WORDS) + 3, n_positions=128, n_embd=32, n_layer=2, n_head=2,
+        bos_token_id=1, eos_token_id=1, pad_token_id=0
+    )
+    return transformers.GPT2LMHeadModel(config)
+
+
+class RecordingLocalLLM(LocalLLM):
+    """LocalLLM that records the size of every generate() batch"""
+
+    def __init__(self, *args, **kwargs):
+        self.batch_sizes = []
+        super().__init__(*args, **kwargs)
+
+    def _generate_batch(self, group, temperature):
+        self.batch_sizes.append((len(group), temperature))
+        return super()._generate_batch(group, temperature)
+
+
+@pytest.fixture
+def t5_llm():
+    llm = RecordingLocalLLM(make_t5(), make_tokenizer(), model_name="tiny-t5", max_batch_size=8, max_wait_ms=200)
+    yield llm
+    llm.stop()
+
+
+class TestLocalLLM:
+    """Test suite for LocalLLM"""
+
+    def test_greedy_generation_respects_max_tokens(self, t5_llm):
+        """Test that temperature 0 is deterministic and output stops at max_tokens"""
+        first = t5_llm.generate("what is your refund policy", temperature=0.0, max_tokens=4)
+        second = t5_llm.generate("what is your refund policy", temperature=0.0, max_tokens=4)
+
+        assert first["success"] and first["model"] == "tiny-t5"
+        assert first["text"] == second["text"]
+        assert len(first["text"].split()) <= 4
+
+    def test_concurrent_requests_share_a_batch(self, t5_llm):
+        """Test that concurrent callers are served by one generate() call per temperature"""
+        async def run():
+            return await asyncio.gather(*(
+                t5_llm.agenerate(f"where is my order w{i}", temperature=0.0, max_tokens=2 + i) for i in range(6)
+            ))
+
+        results = asyncio.run(run())
+        assert all(result["success"] for result in results)
+        assert [len(result["text"].split()) <= 2 + i for i, result in enumerate(results)] == [True] * 6
+        assert t5_llm.batch_sizes == [(6, 0.0)]
+        assert t5_llm.stats()["largest_batch"] == 6
+
+    def test_mixed_temperatures_are_grouped(self, t5_llm):
+        """Test that one micro-batch is split by temperature"""
+        barrier = threading.Barrier(4)
+
+        def call(temperature):
+            barrier.wait()
+            return t5_llm.generate("hello", temperature=temperature, max_tokens=3)
+
+        threads = [threading.Thread(target=call, args=(t,)) for t in (0.0, 0.0, 0.7, 0.7)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(t5_llm.batch_sizes) == [(2, 0.0), (2, 0.7)]
+
+    def test_causal_model_returns_only_the_continuation(self):
+        """Test that decoder-only models are left-padded and the prompt is stripped"""
+        llm = LocalLLM(make_gpt2(), make_tokenizer(), model_name="tiny-gpt2", max_wait_ms=100)
+        try:
+            async def run():
+                return await asyncio.gather(
+                    llm.agenerate("what is your refund policy", temperature=0.0, max_tokens=3),
+                    llm.agenerate("hello", temperature=0.0, max_tokens=3)
+                )
+            long_prompt, short_prompt = asyncio.run(run())
+            alone = llm.generate("hello", temperature=0.0, max_tokens=3)
+        finally:
+            llm.stop()
+
+        assert len(long_prompt["text"].split()) <= 3
+        # Left padding keeps a batched continuation identical to an unbatched one
+        assert short_prompt["text"] == alone["text"]
+
+    def test_int8_dynamic_quantisation(self):
+        """Test that quantisation swaps Linear layers and the model still generates"""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            model = quantize_model(make_t5())
+        assert "quantized" in type(model.lm_head).__module__
+
+        llm = LocalLLM(model, make_tokenizer(), max_wait_ms=0)
+        try:
+            assert llm.generate("hello", temperature=0.0, max_tokens=2)["success"]
+        finally:
+            llm.stop()
+
+
+class TestLocalProvider:
+    """Test suite for the local tier in LLMService"""
+
+    def test_local_model_answers_when_http_providers_fail(self, t5_llm):
+        """Test that the local tier replaces the canned fallback"""
+        llm = LLMService()
+        llm.grok_api_key = None
+        llm.gemini_client = None
+        llm.local_llm = t5_llm
+        llm._client_options = lambda provider: {"transport": httpx.MockTransport(lambda request: httpx.Response(503))}
+
+        result = llm.generate("what is your refund policy", temperature=0.0, max_tokens=3)
+        assert result["success"] and result["model"] == "tiny-t5"
+        assert llm._providers() == ["ollama", "local"]
+        assert llm.health_status()["local_model"]["items"] == 1
@@ -0,0 +1,144 @@
+"""
+Test cases for the combined single-call message analysis in RAGService
+"""
+import asyncio
+import json
+import numpy as np
+import pytest
+
+
+class ConstantEmbeddingService:
+    """Embedding stand-in; retrieval in these tests is lexical"""
+
+    def is_available(self):
+        return True
+
+    def encode(self, texts, batch_size=32):
+        return np.ones((len(texts), 8), dtype='float32')
+
+    def encode_single(self, text):
+        return self.encode([text])[0]
+
+
+class ScriptedLLMService:
+    """LLM stand-in that answers each prompt type and records which were asked"""
+
+    def __init__(self):
+        self.prompts = []
+        self.analysis_text = json.dumps({
+            "in_scope": True, "scope_confidence": 0.9, "scope_reason": "refund question",
+            "intent": "refund_inquiry", "intent_confidence": 0.9,
+            "sentiment": "neutral", "sentiment_score": 0.5,
+            "entities": {"order_number": None, "product_name": None, "amount": None}
+        })
+
+    def check_health(self):
+        return True
+
+    def generate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500, feature=None):
+        if "scope_confidence" in prompt:
+            self.prompts.append("combined")
+            return {"success": True, "model": "scripted", "text": self.analysis_text}
+        if "Respond with only a JSON object" in prompt:
+            self.prompts.append("scope")
+            return {"success": True, "text": '{"in_scope": true, "confidence": 0.9, "reason": "refund"}'}
+        if "Analyze this customer message for intent and sentiment" in prompt:
+            self.prompts.append("analysis")
+            return {"success": True, "model": "scripted", "text": self.analysis_text}
+        self.prompts.append("answer")
+        return {"success": True, "text": "Refunds are accepted within 30 days."}
+
+    async def agenerate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=500, feature=None):
+        return self.generate(prompt, system_prompt, temperature, max_tokens)
+
+
+@pytest.fixture
+def embedder():
+    return ConstantEmbeddingService()
+
+
+@pytest.fixture
+def documents(make_doc):
+    # More than one document, so BM25 weighs the refund terms above RAG_BM25_MIN_SCORE
+    return [
+        make_doc("refund_policy", "Can I get my money back? Refunds are accepted within 30 days.",
+                 title="Refund Policy", tags=["refund"], keywords=["refund"]),
+        make_doc("shipping_policy", "Standard shipping takes 5 business days.", category="Shipping",
+                 title="Shipping Policy", tags=["shipping"], keywords=["shipping"])
+    ]
+
+
+@pytest.fixture
+def llm():
+    return ScriptedLLMService()
+
+
+@pytest.fixture
+def rag_settings():
+    # Exercise the LLM path; rules are covered in test_intent_classifier
+    return {"RAG_RETRIEVAL_MODE": "bm25", "RAG_ANSWER_CACHE_ENABLED": False, "INTENT_RULES_ENABLED": False}
+
+
+@pytest.fixture
+def rag(rag):
+    rag.index_knowledge_base()
+    return rag
+
+
+class TestAnalyzeMessage:
+    """Test suite for RAGService.analyze_message"""
+
+    def test_one_call_returns_scope_and_intent(self, rag):
+        """Test that an ambiguous message is analyzed with a single completion"""
+        analysis = rag.analyze_message("I was told I could get my money back?")
+        assert rag.llm_service.prompts == ["combined"]
+        assert analysis["scope"] == {"in_scope": True, "confidence": 0.9, "reason": "refund question"}
+        assert analysis["intent"] == "refund_inquiry" and analysis["model_used"] == "scripted"
+        assert "in_scope" not in analysis
+
+    @pytest.mark.parametrize("rag_settings", [
+        {"RAG_RETRIEVAL_MODE": "bm25", "RAG_ANSWER_CACHE_ENABLED": False, "INTENT_RULES_ENABLED": True}
+    ])
+    def test_rule_resolved_message_makes_no_call(self, rag):
+        """Test that messages the rules decide fully skip the LLM"""
+        analysis = asyncio.run(rag.aanalyze_message("How do I return my order?"))
+        assert rag.llm_service.prompts == []
+        assert analysis["scope"]["method"] == "rules" and analysis["intent"] == "return_inquiry"
+
+    @pytest.mark.parametrize("text", ["not json", '["refund_inquiry"]', '"refund_inquiry"', "null"])
+    def test_unparseable_result_falls_back(self, rag, text):
+        """Test that a bad or non-object completion degrades like the separate classifiers"""
+        rag.llm_service.analysis_text = text
+        analysis = rag.analyze_message("I was told I could get my money back?")
+        assert analysis["scope"]["reason"] == "Classification failed"
+        assert analysis["model_used"] == "fallback"
+
+
+class TestPrecomputedAnalysis:
+    """Test suite for answer_question with a precomputed analysis and documents"""
+
+    def test_chat_pipeline_needs_two_llm_calls(self, rag):
+        """Test that analysis plus answer replaces analysis, scope and answer calls"""
+        message = "I was told I could get my money back?"
+
+        async def pipeline():
+            analysis, docs = await asyncio.gather(rag.aanalyze_message(message), rag.aretrieve_for_answer(message))
+            return await rag.aanswer_question(message, analysis=analysis, context_docs=docs)
+
+        result = asyncio.run(pipeline())
+        assert rag.llm_service.prompts == ["combined", "answer"]
+        assert result["response"] == "Refunds are accepted within 30 days."
+        assert result["intent_classification"]["reason"] == "refund question"
+        assert result["retrieved_docs"] == 1
+
+    def test_without_analysis_scope_is_classified(self, rag):
+        """Test that callers without an analysis keep the previous behaviour"""
+        rag.answer_question("I was told I could get my money back?")
+        assert rag.llm_service.prompts == ["scope", "answer"]
+
+    def test_out_of_scope_analysis_skips_retrieval_results(self, rag):
+        """Test that a precomputed out-of-scope decision is refused without an LLM call"""
+        analysis = {"scope": {"in_scope": False, "confidence": 0.95, "reason": "entertainment"}}
+        result = rag.answer_question("Entertain me please", analysis=analysis, context_docs=[])
+        assert result["response"] == rag.OUT_OF_SCOPE_RESPONSE
+        assert rag.llm_service.prompts == []
@@ -0,0 +1,134 @@
+"""
+Test cases for token-budgeted RAG prompts and index-time chunking
+"""
+import pytest
+
+from app.services.llm_telemetry import estimate_tokens
+from app.services.prompt_builder import build_context, chunk_document, trim_history
+
+
+def paragraph(topic, sentences=6):
+    """Sentences whose words are unique to the topic, so paragraphs share no trigrams"""
+    return " ".join(" ".join(f"{topic}{i}w{j}" for j in range(8)) + "." for i in range(sentences))
+
+
+def passage(content, title="Policy"):
+    return {"content": content, "metadata": {"title": title}}
+
+
+class TestPromptBuilder:
+    """Test suite for chunk_document, build_context and trim_history"""
+
+    def test_chunks_follow_paragraphs_and_respect_size(self):
+        """Test that a long document becomes passages of at most max_tokens"""
+        text = "\n\n".join(paragraph(topic) for topic in ("refund", "return", "shipping", "warranty"))
+        chunks = chunk_document(text, max_tokens=120, overlap_tokens=0)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk) <= 120 for chunk in chunks)
+        assert "".join(chunks).replace("\n", "").replace(" ", "") == text.replace("\n", "").replace(" ", "")
+
+    def test_chunks_overlap_their_predecessor(self):
+        """Test that each passage starts with the tail of the previous one"""
+        text = "\n\n".join(paragraph(topic) for topic in ("refund", "return", "shipping"))
+        chunks = chunk_document(text, max_tokens=120, overlap_tokens=10)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            first_words = " ".join(current.split()[:3])
+            assert first_words in previous
+
+    def test_short_document_is_one_passage(self):
+        """Test that documents within the limit are left whole"""
+        assert chunk_document("Refunds take 5 days.", max_tokens=100) == ["Refunds take 5 days."]
+        assert chunk_document("   ", max_tokens=100) == []
+
+    def test_duplicates_are_dropped(self):
+        """Test that passages mostly covered by chosen ones are skipped"""
+        refund = paragraph("refund")
+        docs = [passage(refund), passage(refund + " Thanks."), passage(paragraph("shipping"))]
+        selected, usage = build_context(docs, budget_tokens=1000)
+
+        assert [doc["content"] for doc in selected] == [refund, paragraph("shipping")]
+        assert usage["duplicates_dropped"] == 1
+        assert usage["passages_used"] == 2
+
+    def test_budget_truncates_then_drops(self):
+        """Test that the budget is filled in rank order and never exceeded"""
+        docs = [passage(paragraph(topic, 10)) for topic in ("refund", "return", "shipping")]
+        budget = estimate_tokens(docs[0]["content"]) + 60
+        selected, usage = build_context(docs, budget_tokens=budget)
+
+        assert selected[0]["content"] == docs[0]["content"]
+        assert selected[1]["content"].endswith(" ...")
+        assert usage["context_tokens"] <= budget
+        assert (usage["truncated"], usage["over_budget_dropped"]) == (1, 1)
+
+    def test_history_keeps_newest_turns(self):
+        """Test that older turns are dropped first when history is over budget"""
+        messages = [{"role": "user", "content": f"message {i} " + "x" * 80} for i in range(5)]
+        lines, tokens = trim_history(messages, budget_tokens=50)
+
+        assert [line.split()[2] for line in lines] == ["3", "4"]
+        assert tokens <= 50
+
+
+class RecordingLLM:
+    """LLM stand-in that keeps the requests it receives"""
+
+    def __init__(self):
+        self.requests = []
+
+    def check_health(self):
+        return True
+
+    def generate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=200, feature=None):
+        self.requests.append({"prompt": prompt, "feature": feature})
+        return {"text": "answer", "success": True}
+
+
+@pytest.fixture
+def documents(make_doc):
+    long_policy = "\n\n".join(paragraph(topic) for topic in ("refund", "return", "exchange", "warranty"))
+    return [make_doc("returns", long_policy, title="Returns Policy", tags=["returns"])]
+
+
+@pytest.fixture
+def llm():
+    return RecordingLLM()
+
+
+@pytest.fixture
+def rag_settings():
+    return {
+        "RAG_ANSWER_CACHE_ENABLED": False,
+        "RAG_RETRIEVAL_MODE": "bm25",
+        "RAG_CHUNK_TOKENS": 120,
+        "RAG_CONTEXT_TOKEN_BUDGET": 200
+    }
+
+
+class TestBudgetedAnswers:
+    """Test suite for chunked indexing and budgeted answer prompts in RAGService"""
+
+    def test_long_documents_are_indexed_as_passages(self, rag):
+        """Test that each passage is its own index entry carrying the title"""
+        report = rag.index_knowledge_base()
+        records = list(rag.doc_store.records())
+
+        assert report["indexed"] == 1 and report["chunks"] == len(records) > 1
+        assert all(text.startswith("Returns Policy\n\n") for _, text, _ in records)
+        assert sorted(meta["chunk"] for _, _, meta in records) == list(range(len(records)))
+
+    def test_answer_prompt_stays_within_budget(self, rag):
+        """Test that the answer reports its budget usage and the prompt holds only what fits"""
+        rag.index_knowledge_base()
+        result = rag.answer_question(
+            "returns policy", top_k=5,
+            analysis={"scope": {"in_scope": True, "confidence": 0.9}}
+        )
+
+        usage = result["prompt_budget"]
+        assert usage["context_tokens"] <= 200
+        assert usage["passages_used"] < usage["passages_retrieved"]
+        assert rag.llm_service.requests[0]["prompt"].count("[Source ") == usage["passages_used"]
+        assert rag.prompt_budget_stats()["prompts"] == 1
@@ -0,0 +1,123 @@
+"""
+Test cases for LLM circuit breakers and latency-aware provider routing
+"""
+import httpx
+import pytest
+
+from app.services import provider_router as router_module
+from app.services.provider_router import CircuitBreaker, ProviderRouter, CLOSED, OPEN, HALF_OPEN
+from app.services.llm_service import LLMService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(router_module.time, "monotonic", fake.monotonic)
+    return fake
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker state transitions"""
+
+    def test_opens_after_consecutive_failures(self, clock):
+        """Test that the breaker opens at the threshold and a success resets the count"""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout_seconds=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.allow_request() is False
+
+    def test_half_open_allows_one_trial(self, clock):
+        """Test that after the cool-down a single trial decides the state"""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout_seconds=30)
+        breaker.record_failure()
+        clock.now += 31
+        assert breaker.allow_request() is True
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow_request() is False
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.now += 31
+        assert breaker.allow_request() is True
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+
+class TestProviderRouter:
+    """Test suite for latency-aware ordering"""
+
+    def test_unmeasured_providers_keep_configured_order(self):
+        """Test that routing starts from the configured priority"""
+        router = ProviderRouter(min_samples=3)
+        assert router.order(["groq", "gemini", "ollama"]) == ["groq", "gemini", "ollama"]
+
+    def test_fastest_measured_provider_first(self):
+        """Test that providers are ranked by rolling p50 latency"""
+        router = ProviderRouter(min_samples=3)
+        for _ in range(3):
+            router.record_success("groq", 900)
+            router.record_success("gemini", 300)
+        assert router.order(["groq", "gemini", "ollama"]) == ["gemini", "groq", "ollama"]
+
+        assert router.order(["ollama", "groq", "gemini"]) == ["ollama", "gemini", "groq"]
+
+        router.adaptive = False
+        assert router.order(["groq", "gemini", "ollama"]) == ["groq", "gemini", "ollama"]
+
+    def test_streamed_calls_ranked_separately(self):
+        """Test that time to first token does not make a provider look faster for full completions"""
+        router = ProviderRouter(min_samples=3)
+        for _ in range(3):
+            router.record_success("groq", 900)
+            router.record_success("gemini", 600)
+        for _ in range(10):
+            router.record_success("groq", 50, streamed=True)
+            router.record_success("gemini", 150, streamed=True)
+
+        assert router.order(["groq", "gemini"]) == ["gemini", "groq"]
+        assert router.order(["groq", "gemini"], streamed=True) == ["groq", "gemini"]
+        stats = router.stats(["groq"])["providers"]["groq"]
+        assert stats["samples"] == 3 and stats["p50_ms"] == 900
+        assert stats["stream_samples"] == 10 and stats["stream_first_token_p50_ms"] == 50
+
+
+class TestLLMServiceRouting:
+    """Test suite for breaker-aware fallback in LLMService.generate"""
+
+    def test_open_circuit_skips_dead_provider(self, clock):
+        """Test that once Groq's circuit opens, calls stop reaching it until the cool-down"""
+        llm = LLMService()
+        llm.grok_api_key = "test-key"
+        llm.gemini_client = None
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            if request.url.host == "api.groq.com":
+                raise httpx.ConnectTimeout("timed out", request=request)
+            return httpx.Response(200, json={"message": {"content": "from ollama"}})
+
+        llm._client_options = lambda provider: {"transport": httpx.MockTransport(handler)}
+        threshold = llm.router.failure_threshold
+        for _ in range(threshold + 2):
+            assert llm.generate("hello")["text"] == "from ollama"
+
+        assert hosts.count("api.groq.com") == threshold
+        assert llm.router.stats(["groq", "ollama"])["providers"]["groq"]["state"] == OPEN
+
+        # After the cool-down a single trial goes to Groq again
+        clock.now += llm.router.reset_timeout_seconds + 1
+        llm.generate("hello")
+        assert hosts.count("api.groq.com") == threshold + 1
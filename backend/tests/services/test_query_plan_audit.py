@@ -0,0 +1,45 @@
+"""
+Test cases for the query plan audit and the hot-query indexes
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.models import Base
+from scripts.audit_query_plans import CATALOGUE, audit, full_scans
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'audit.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return url
+
+
+class TestQueryPlanAudit:
+    """Test suite for scripts/audit_query_plans.py"""
+
+    def test_catalogue_has_no_full_scans(self, db_url):
+        """Test that every catalogued query is answered from an index on the current schema"""
+        report = audit(db_url)
+
+        assert len(report) == len(CATALOGUE)
+        assert all(row["plan"] for row in report)
+        assert {row["query"]: row["full_scans"] for row in report if row["full_scans"]} == {}
+
+    def test_missing_index_is_flagged(self, db_url):
+        """Test that dropping an index turns its queries into flagged full scans"""
+        engine = create_engine(db_url)
+        with engine.begin() as connection:
+            connection.execute(text("DROP INDEX ix_messages_ticket_id_created_at"))
+        engine.dispose()
+
+        flagged = {row["query"]: row["full_scans"] for row in audit(db_url) if row["full_scans"]}
+        assert flagged["ticket thread"] == ["SCAN messages"]
+
+    def test_index_walks_are_not_full_scans(self):
+        """Test that ordered index scans and searches are not reported"""
+        plan = ["SCAN tickets USING INDEX ix_tickets_created_at_id", "SEARCH users USING INTEGER PRIMARY KEY (rowid=?)", "SCAN orders"]
+        assert full_scans(plan, "sqlite") == ["SCAN orders"]
+        assert full_scans(["Seq Scan on orders  (cost=0.00..1.01 rows=1 width=8)"], "postgresql") == ["Seq Scan on orders  (cost=0.00..1.01 rows=1 width=8)"]
@@ -0,0 +1,114 @@
+"""
+Test cases for single-flight coalescing and the short-TTL LLM result cache
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.services.llm_service import LLMService
+from app.services.request_coalescer import ResultCache, SingleFlight
+
+
+@pytest.fixture
+def llm():
+    service = LLMService()
+    service.grok_api_key = "test-key"
+    service.gemini_client = None
+    service.requests = []
+    service.status = 200
+
+    def handler(request):
+        service.requests.append(request)
+        time.sleep(0.1)
+        return httpx.Response(service.status, json={"choices": [{"message": {"content": "summary"}}]})
+
+    service._client_options = lambda provider: {"transport": httpx.MockTransport(handler)}
+    return service
+
+
+class TestSingleFlight:
+    """Test suite for coalescing identical in-flight requests"""
+
+    def test_concurrent_identical_threads_share_one_call(self, llm):
+        """Test that duplicate blocking calls wait for the first one"""
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(lambda _: llm.generate("summarise ticket 42"), range(5)))
+
+        assert [result["text"] for result in results] == ["summary"] * 5
+        assert len(llm.requests) == 1
+        assert llm.single_flight.stats()["coalesced"] == 4
+
+    def test_concurrent_identical_coroutines_share_one_call(self, llm):
+        """Test that duplicate awaited calls share one request and different prompts do not"""
+        async def run():
+            same = [llm.agenerate("team insights") for _ in range(4)]
+            other = [llm.agenerate("agent performance")]
+            return await asyncio.gather(*same, *other)
+
+        results = asyncio.run(run())
+        assert all(result["success"] for result in results)
+        assert len(llm.requests) == 2
+        assert results[0] is not results[1]
+
+    def test_followers_receive_the_leaders_error(self):
+        """Test that an exception in the shared call reaches every waiter"""
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError("provider down")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("key", failing)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+        assert errors == ["provider down", "provider down"]
+
+
+class TestResultCache:
+    """Test suite for caching low-temperature results"""
+
+    def test_low_temperature_result_is_reused(self, llm):
+        """Test that a repeated classification prompt is served from the cache"""
+        first = llm.generate("classify this", temperature=0.1)
+        second = llm.generate("classify this", temperature=0.1)
+        assert first == second
+        assert len(llm.requests) == 1
+
+    def test_creative_and_failed_results_are_not_cached(self, llm):
+        """Test that high-temperature prompts and failures always reach the provider"""
+        llm.generate("suggest a reply", temperature=0.7)
+        llm.generate("suggest a reply", temperature=0.7)
+        assert len(llm.requests) == 2
+
+        llm.status = 500
+        llm.router.failure_threshold = 100
+        llm.generate("classify that", temperature=0.1)
+        requests_after_failure = len(llm.requests)
+        llm.generate("classify that", temperature=0.1)
+        assert len(llm.requests) > requests_after_failure
+
+    def test_entries_expire(self):
+        """Test that entries are dropped after their TTL"""
+        cache = ResultCache(ttl_seconds=0.05)
+        cache.put("key", {"text": "a"})
+        assert cache.get("key") == {"text": "a"}
+        time.sleep(0.06)
+        assert cache.get("key") is None
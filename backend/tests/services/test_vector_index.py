@@ -0,0 +1,76 @@
+"""
+Test cases for the FAISS vector index factory
+"""
+import numpy as np
+import pytest
+
+from app.services import vector_index
+from app.services.vector_index import (
+    build_index, select_index_mode, index_mode_of, read_index, write_index, filtered_search
+)
+
+
+def make_vectors(count: int, dimension: int = 32) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(count, dimension)).astype('float32')
+
+
+class TestVectorIndex:
+    """Test suite for index mode selection, building and tuning"""
+
+    def test_auto_mode_follows_corpus_size(self, monkeypatch):
+        """Test automatic selection: flat for small, IVF for medium, IVF-PQ for huge corpora"""
+        monkeypatch.setattr(vector_index.settings, "RAG_INDEX_MODE", "auto")
+        assert select_index_mode(100) == "flat"
+        assert select_index_mode(vector_index.settings.RAG_ANN_MIN_VECTORS) == "ivf_flat"
+        assert select_index_mode(vector_index.settings.RAG_IVF_PQ_MIN_VECTORS) == "ivf_pq"
+
+    def test_explicit_mode_overrides_auto(self):
+        """Test explicit and unknown modes"""
+        assert select_index_mode(10, "hnsw") == "hnsw"
+        assert select_index_mode(10, "bogus") == "flat"
+
+    def test_small_corpus_falls_back_to_flat(self):
+        """Test that modes needing training fall back when there is too little data"""
+        index, report = build_index(make_vectors(20), mode="ivf_pq")
+        assert report["mode"] == "flat"
+        assert index.ntotal == 20
+
+    def test_ivf_is_tuned_to_recall_target(self, monkeypatch):
+        """Test that nprobe is raised until recall reaches the configured target"""
+        monkeypatch.setattr(vector_index.settings, "RAG_IVF_NPROBE", 1)
+        monkeypatch.setattr(vector_index.settings, "RAG_RECALL_TARGET", 0.9)
+        index, report = build_index(make_vectors(4000), mode="ivf_flat")
+        assert index_mode_of(index) == "ivf_flat"
+        assert report["recall"] >= 0.9
+        assert report["params"]["nprobe"] >= 1
+
+    def test_hnsw_search_returns_neighbours(self):
+        """Test HNSW index search finds the query vector itself"""
+        vectors = make_vectors(500)
+        index, report = build_index(vectors, mode="hnsw")
+        assert report["mode"] == "hnsw"
+        _, ids = index.search(vectors[:1], 1)
+        assert ids[0][0] == 0
+
+    def test_memory_mapped_load_matches_in_memory_search(self, tmp_path):
+        """Test that a memory-mapped index returns the same neighbours as an in-memory copy"""
+        vectors = make_vectors(4000)
+        index, _ = build_index(vectors, mode="ivf_flat", tune=False)
+        path = str(tmp_path / "faiss.index")
+        write_index(index, path)
+
+        mapped, is_mapped = read_index(path, mmap=True)
+        loaded, is_loaded_mapped = read_index(path, mmap=False)
+        assert (is_mapped, is_loaded_mapped) == (True, False)
+        assert (mapped.search(vectors[:5], 3)[1] == loaded.search(vectors[:5], 3)[1]).all()
+
+    @pytest.mark.parametrize("mode", ["flat", "ivf_flat", "hnsw"])
+    def test_filtered_search_returns_only_allowed_ids(self, mode):
+        """Test that filtered search fills top_k from a rare id subset"""
+        vectors = make_vectors(4000)
+        index, _ = build_index(vectors, mode=mode, tune=False, ids=np.arange(4000, dtype='int64') * 2)
+        allowed = np.array([10, 500, 3002, 7998], dtype='int64')
+        _, ids = filtered_search(index, vectors[:1], 3, allowed)
+        assert len(ids[0]) == 3
+        assert set(ids[0].tolist()) <= set(allowed.tolist())
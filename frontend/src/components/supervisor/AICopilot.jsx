@@ -3,6 +3,7 @@ import { Card, CardContent, CardHeader, CardTitle } from '../ui/card';
 import { Button } from '../ui/button';
 import { Badge } from '../ui/badge';
 import { Brain, Sparkles, AlertTriangle, TrendingUp, FileText, Copy } from 'lucide-react';
+import supervisorApi from '../../services/supervisorApi';
 
 const AICopilot = () => {
   const [activeTab, setActiveTab] = useState('summarize');
@@ -18,7 +19,8 @@ const AICopilot = () => {
   React.useEffect(() => {
     const fetchRecentTickets = async () => {
       try {
-        const response = await fetch('http://127.0.0.1:8000/api/v1/supervisor/tickets', {
+        // Only the newest few are listed, so one short page is enough
+        const response = await fetch('http://127.0.0.1:8000/api/v1/supervisor/tickets?limit=10', {
           headers: { 'Authorization': `Bearer ${localStorage.getItem('intellica_token_supervisor')}` }
         });
         if (response.ok) {
@@ -32,13 +34,8 @@ const AICopilot = () => {
     
     const fetchRecentAgents = async () => {
       try {
-        const response = await fetch('http://127.0.0.1:8000/api/v1/supervisor/agents', {
-          headers: { 'Authorization': `Bearer ${localStorage.getItem('intellica_token_supervisor')}` }
-        });
-        if (response.ok) {
-          const agents = await response.json();
-          setRecentAgents(agents);
-        }
+        const agents = await supervisorApi.getAgents();
+        setRecentAgents(agents);
       } catch (error) {
         console.error('Failed to fetch agents:', error);
       }
@@ -104,39 +101,31 @@ const AICopilot = () => {
     setLoading(true);
     try {
       // First get agents to find the correct agent ID
-      const agentsResponse = await fetch('http://127.0.0.1:8000/api/v1/supervisor/agents', {
-        headers: { 'Authorization': `Bearer ${localStorage.getItem('intellica_token_supervisor')}` }
-      });
+      const agents = await supervisorApi.getAgents();
+      const agent = agents.find(a => 
+        a.id.toString() === ticketId.trim() || 
+        a.name.toLowerCase() === ticketId.trim().toLowerCase() ||
+        a.name.toLowerCase().includes(ticketId.trim().toLowerCase())
+      );
       
-      if (agentsResponse.ok) {
-        const agents = await agentsResponse.json();
-        const agent = agents.find(a => 
-          a.id.toString() === ticketId.trim() || 
-          a.name.toLowerCase() === ticketId.trim().toLowerCase() ||
-          a.name.toLowerCase().includes(ticketId.trim().toLowerCase())
-        );
+      if (agent) {
+        // Use the real copilot API for AI analysis
+        const response = await fetch(`http://127.0.0.1:8000/api/v1/copilot/supervisor/agent-performance/${agent.id}`, {
+          headers: { 'Authorization': `Bearer ${localStorage.getItem('intellica_token_supervisor')}` }
+        });
         
-        if (agent) {
-          // Use the real copilot API for AI analysis
-          const response = await fetch(`http://127.0.0.1:8000/api/v1/copilot/supervisor/agent-performance/${agent.id}`, {
-            headers: { 'Authorization': `Bearer ${localStorage.getItem('intellica_token_supervisor')}` }
-          });
-          
-          if (response.ok) {
-            const data = await response.json();
-            setResult(data);
-          } else {
-            throw new Error('Failed to get AI analysis');
-          }
+        if (response.ok) {
+          const data = await response.json();
+          setResult(data);
         } else {
-          const availableAgents = agents.map(a => `${a.name} (ID: ${a.id})`).join(', ');
-          setResult({ 
-            error: `Agent '${ticketId}' not found`, 
-            details: `Available agents: ${availableAgents}` 
-          });
+          throw new Error('Failed to get AI analysis');
         }
       } else {
-        throw new Error('Failed to fetch agents');
+        const availableAgents = agents.map(a => `${a.name} (ID: ${a.id})`).join(', ');
+        setResult({ 
+          error: `Agent '${ticketId}' not found`, 
+          details: `Available agents: ${availableAgents}` 
+        });
       }
     } catch (error) {
       setResult({ error: 'Failed to analyze performance', details: error.message });
@@ -14,7 +14,7 @@ class AgentApiService {
     };
   }
 
-  async request(endpoint, options = {}) {
+  async send(endpoint, options = {}) {
     const url = `${API_BASE_URL}${endpoint}`;
     const config = {
       ...options,
@@ -40,7 +40,26 @@ class AgentApiService {
       throw new Error(`API Error: ${response.status}`);
     }
     
-    return response.json();
+    return response;
+  }
+
+  async request(endpoint, options = {}) {
+    const response = await this.send(endpoint, options);
+    return response && response.json();
+  }
+
+  // List endpoints return one page per request; follow X-Next-Cursor to collect every row
+  async requestAllPages(endpoint, params) {
+    const rows = [];
+    let cursor = null;
+    do {
+      if (cursor) params.set('cursor', cursor);
+      const response = await this.send(`${endpoint}?${params}`);
+      if (!response) return rows;
+      rows.push(...await response.json());
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return rows;
   }
 
   // Dashboard
@@ -55,7 +74,7 @@ class AgentApiService {
     if (priority && priority !== 'all') params.append('priority', priority);
     if (assignedOnly) params.append('assigned_only', 'true');
     
-    return this.request(`/agent/tickets?${params}`);
+    return this.requestAllPages('/agent/tickets', params);
   }
 
   async getTicketDetails(ticketId) {
@@ -94,7 +113,7 @@ class AgentApiService {
     const params = new URLSearchParams();
     if (search) params.append('search', search);
     
-    return this.request(`/agent/customers?${params}`);
+    return this.requestAllPages('/agent/customers', params);
   }
 
   async getCustomerDetails(customerId) {
@@ -18,7 +18,7 @@ class ApiService {
     };
   }
 
-  async request(endpoint, options = {}) {
+  async send(endpoint, options = {}) {
     const url = `${API_BASE_URL}${endpoint}`;
     const config = {
       ...options,
@@ -44,7 +44,26 @@ class ApiService {
       throw new Error(`API Error: ${response.status}`);
     }
     
-    return response.json();
+    return response;
+  }
+
+  async request(endpoint, options = {}) {
+    const response = await this.send(endpoint, options);
+    return response && response.json();
+  }
+
+  // List endpoints return one page per request; follow X-Next-Cursor to collect every row
+  async requestAllPages(endpoint, params) {
+    const rows = [];
+    let cursor = null;
+    do {
+      if (cursor) params.set('cursor', cursor);
+      const response = await this.send(`${endpoint}?${params}`);
+      if (!response) return rows;
+      rows.push(...await response.json());
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return rows;
   }
 
   // Dashboard
@@ -58,7 +77,7 @@ class ApiService {
     if (status && status !== 'all') params.append('status', status);
     if (search) params.append('search', search);
     
-    return this.request(`/customer/orders?${params}`);
+    return this.requestAllPages('/customer/orders', params);
   }
 
   async getOrderDetails(orderId) {
@@ -82,7 +101,7 @@ class ApiService {
     if (status && status !== 'all') params.append('status', status);
     if (search) params.append('search', search);
     
-    return this.request(`/customer/tickets?${params}`);
+    return this.requestAllPages('/customer/tickets', params);
   }
 
   async createTicket(ticketData) {
@@ -13,7 +13,7 @@ class SupervisorApiService {
     };
   }
 
-  async request(endpoint, options = {}) {
+  async send(endpoint, options = {}) {
     const url = `${API_BASE_URL}${endpoint}`;
     const config = {
       ...options,
@@ -36,7 +36,26 @@ class SupervisorApiService {
       throw new Error(`API Error: ${response.status}`);
     }
     
-    return response.json();
+    return response;
+  }
+
+  async request(endpoint, options = {}) {
+    const response = await this.send(endpoint, options);
+    return response && response.json();
+  }
+
+  // List endpoints return one page per request; follow X-Next-Cursor to collect every row
+  async requestAllPages(endpoint, params) {
+    const rows = [];
+    let cursor = null;
+    do {
+      if (cursor) params.set('cursor', cursor);
+      const response = await this.send(`${endpoint}?${params}`);
+      if (!response) return rows;
+      rows.push(...await response.json());
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return rows;
   }
 
   // Dashboard
@@ -55,7 +74,7 @@ class SupervisorApiService {
     if (priority && priority !== 'all') params.append('priority', priority);
     if (search) params.append('search', search);
     
-    return this.request(`/supervisor/tickets?${params}`);
+    return this.requestAllPages('/supervisor/tickets', params);
   }
 
   async reassignTicket(ticketId, agentId) {
@@ -83,7 +102,7 @@ class SupervisorApiService {
     if (search) params.append('search', search);
     if (statusFilter) params.append('status_filter', statusFilter);
     
-    return this.request(`/supervisor/agents?${params}`);
+    return this.requestAllPages('/supervisor/agents', params);
   }
 
   async updateAgentStatus(agentId, isActive) {
@@ -109,7 +128,7 @@ class SupervisorApiService {
     if (search) params.append('search', search);
     if (statusFilter && statusFilter !== 'All Customers') params.append('status_filter', statusFilter);
     
-    return this.request(`/supervisor/customers?${params}`);
+    return this.requestAllPages('/supervisor/customers', params);
   }
 
   async updateCustomerStatus(customerId, isActive) {